@@ -0,0 +1,187 @@
+"""
+bench_agg_oracle.py — qa_common.agg_oracle vs sort ทั้งกลุ่มทีละ row ใน Python
+
+สร้าง snapshot สังเคราะห์ของ mst_sfv_nonprod ที่มี most_popular (PLAY_COUNT_DAY_14 / 30)
+แล้วคำนวณ buckets ผ่านทั้ง 2 วิธี:
+  - agg_tophit ของ src/sfv_agg_tophit.sql (heap ต่อกลุ่ม)
+  - agg_latest ของ src/sfv_agg_latest.sql (ลำดับวันที่ที่ sort ไว้ + rank ในกลุ่ม)
+  - buckets + ID + ลำดับต้องตรงกันทุกชุด, เวลา ต่อ parameter set
+
+Usage:
+  python benchmarks/bench_agg_oracle.py
+  python benchmarks/bench_agg_oracle.py --rows 300000
+"""
+
+import argparse
+import datetime
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.agg_oracle import SPORTS_CATEGORIES, expected_latest, expected_tophit
+from qa_common.columnar import load_table
+
+TEMPLATE = os.path.join(ROOT_DIR, "src", "sfv_agg_tophit.sql")
+LATEST_TEMPLATE = os.path.join(ROOT_DIR, "src", "sfv_agg_latest.sql")
+TABLE    = "mst_sfv_nonprod"
+NOW      = datetime.datetime(2026, 1, 15, 12, 0, tzinfo=datetime.timezone.utc)
+
+CATEGORIES = ["series", "movie", "sports", "tennis", "news", "music", "drama", "nba", "game", "f1", "kids"]
+COLUMNS = [
+    ["id", "STRING(MAX)"], ["title", "STRING(MAX)"], ["status", "STRING(MAX)"],
+    ["searchable", "STRING(MAX)"], ["lang", "STRING(MAX)"], ["publish_date", "TIMESTAMP"],
+    ["expire_date", "TIMESTAMP"], ["article_category", "ARRAY<STRING(MAX)>"],
+    ["most_popular", "JSON"],
+]
+
+PARAMETER_SETS = [
+    {"tophit_date_filter": 30, "agg_tophit_group_field": "article_category",
+     "agg_tophit_limit": 50, "agg_tophit_sort_by": "PLAY_COUNT_DAY_14"},
+    {"tophit_date_filter": 30, "agg_tophit_group_field": "article_category",
+     "agg_tophit_limit": 100, "agg_tophit_sort_by": "PLAY_COUNT_DAY_14"},
+    {"tophit_date_filter": 60, "agg_tophit_group_field": "article_category",
+     "agg_tophit_limit": 50, "agg_tophit_sort_by": "PLAY_COUNT_DAY_30"},
+    {"tophit_date_filter": 60, "language": "en", "agg_tophit_group_field": "article_category",
+     "agg_tophit_limit": 10, "agg_tophit_sort_by": "PLAY_COUNT_DAY_30"},
+]
+
+LATEST_PARAMETER_SETS = [
+    {"tophit_date_filter": 30, "agg_latest_group_field": "article_category", "agg_latest_limit": 50},
+    {"tophit_date_filter": 30, "agg_latest_group_field": "article_category", "agg_latest_limit": 100},
+    {"tophit_date_filter": 0, "language": "en", "agg_latest_group_field": "article_category",
+     "agg_latest_limit": 1000},
+]
+
+
+# ======================================================
+# SYNTHETIC SNAPSHOT
+# ======================================================
+def write_snapshot(path: str, rows: int, seed: int = 5):
+    rng = random.Random(seed)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"database": "ai_raas_nonprod", "table": TABLE,
+                            "columns": COLUMNS, "primary_key": ["id"]}) + "\n")
+        for i in range(rows):
+            pub = NOW - datetime.timedelta(minutes=rng.randint(-600, 60 * 24 * 90))
+            popular = None
+            if rng.random() < 0.9:
+                popular = {"PLAY_COUNT_DAY_14": rng.randint(0, 300), "PLAY_COUNT_DAY_30": rng.randint(0, 3000)}
+            f.write(json.dumps([
+                f"id{i:06d}", f"title {i}",
+                "publish" if rng.random() < 0.95 else "draft", "Y",
+                "th" if rng.random() < 0.7 else "en",
+                pub.isoformat(), None,
+                ([None] if rng.random() < 0.02 else []) + rng.sample(CATEGORIES, rng.randint(0, 2)),
+                popular,
+            ]) + "\n")
+
+
+# ======================================================
+# REFERENCE (ทีละ row + sort ทั้งกลุ่ม — ตาม SQL ตรง ๆ)
+# ======================================================
+def _reference_groups(path: str, parameters: dict, sort_key) -> dict:
+    days  = parameters["tophit_date_filter"]
+    lang  = parameters.get("language", "th")
+    since = NOW - datetime.timedelta(days=days) if days else None
+    groups: dict = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        names = [c for c, _ in json.loads(f.readline())["columns"]]
+        for line in f:
+            r = dict(zip(names, json.loads(line)))
+            pub = datetime.datetime.fromisoformat(r["publish_date"])
+            if (r["status"] != "publish" or r["lang"] != lang or pub > NOW or (since and pub < since)
+                    or any(c in ("s-highlight-epl,epl-poll-whowin,epl-preview,epl-h2h,epl-key-player",)
+                           for c in r["article_category"] if c)):
+                continue
+            key = sort_key(r, pub)
+            if key is None:
+                continue
+            first = next((c for c in r["article_category"] if c is not None), None)
+            group = "sports" if first in SPORTS_CATEGORIES else first
+            groups.setdefault(group, []).append((key, r["id"]))
+    return groups
+
+
+def _reference_buckets(groups: dict, limit: int) -> dict:
+    return {k: [i for _, i in sorted(groups[k])[:limit]]
+            for k in sorted(groups, key=lambda k: (k is None, k or ""))}
+
+
+def reference_tophit(path: str, parameters: dict) -> dict:
+    sort_by = parameters["agg_tophit_sort_by"]
+    score = lambda r, pub: None if (r["most_popular"] or {}).get(sort_by) is None \
+        else -r["most_popular"][sort_by]
+    return _reference_buckets(_reference_groups(path, parameters, score), parameters["agg_tophit_limit"])
+
+
+def reference_latest(path: str, parameters: dict) -> dict:
+    newest_first = lambda r, pub: -pub.timestamp()
+    return _reference_buckets(_reference_groups(path, parameters, newest_first), parameters["agg_latest_limit"])
+
+
+def run(table, path: str, repeat: int, name: str, template: str, parameter_sets: list,
+        oracle_fn, reference_fn, label_fn) -> tuple:
+    oracle_total = loop_total = 0.0
+    for params in parameter_sets:
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            got = oracle_fn(table, template, params, now=NOW)
+            times.append((time.perf_counter() - t0) * 1000)
+        oracle_ms = statistics.median(times)
+        oracle_total += oracle_ms
+
+        t0 = time.perf_counter()
+        want = reference_fn(path, params)
+        loop_ms = (time.perf_counter() - t0) * 1000
+        loop_total += loop_ms
+        assert got == want, f"ผลไม่ตรงกัน: {params}"
+
+        label = f"{name} {label_fn(params)} days={params['tophit_date_filter']} lang={params.get('language', 'th')}"
+        print(f"  {label:<60} {len(got):>7} {sum(map(len, got.values())):>6} "
+              f"{oracle_ms:>10.2f} {loop_ms:>9.0f}")
+    return oracle_total, loop_total
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows",   type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".jsonl.gz", delete=False)
+    tmp.close()
+    try:
+        write_snapshot(tmp.name, args.rows)
+        t0 = time.perf_counter()
+        table = load_table(tmp.name, TABLE)
+        print(f"📦 {TABLE}: {table.n} rows, load {time.perf_counter() - t0:.2f} s (ครั้งเดียวต่อ process)")
+
+        print(f"\n  {'parameters':<60} {'buckets':>7} {'ids':>6} {'oracle ms':>10} {'loop ms':>9}")
+        print(f"  {'-'*60} {'-'*7} {'-'*6} {'-'*10} {'-'*9}")
+        results = [
+            run(table, tmp.name, args.repeat, "tophit", TEMPLATE, PARAMETER_SETS, expected_tophit, reference_tophit,
+                lambda p: f"limit={p['agg_tophit_limit']} {p['agg_tophit_sort_by']}"),
+            run(table, tmp.name, args.repeat, "latest", LATEST_TEMPLATE, LATEST_PARAMETER_SETS, expected_latest, reference_latest,
+                lambda p: f"limit={p['agg_latest_limit']}"),
+        ]
+        oracle_total = sum(r[0] for r in results)
+        loop_total   = sum(r[1] for r in results)
+        count = len(PARAMETER_SETS) + len(LATEST_PARAMETER_SETS)
+
+        print(f"\n  ⚡ oracle {oracle_total / count:.1f} ms / parameter set, "
+              f"x{loop_total / oracle_total:.0f} faster than row loop (buckets + ลำดับตรงกันทุกชุด)")
+    finally:
+        os.unlink(tmp.name)
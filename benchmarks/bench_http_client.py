@@ -0,0 +1,134 @@
+"""
+bench_http_client.py — เปรียบเทียบ curl subprocess (call_api เดิม) กับ qa_common.http_client
+
+รัน stand-in server บน localhost (ThreadingHTTPServer, HTTP/1.1 keep-alive)
+ตอบ JSON ขนาดใกล้เคียง metadata response แล้ววัด:
+  - requests/sec
+  - p50 / p95 client overhead (server ตอบทันที → latency ≈ overhead ฝั่ง client)
+
+Usage:
+  python benchmarks/bench_http_client.py                 # 200 requests / path
+  python benchmarks/bench_http_client.py -n 500 --hits 200
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.http_client import post_json, close_session
+
+REQUEST_BODY = {
+    "parameters": {"limit": 50, "language": "th", "title": "รัก",
+                   "fields": ["id", "create_date", "title", "article_category"]},
+    "options": {"rename_mapping": False, "dry_run": False, "debug": True, "cache": False},
+}
+
+
+# ======================================================
+# STAND-IN SERVER
+# ======================================================
+def make_payload(n_hits: int) -> bytes:
+    hits = [{"_source": {"id": f"id{i:08d}", "title": f"รักแท้ {i}",
+                         "article_category": "drama", "create_date": "2025-01-01"}}
+            for i in range(n_hits)]
+    return json.dumps({"data": {"hits": {"hits": hits}}}, ensure_ascii=False).encode("utf-8")
+
+
+def start_server(payload: bytes):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True   # เหมือน server จริง — ไม่ให้ Nagle + delayed ACK บวก 40ms
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/metadata/sfv"
+
+
+# ======================================================
+# CLIENT PATHS
+# ======================================================
+def curl_call(url: str, body: dict) -> dict:
+    """เหมือน call_api เดิมใน src/test_*_parameters.py"""
+    curl_cmd = [
+        "curl", "--location", "--silent", url,
+        "--header", "Content-Type: application/json",
+        "--data", json.dumps(body, ensure_ascii=False),
+    ]
+    result = subprocess.run(curl_cmd, capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(f"curl error: {result.stderr}")
+    return json.loads(result.stdout)
+
+
+def pooled_call(url: str, body: dict) -> dict:
+    return post_json(url, body, timeout=60)
+
+
+def run(label: str, fn, url: str, n: int) -> dict:
+    fn(url, REQUEST_BODY)   # warm-up (pooled: เปิด connection แรก)
+    lat = []
+    t0 = time.perf_counter()
+    for _ in range(n):
+        s = time.perf_counter()
+        fn(url, REQUEST_BODY)
+        lat.append((time.perf_counter() - s) * 1000)
+    total = time.perf_counter() - t0
+    lat.sort()
+    return {
+        "label":   label,
+        "rps":     n / total,
+        "p50_ms":  statistics.median(lat),
+        "p95_ms":  lat[int(len(lat) * 0.95) - 1],
+    }
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=200, help="requests ต่อ path")
+    ap.add_argument("--hits", type=int, default=100, help="จำนวน hits ใน stand-in response")
+    args = ap.parse_args()
+
+    server, url = start_server(make_payload(args.hits))
+    print(f"🖥️  stand-in server : {url}  (hits={args.hits}, n={args.n})")
+
+    try:
+        results = [
+            run("curl subprocess", curl_call,   url, args.n),
+            run("pooled session",  pooled_call, url, args.n),
+        ]
+    finally:
+        close_session()
+        server.shutdown()
+
+    print(f"\n  {'Path':<18} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    print(f"  {'-'*18} {'-'*9} {'-'*9} {'-'*9}")
+    for r in results:
+        print(f"  {r['label']:<18} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f}")
+    base, pooled = results
+    print(f"\n  ⚡ speed-up: x{pooled['rps'] / base['rps']:.1f} req/s, "
+          f"p95 overhead {base['p95_ms']:.2f} → {pooled['p95_ms']:.2f} ms")
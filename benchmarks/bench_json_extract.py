@@ -0,0 +1,165 @@
+"""
+bench_json_extract.py — json.loads ทั้งก้อน vs qa_common.json_extract.extract_nodes
+
+สร้าง verbose=debug payload ขนาดหลาย MB (หรือใช้ไฟล์ที่อัดไว้ด้วย --payload)
+แล้วรันแต่ละวิธีใน subprocess แยก เพื่อวัด:
+  - parse time ต่อ response (median)
+  - peak RSS ที่เพิ่มขึ้นระหว่าง parse (VmHWM หลัง − ก่อน)
+  - จำลอง cursor walker: parse ซ้ำ --cursors รอบ เก็บแค่ ids → peak RSS ต้องไม่โตตามจำนวน cursor
+
+Usage:
+  python benchmarks/bench_json_extract.py
+  python benchmarks/bench_json_extract.py --nodes 800 --cursors 100
+  python benchmarks/bench_json_extract.py --payload recorded_debug.json --find merge_page
+  python benchmarks/bench_json_extract.py --path data.results --find merge_page,candidate_pin_global
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.json_extract import extract_nodes
+from qa_common.node_index import NodeIndex
+
+DEFAULT_FIND = ["merge_page", "candidate_pin_global", "bucketize_tophit_sfv"]
+
+
+def peak_rss_mb() -> float:
+    # VmHWM reset ตอน exec; ru_maxrss ของ child ติดค่า peak ของ parent มาตอน fork
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # macOS: bytes, Linux: KB
+
+
+# ======================================================
+# PARSE PATHS
+# ======================================================
+def parse_full(body: bytes, names, path=None) -> dict:
+    obj = json.loads(body)
+    if path is not None:
+        for key in path:
+            obj = obj.get(key) if isinstance(obj, dict) else None
+        obj = obj if isinstance(obj, dict) else {}
+        return {n: obj[n] for n in names if isinstance(obj.get(n), dict)}
+    idx = NodeIndex(obj)
+    return {n: idx.node(n) for n in names if idx.node(n) is not None}
+
+
+def parse_extract(body: bytes, names, path=None) -> dict:
+    return extract_nodes(body, names, path=path)
+
+
+PATHS = {"json.loads": parse_full, "extract_nodes": parse_extract}
+
+
+def ids_of(nodes: dict) -> list:
+    out = []
+    for node in nodes.values():
+        result = node.get("result", {}) if isinstance(node, dict) else {}
+        for it in result.get("items", []) if isinstance(result, dict) else []:
+            if isinstance(it, dict) and it.get("id"):
+                out.append(it["id"])
+    return out
+
+
+# ======================================================
+# CHILD (1 path ต่อ process → peak RSS ไม่ปนกัน)
+# ======================================================
+def child(path: str, payload: str, names: list, cursors: int, node_path=None) -> dict:
+    with open(payload, "rb") as f:
+        body = f.read()
+    fn = PATHS[path]
+    base = peak_rss_mb()
+
+    times, kept = [], []
+    for _ in range(cursors):
+        t0 = time.perf_counter()
+        nodes = fn(body, names, node_path)
+        times.append((time.perf_counter() - t0) * 1000)
+        kept.append(ids_of(nodes))      # เหมือน walker: เก็บแค่ ids ต่อ cursor
+        del nodes
+        if len(times) == 1:
+            first_peak = peak_rss_mb() - base
+
+    return {
+        "path":           path,
+        "parse_ms":       statistics.median(times),
+        "peak_first_mb":  first_peak,
+        "peak_all_mb":    peak_rss_mb() - base,
+        "ids_per_cursor": len(kept[0]),
+    }
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nodes",   type=int, default=400, help="จำนวน filler DAG node")
+    ap.add_argument("--items",   type=int, default=100, help="items ต่อ node")
+    ap.add_argument("--payload", help="ไฟล์ JSON ของ verbose=debug response ที่อัดไว้")
+    ap.add_argument("--find",    default=",".join(DEFAULT_FIND), help="node ที่ต้องการ (comma)")
+    ap.add_argument("--cursors", type=int, default=30, help="จำนวนรอบ parse (จำลอง cursor walker)")
+    ap.add_argument("--path",    help="anchor ที่ object นี้ (คั่นด้วยจุด เช่น data.results)")
+    ap.add_argument("--child",   help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    names = [n for n in args.find.split(",") if n]
+    node_path = tuple(args.path.split(".")) if args.path else None
+
+    if args.child:
+        print(json.dumps(child(args.child, args.payload, names, args.cursors, node_path)))
+        sys.exit(0)
+
+    tmp = None
+    payload = args.payload
+    if not payload:
+        from bench_node_index import make_payload
+        tmp = tempfile.NamedTemporaryFile("wb", suffix=".json", delete=False)
+        tmp.write(json.dumps(make_payload(args.nodes, args.items), ensure_ascii=False).encode("utf-8"))
+        tmp.close()
+        payload = tmp.name
+
+    try:
+        with open(payload, "rb") as f:
+            body = f.read()
+        assert parse_full(body, names, node_path) == parse_extract(body, names, node_path), "ผลไม่ตรงกัน"
+        print(f"📦 payload : {len(body) / 1e6:.1f} MB, nodes = {names}, path = {args.path or '-'},"
+              f" cursors = {args.cursors}")
+        del body
+
+        results = []
+        for path in PATHS:
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", path, "--payload", payload,
+                 "--find", ",".join(names), "--cursors", str(args.cursors)]
+                + (["--path", args.path] if args.path else []),
+                capture_output=True, text=True, check=True,
+            )
+            results.append(json.loads(out.stdout))
+    finally:
+        if tmp:
+            os.unlink(tmp.name)
+
+    print(f"\n  {'Path':<14} {'parse ms':>9} {'peak RSS 1st':>13} {'peak RSS all':>13} {'ids':>5}")
+    print(f"  {'-'*14} {'-'*9} {'-'*13} {'-'*13} {'-'*5}")
+    for r in results:
+        print(f"  {r['path']:<14} {r['parse_ms']:>9.1f} {r['peak_first_mb']:>10.1f} MB"
+              f" {r['peak_all_mb']:>10.1f} MB {r['ids_per_cursor']:>5}")
+    full, ext = results
+    print(f"\n  ⚡ parse x{full['parse_ms'] / ext['parse_ms']:.1f} faster, "
+          f"peak RSS {full['peak_all_mb']:.1f} → {ext['peak_all_mb']:.1f} MB")
@@ -0,0 +1,171 @@
+"""
+bench_metadata_oracle.py — qa_common.metadata_oracle (NumPy mask) vs loop ทีละ row ใน Python
+
+สร้าง snapshot สังเคราะห์ของ mst_sfv_nonprod (หรือใช้ snapshot จริงด้วย --snapshot)
+แล้วรัน parameter sets ของ test_sfv_parameters ผ่านทั้ง 2 วิธี:
+  - ผลต้องตรงกันทุกชุด (ID + ลำดับ)
+  - เวลา ต่อ query และ rows / ms
+
+Usage:
+  python benchmarks/bench_metadata_oracle.py
+  python benchmarks/bench_metadata_oracle.py --rows 300000
+  python benchmarks/bench_metadata_oracle.py --snapshot fixtures/spanner_snapshot.jsonl.gz
+"""
+
+import argparse
+import datetime
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.columnar import load_table
+from qa_common.metadata_oracle import expected_ids, resolve_params
+
+TEMPLATE = os.path.join(ROOT_DIR, "src", "sfv_standard.sql")
+TABLE    = "mst_sfv_nonprod"
+NOW      = datetime.datetime(2026, 1, 15, 12, 0, tzinfo=datetime.timezone.utc)
+
+CATEGORIES = ["series", "movie", "sports", "tennis", "news", "music", "drama", "nba", "game"]
+COLUMNS = [
+    ["id", "STRING(MAX)"], ["title", "STRING(MAX)"], ["status", "STRING(MAX)"],
+    ["searchable", "STRING(MAX)"], ["lang", "STRING(MAX)"], ["publish_date", "TIMESTAMP"],
+    ["expire_date", "TIMESTAMP"], ["article_category", "ARRAY<STRING(MAX)>"],
+    ["genres", "ARRAY<STRING(MAX)>"], ["partner_related", "ARRAY<STRING(MAX)>"],
+    ["related_ecommerce_id", "ARRAY<STRING(MAX)>"], ["hit_count_day_7", "INT64"],
+]
+
+PARAMETER_SETS = [
+    {"limit": 50, "language": "th"},
+    {"limit": 50, "language": "en"},
+    {"limit": 100, "tophit_date_filter": 50},
+    {"limit": 100, "is_related_ecommerce": True},
+    {"limit": 100, "filter_out_category": ["series"]},
+    {"limit": 100, "exclude_ids": ["id000007"], "sort_field": "publish_date", "sort_field_value": "desc"},
+    {"limit": 200, "article_category": ["sports", "nba"], "sort_field": "HIT_COUNT_DAY_7", "sort_field_value": "desc"},
+    {"limit": 1000, "tophit_date_filter": 0},
+]
+
+
+# ======================================================
+# SYNTHETIC SNAPSHOT
+# ======================================================
+def write_snapshot(path: str, rows: int, seed: int = 3):
+    rng = random.Random(seed)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"database": "ai_raas_nonprod", "table": TABLE,
+                            "columns": COLUMNS, "primary_key": ["id"]}) + "\n")
+        for i in range(rows):
+            pub = NOW - datetime.timedelta(minutes=rng.randint(-600, 60 * 24 * 90))
+            exp = None if rng.random() < 0.8 else NOW + datetime.timedelta(hours=rng.randint(-48, 48))
+            f.write(json.dumps([
+                f"id{i:06d}",
+                "empty title" if rng.random() < 0.01 else f"title {i}",
+                "publish" if rng.random() < 0.9 else "draft",
+                "Y" if rng.random() < 0.95 else "N",
+                "th" if rng.random() < 0.7 else "en",
+                pub.isoformat(),
+                exp.isoformat() if exp else None,
+                rng.sample(CATEGORIES, rng.randint(0, 2)),
+                rng.sample(["comedy", "action", "kids"], rng.randint(0, 1)),
+                [],
+                ["e1"] if rng.random() < 0.1 else [],
+                rng.choice([None, rng.randint(0, 5000)]),
+            ]) + "\n")
+
+
+# ======================================================
+# REFERENCE (ทีละ row — ตาม SQL ตรง ๆ)
+# ======================================================
+def reference_ids(path: str, parameters: dict) -> list:
+    p = resolve_params(TEMPLATE, parameters)
+    now = NOW
+    out = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        names = [c for c, _ in json.loads(f.readline())["columns"]]
+        for line in f:
+            r = dict(zip(names, json.loads(line)))
+            pub = datetime.datetime.fromisoformat(r["publish_date"])
+            exp = r["expire_date"] and datetime.datetime.fromisoformat(r["expire_date"])
+            cats = r["article_category"]
+            ok = (r["status"] == "publish" and r["searchable"] == "Y" and pub <= now
+                  and (exp is None or exp > now - datetime.timedelta(minutes=5))
+                  and r["title"] != "empty title" and r["lang"] == (p["p_language"] or "th")
+                  and (not p["p_exclude_ids"] or r["id"] not in p["p_exclude_ids"])
+                  and (not p["p_filter_out_category"] or not set(cats) & set(p["p_filter_out_category"]))
+                  and (not p["p_genres"] or set(r["genres"]) & set(p["p_genres"]))
+                  and (not p["p_article_category"] or set(cats) & set(p["p_article_category"]))
+                  and (not p["p_id_list"] or r["id"] in p["p_id_list"])
+                  and (not p["p_is_related_ecommerce"] or r["related_ecommerce_id"])
+                  and (not p["p_tophit_date_filter"]
+                       or pub >= now - datetime.timedelta(days=p["p_tophit_date_filter"])))
+            if ok:
+                out.append((pub, r["hit_count_day_7"] or 0, r["id"]))
+    field, direction = p["p_sort_field"], p["p_sort_field_value"]
+    out.sort(key=lambda x: x[2])
+    if field == "publish_date" and direction in ("asc", "desc"):
+        out.sort(key=lambda x: x[0], reverse=direction == "desc")
+    elif field.startswith("HIT_COUNT") and direction in ("asc", "desc"):
+        out.sort(key=lambda x: x[1], reverse=direction == "desc")
+    return [x[2] for x in out[:p["p_limit"]]]
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows",     type=int, default=100_000)
+    ap.add_argument("--snapshot", help="snapshot ของ qa_common.spanner_emulator (ข้ามการเทียบกับ reference)")
+    ap.add_argument("--repeat",   type=int, default=5)
+    args = ap.parse_args()
+
+    tmp = None
+    path = args.snapshot
+    if not path:
+        tmp = tempfile.NamedTemporaryFile(suffix=".jsonl.gz", delete=False)
+        tmp.close()
+        path = tmp.name
+        write_snapshot(path, args.rows)
+
+    try:
+        t0 = time.perf_counter()
+        table = load_table(path, TABLE)
+        print(f"📦 {TABLE}: {table.n} rows, load {time.perf_counter() - t0:.2f} s (ครั้งเดียวต่อ process)")
+
+        print(f"\n  {'parameters':<72} {'ids':>5} {'oracle ms':>10} {'loop ms':>9}")
+        print(f"  {'-'*72} {'-'*5} {'-'*10} {'-'*9}")
+        oracle_total = loop_total = 0.0
+        for params in PARAMETER_SETS:
+            times = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                got = expected_ids(table, TEMPLATE, params, now=NOW)
+                times.append((time.perf_counter() - t0) * 1000)
+            oracle_ms = statistics.median(times)
+            oracle_total += oracle_ms
+            loop_ms = float("nan")
+            if not args.snapshot:
+                t0 = time.perf_counter()
+                want = reference_ids(path, params)
+                loop_ms = (time.perf_counter() - t0) * 1000
+                loop_total += loop_ms
+                assert got == want, f"ผลไม่ตรงกัน: {params}"
+            print(f"  {json.dumps(params)[:72]:<72} {len(got):>5} {oracle_ms:>10.2f} {loop_ms:>9.0f}")
+
+        print(f"\n  ⚡ oracle {table.n / (oracle_total / len(PARAMETER_SETS)):,.0f} rows/ms", end="")
+        if loop_total:
+            print(f", x{loop_total / oracle_total:.0f} faster than row loop (ผลตรงกันทุกชุด)")
+        else:
+            print()
+    finally:
+        if tmp:
+            os.unlink(tmp.name)
@@ -0,0 +1,165 @@
+"""
+bench_node_index.py — recursive node finder เดิม vs qa_common.node_index
+
+จำลอง verbose=debug response ขนาดใหญ่ (หรือโหลดจากไฟล์ที่อัดไว้ด้วย --payload)
+แล้ววัดเวลาหา node ชุดเดียวกันต่อ 1 response:
+  - legacy : เรียก recursive finder ทีละ node (walk tree ใหม่ทุกครั้ง)
+  - index  : NodeIndex(resp) ครั้งเดียว + lookup ทุก node (walk ต่อเนื่องรอบเดียว)
+
+Usage:
+  python benchmarks/bench_node_index.py
+  python benchmarks/bench_node_index.py --nodes 400 --items 200 -r 20
+  python benchmarks/bench_node_index.py --payload recorded_debug.json --find merge_page,feature_segments
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.node_index import NodeIndex
+
+DEFAULT_FIND = [
+    "merge_page", "feature_segments", "candidate_pin_global",
+    "external_user_feature", "bucketize_tophit_sfv",
+]
+
+
+# ======================================================
+# LEGACY FINDERS  (คัดลอกจาก implementation เดิมเพื่อเทียบ)
+# ======================================================
+def legacy_find_node_in(obj, node_name):
+    """get_live_ids.py / test_live_commerce.py"""
+    if isinstance(obj, dict):
+        if obj.get("name") == node_name and "result" in obj:
+            return obj["result"]
+        node = obj.get(node_name)
+        if isinstance(node, dict):
+            return node.get("result", node)
+        for v in obj.values():
+            if isinstance(v, (dict, list)):
+                found = legacy_find_node_in(v, node_name)
+                if found is not None:
+                    return found
+    elif isinstance(obj, list):
+        for elem in obj:
+            if isinstance(elem, (dict, list)):
+                found = legacy_find_node_in(elem, node_name)
+                if found is not None:
+                    return found
+    return None
+
+
+def legacy_find_key(obj, key_name):
+    """tests/check_following_logic.py / tests/check_seen_fix_bug.py (ค้นเฉพาะใน dict)"""
+    if not isinstance(obj, dict):
+        return None
+    if key_name in obj:
+        return obj[key_name]
+    for v in obj.values():
+        found = legacy_find_key(v, key_name)
+        if found is not None:
+            return found
+    return None
+
+
+# ======================================================
+# PAYLOAD
+# ======================================================
+def make_payload(n_nodes: int, n_items: int) -> dict:
+    """DAG debug response: node ส่วนใหญ่เป็น filler, node ที่ test ใช้อยู่ท้าย ๆ (worst case เดิม)"""
+    def items(prefix):
+        return [{"id": f"{prefix}{i:06d}", "score": i / n_items,
+                 "metadata": {"article_category": "drama", "tags": ["a", "b"],
+                              "publish_date": "2025-01-01T00:00:00Z"}}
+                for i in range(n_items)]
+
+    results = {f"filler_node_{i}": {"result": {"items": items(f"f{i}_")},
+                                    "latency_ms": 1.5, "status": "ok"}
+               for i in range(n_nodes)}
+    results["merge_page"]            = {"result": {"items": items("mp")}}
+    results["candidate_pin_global"]  = {"result": {"items": items("pin")}}
+    results["external_user_feature"] = {"result": {"segments": {"dgi_truecard_type": "black"}}}
+    dag = [{"name": "feature_segments", "result": {"segments": {"dgi_truecard_type": "red"}}},
+           {"name": "bucketize_tophit_sfv", "result": {"items": items("top")}}]
+    return {"status": 200, "data": {"results": results, "dag": dag}}
+
+
+# ======================================================
+# RUN
+# ======================================================
+def timeit(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def index_lookups(resp, names) -> list:
+    idx = NodeIndex(resp, name_needs_result=True)
+    return [idx.result(n) for n in names]
+
+
+def count_nodes(obj) -> int:
+    n, stack = 0, [obj]
+    while stack:
+        cur = stack.pop()
+        n += 1
+        if isinstance(cur, dict):
+            stack.extend(cur.values())
+        elif isinstance(cur, list):
+            stack.extend(cur)
+    return n
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nodes",   type=int, default=200, help="จำนวน filler DAG node")
+    ap.add_argument("--items",   type=int, default=100, help="items ต่อ node")
+    ap.add_argument("--payload", help="ไฟล์ JSON ของ verbose=debug response ที่อัดไว้")
+    ap.add_argument("--find",    default=",".join(DEFAULT_FIND), help="node ที่ต้องหา (comma)")
+    ap.add_argument("-r", "--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    if args.payload:
+        with open(args.payload, encoding="utf-8") as f:
+            resp = json.load(f)
+    else:
+        resp = make_payload(args.nodes, args.items)
+    names = [n for n in args.find.split(",") if n]
+
+    # ผลต้องตรงกันก่อนวัดเวลา (option เดียวกับ call site จริง)
+    idx      = NodeIndex(resp, name_needs_result=True)
+    idx_keys = NodeIndex(resp, lists=False)
+    for name in names:
+        assert idx.result(name) == legacy_find_node_in(resp, name), name
+        assert idx_keys.value(name) == legacy_find_key(resp, name), name
+
+    print(f"📦 payload : {count_nodes(resp):,} JSON values, lookups = {len(names)} nodes")
+
+    rows = [
+        ("legacy _find_node_in",       lambda: [legacy_find_node_in(resp, n) for n in names]),
+        ("legacy find_key",            lambda: [legacy_find_key(resp, n) for n in names]),
+        ("NodeIndex build + lookups",  lambda: index_lookups(resp, names)),
+    ]
+    build_ms  = timeit(lambda: NodeIndex(resp, name_needs_result=True).build(), args.repeat)
+    lookup_us = timeit(lambda: [idx.result(n) for n in names], args.repeat) * 1000
+
+    print(f"\n  {'Path':<30} {'ms / response':>14}")
+    print(f"  {'-'*30} {'-'*14}")
+    timings = {}
+    for label, fn in rows:
+        timings[label] = timeit(fn, args.repeat)
+        print(f"  {label:<30} {timings[label]:>14.2f}")
+    print(f"\n  NodeIndex full build : {build_ms:.2f} ms   "
+          f"lookups หลัง index ({len(names)}) : {lookup_us:.1f} µs")
+    legacy = timings["legacy _find_node_in"]
+    print(f"  ⚡ speed-up vs _find_node_in: x{legacy / timings['NodeIndex build + lookups']:.1f}")
@@ -0,0 +1,106 @@
+"""
+bench_payload_diff.py — DeepDiff(ignore_order=True) เดิม vs qa_common.payload_diff (Atlas comparison)
+
+สร้างคู่ response แบบ Atlas (items หลายร้อยตัว) ที่ต่างกันแบบที่เจอจริง:
+item เพิ่ม / หาย, สลับลำดับ, field เปลี่ยน, score ต่างเล็กน้อย
+แล้ววัดเวลา diff ต่อคู่ + เวลารวมของทั้ง sheet
+
+  - deepdiff : DeepDiff(ignore_order=True, significant_digits=2) (ข้ามถ้าไม่ได้ติดตั้ง deepdiff)
+  - payload  : diff_payloads() — จับคู่ item ด้วย id ในรอบเดียว
+
+Usage:
+  python benchmarks/bench_payload_diff.py
+  python benchmarks/bench_payload_diff.py --items 300 --placements 2000 -r 5
+"""
+
+import argparse
+import copy
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.payload_diff import diff_payloads, summarize
+
+EXCLUDE = ("schemaId", "request_id")
+
+
+# ======================================================
+# PAYLOAD
+# ======================================================
+def make_pair(n_items: int, seed: int) -> tuple:
+    rnd = random.Random(seed)
+    items = [{"id": f"it{seed}_{i:05d}", "score": round(rnd.random(), 4),
+              "title": f"title {i}", "content_type": rnd.choice(["sfv", "movie", "live"]),
+              "tags": rnd.sample(["a", "b", "c", "d", "e"], 3),
+              "metadata": {"article_category": "drama", "publish_date": "2025-01-01T00:00:00Z"}}
+             for i in range(n_items)]
+    a = {"schemaId": "s1", "request_id": f"r{seed}", "status": 200, "items": items}
+    b = copy.deepcopy(a)
+    b["request_id"] = f"r{seed}-2"
+    # item หาย 2 / เพิ่ม 2 / ย้าย 3 / field เปลี่ยน 5 / score ต่างในหลักที่ 3 (ไม่นับ)
+    del b["items"][rnd.randrange(n_items)]
+    del b["items"][rnd.randrange(n_items - 1)]
+    for k in range(2):
+        b["items"].insert(rnd.randrange(n_items), {**items[0], "id": f"new{seed}_{k}"})
+    for _ in range(3):
+        b["items"].insert(rnd.randrange(n_items), b["items"].pop(rnd.randrange(n_items)))
+    for _ in range(5):
+        b["items"][rnd.randrange(n_items)]["title"] += " (edited)"
+    b["items"][0]["score"] += 0.0001
+    return a, b
+
+
+# ======================================================
+# RUN
+# ======================================================
+def timeit(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--items", type=int, default=150, help="items ต่อ response")
+    ap.add_argument("--placements", type=int, default=1000, help="จำนวนคู่ของทั้ง sheet")
+    ap.add_argument("-r", "--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    a, b = make_pair(args.items, 0)
+    print(f"📦 {args.items} items / response, {args.placements} placements\n")
+    print(f"  diff: {summarize(diff_payloads(a, b, exclude_keys=EXCLUDE))}\n")
+
+    payload_ms = timeit(lambda: diff_payloads(a, b, exclude_keys=EXCLUDE), args.repeat)
+    print(f"  payload  : {payload_ms:8.2f} ms / pair")
+    try:
+        from deepdiff import DeepDiff
+    except ImportError:
+        DeepDiff = None
+        print("  deepdiff : (ไม่ได้ติดตั้ง — ข้าม)")
+    if DeepDiff is not None:
+        exclude_paths = [f"root['{k}']" for k in EXCLUDE]
+        dd_ms = timeit(lambda: DeepDiff(a, b, ignore_order=True, significant_digits=2,
+                                        exclude_paths=exclude_paths), max(1, args.repeat // 2))
+        print(f"  deepdiff : {dd_ms:8.2f} ms / pair  (x{dd_ms / payload_ms:.0f})")
+
+    pairs = [make_pair(args.items, seed) for seed in range(args.placements)]
+    t0 = time.perf_counter()
+    for x, y in pairs:
+        diff_payloads(x, y, exclude_keys=EXCLUDE)
+    total = time.perf_counter() - t0
+    print(f"\n  payload ทั้ง sheet : {total:.2f} s ({args.placements} pairs)")
+    if DeepDiff is not None:
+        print(f"  deepdiff (ประมาณ) : {dd_ms * args.placements / 1000:.0f} s")
+
+
+if __name__ == "__main__":
+    main()
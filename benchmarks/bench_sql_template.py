@@ -0,0 +1,166 @@
+"""
+bench_sql_template.py — inject_ids แบบ string-injection เดิม vs @param bindings (qa_common.sql_template)
+
+ส่วนที่ 1 (รันได้เสมอ, ไม่ต้องมี Spanner):
+  - เวลาสร้าง SQL ต่อ query (อ่านไฟล์ + replace + regex  vs  template ที่ parse ไว้แล้ว)
+  - ขนาด SQL text ที่ส่งไป Spanner
+  - จำนวน SQL text ที่ไม่ซ้ำกัน (= จำนวน query plan ที่ Spanner ต้อง compile)
+
+ส่วนที่ 2 (ต้องมี google-cloud-spanner + SPANNER_EMULATOR_HOST):
+  - latency ของ query จริงบน emulator: p50 / p95 ก่อน-หลัง
+  - ผลลัพธ์ (ID ที่ได้) ต้องเหมือนกันทุกรอบ
+
+Usage:
+  python benchmarks/bench_sql_template.py
+  python benchmarks/bench_sql_template.py --sql src/livetv_main.sql --ids 500 --rounds 50
+
+  # emulator (gcloud emulators spanner start) + database ที่มี table ตาม SQL
+  SPANNER_EMULATOR_HOST=localhost:9010 python benchmarks/bench_sql_template.py \\
+      --project test-project --instance test-instance --database ai_raas_nonprod
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import string
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.sql_template import load_template
+
+
+# ======================================================
+# BEFORE / AFTER
+# ======================================================
+def legacy_inject_ids(sql_path: str, ids: list) -> str:
+    """inject_ids เดิมจาก src/test_*_parameters.py"""
+    with open(sql_path, "r") as f:
+        sql = f.read()
+    id_array = "[" + ", ".join(f"'{i}'" for i in ids) + "]"
+    sql = sql.replace(
+        "CAST([] AS ARRAY<STRING>) AS p_id_list",
+        f"CAST({id_array} AS ARRAY<STRING>) AS p_id_list"
+    )
+    new_limit = max(len(ids), 1000)
+    sql = re.sub(r'\bLIMIT\s+10\b', f'LIMIT {new_limit}', sql)
+    return sql
+
+
+def bound_query(sql_path: str, ids: list) -> tuple:
+    """inject_ids ใหม่ — ถ้าไม่มี google-cloud-spanner คืน types เป็นชื่อ type (วัดเฉพาะฝั่ง client)"""
+    tpl = load_template(sql_path)
+    try:
+        return tpl.bind(p_id_list=list(ids), row_limit=max(len(ids), 1000))
+    except RuntimeError:
+        params = {**tpl.defaults, "p_id_list": list(ids), "row_limit": max(len(ids), 1000)}
+        return tpl.sql, params, tpl.types
+
+
+def random_id_sets(rounds: int, size: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits
+    return [["".join(rng.choices(alphabet, k=12)) for _ in range(size)] for _ in range(rounds)]
+
+
+def pct(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[max(int(len(values) * q) - 1, 0)]
+
+
+# ======================================================
+# PART 1: CLIENT SIDE
+# ======================================================
+def bench_build(sql_path: str, id_sets: list) -> list:
+    rows = []
+    for name, fn in (("string-inject", legacy_inject_ids), ("@param bind", bound_query)):
+        times, sizes, texts = [], [], set()
+        for ids in id_sets:
+            t0 = time.perf_counter()
+            out = fn(sql_path, ids)
+            times.append((time.perf_counter() - t0) * 1000)
+            sql = out[0] if isinstance(out, tuple) else out
+            sizes.append(len(sql.encode("utf-8")))
+            texts.add(sql)
+        rows.append({"name": name, "build_ms": statistics.median(times),
+                     "sql_kb": statistics.median(sizes) / 1024, "plans": len(texts)})
+    return rows
+
+
+# ======================================================
+# PART 2: EMULATOR LATENCY
+# ======================================================
+def bench_emulator(args, sql_path: str, id_sets: list) -> list:
+    from qa_common.spanner_client import query_ids
+
+    def run(fn, ids):
+        out = fn(sql_path, ids)
+        if isinstance(out, tuple):
+            return query_ids(args.project, args.instance, args.database, *out)
+        return query_ids(args.project, args.instance, args.database, out)
+
+    # warm-up: session pool + database handle ไม่ปนกับตัวเลข
+    run(bound_query, id_sets[0])
+
+    rows, results = [], {}
+    for name, fn in (("string-inject", legacy_inject_ids), ("@param bind", bound_query)):
+        lat, got = [], []
+        for ids in id_sets:
+            t0 = time.perf_counter()
+            got.append(sorted(run(fn, ids)))
+            lat.append((time.perf_counter() - t0) * 1000)
+        results[name] = got
+        rows.append({"name": name, "p50_ms": statistics.median(lat), "p95_ms": pct(lat, 0.95),
+                     "total_ms": sum(lat)})
+    assert results["string-inject"] == results["@param bind"], "ผลจาก Spanner ไม่ตรงกัน"
+    return rows
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sql",      default=os.path.join(ROOT_DIR, "src", "channel_main.sql"))
+    ap.add_argument("--ids",      type=int, default=200, help="จำนวน ID ต่อ query")
+    ap.add_argument("--rounds",   type=int, default=30,  help="จำนวน query (ID ชุดใหม่ทุกรอบ)")
+    ap.add_argument("--project",  default="test-project")
+    ap.add_argument("--instance", default="test-instance")
+    ap.add_argument("--database", default="ai_raas_nonprod")
+    args = ap.parse_args()
+
+    id_sets = random_id_sets(args.rounds, args.ids)
+    print(f"📄 {os.path.relpath(args.sql, ROOT_DIR)} — {args.rounds} queries × {args.ids} IDs")
+
+    tpl = load_template(args.sql)
+    print(f"   @params: {', '.join(tpl.types)}")
+    if tpl.literal:
+        print(f"   literal: {', '.join(tpl.literal)}")
+
+    rows = bench_build(args.sql, id_sets)
+    print(f"\n  {'Path':<14} {'build ms':>9} {'SQL KB':>8} {'distinct SQL':>13}")
+    print(f"  {'-'*14} {'-'*9} {'-'*8} {'-'*13}")
+    for r in rows:
+        print(f"  {r['name']:<14} {r['build_ms']:>9.3f} {r['sql_kb']:>8.1f} {r['plans']:>13}")
+    old, new = rows
+    print(f"\n  ⚡ build x{old['build_ms'] / new['build_ms']:.1f} faster, "
+          f"SQL {old['sql_kb']:.1f} → {new['sql_kb']:.1f} KB, query plans {old['plans']} → {new['plans']}")
+
+    if not os.environ.get("SPANNER_EMULATOR_HOST"):
+        print("\n⏭️  ข้าม latency บน emulator (ไม่ได้ตั้ง SPANNER_EMULATOR_HOST)")
+        sys.exit(0)
+
+    print(f"\n🗃️  emulator {os.environ['SPANNER_EMULATOR_HOST']} "
+          f"({args.project}/{args.instance}/{args.database})")
+    rows = bench_emulator(args, args.sql, id_sets)
+    print(f"\n  {'Path':<14} {'p50 ms':>8} {'p95 ms':>8} {'total ms':>9}")
+    print(f"  {'-'*14} {'-'*8} {'-'*8} {'-'*9}")
+    for r in rows:
+        print(f"  {r['name']:<14} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['total_ms']:>9.0f}")
+    old, new = rows
+    print(f"\n  ⚡ p50 x{old['p50_ms'] / new['p50_ms']:.1f}, p95 x{old['p95_ms'] / new['p95_ms']:.1f}")
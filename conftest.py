@@ -7,6 +7,15 @@ Features:
                            full API IDs + capture structured comparison data
   3. pytest_runtest_makereport — collect result + comparison per test
   4. pytest_sessionfinish     — save evidence_report.json + per-test JSON
+                                 + ปิด shared HTTP session (qa_common.http_client)
+                                 + สรุป hit / miss ของ HTTP request cache
+                                 + สรุป response ที่ derive จาก query ที่ใหญ่กว่า (qa_common.response_planner)
+                                 + สรุป latency / session ของ Spanner (qa_common.spanner_client)
+                                 + สรุป ID ที่ตรวจแบบ batch / จาก cache (qa_common.spanner_verify)
+                                 + สรุป ID ที่ตอบจาก ID snapshot ในเครื่อง (qa_common.id_snapshot)
+  5. --record / --replay        — อัด / เล่น HTTP response จาก cassettes/ (qa_common.pytest_cassette)
+  6. --spanner-emulator         — Spanner emulator + seed mst_* จาก snapshot (qa_common.pytest_spanner_emulator)
+  7. host limiter               — ทุก request จำกัด in-flight + rps ต่อ host (qa_common.pytest_host_limiter)
 
 Output (generated in reports/):
   reports/test_evidence.json        ← full summary (import Xray via REST)
@@ -21,6 +30,17 @@ import inspect
 import pytest
 from datetime import datetime, timezone
 
+from qa_common.http_client import close_session
+from qa_common.request_cache import SESSION_CACHE
+from qa_common.spanner_client import METRICS as SPANNER_METRICS, close_all as close_spanner
+from qa_common import response_planner, spanner_verify
+
+# --record / --replay (requests + curl) — ดู qa_common/cassette.py
+# --spanner-emulator (Spanner checks กับ emulator ที่ seed จาก snapshot) — ดู qa_common/spanner_emulator.py
+# in-flight + rps ต่อ host ของทุก request (QA_HOST_LIMITS) — ดู qa_common/host_limiter.py
+pytest_plugins = ["qa_common.pytest_cassette", "qa_common.pytest_spanner_emulator",
+                  "qa_common.pytest_host_limiter"]
+
 # ─── Result stores (session-scoped) ───────────────────────────────────────────
 _evidence:              list = []   # legacy evidence_report.json
 _test_results:          dict = {}   # nodeid → full result dict
@@ -171,6 +191,7 @@ def pytest_runtest_makereport(item, call):
             "params":      params,
             "outcome":     report.outcome,        # "passed" / "failed" / "skipped"
             "duration_s":  round(report.duration, 3),
+            "properties":  dict(report.user_properties),   # เช่น fetch_s, timing (DNS / connect / TTFB / download ต่อ request)
             "error":       err_msg,
             "skip_reason": skip_reason,
             "timestamp":   datetime.now(timezone.utc).isoformat(),
@@ -201,6 +222,8 @@ def pytest_runtest_makereport(item, call):
 @pytest.hookimpl(trylast=True)
 def pytest_sessionfinish(session, exitstatus):
     root = os.path.dirname(os.path.abspath(__file__))
+    close_session()   # ปิด keep-alive connections ของ shared HTTP client
+    close_spanner()   # ทิ้ง Spanner database handle / session pool ที่ cache ไว้
 
     # ── legacy evidence_report.json ─────────────────────────────────────────
     if _evidence:
@@ -237,6 +260,9 @@ def pytest_sessionfinish(session, exitstatus):
         "passed":     len(passed),
         "failed":     len(failed),
         "skipped":    len(skipped),
+        "http_cache": SESSION_CACHE.stats(),
+        "derived":    response_planner.stats(),
+        "spanner":    {**SPANNER_METRICS.stats(), "id_verify": spanner_verify.stats()},
         "by_service": by_service,
         "results":    results_list,
     }
@@ -249,6 +275,25 @@ def pytest_sessionfinish(session, exitstatus):
     print(f"\n{'═'*62}")
     print(f"  📊 Results    : {len(passed)}/{len(results_list)} passed"
           f"  ({len(failed)} failed, {len(skipped)} skipped)")
+    cache = SESSION_CACHE.stats()
+    print(f"  🗄️  HTTP cache : {cache['hits']} hits / {cache['misses']} misses"
+          f" / {cache['coalesced']} coalesced  → saved {cache['saved_calls']} round-trips")
+    rp = response_planner.stats()
+    if rp["derived"]:
+        print(f"  ♻️  Derived    : {rp['derived']} responses จาก query ที่ใหญ่กว่า / {rp['fetched']} fetched"
+              f" / {rp['verified']} verified ({rp['mismatches']} mismatches)")
+    sp = SPANNER_METRICS.stats()
+    if sp["queries"]:
+        print(f"  🗃️  Spanner    : {sp['queries']} queries (p50 {sp['p50_ms']} ms, p95 {sp['p95_ms']} ms)"
+              f" / {sp['sessions_created']} sessions created / {sp['databases_opened']} databases")
+        iv = spanner_verify.stats()
+        print(f"  🔎 ID verify  : {iv['checked']} IDs queried in {iv['queries']} batches"
+              f" / {iv['cache_hit']} answered from cache ({iv['sources']} sources)")
+    iv = spanner_verify.stats()
+    if iv["local_hit"] or iv["reconfirmed"]:
+        versions = ", ".join(f"{t}@{v['version']}" for t, v in iv["snapshots"].items())
+        print(f"  🧬 ID snapshot: {iv['local_hit']} IDs answered locally"
+              f" / {iv['reconfirmed']} re-checked in Spanner / {iv['stale']} stale ({versions})")
     print(f"  📄 JUnit XML  : src/results/junit_report.xml   ← import Xray")
     print(f"  📋 Evidence   : reports/test_evidence.json")
     print(f"  📁 Per-test   : reports/evidence/  ({len(results_list)} files)")
@@ -7,7 +7,7 @@ Test cases:
   [Endpoint]
     E1: HTTP 200
     E2: node ที่กำหนดต้องอยู่ใน response
-    E3: response time ≤ RESPONSE_TIME_LIMIT วินาที
+    E3: response time ≤ RESPONSE_TIME_LIMIT วินาที (เวลาฝั่ง server: TTFB + download ไม่รวม spawn curl)
 
   [Item — ต่อทุก ActivityId]
     I1:  ActivityId not null
@@ -33,11 +33,12 @@ Test cases:
 """
 
 import json
-import subprocess
-import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 
+from qa_common.curl_timing import curl_get
+from qa_common.node_index import index_of
+
 BASE = (
     "http://ai-universal-service-new.preprod-gcp-ai-bn"
     ".int-ai-platform.gcp.dmp.true.th/api/v1/universal"
@@ -79,43 +80,19 @@ CURSOR_RANGE = range(1, 6)   # cursor 1–5 สำหรับ pagination test
 
 
 # ── HTTP fetch ──────────────────────────────────────────────────────────────
-def fetch(url: str) -> tuple[int, float, Any]:
+def fetch(url: str) -> tuple[int, dict, Any]:
+    """คืน (status, timing, data) — timing = เวลาแยกตาม phase จาก curl (qa_common.curl_timing)"""
     try:
-        t0 = time.monotonic()
-        res = subprocess.run(
-            ["curl", "-s", "-o", "-", "-w", "\n__STATUS__%{http_code}", url],
-            capture_output=True, text=True, timeout=30,
-        )
-        elapsed = time.monotonic() - t0
-        out = res.stdout
-        *body_parts, status_line = out.rsplit("\n__STATUS__", 1)
-        body = "\n__STATUS__".join(body_parts)
-        status = int(status_line.strip()) if status_line.strip().isdigit() else 0
-        return status, elapsed, json.loads(body)
+        status, body, timing = curl_get(url, timeout=30)
+        return status, timing, json.loads(body)
     except Exception as e:
-        return 0, 0.0, {"_error": str(e)}
+        return 0, {}, {"_error": str(e)}
 
 
 # ── Node extraction ─────────────────────────────────────────────────────────
 def _find_node_in(obj: Any, node_name: str):
-    if isinstance(obj, dict):
-        if obj.get("name") == node_name and "result" in obj:
-            return obj["result"]
-        node = obj.get(node_name)
-        if isinstance(node, dict):
-            return node.get("result", node)
-        for v in obj.values():
-            if isinstance(v, (dict, list)):
-                found = _find_node_in(v, node_name)
-                if found is not None:
-                    return found
-    elif isinstance(obj, list):
-        for elem in obj:
-            if isinstance(elem, (dict, list)):
-                found = _find_node_in(elem, node_name)
-                if found is not None:
-                    return found
-    return None
+    # response เดียวกันถูก walk ครั้งเดียว แล้ว lookup ทุก node จาก index
+    return index_of(obj, name_needs_result=True).result(node_name)
 
 
 def get_node_result(response_data: dict, node_name: str):
@@ -386,18 +363,19 @@ def run_pagination_test(ep: dict) -> dict:
 
 # ── Per-endpoint processing ─────────────────────────────────────────────────
 def process_endpoint(ep: dict) -> dict:
-    status, elapsed, data = fetch(ep["url"])
+    status, timing, data = fetch(ep["url"])
     out = {
         "name":     ep["name"],
         "status":   status,
-        "elapsed":  elapsed,
+        "elapsed":  timing.get("server_s", 0.0),   # เวลาฝั่ง server — ใช้ตัดสิน E3
+        "timing":   timing,
         "nodes":    {},
         "raw_items": {},
     }
 
     # E1, E3
     out["e1_passed"] = (status == 200)
-    out["e3_passed"] = (elapsed <= RESPONSE_TIME_LIMIT)
+    out["e3_passed"] = (out["elapsed"] <= RESPONSE_TIME_LIMIT)
 
     if not out["e1_passed"]:
         out["error"] = data.get("_error", f"HTTP {status}")
@@ -444,6 +422,14 @@ FAIL = "❌"
 SKIP = "—"
 
 
+def format_timing(t: dict) -> str:
+    if not t:
+        return ""
+    return (f"dns {t['dns_s']*1000:.0f}ms | connect {t['connect_s']*1000:.0f}ms | "
+            f"ttfb {t['ttfb_s']*1000:.0f}ms | download {t['download_s']*1000:.0f}ms "
+            f"({t['bytes']:,} bytes) | curl overhead {t.get('overhead_s', 0)*1000:.0f}ms")
+
+
 def print_check(label: str, passed, detail: str = "", indent: int = 6):
     if passed is None:
         icon = "⏭️ "
@@ -498,11 +484,11 @@ def main():
 
         # E3
         e3 = {
-            "case": f"E3: response time ≤ {RESPONSE_TIME_LIMIT}s (got {r['elapsed']:.2f}s)",
+            "case": f"E3: response time ≤ {RESPONSE_TIME_LIMIT}s (got {r['elapsed']:.2f}s server)",
             "passed": r["e3_passed"],
-            "detail": "",
+            "detail": format_timing(r["timing"]),
         }
-        print_check(e3["case"], e3["passed"])
+        print_check(e3["case"], e3["passed"], e3["detail"])
         tally([e3], totals)
 
         if not r["e1_passed"]:
@@ -0,0 +1 @@
+"""qa_common — helper ที่ใช้ร่วมกันระหว่าง test suites (root / src / tests)"""
@@ -0,0 +1,341 @@
+"""
+agg_oracle.py — คำนวณ buckets ที่ aggregation ของ Metadata API "ควร" คืน จาก snapshot ในเครื่อง
+
+เดิม test_tophit_* / test_latest_* ตรวจได้แค่ว่ามี buckets และจำนวน hits ไม่เกิน limit
+oracle นี้จำลอง CTE ต่อกลุ่มของ src/*_agg_tophit.sql และ src/*_agg_latest.sql:
+
+    TopHitAggGrouped: ARRAY_AGG(id ORDER BY agg_tophit_sort_col DESC, id ASC LIMIT <limit>) GROUP BY agg_group_key
+    LatestAggGrouped: ARRAY_AGG(id ORDER BY publish_date DESC, id ASC LIMIT <limit>)         GROUP BY agg_group_key
+
+  - WHERE ของ BaseDataRaw → mask เดียวกับ qa_common.metadata_oracle
+  - agg_group_key = article_category ตัวแรกที่ไม่ NULL (badminton/tennis/f1/nba/ufc/volleyball → 'sports')
+  - agg_tophit: sort col = JSON_VALUE(most_popular, '$.<agg_tophit_sort_by>') เช่น PLAY_COUNT_DAY_14 / 30
+    top-k ต่อกลุ่มด้วย bounded min-heap ขนาด limit → ผ่าน candidate rows รอบเดียว
+    memory ของผล = O(groups × limit) ไม่ใช่ O(rows) (ไม่ sort ทั้ง table)
+  - agg_latest: ลำดับ publish_date DESC, id ASC ของทั้ง table sort ไว้ครั้งเดียว (cache ต่อ table)
+    → แต่ละ parameter set แค่กรอง mask ตามลำดับนั้น + นับ rank ในกลุ่ม (group index) → ตัดที่ limit
+
+buckets ของ API อ่านด้วย api_bucket_ids (ลอง inner key ตามลำดับ เช่น sort_by_publish_date / latest / hits
+แล้ว auto-detect เหมือน auto_extract_agg_ids ของ src/Extract_id_3_type.py)
+
+Usage:
+    from qa_common.columnar import load_table
+    from qa_common.agg_oracle import api_bucket_ids, diff_buckets, expected_latest, expected_tophit
+
+    table = load_table(SNAPSHOT, "mst_sfv_nonprod")
+    want  = expected_tophit(table, "src/sfv_agg_tophit.sql", TOPHIT_BASE_PARAMS)
+    diff  = diff_buckets({"sports": ["id1", "id2"], ...}, want)
+
+    want  = expected_latest(table, "src/sfv_agg_latest.sql", LATEST_BASE_PARAMS)
+    diff  = diff_buckets(api_bucket_ids(get_latest_buckets(resp), "agg_latest"), want)
+    diff["buckets"]["sports"]["first_divergence"]   # ตำแหน่งแรกที่ลำดับไม่ตรง (None = ตรง)
+"""
+
+import datetime
+import heapq
+import json
+import os
+import re
+
+from qa_common.columnar import NULL_TS, ColumnarTable, import_numpy, load_table, to_micros
+from qa_common.metadata_oracle import DAY_US, OracleUnsupported, diff_ids, filter_mask, resolve_params
+from qa_common.sql_template import load_template
+
+# CASE WHEN x IN (...) THEN 'sports' ของ agg_group_key ในทุก template
+SPORTS_CATEGORIES = ("badminton", "tennis", "f1", "nba", "ufc", "volleyball")
+GROUP_FIELDS = {"article_category"}
+
+_SORT_JSON_RE  = re.compile(r"CAST\(JSON_VALUE\(m\.(\w+),\s*'\$\.\w+'\)\s+AS\s+INT64\)\s+AS\s+agg_tophit_sort_col")
+_SORT_CONST_RE = re.compile(r"\b(\d+)\s+AS\s+agg_tophit_sort_col")
+_AGG_LIMIT_RE  = re.compile(r"ARRAY_AGG\(id ORDER BY agg_tophit_sort_col DESC, id ASC LIMIT (\d+)\)")
+_LATEST_LIMIT_RE = re.compile(r"ARRAY_AGG\(id ORDER BY publish_date DESC, id ASC LIMIT (\d+)\)")
+_AGG_DATE_FRAGMENT = "\n  AND publish_date >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL (SELECT p_tophit_date_filter FROM Params) DAY)"
+
+
+# inner key ของ hits ใน bucket ตามลำดับที่ลอง (ต่อ aggregation)
+HIT_KEYS = {
+    "agg_tophit": ("sort_by_hit_count", "hits"),
+    "agg_latest": ("sort_by_publish_date", "latest", "hits"),
+}
+_BUCKET_META_KEYS = {"doc_count", "key", "key_as_string"}
+
+
+# ======================================================
+# COLUMNS
+# ======================================================
+def group_keys(table: ColumnarTable, group_field: str = "article_category"):
+    """
+    agg_group_key ต่อ row → (codes int64, keys) — codes[i] = index ใน keys, -1 = NULL
+    (SELECT CASE ... FROM UNNEST(m.article_category) AS x WHERE x IS NOT NULL LIMIT 1)
+    """
+    if group_field not in GROUP_FIELDS:
+        raise OracleUnsupported(f"oracle จัดกลุ่มตาม {group_field} ไม่ได้ (รองรับ {sorted(GROUP_FIELDS)})")
+    return table.derived(("agg_group_key", group_field), lambda: _build_group_keys(table, group_field))
+
+
+def _build_group_keys(table: ColumnarTable, group_field: str):
+    np  = import_numpy()
+    col = table.array(group_field)
+    valid = np.ones(len(col.codes), dtype=bool)
+    if None in col.index:
+        valid = col.codes != col.index[None]
+
+    keys = sorted({"sports" if v in SPORTS_CATEGORIES else v for v in col.vocab if v is not None})
+    key_index = {k: i for i, k in enumerate(keys)}
+    vocab_to_key = np.array([-1 if v is None else key_index["sports" if v in SPORTS_CATEGORIES else v]
+                             for v in col.vocab] or [-1], dtype=np.int64)
+
+    out = np.full(table.n, -1, dtype=np.int64)
+    positions = np.flatnonzero(valid)
+    rows, first = np.unique(col.row_of[positions], return_index=True)   # สมาชิกแรกที่ไม่ NULL ต่อ row
+    out[rows] = vocab_to_key[col.codes[positions[first]]]
+    return out, keys
+
+
+def json_int(table: ColumnarTable, column: str, key: str):
+    """CAST(JSON_VALUE(column, '$.key') AS INT64) → float64 (NaN = NULL) — parse JSON ครั้งละ vocab ไม่ใช่ต่อ row"""
+    return table.derived(("json_int", column, key), lambda: _build_json_int(table, column, key))
+
+
+def _build_json_int(table: ColumnarTable, column: str, key: str):
+    np  = import_numpy()
+    col = table.string(column)
+    per_vocab = np.full(len(col.vocab) + 1, np.nan)     # ตัวสุดท้าย = code -1 (NULL)
+    for i, text in enumerate(col.vocab):
+        try:
+            value = json.loads(text).get(key)
+            per_vocab[i] = int(value) if value is not None else np.nan
+        except (ValueError, TypeError, AttributeError):
+            pass
+    return per_vocab[col.codes]
+
+
+def _sort_column(table: ColumnarTable, sql: str, sort_by: str):
+    np = import_numpy()
+    m = _SORT_JSON_RE.search(sql)
+    if m:
+        return json_int(table, m.group(1), sort_by)
+    m = _SORT_CONST_RE.search(sql)
+    if m:
+        return np.full(table.n, float(m.group(1)))
+    raise OracleUnsupported("template ไม่มี agg_tophit_sort_col แบบที่ oracle รู้จัก")
+
+
+# ======================================================
+# TOP-K PER GROUP
+# ======================================================
+def top_k_per_group(groups, scores, ranks, rows, limit: int) -> dict:
+    """
+    รอบเดียวบน candidate rows: heap ต่อกลุ่มเก็บ (score, -id_rank, row) ไม่เกิน limit ตัว
+    root = ตัวที่แย่ที่สุดในกลุ่ม (score ต่ำสุด, id มากสุด) → ตัวใหม่ที่ดีกว่าจะแทนที่ root
+    คืน {group_code: [row, ...]} เรียง score DESC, id ASC
+    """
+    heaps: dict = {}
+    for g, score, rank, row in zip(groups.tolist(), scores.tolist(), ranks.tolist(), rows.tolist()):
+        heap = heaps.get(g)
+        if heap is None:
+            heap = heaps[g] = []
+        item = (score, -rank, row)
+        if len(heap) < limit:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    return {g: [row for _, _, row in sorted(heap, reverse=True)] for g, heap in heaps.items()}
+
+
+def expected_tophit(table: ColumnarTable, template_path: str, parameters: dict,
+                    now: datetime.datetime = None) -> dict:
+    """{bucket key: [id, ...]} ที่ agg_tophit ควรคืน (key None = แถวที่ article_category ว่าง)"""
+    np  = import_numpy()
+    tpl = load_template(template_path)
+    params = resolve_params(template_path, parameters)
+    limit = parameters.get("agg_tophit_limit") or tpl.defaults.get("p_agg_tophit_limit")
+    if not limit:
+        m = _AGG_LIMIT_RE.search(tpl.sql)
+        limit = int(m.group(1)) if m else 0
+    sort_by = parameters.get("agg_tophit_sort_by") or tpl.defaults.get("p_agg_tophit_sort_by")
+    if not sort_by:
+        raise OracleUnsupported("ไม่มี agg_tophit_sort_by")
+    now_us = to_micros(now or datetime.datetime.now(datetime.timezone.utc))
+
+    mask   = filter_mask(table, template_path, params, now_us)
+    scores = _sort_column(table, tpl.sql, sort_by)
+    mask  &= ~np.isnan(scores)
+    if "agg_tophit_sort_col > 0" in tpl.sql:
+        mask &= scores > 0
+    if _AGG_DATE_FRAGMENT in tpl.sql:
+        # ซ้ำกับ BaseDataRaw แต่ไม่มีกรณี 0/NULL = ไม่กรอง (NULL → ไม่ผ่าน, 0 → เฉพาะ publish_date >= now)
+        days = params.get("p_tophit_date_filter")
+        pd = table.timestamp("publish_date")
+        mask &= (pd != NULL_TS) & (pd >= now_us - days * DAY_US) if days is not None else False
+
+    groups, keys = group_keys(table, parameters.get("agg_tophit_group_field") or "article_category")
+    rows = np.flatnonzero(mask)
+    top = top_k_per_group(groups[rows], scores[rows], table.id_rank()[rows], rows, int(limit))
+
+    return _bucket_ids(table, top, keys)
+
+
+# ======================================================
+# LATEST-N PER GROUP
+# ======================================================
+def latest_order(table: ColumnarTable):
+    """row ทั้ง table เรียง publish_date DESC, id ASC (NULL ท้ายสุด) — sort ครั้งเดียวต่อ table"""
+    def build():
+        np = import_numpy()
+        pd = table.timestamp("publish_date").astype(np.float64)
+        return np.lexsort((table.id_rank(), -pd))
+    return table.derived("latest_order", build)
+
+
+def latest_n_per_group(order, mask, groups, limit: int) -> dict:
+    """
+    เดิน rows ตามลำดับวันที่ (order) เฉพาะที่ผ่าน mask → rank ในกลุ่ม = จำนวน row ก่อนหน้าในกลุ่มเดียวกัน
+    เก็บเฉพาะ rank < limit → {group_code: [row, ...]} เรียง publish_date DESC, id ASC
+    """
+    np = import_numpy()
+    rows = order[mask[order]]
+    if not len(rows):
+        return {}
+    g = groups[rows]
+    by_group = np.argsort(g, kind="stable")              # stable → ในกลุ่มยังเรียงตามวันที่
+    sorted_g = g[by_group]
+    starts = np.flatnonzero(np.r_[True, sorted_g[1:] != sorted_g[:-1]])
+    sizes  = np.diff(np.r_[starts, len(sorted_g)])
+    rank   = np.arange(len(sorted_g)) - np.repeat(starts, sizes)
+    keep   = rank < limit
+    kept_rows, kept_groups = rows[by_group[keep]], sorted_g[keep]
+    bounds = np.flatnonzero(np.r_[True, kept_groups[1:] != kept_groups[:-1]])
+    return {int(kept_groups[b]): kept_rows[b:e].tolist()
+            for b, e in zip(bounds, np.r_[bounds[1:], len(kept_rows)])}
+
+
+def expected_latest(table: ColumnarTable, template_path: str, parameters: dict,
+                    now: datetime.datetime = None) -> dict:
+    """{bucket key: [id, ...]} ที่ agg_latest ควรคืน (key None = แถวที่ article_category ว่าง)"""
+    tpl = load_template(template_path)
+    params = resolve_params(template_path, parameters)
+    # template ฝัง LIMIT เป็นตัวเลข (Spanner ไม่รับ subquery ใน LIMIT) → ใช้ agg_latest_limit ของ API ก่อน
+    limit = parameters.get("agg_latest_limit") or tpl.defaults.get("p_agg_latest_limit")
+    if not limit:
+        m = _LATEST_LIMIT_RE.search(tpl.sql)
+        limit = int(m.group(1)) if m else 0
+    now_us = to_micros(now or datetime.datetime.now(datetime.timezone.utc))
+
+    mask = filter_mask(table, template_path, params, now_us)
+    groups, keys = group_keys(table, parameters.get("agg_latest_group_field") or "article_category")
+    latest = latest_n_per_group(latest_order(table), mask, groups, int(limit))
+    return _bucket_ids(table, latest, keys)
+
+
+def _bucket_ids(table: ColumnarTable, rows_by_group: dict, keys: list) -> dict:
+    ids = table.ids()
+    ordered = sorted(rows_by_group, key=lambda g: (g < 0, keys[g] if g >= 0 else ""))
+    return {(keys[g] if g >= 0 else None): [ids[r] for r in rows_by_group[g]] for g in ordered}
+
+
+# ======================================================
+# API BUCKETS
+# ======================================================
+def _hit_ids(hits: list) -> list:
+    seen, ids = set(), []
+    for h in hits:
+        id_val = h.get("_source", {}).get("id")
+        if id_val and id_val not in seen:
+            ids.append(id_val)
+            seen.add(id_val)
+    return ids
+
+
+def api_bucket_ids(buckets: list, agg_name: str) -> dict:
+    """
+    buckets ของ API → {key: [id, ...]} ตามลำดับ hits
+    ต่อ bucket: ลอง inner key ตาม HIT_KEYS[agg_name] แล้ว auto-detect key อื่นที่ไม่ใช่ meta (ใช้อันแรกที่มี IDs)
+    """
+    candidates = HIT_KEYS.get(agg_name, ("hits",))
+    out = {}
+    for bucket in buckets:
+        ids = []
+        detected = [k for k in bucket if k not in _BUCKET_META_KEYS and k not in candidates]
+        for key in (*candidates, *detected):
+            inner = bucket.get(key)
+            if isinstance(inner, dict):
+                ids = _hit_ids(inner.get("hits", {}).get("hits", []))
+                if ids:
+                    break
+        out[bucket.get("key")] = ids
+    return out
+
+
+# ======================================================
+# DIFF
+# ======================================================
+def diff_buckets(api_buckets: dict, expected: dict) -> dict:
+    """
+    เทียบ {key: [ids]} ของ API กับ oracle ทีละ bucket
+      missing_buckets    = oracle มีแต่ API ไม่มี
+      unexpected_buckets = API มีแต่ oracle ไม่มี
+      buckets[key]       = diff_ids ของ bucket ที่มีทั้งคู่ (missing / unexpected / same_order / first_divergence)
+    """
+    detail = {
+        "missing_buckets":    [k for k in expected if k not in api_buckets],
+        "unexpected_buckets": [k for k in api_buckets if k not in expected],
+        "buckets": {},
+    }
+    for key, ids in api_buckets.items():
+        if key in expected:
+            detail["buckets"][key] = diff_ids(ids, expected[key])
+    detail["mismatched"] = [k for k, d in detail["buckets"].items()
+                            if d["missing"] or d["unexpected"] or not d["same_order"]]
+    return detail
+
+
+def _compare_buckets(agg_name: str, label: str, table_name: str, template_path: str,
+                     parameters: dict, api_buckets: dict, expected_fn) -> tuple:
+    snapshot = os.environ.get("QA_ORACLE_SNAPSHOT")
+    if not snapshot:
+        return True, "oracle: ข้าม (ไม่ได้ตั้ง QA_ORACLE_SNAPSHOT)", {}
+    try:
+        expected = expected_fn(load_table(snapshot, table_name), template_path, parameters)
+    except OracleUnsupported as e:
+        return True, f"oracle: ข้าม ({e})", {}
+
+    detail = diff_buckets(api_buckets, expected)
+    print(f"\n    🔮 Oracle {agg_name} compare [{label}]")
+    print(f"       Expected buckets : {len(expected)}")
+    print(f"       API buckets      : {len(api_buckets)}")
+    for key in detail["missing_buckets"][:5]:
+        print(f"       ❌ Missing bucket '{key}' ({len(expected[key])} ids)")
+    for key in detail["unexpected_buckets"][:5]:
+        print(f"       ❌ Unexpected bucket '{key}'")
+    for key in detail["mismatched"][:5]:
+        d, pos = detail["buckets"][key], detail["buckets"][key]["first_divergence"]
+        got, want = api_buckets[key], expected[key]
+        print(f"       ❌ bucket '{key}': ต่างกันครั้งแรกที่ตำแหน่ง {pos} "
+              f"(API={got[pos] if pos < len(got) else '-'} / expected={want[pos] if pos < len(want) else '-'})"
+              f" — missing {len(d['missing'])} / unexpected {len(d['unexpected'])}")
+
+    if detail["missing_buckets"] or detail["unexpected_buckets"] or detail["mismatched"]:
+        return False, (
+            f"Oracle {agg_name}: missing buckets {len(detail['missing_buckets'])}"
+            f" / unexpected buckets {len(detail['unexpected_buckets'])}"
+            f" / buckets ไม่ตรง {[(k, detail['buckets'][k]['first_divergence']) for k in detail['mismatched'][:5]]}"
+        ), detail
+    return True, f"Oracle {agg_name}: ตรงกับ expected {len(expected)} buckets ✓", detail
+
+
+def compare_tophit_with_oracle(label: str, table_name: str, template_path: str,
+                               parameters: dict, api_buckets: dict) -> tuple:
+    """
+    เทียบ agg_tophit buckets ({key: [ids]}) กับ oracle — คืน (passed, msg, detail)
+    ทำงานเฉพาะเมื่อตั้ง QA_ORACLE_SNAPSHOT (เหมือน metadata_oracle.compare_with_oracle)
+    """
+    return _compare_buckets("agg_tophit", label, table_name, template_path, parameters,
+                            api_buckets, expected_tophit)
+
+
+def compare_latest_with_oracle(label: str, table_name: str, template_path: str,
+                               parameters: dict, api_buckets: dict) -> tuple:
+    """เทียบ agg_latest buckets ({key: [ids]}) กับ oracle — รายงานตำแหน่งแรกที่ต่างกันต่อ bucket"""
+    return _compare_buckets("agg_latest", label, table_name, template_path, parameters,
+                            api_buckets, expected_latest)
@@ -0,0 +1,416 @@
+"""
+cassette.py — record / replay HTTP response ลง disk (content-addressed + gzip)
+
+ครอบทั้ง 2 ทางที่ test ยิง network:
+  - requests   → patch HTTPAdapter.send (ครอบทั้ง shared session และ requests.get ตรง ๆ)
+  - curl       → patch subprocess.run เฉพาะ argv[0] == "curl"
+                 (get_live_ids.py, test_live_commerce.py, test_endpoints.py)
+
+Layout บน disk:
+  <dir>/index/<kk>/<key>.json   ← key = request_key(method, url, body) — ลำดับ response ของ request นั้น
+  <dir>/blobs/<hh>/<sha>.gz     ← body ที่ gzip แล้ว, ชื่อไฟล์ = sha256 ของ body (response ซ้ำเก็บครั้งเดียว)
+  <dir>/clock.json              ← {test_key: epoch ตอนเริ่ม test ที่อัด} — replay เลื่อนนาฬิกากลับไปที่เวลานี้
+
+request เดียวกันที่ยิงหลายครั้ง (เช่น merge_page randomness) เก็บ response ตามลำดับ
+→ ตอน replay ครั้งที่ n ได้ response ครั้งที่ n (เกินจำนวนที่อัดไว้ → ใช้ตัวสุดท้าย)
+
+Mode:
+  record  → ยิงจริงแล้วเขียน cassette (ทับ key เดิมที่ยิงใน session นี้)
+  replay  → ไม่แตะ network; key ที่ไม่มีใน cassette = CassetteMiss (requests) / curl exit 7
+
+Usage (นอก pytest):
+    from qa_common import cassette
+    cassette.activate("replay", "cassettes")
+    ...
+    cassette.deactivate()
+"""
+
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from qa_common.request_cache import request_key
+
+MODES = ("record", "replay")
+DEFAULT_DIR = os.environ.get(
+    "QA_CASSETTE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cassettes"),
+)
+
+# header ที่ไม่ตรงกับ body ที่ decode แล้ว → ไม่เก็บ
+_DROP_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection"}
+# curl exit code 7 = "Failed to connect to host" — ให้ caller เห็นเหมือน offline จริง
+_CURL_MISS_RC = 7
+
+
+class CassetteMiss(requests.ConnectionError):
+    """replay mode แล้วไม่มี response ของ request นี้ใน cassette"""
+
+
+# ======================================================
+# STORE
+# ======================================================
+class CassetteStore:
+    """content-addressed store: index ต่อ request key + gzip blob ต่อ body"""
+
+    def __init__(self, root: str):
+        self.root     = root
+        self._lock    = threading.Lock()
+        self._index:  dict = {}    # key → {"request": ..., "responses": [...]}
+        self._cursor: dict = {}    # key → จำนวนครั้งที่ใช้ไปแล้วใน session นี้
+        self._blobs:  dict = {}    # sha → bytes (replay: decompress ครั้งเดียว)
+        self._dirty:  set  = set()
+        self._clock:  dict = None  # test_key → epoch (โหลดจาก clock.json ครั้งแรกที่ใช้)
+        self._clock_dirty  = False
+        self.hits     = 0
+        self.misses   = 0
+        self.recorded = 0
+
+    # ─── paths ─────────────────────────────────────────
+    def _index_path(self, key: str) -> str:
+        return os.path.join(self.root, "index", key[:2], f"{key}.json")
+
+    def _blob_path(self, sha: str) -> str:
+        return os.path.join(self.root, "blobs", sha[:2], f"{sha}.gz")
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    # ─── blobs ─────────────────────────────────────────
+    def put_blob(self, body: bytes) -> str:
+        sha  = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(sha)
+        if not os.path.exists(path):
+            self._atomic_write(path, gzip.compress(body, compresslevel=6))
+        return sha
+
+    def get_blob(self, sha: str) -> bytes:
+        with self._lock:
+            cached = self._blobs.get(sha)
+        if cached is not None:
+            return cached
+        with open(self._blob_path(sha), "rb") as f:
+            body = gzip.decompress(f.read())
+        with self._lock:
+            self._blobs[sha] = body
+        return body
+
+    # ─── index ─────────────────────────────────────────
+    def _load_entry(self, key: str):
+        if key not in self._index:
+            try:
+                with open(self._index_path(key), encoding="utf-8") as f:
+                    self._index[key] = json.load(f)
+            except FileNotFoundError:
+                self._index[key] = None
+        return self._index[key]
+
+    def record(self, key: str, request_info: dict, response: dict, body: bytes):
+        sha = self.put_blob(body)
+        with self._lock:
+            # key แรกที่อัดใน session นี้ → เริ่ม list ใหม่ (ทับ cassette เก่า)
+            if key not in self._dirty:
+                self._index[key] = {"request": request_info, "responses": []}
+                self._dirty.add(key)
+            self._index[key]["responses"].append({**response, "blob": sha})
+            self.recorded += 1
+
+    def lookup(self, key: str):
+        """คืน (response_meta, body) ของครั้งถัดไปของ key นี้ — ไม่มี → None"""
+        with self._lock:
+            entry = self._load_entry(key)
+            if not entry or not entry["responses"]:
+                self.misses += 1
+                return None
+            n = self._cursor.get(key, 0)
+            self._cursor[key] = n + 1
+            self.hits += 1
+            responses = entry["responses"]
+            meta = responses[min(n, len(responses) - 1)]
+        return meta, self.get_blob(meta["blob"])
+
+    # ─── clock ─────────────────────────────────────────
+    def _clock_path(self) -> str:
+        return os.path.join(self.root, "clock.json")
+
+    def _load_clock(self) -> dict:
+        if self._clock is None:
+            try:
+                with open(self._clock_path(), encoding="utf-8") as f:
+                    self._clock = json.load(f)
+            except FileNotFoundError:
+                self._clock = {}
+        return self._clock
+
+    def record_time(self, test_key: str, epoch: float):
+        with self._lock:
+            self._load_clock()[test_key] = epoch
+            self._clock_dirty = True
+
+    def recorded_time(self, test_key: str):
+        """epoch ตอนเริ่ม test นี้ตอนอัด — None ถ้า cassette ไม่มี (อัดก่อนมี clock.json)"""
+        with self._lock:
+            return self._load_clock().get(test_key)
+
+    def flush(self):
+        """เขียน index ของ key ที่อัดใน session นี้ลง disk (+ clock.json ถ้ามีการอัดเวลา)"""
+        with self._lock:
+            dirty = [(k, self._index[k]) for k in sorted(self._dirty)]
+            self._dirty.clear()
+            clock = dict(self._clock) if self._clock_dirty else None
+            self._clock_dirty = False
+        for key, entry in dirty:
+            data = json.dumps(entry, ensure_ascii=False, indent=1, sort_keys=True)
+            self._atomic_write(self._index_path(key), data.encode("utf-8"))
+        if clock is not None:
+            data = json.dumps(clock, indent=1, sort_keys=True)
+            self._atomic_write(self._clock_path(), data.encode("utf-8"))
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+# ======================================================
+# REQUESTS  (HTTPAdapter.send)
+# ======================================================
+_state = {"mode": None, "store": None}
+_orig_send = HTTPAdapter.send
+_orig_run  = subprocess.run
+
+
+def _requests_key(request) -> str:
+    body = request.body
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    key_body = None
+    if body:
+        try:
+            key_body = json.loads(body)     # canonical → ลำดับ key / whitespace ไม่มีผล
+        except ValueError:
+            key_body = body.decode("utf-8", errors="replace")
+    return request_key(request.method, request.url, key_body)
+
+
+def _build_response(adapter, request, meta: dict, body: bytes) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = meta["status"]
+    resp.reason      = meta.get("reason", "")
+    resp.headers     = CaseInsensitiveDict(meta.get("headers", {}))
+    resp.encoding    = get_encoding_from_headers(resp.headers)
+    resp._content    = body
+    resp.url         = request.url
+    resp.request     = request
+    resp.connection  = adapter
+    return resp
+
+
+def _cassette_send(self, request, **kwargs):
+    store = _state["store"]
+    key   = _requests_key(request)
+
+    if _state["mode"] == "replay":
+        found = store.lookup(key)
+        if found is None:
+            raise CassetteMiss(f"cassette miss: {request.method} {request.url}", request=request)
+        return _build_response(self, request, *found)
+
+    resp = _orig_send(self, request, **kwargs)
+    headers = {k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS}
+    store.record(
+        key,
+        {"method": request.method, "url": request.url},
+        {"status": resp.status_code, "reason": resp.reason, "headers": headers},
+        resp.content,
+    )
+    return resp
+
+
+# ======================================================
+# CURL  (subprocess.run)
+# ======================================================
+def _is_curl(args) -> bool:
+    return (isinstance(args, (list, tuple)) and args
+            and os.path.basename(str(args[0])) == "curl")
+
+
+def _cassette_run(args, *popenargs, **kwargs):
+    if not _is_curl(args):
+        return _orig_run(args, *popenargs, **kwargs)
+
+    store   = _state["store"]
+    argv    = [str(a) for a in args]
+    key     = request_key("CURL", "curl", argv)
+    as_text = bool(kwargs.get("text") or kwargs.get("universal_newlines")
+                   or kwargs.get("encoding") or kwargs.get("errors"))
+
+    def _out(b: bytes):
+        return b.decode(kwargs.get("encoding") or "utf-8", errors="replace") if as_text else b
+
+    if _state["mode"] == "replay":
+        found = store.lookup(key)
+        if found is None:
+            return subprocess.CompletedProcess(
+                argv, _CURL_MISS_RC, _out(b""), _out(b"cassette miss: " + " ".join(argv).encode()))
+        meta, body = found
+        return subprocess.CompletedProcess(
+            argv, meta["status"], _out(body), _out(meta.get("stderr", "").encode("utf-8")))
+
+    result = _orig_run(args, *popenargs, **kwargs)
+    stdout, stderr = result.stdout or b"", result.stderr or b""
+    if isinstance(stdout, str):
+        stdout = stdout.encode("utf-8")
+    if isinstance(stderr, bytes):
+        stderr = stderr.decode("utf-8", errors="replace")
+    store.record(key, {"method": "CURL", "argv": argv},
+                 {"status": result.returncode, "stderr": stderr}, stdout)
+    return result
+
+
+# ======================================================
+# CLOCK  (replay: datetime.now / time.time ของ repo = เวลาตอนอัด)
+# ======================================================
+# เลื่อน (ไม่หยุด) นาฬิกา: now = เวลาตอนอัด + เวลาที่ผ่านไปจริงใน test
+# → loop ที่รอ deadline ด้วย time.time() ยังเดินต่อได้
+# patch เฉพาะ module ของ repo (ใต้ roots) — module datetime / time และ library
+# (google-auth, grpc, urllib3, pandas ...) เห็นนาฬิกาจริงเสมอ: token / TLS / Spanner ที่ยังยิงจริงไม่เพี้ยน
+_REAL_DATETIME = datetime.datetime
+_real_time     = time.time
+_clock = {"offset": 0.0, "patched": []}
+
+
+def _shifted_time() -> float:
+    return _real_time() + _clock["offset"]
+
+
+def _shifted_time_ns() -> int:
+    return time.time_ns() + int(_clock["offset"] * 1e9)
+
+
+class _ShiftedMeta(type):
+    # datetime จริงที่สร้างจากที่อื่นยังผ่าน isinstance(x, datetime) ของ module ที่ถูก patch
+    def __instancecheck__(cls, obj):
+        return isinstance(obj, _REAL_DATETIME)
+
+    def __subclasscheck__(cls, sub):
+        return issubclass(sub, _REAL_DATETIME)
+
+
+class ShiftedDatetime(_REAL_DATETIME, metaclass=_ShiftedMeta):
+    """datetime.datetime ที่ now() / utcnow() / today() อ่านนาฬิกาที่เลื่อนแล้ว"""
+
+    @classmethod
+    def now(cls, tz=None):
+        return _REAL_DATETIME.fromtimestamp(_shifted_time(), tz)
+
+    @classmethod
+    def utcnow(cls):
+        return _REAL_DATETIME.fromtimestamp(_shifted_time(), datetime.timezone.utc).replace(tzinfo=None)
+
+    @classmethod
+    def today(cls):
+        return cls.now()
+
+
+class _ShiftedModule:
+    """แทน module datetime / time ใน namespace ของ repo module — override บาง attr ที่เหลือส่งต่อของจริง"""
+
+    def __init__(self, real, overrides: dict):
+        self._real      = real
+        self._overrides = overrides
+
+    def __getattr__(self, name):
+        if name in self._overrides:
+            return self._overrides[name]
+        return getattr(self._real, name)
+
+    def __repr__(self):
+        return f"<shifted {self._real!r}>"
+
+
+_SHIFTED_DATETIME_MODULE = _ShiftedModule(datetime, {"datetime": ShiftedDatetime})
+_SHIFTED_TIME_MODULE     = _ShiftedModule(time, {"time": _shifted_time, "time_ns": _shifted_time_ns})
+
+
+def _clock_targets(roots):
+    """
+    (module, attr, replacement) ของทุกชื่อใน module ใต้ roots ที่ bind
+    datetime.datetime / time.time (from ... import) หรือ module datetime / time เอง (import datetime)
+    """
+    swap = {id(_REAL_DATETIME): ShiftedDatetime, id(_real_time): _shifted_time,
+            id(datetime): _SHIFTED_DATETIME_MODULE, id(time): _SHIFTED_TIME_MODULE}
+    this = sys.modules[__name__]     # _REAL_DATETIME / _real_time ของที่นี่ต้องเป็นของจริงเสมอ
+    for mod in list(sys.modules.values()):
+        path = getattr(mod, "__file__", None) or ""
+        if mod is this or "site-packages" in path or not any(path.startswith(r) for r in roots):
+            continue
+        for attr, val in list(vars(mod).items()):
+            if id(val) in swap:
+                yield mod, attr, swap[id(val)]
+
+
+def shift_clock(epoch: float, roots=()):
+    """
+    ให้ datetime.now() / time.time() ของ module ใต้ roots เริ่มที่ epoch
+    (ไม่แตะ module datetime / time — code นอก roots ใช้นาฬิกาจริง)
+    """
+    restore_clock()
+    _clock["offset"] = epoch - _real_time()
+    for mod, attr, new in _clock_targets(tuple(roots)):
+        _clock["patched"].append((mod, attr, getattr(mod, attr)))
+        setattr(mod, attr, new)
+
+
+def restore_clock():
+    for mod, attr, old in reversed(_clock["patched"]):
+        setattr(mod, attr, old)
+    _clock["patched"] = []
+    _clock["offset"]  = 0.0
+
+
+# ======================================================
+# ACTIVATE / DEACTIVATE
+# ======================================================
+def activate(mode: str, root: str = DEFAULT_DIR) -> CassetteStore:
+    """เปิด record / replay ทั้ง process — คืน store (ใช้ดู stats)"""
+    if mode not in MODES:
+        raise ValueError(f"cassette mode ต้องเป็น {MODES}, ได้ {mode!r}")
+    if mode == "replay" and not os.path.isdir(root):
+        raise FileNotFoundError(f"ไม่พบ cassette directory: {root}")
+    _state["mode"]  = mode
+    _state["store"] = CassetteStore(root)
+    HTTPAdapter.send = _cassette_send
+    subprocess.run   = _cassette_run
+    return _state["store"]
+
+
+def deactivate() -> dict:
+    """คืน patch เดิม + flush index (record) — คืน stats"""
+    store = _state["store"]
+    HTTPAdapter.send = _orig_send
+    subprocess.run   = _orig_run
+    restore_clock()
+    _state["mode"] = _state["store"] = None
+    if store is None:
+        return {}
+    store.flush()
+    return store.stats()
+
+
+def active_mode():
+    return _state["mode"]
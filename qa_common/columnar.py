@@ -0,0 +1,265 @@
+"""
+columnar.py — โหลด mst_* table จาก Spanner snapshot เป็น NumPy column arrays
+
+ใช้กับ oracle ที่คำนวณผลที่ "ควรได้" ในเครื่อง (qa_common.metadata_oracle, qa_common.agg_oracle)
+snapshot = ไฟล์ของ qa_common.spanner_emulator (gzip JSON lines: schema header + row arrays)
+
+ชนิด column:
+  STRING / BOOL / อื่น ๆ   → StringColumn   (dictionary-encoded: codes int32 + vocab, NULL = -1)
+  JSON                      → StringColumn   (vocab = JSON text แบบ sort_keys)
+  INT64 / FLOAT64 / NUMERIC → float64 array  (NULL = NaN)
+  TIMESTAMP / DATE          → int64 UNIX micros (NULL = NULL_TS)
+  ARRAY<...>                → ArrayColumn    (CSR: codes + offsets ต่อ row, vocab ร่วมกันทั้ง column)
+
+predicate ทุกตัวเป็น boolean mask ขนาด n rows → รวมกันด้วย & / | ได้ตรง ๆ
+
+Usage:
+    from qa_common.columnar import load_table
+
+    t = load_table("fixtures/spanner_snapshot.jsonl.gz", "mst_sfv_nonprod")
+    mask = t.string("status").eq("publish") & t.array("article_category").any_in(["series"])
+"""
+
+import datetime
+import json
+import os
+import threading
+
+NULL_TS = -(2 ** 63)
+
+_INSTALL_HINT = (
+    "ไม่พบ numpy กรุณารัน:\n"
+    "  pip install numpy --break-system-packages"
+)
+
+
+def import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError(_INSTALL_HINT)
+    return numpy
+
+
+# ======================================================
+# COLUMN TYPES
+# ======================================================
+class StringColumn:
+    """scalar column แบบ dictionary-encoded"""
+
+    def __init__(self, codes, vocab: list):
+        self.codes = codes
+        self.vocab = vocab
+        self.index = {v: i for i, v in enumerate(vocab)}
+        self._values = None
+
+    def eq(self, value):
+        code = self.index.get(value)
+        return self.codes == code if code is not None else self.codes == -2
+
+    def ne(self, value):
+        """SQL `col != value` — NULL ไม่ผ่าน"""
+        return (self.codes != self.index.get(value, -2)) & (self.codes >= 0)
+
+    def isin(self, values):
+        np = import_numpy()
+        wanted = [self.index[v] for v in values if v in self.index]
+        return np.isin(self.codes, wanted) if wanted else np.zeros(len(self.codes), dtype=bool)
+
+    def values(self):
+        """object array ของค่าจริง (None = NULL) — สร้างครั้งเดียวเมื่อใช้"""
+        if self._values is None:
+            np = import_numpy()
+            lookup = np.array(self.vocab + [None], dtype=object)
+            self._values = lookup[self.codes]          # code -1 → ตัวสุดท้าย = None
+        return self._values
+
+
+class ArrayColumn:
+    """ARRAY<...> column: ค่าของ row i = vocab[codes[offsets[i]:offsets[i+1]]]"""
+
+    def __init__(self, codes, offsets, vocab: list):
+        np = import_numpy()
+        self.codes   = codes
+        self.offsets = offsets
+        self.vocab   = vocab
+        self.index   = {v: i for i, v in enumerate(vocab)}
+        self.n       = len(offsets) - 1
+        self.row_of  = np.repeat(np.arange(self.n, dtype=np.int64), np.diff(offsets))
+
+    def lengths(self):
+        np = import_numpy()
+        return np.diff(self.offsets)
+
+    def any_in(self, values):
+        """EXISTS(SELECT 1 FROM UNNEST(col) AS x WHERE x IN UNNEST(values))"""
+        np = import_numpy()
+        wanted = [self.index[v] for v in values if v in self.index]
+        if not wanted:
+            return np.zeros(self.n, dtype=bool)
+        hit = np.isin(self.codes, wanted)
+        return np.bincount(self.row_of[hit], minlength=self.n) > 0
+
+    def first_code(self):
+        """code ของสมาชิกตัวแรกต่อ row (-1 = array ว่าง / NULL)"""
+        np = import_numpy()
+        out = np.full(self.n, -1, dtype=np.int64)
+        non_empty = self.offsets[1:] > self.offsets[:-1]
+        out[non_empty] = self.codes[self.offsets[:-1][non_empty]]
+        return out
+
+    def row(self, i: int) -> list:
+        return [self.vocab[c] for c in self.codes[self.offsets[i]:self.offsets[i + 1]]]
+
+
+# ======================================================
+# TABLE
+# ======================================================
+def _to_micros(value) -> int:
+    if value is None:
+        return NULL_TS
+    if len(value) == 10:                                # DATE
+        d = datetime.date.fromisoformat(value)
+        value = datetime.datetime(d.year, d.month, d.day, tzinfo=datetime.timezone.utc)
+    else:
+        value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+    return int(value.timestamp()) * 1_000_000 + value.microsecond
+
+
+def to_micros(dt: datetime.datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return int(dt.timestamp()) * 1_000_000 + dt.microsecond
+
+
+class ColumnarTable:
+    """column arrays ของ table เดียว + rank ของ id (ORDER BY id ASC)"""
+
+    def __init__(self, name: str, n: int, columns: dict, types: dict):
+        self.name    = name
+        self.n       = n
+        self.columns = columns
+        self.types   = types
+        self._id_rank = None
+        self._derived: dict = {}
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.columns
+
+    def string(self, name: str) -> StringColumn:
+        col = self.columns.get(name)
+        if col is None:                                  # column ไม่มีใน table = NULL ทุก row
+            np = import_numpy()
+            col = self.columns[name] = StringColumn(np.full(self.n, -1, dtype=np.int32), [])
+        return col
+
+    def array(self, name: str) -> ArrayColumn:
+        col = self.columns.get(name)
+        if col is None:
+            np = import_numpy()
+            col = self.columns[name] = ArrayColumn(np.zeros(0, dtype=np.int32),
+                                                   np.zeros(self.n + 1, dtype=np.int64), [])
+        return col
+
+    def number(self, name: str):
+        """float64 (NaN = NULL); column ที่ไม่มี = NaN ทั้งหมด"""
+        np = import_numpy()
+        col = self.columns.get(name)
+        return col if col is not None else np.full(self.n, np.nan)
+
+    def timestamp(self, name: str):
+        np = import_numpy()
+        col = self.columns.get(name)
+        return col if col is not None else np.full(self.n, NULL_TS, dtype=np.int64)
+
+    def ids(self):
+        return self.string("id").values()
+
+    def derived(self, key, build):
+        """column ที่คำนวณจาก column อื่น (เช่น JSON_VALUE, group key) — build ครั้งเดียวต่อ table"""
+        if key not in self._derived:
+            self._derived[key] = build()
+        return self._derived[key]
+
+    def id_rank(self):
+        """rank ของ id ตามลำดับ string (= ORDER BY id ASC ของ Spanner สำหรับ utf-8)"""
+        if self._id_rank is None:
+            np = import_numpy()
+            col = self.string("id")
+            vocab_rank = np.empty(len(col.vocab), dtype=np.int64)
+            vocab_rank[np.argsort(np.array(col.vocab, dtype=object), kind="stable")] = np.arange(len(col.vocab))
+            self._id_rank = vocab_rank[col.codes]
+        return self._id_rank
+
+
+def _build(name: str, schema_columns: list, rows: list) -> ColumnarTable:
+    np = import_numpy()
+    columns, types = {}, {}
+    for j, (col, typ) in enumerate(schema_columns):
+        types[col] = typ
+        values = [r[j] for r in rows]
+        base = typ.split("(")[0]
+        if typ.startswith("ARRAY<"):
+            vocab, index, codes, offsets = [], {}, [], [0]
+            for arr in values:
+                for v in arr or ():
+                    key = v if isinstance(v, str) or v is None else str(v)
+                    code = index.get(key)
+                    if code is None:
+                        code = index[key] = len(vocab)
+                        vocab.append(key)
+                    codes.append(code)
+                offsets.append(len(codes))
+            columns[col] = ArrayColumn(np.array(codes, dtype=np.int32), np.array(offsets, dtype=np.int64), vocab)
+        elif base in ("INT64", "FLOAT64", "NUMERIC"):
+            columns[col] = np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+        elif base in ("TIMESTAMP", "DATE"):
+            columns[col] = np.array([_to_micros(v) for v in values], dtype=np.int64)
+        else:
+            if base == "JSON":                            # snapshot เก็บ JSON เป็น object → text
+                values = [v if v is None or isinstance(v, str) else json.dumps(v, sort_keys=True)
+                          for v in values]
+            vocab, index, codes = [], {}, []
+            for v in values:
+                if v is None:
+                    codes.append(-1)
+                    continue
+                code = index.get(v)
+                if code is None:
+                    code = index[v] = len(vocab)
+                    vocab.append(v)
+                codes.append(code)
+            columns[col] = StringColumn(np.array(codes, dtype=np.int32), vocab)
+    return ColumnarTable(name, len(rows), columns, types)
+
+
+_tables: dict = {}
+_lock = threading.Lock()
+
+
+def load_table(snapshot_path: str, table: str) -> ColumnarTable:
+    """ColumnarTable จาก snapshot (cache ต่อ path + mtime + table)"""
+    from qa_common.spanner_emulator import iter_rows
+
+    import_numpy()
+    path = os.path.abspath(snapshot_path)
+    key  = (path, os.path.getmtime(path), table)
+    if key in _tables:
+        return _tables[key]
+    with _lock:
+        if key not in _tables:
+            schema, rows = None, []
+            for s, row in iter_rows(path):
+                if row is None:
+                    if schema is not None:
+                        break                        # อ่านครบ table ที่ต้องการแล้ว
+                    if s["table"] == table:
+                        schema = s
+                elif schema is not None:
+                    rows.append(row)
+            if schema is None:
+                raise KeyError(f"ไม่มี table {table} ใน snapshot {snapshot_path}")
+            _tables[key] = _build(table, schema["columns"], rows)
+    return _tables[key]
@@ -0,0 +1,95 @@
+"""
+curl_timing.py — GET ผ่าน curl พร้อมเวลาแยกตาม phase (DNS / connect / TLS / TTFB / download) จาก curl -w
+
+time.monotonic() รอบ subprocess.run รวมเวลา spawn process + เวลา parse ของเราไปด้วย
+→ ใช้เวลาที่ curl วัดเองแทน (วินาที):
+
+  dns_s       time_namelookup
+  connect_s   time_connect - time_namelookup               (TCP handshake)
+  tls_s       time_appconnect - time_connect               (0 ถ้าไม่ใช่ https)
+  ttfb_s      time_starttransfer - time_pretransfer        (ส่ง request เสร็จ → byte แรกของ response)
+  download_s  time_total - time_starttransfer              (รับ body)
+  total_s     time_total                                   (ทั้ง request ตามที่ curl วัด)
+  server_s    ttfb_s + download_s                          ← เวลาที่ service รับผิดชอบ — ใช้กับ latency assertion
+  wall_s      เวลารอบ subprocess (หลังได้ slot จาก host limiter)
+  overhead_s  wall_s - total_s                             (spawn curl + อ่าน stdout — เวลาของ harness)
+  bytes       size_download
+
+cassette replay (qa_common.cassette) คืน stdout ที่อัดไว้ → timing เป็นค่าตอน record
+
+Usage:
+    from qa_common.curl_timing import curl_get
+
+    status, body, timing = curl_get(url)
+    assert timing["server_s"] <= 5.0
+"""
+
+import subprocess
+import time
+
+from qa_common.host_limiter import limited
+
+# ======================================================
+# CONFIG
+# ======================================================
+MARKER = "\n__TIMING__"
+# ลำดับ field ใน -w (คั่นด้วย space) — curl พิมพ์เวลาเป็นวินาที ทศนิยม 6 ตำแหน่ง
+WRITE_OUT_FIELDS = ("http_code", "time_namelookup", "time_connect", "time_appconnect",
+                    "time_pretransfer", "time_starttransfer", "time_total", "size_download")
+WRITE_OUT = MARKER + " ".join(f"%{{{f}}}" for f in WRITE_OUT_FIELDS)
+
+
+# ======================================================
+# PARSE
+# ======================================================
+def phases(raw: dict, wall_s: float = None) -> dict:
+    """ค่า -w ดิบ (วินาที) → timing ต่อ phase"""
+    dns, conn, app = raw["time_namelookup"], raw["time_connect"], raw["time_appconnect"]
+    pre, start, total = raw["time_pretransfer"], raw["time_starttransfer"], raw["time_total"]
+    timing = {
+        "dns_s":      dns,
+        "connect_s":  max(0.0, conn - dns),
+        "tls_s":      max(0.0, app - conn) if app else 0.0,
+        "ttfb_s":     max(0.0, start - pre),
+        "download_s": max(0.0, total - start),
+        "total_s":    total,
+        "bytes":      int(raw["size_download"]),
+    }
+    timing["server_s"] = timing["ttfb_s"] + timing["download_s"]
+    if wall_s is not None:
+        timing["wall_s"]     = wall_s
+        timing["overhead_s"] = max(0.0, wall_s - total)
+    return {k: v if k == "bytes" else round(v, 4) for k, v in timing.items()}
+
+
+def parse_output(stdout: str, wall_s: float = None) -> tuple:
+    """stdout ของ curl -w WRITE_OUT → (status, body, timing) — timing = {} ถ้าไม่มี marker"""
+    body, sep, tail = stdout.rpartition(MARKER)
+    if not sep:
+        return 0, stdout, {}
+    values = tail.split()
+    if len(values) != len(WRITE_OUT_FIELDS):
+        return 0, body, {}
+    raw    = dict(zip(WRITE_OUT_FIELDS, values))
+    status = int(raw.pop("http_code")) if raw["http_code"].isdigit() else 0
+    try:
+        timing = phases({k: float(v) for k, v in raw.items()}, wall_s)
+    except ValueError:
+        timing = {}
+    return status, body, timing
+
+
+# ======================================================
+# FETCH
+# ======================================================
+def curl_get(url: str, timeout: float = 30) -> tuple:
+    """
+    GET ด้วย curl (ผ่าน limiter ของ host) — คืน (status, body str, timing)
+    wall_s วัดหลังได้ slot จาก host limiter — เวลารอคิวไม่นับ
+    """
+    with limited(url):
+        t0  = time.monotonic()
+        res = subprocess.run(["curl", "-s", "-o", "-", "-w", WRITE_OUT, url],
+                             capture_output=True, text=True, timeout=timeout)
+        wall_s = time.monotonic() - t0
+    return parse_output(res.stdout, wall_s)
@@ -0,0 +1,224 @@
+"""
+host_limiter.py — จำกัด in-flight requests + request / วินาที ต่อ target host (ใช้ร่วมกันทุก fetcher ใน process)
+
+แทนที่การหน่วงแบบตายตัว (time.sleep(DELAY)) และ thread pool ที่เปิดเท่าจำนวน task:
+  - 1 limiter ต่อ host (netloc) — ทุก thread / ทุก fetcher ที่ยิง host เดียวกันแชร์ตัวเดียวกัน
+  - max in-flight : semaphore — request ที่เกินรอจนมี slot ว่าง
+  - rps           : token bucket (burst = max in-flight) — ยิงเร็วสุดเท่าที่ bucket อนุญาต ไม่ sleep เกินจำเป็น
+  - ค่าตั้งต้นตาม service (ชื่อ label แรกของ hostname) ใน HOST_LIMITS
+    host ที่ไม่อยู่ใน HOST_LIMITS ใช้ DEFAULT_LIMIT (QA_HOST_INFLIGHT / QA_HOST_RPS)
+  - cassette replay (qa_common.cassette) ไม่แตะ network → ไม่จำกัด
+
+ทางที่ request ผ่าน limiter:
+  - qa_common.http_client (post_json / get_json / get) — เสมอ
+  - requests.* ตรง ๆ  → install() patch requests.Session.send
+                        (pytest: qa_common.pytest_host_limiter — โหลดจาก root conftest.py
+                         และ src/Test_7-11_New_prod/pytest.ini)
+  - curl / โค้ดอื่น   → with limited(url): ...
+
+Override (env):
+  QA_HOST_LIMITS="atlas-serving=4:10,ai-metadata-service=32:80"   # <service>=<in-flight>:<rps> (rps 0 = ไม่จำกัด)
+  QA_HOST_LIMIT=0                                                  # ปิด limiter ทั้งหมด
+
+Usage:
+    from qa_common.host_limiter import limited
+
+    with limited(url):
+        subprocess.run(["curl", "-s", url], ...)
+"""
+
+import contextlib
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from qa_common import cassette
+
+# ======================================================
+# CONFIG
+# ======================================================
+LIMIT_ENABLED = os.environ.get("QA_HOST_LIMIT", "1") != "0"
+
+# service (label แรกของ hostname, ตัด suffix -2 / -preprod ได้) → (max in-flight, requests / วินาที)
+HOST_LIMITS = {
+    "ai-universal-service-new": (16, 30),
+    "ai-universal-service-711": (16, 30),
+    "ai-metadata-service":      (16, 40),
+    "atlas-serving":            (8, 20),
+    "torch-serving-coldstart":  (8, 10),
+}
+DEFAULT_LIMIT = (int(os.environ.get("QA_HOST_INFLIGHT", "8")),
+                 float(os.environ.get("QA_HOST_RPS", "0")))
+
+
+def _parse_overrides(spec: str) -> dict:
+    out = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, value = part.partition("=")
+        inflight, _, rps = value.partition(":")
+        out[name.strip()] = (int(inflight), float(rps or 0))
+    return out
+
+
+HOST_LIMITS.update(_parse_overrides(os.environ.get("QA_HOST_LIMITS", "")))
+
+_limiters: dict = {}
+_limiters_lock = threading.Lock()
+
+
+# ======================================================
+# TOKEN BUCKET
+# ======================================================
+class TokenBucket:
+    """token bucket แบบจอง: token ติดลบได้ = คิวของคนที่รออยู่ → แต่ละคนรู้เวลารอของตัวเองทันที"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate   = rate
+        self.burst  = max(1, burst)
+        self.tokens = float(self.burst)
+        self._last  = time.monotonic()
+        self._lock  = threading.Lock()
+
+    def acquire(self) -> float:
+        """ใช้ 1 token — คืนเวลาที่ต้องรอ (วินาที)"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+            self._last = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+# ======================================================
+# HOST LIMITER
+# ======================================================
+class HostLimiter:
+    """semaphore (max in-flight) + token bucket (rps) ของ host เดียว (thread-safe, reentrant ต่อ thread)"""
+
+    def __init__(self, host: str, max_inflight: int, rps: float):
+        self.host         = host
+        self.max_inflight = max(1, max_inflight)
+        self.rps          = rps
+        self._slots  = threading.BoundedSemaphore(self.max_inflight)
+        self._bucket = TokenBucket(rps, burst=self.max_inflight)
+        self._local  = threading.local()
+        self._lock   = threading.Lock()
+        self.requests = 0
+        self.inflight = 0
+        self.peak     = 0
+        self.waited_s = 0.0
+
+    @contextlib.contextmanager
+    def slot(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            # redirect ของ requests.Session.send / http_client → Session.send: ใช้ slot เดิม
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth = depth
+            return
+
+        t0 = time.monotonic()
+        self._slots.acquire()
+        try:
+            self._bucket.acquire()
+            with self._lock:
+                self.requests += 1
+                self.inflight += 1
+                self.peak      = max(self.peak, self.inflight)
+                self.waited_s += time.monotonic() - t0
+            self._local.depth = 1
+            try:
+                yield
+            finally:
+                self._local.depth = 0
+                with self._lock:
+                    self.inflight -= 1
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "peak_inflight": self.peak,
+                "max_inflight": self.max_inflight, "rps": self.rps,
+                "waited_s": round(self.waited_s, 2)}
+
+
+def _host(url_or_host: str) -> str:
+    return urlsplit(url_or_host).netloc or url_or_host
+
+
+def limits_for(host: str) -> tuple:
+    """(max in-flight, rps) ของ host — จับคู่ service ที่ยาวที่สุดที่ hostname ขึ้นต้นด้วย"""
+    label = host.split(":")[0].split(".")[0]
+    names = [n for n in HOST_LIMITS if label == n or label.startswith(n + "-")]
+    return HOST_LIMITS[max(names, key=len)] if names else DEFAULT_LIMIT
+
+
+def limiter_for(url_or_host: str) -> HostLimiter:
+    host = _host(url_or_host)
+    limiter = _limiters.get(host)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(host)
+            if limiter is None:
+                limiter = _limiters[host] = HostLimiter(host, *limits_for(host))
+    return limiter
+
+
+def configure(url_or_host: str, max_inflight: int = None, rps: float = None):
+    """เปลี่ยน limit ของ host (ใช้กับ request ถัดไป) — รับได้ทั้ง hostname และ URL เต็ม"""
+    host = _host(url_or_host)
+    cur_inflight, cur_rps = limits_for(host)
+    with _limiters_lock:
+        old = _limiters.get(host)
+        if old is not None:
+            cur_inflight, cur_rps = old.max_inflight, old.rps
+        _limiters[host] = HostLimiter(host,
+                                      cur_inflight if max_inflight is None else max_inflight,
+                                      cur_rps if rps is None else rps)
+
+
+@contextlib.contextmanager
+def limited(url: str):
+    """ครอบ 1 request ไปยัง host ของ url"""
+    if not LIMIT_ENABLED or cassette.active_mode() == "replay":
+        yield
+        return
+    with limiter_for(url).slot():
+        yield
+
+
+def stats() -> dict:
+    """host → stats (เฉพาะ host ที่มี request)"""
+    with _limiters_lock:
+        return {h: l.stats() for h, l in sorted(_limiters.items()) if l.requests}
+
+
+# ======================================================
+# INSTALL  (requests.Session.send)
+# ======================================================
+_orig_session_send = requests.Session.send
+
+
+def _limited_send(self, request, **kwargs):
+    with limited(request.url):
+        return _orig_session_send(self, request, **kwargs)
+
+
+def install():
+    """ให้ทุก request ที่ผ่าน requests (รวม requests.get / post ตรง ๆ) ผ่าน limiter"""
+    requests.Session.send = _limited_send
+
+
+def uninstall():
+    requests.Session.send = _orig_session_send
@@ -0,0 +1,170 @@
+"""
+http_client.py — shared HTTP client (connection pool + keep-alive)
+
+แทนที่การ fork `curl` ต่อ 1 request:
+  - ใช้ requests.Session เดียวทั้ง process (session-scoped)
+  - connection pool + keep-alive → ไม่ต้อง TCP handshake ใหม่ทุก call
+  - กำหนดขนาด pool แยกต่อ host ได้ (HOST_POOL_SIZES / configure_host)
+  - serialise body เป็น bytes ครั้งเดียว แล้วส่งตรง (ไม่ผ่าน argv ของ curl)
+  - ทุก request ผ่าน limiter ของ host (in-flight + rps — qa_common.host_limiter)
+
+Usage:
+    from qa_common.http_client import post_json, get_json
+
+    resp = post_json(API_URL, {"parameters": {...}, "options": {...}})
+"""
+
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from qa_common.host_limiter import limited
+from qa_common.request_cache import CACHE_ENABLED, SESSION_CACHE, request_key
+
+# ======================================================
+# CONFIG
+# ======================================================
+DEFAULT_TIMEOUT   = 60
+DEFAULT_POOL_SIZE = int(os.environ.get("QA_HTTP_POOL_SIZE", "10"))
+
+# จำนวน connection สูงสุดต่อ host (host ที่ไม่อยู่ในนี้ใช้ DEFAULT_POOL_SIZE)
+HOST_POOL_SIZES = {
+    "ai-metadata-service.preprod-gcp-ai-bn.int-ai-platform.gcp.dmp.true.th":      16,
+    "ai-universal-service-new.preprod-gcp-ai-bn.int-ai-platform.gcp.dmp.true.th": 16,
+    "ai-universal-service-711.prod-gcp-ai-bn.ai-platform.gcp.dmp.true.th":        16,
+}
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+_session      = None
+_session_lock = threading.Lock()
+
+
+# ======================================================
+# SESSION
+# ======================================================
+def _new_adapter(pool_size: int) -> HTTPAdapter:
+    # pool_connections = จำนวน host pool ที่ cache ไว้, pool_maxsize = connection ต่อ host
+    return HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=False)
+
+
+def get_session() -> requests.Session:
+    """คืน requests.Session ตัวเดียวของ process (สร้างครั้งแรกที่เรียก)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                default = HTTPAdapter(pool_connections=len(HOST_POOL_SIZES) + 4,
+                                      pool_maxsize=DEFAULT_POOL_SIZE)
+                s.mount("http://",  default)
+                s.mount("https://", default)
+                _session = s
+                for host, size in HOST_POOL_SIZES.items():
+                    _mount_host(s, host, size)
+    return _session
+
+
+def _mount_host(session: requests.Session, host: str, pool_size: int):
+    adapter = _new_adapter(pool_size)
+    session.mount(f"http://{host}/",  adapter)
+    session.mount(f"https://{host}/", adapter)
+
+
+def configure_host(host_or_url: str, pool_size: int):
+    """กำหนดขนาด connection pool ของ host (รับได้ทั้ง hostname และ URL เต็ม)"""
+    host = urlsplit(host_or_url).netloc or host_or_url
+    HOST_POOL_SIZES[host] = pool_size
+    with _session_lock:
+        if _session is not None:
+            _mount_host(_session, host, pool_size)
+
+
+def close_session():
+    """ปิด connection ทั้งหมด — เรียกตอนจบ session (conftest.pytest_sessionfinish)"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+# ======================================================
+# REQUEST HELPERS
+# ======================================================
+def _decode(content: bytes) -> dict:
+    try:
+        return json.loads(content)
+    except ValueError as e:
+        raw = content[:300].decode("utf-8", errors="replace")
+        raise RuntimeError(f"JSON parse error: {e}\nRaw: {raw}")
+
+
+def encode_body(body: dict) -> bytes:
+    """serialise request body ครั้งเดียว (UTF-8, ไม่ escape ภาษาไทย)"""
+    return json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+
+def _post_raw(url: str, data: bytes, timeout: float) -> tuple:
+    """คืน (status_code, content)"""
+    try:
+        with limited(url):
+            resp = get_session().post(url, data=data, headers=JSON_HEADERS, timeout=timeout)
+    except requests.RequestException as e:
+        raise RuntimeError(f"HTTP error: {e}")
+    return resp.status_code, resp.content
+
+
+def _cacheable(result: tuple) -> bool:
+    """cache เฉพาะ 2xx ที่ body เป็น JSON — 4xx/5xx หรือ body เสีย ยิงใหม่ทุกครั้ง"""
+    status, content = result
+    if not 200 <= status < 300:
+        return False
+    try:
+        json.loads(content)
+    except ValueError:
+        return False
+    return True
+
+
+def post_json(url: str, body, timeout: float = DEFAULT_TIMEOUT, cache: bool = False) -> dict:
+    """
+    POST JSON แล้วคืน response dict (พฤติกรรมเหมือน curl --silent เดิม:
+    ไม่ raise ตาม HTTP status — คืน body ที่ server ส่งมา)
+    body เป็น dict หรือ bytes ที่ encode ไว้แล้วก็ได้
+
+    cache=True → body ที่เหมือนกัน (หลัง canonicalise) ยิงจริงครั้งเดียวต่อ session
+                 request ที่ซ้ำกันและยิงพร้อมกันจะรอผลของ request เดียว (qa_common.request_cache)
+                 เก็บเฉพาะ response 2xx ที่ decode เป็น JSON ได้ — error ไม่ติด cache
+    """
+    if isinstance(body, (bytes, bytearray)):
+        data, key_body = body, json.loads(body)
+    else:
+        data, key_body = encode_body(body), body
+
+    if not (cache and CACHE_ENABLED):
+        return _decode(_post_raw(url, data, timeout)[1])
+
+    key = request_key("POST", url, key_body)
+    _, content = SESSION_CACHE.get_or_fetch(key, lambda: _post_raw(url, data, timeout), cacheable=_cacheable)
+    return _decode(content)
+
+
+def get_json(url: str, params: dict = None, timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """GET แล้วคืน response dict"""
+    try:
+        with limited(url):
+            resp = get_session().get(url, params=params, timeout=timeout)
+    except requests.RequestException as e:
+        raise RuntimeError(f"HTTP error: {e}")
+    return _decode(resp.content)
+
+
+def get(url: str, params: dict = None, timeout: float = DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    """GET แบบคืน Response ดิบ (ใช้แทน requests.get ในจุดที่ต้องดู status_code)"""
+    with limited(url):
+        return get_session().get(url, params=params, timeout=timeout, **kwargs)
@@ -0,0 +1,355 @@
+"""
+id_snapshot.py — snapshot ของ ID ใน mst_* tables สำหรับเช็ค "ID นี้มีไหม" แบบ local
+
+งาน Spanner ส่วนใหญ่ (not_in_spanner_*.txt, *_missing_but_in_source.txt) คือถามว่า ID มีใน table ไหม
+→ export ID column ของแต่ละ table ครั้งเดียว แล้วตอบ membership ในเครื่อง (ไม่มี network round-trip)
+
+ไฟล์ต่อ table  (<dir>/<database>/<table>.*):
+  .ids        sorted array ของ ID (utf-8, fixed-width เติม \\0) — mmap + binary search
+  .bloom      Bloom filter (blake2b double hashing) — ตอบ "ไม่มีแน่นอน" ได้ก่อนแตะ .ids
+  .meta.json  version stamp (เวลา export + sha256 ของ .ids), จำนวน ID, width, m / k ของ Bloom
+
+classify(ids):
+  Bloom negative                 → ไม่มีใน snapshot
+  Bloom positive + เจอใน .ids     → มี
+  Bloom positive + ไม่เจอใน .ids  → ไม่มีใน snapshot (false positive ของ Bloom)
+  Bloom positive แต่ไม่มีไฟล์ .ids → ยืนยันไม่ได้ → ส่งต่อให้ Spanner
+
+snapshot อาจเก่ากว่า Spanner ทั้งสองทาง:
+  "ไม่มีใน snapshot" ≠ ไม่มีใน Spanner — row ที่เพิ่มหลัง export
+  "มีใน snapshot"    ≠ มีใน Spanner    — row ที่ถูกลบ / unpublish หลัง export
+→ default: spanner_verify ยังยืนยันทุก ID กับ Spanner — snapshot เป็นแค่ prefilter
+   (นับว่า snapshot ตอบต่างจาก Spanner กี่ ID = ความเก่าของ snapshot)
+→ QA_ID_SNAPSHOT_TRUST=1: ยอมรับความเก่า — ID ที่ snapshot บอกว่า "มี" ตอบเลยไม่ถาม Spanner
+   (ID ที่ถูกลบหลัง export จะผ่านได้จนกว่า snapshot หมดอายุ) — "ไม่มี" ยังยืนยันกับ Spanner เสมอ
+
+เปิดใช้ใน compare_with_spanner (qa_common.spanner_verify) ด้วย env:
+  QA_ID_SNAPSHOT=1                      ใช้ snapshot ถ้ามีไฟล์ของ table นั้น
+  QA_ID_SNAPSHOT_DIR=<dir>              (default: fixtures/id_snapshot)
+  QA_ID_SNAPSHOT_MAX_AGE_HOURS=24       snapshot เก่ากว่านี้ = ไม่ใช้ (default 24, 0 = ไม่จำกัด)
+  QA_ID_SNAPSHOT_TRUST=1                ตอบ "มี" จาก snapshot โดยไม่ยืนยันกับ Spanner (default ปิด)
+
+Usage:
+  python -m qa_common.id_snapshot export                          # จาก Spanner จริง
+  python -m qa_common.id_snapshot export --from-snapshot fixtures/spanner_snapshot.jsonl.gz
+  QA_ID_SNAPSHOT=1 QA_ID_SNAPSHOT_TRUST=1 pytest src/test_sfv_parameters.py
+"""
+
+import argparse
+import bisect
+import datetime
+import hashlib
+import json
+import math
+import mmap
+import os
+import sys
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# ======================================================
+# CONFIG
+# ======================================================
+ENABLED       = os.environ.get("QA_ID_SNAPSHOT", "").lower() in ("1", "true", "yes")
+DEFAULT_DIR   = os.environ.get("QA_ID_SNAPSHOT_DIR", os.path.join(ROOT_DIR, "fixtures", "id_snapshot"))
+MAX_AGE_HOURS = float(os.environ.get("QA_ID_SNAPSHOT_MAX_AGE_HOURS", "24"))
+TRUST_PRESENT = os.environ.get("QA_ID_SNAPSHOT_TRUST", "").lower() in ("1", "true", "yes")
+BLOOM_FP_RATE = 0.001
+
+
+# ======================================================
+# BLOOM FILTER
+# ======================================================
+def _positions(key: bytes, m: int, k: int):
+    d  = hashlib.blake2b(key, digest_size=16).digest()
+    h1 = int.from_bytes(d[:8], "little")
+    h2 = int.from_bytes(d[8:], "little") | 1
+    return [(h1 + i * h2) % m for i in range(k)]
+
+
+class BloomFilter:
+    """bit array ขนาด m bits, k hash (bits เป็น bytearray ตอนสร้าง / mmap ตอนโหลด)"""
+
+    def __init__(self, m: int, k: int, bits=None):
+        self.m, self.k = m, k
+        self.bits = bits if bits is not None else bytearray((m + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, n: int, fp_rate: float = BLOOM_FP_RATE) -> "BloomFilter":
+        n = max(n, 1)
+        m = max(int(math.ceil(-n * math.log(fp_rate) / (math.log(2) ** 2))), 64)
+        k = max(int(round(m / n * math.log(2))), 1)
+        return cls(m, k)
+
+    def add(self, key: bytes):
+        for p in _positions(key, self.m, self.k):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, key: bytes) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in _positions(key, self.m, self.k))
+
+
+# ======================================================
+# SORTED FIXED-WIDTH ARRAY (mmap)
+# ======================================================
+class _Records:
+    """มุมมอง sequence บน mmap — bisect ใช้ได้ตรง ๆ (ไม่ copy ทั้งไฟล์เข้า RAM)"""
+
+    def __init__(self, buf, width: int, count: int):
+        self.buf, self.width, self.count = buf, width, count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i: int) -> bytes:
+        w = self.width
+        return self.buf[i * w:(i + 1) * w]
+
+
+def _paths(root: str, database: str, table: str) -> dict:
+    base = os.path.join(root, database, table)
+    return {"ids": base + ".ids", "bloom": base + ".bloom", "meta": base + ".meta.json"}
+
+
+def write_snapshot(root: str, database: str, table: str, ids, column: str = "id",
+                   source: str = "spanner") -> dict:
+    """เขียน .ids / .bloom / .meta.json ของ table — คืน meta"""
+    keys  = sorted({str(i).encode("utf-8") for i in ids if i})
+    width = max((len(k) for k in keys), default=1)
+    bloom = BloomFilter.for_capacity(len(keys))
+    for k in keys:
+        bloom.add(k)
+
+    paths = _paths(root, database, table)
+    os.makedirs(os.path.dirname(paths["ids"]), exist_ok=True)
+    sha = hashlib.sha256()
+    with open(paths["ids"] + ".tmp", "wb") as f:
+        for k in keys:
+            rec = k.ljust(width, b"\0")
+            sha.update(rec)
+            f.write(rec)
+    with open(paths["bloom"] + ".tmp", "wb") as f:
+        f.write(bloom.bits)
+
+    created = datetime.datetime.now(datetime.timezone.utc)
+    meta = {
+        "version":    f"{created:%Y%m%dT%H%M%SZ}-{sha.hexdigest()[:12]}",
+        "created_at": created.isoformat(),
+        "source":     source,
+        "database":   database,
+        "table":      table,
+        "column":     column,
+        "count":      len(keys),
+        "width":      width,
+        "bloom":      {"m": bloom.m, "k": bloom.k, "fp_rate": BLOOM_FP_RATE},
+    }
+    with open(paths["meta"] + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    for p in paths.values():                    # .ids / .bloom / .meta พร้อมกันเท่านั้น
+        os.replace(p + ".tmp", p)
+    return meta
+
+
+# ======================================================
+# SNAPSHOT (read side)
+# ======================================================
+def _mmap(path: str):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class IdSnapshot:
+    """membership ของ ID ใน table หนึ่ง ตาม snapshot (thread-safe: อ่านอย่างเดียว)"""
+
+    def __init__(self, root: str, database: str, table: str):
+        paths = _paths(root, database, table)
+        with open(paths["meta"], "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.version = self.meta["version"]
+        self.bloom   = BloomFilter(self.meta["bloom"]["m"], self.meta["bloom"]["k"], _mmap(paths["bloom"]))
+        self.records = None
+        if os.path.exists(paths["ids"]):
+            self.records = _Records(_mmap(paths["ids"]), self.meta["width"], self.meta["count"])
+        self._lock = threading.Lock()
+        self.counts = {"lookups": 0, "bloom_negative": 0, "confirmed": 0,
+                       "false_positive": 0, "unconfirmed": 0}
+
+    def age_hours(self) -> float:
+        created = datetime.datetime.fromisoformat(self.meta["created_at"])
+        return (datetime.datetime.now(datetime.timezone.utc) - created).total_seconds() / 3600
+
+    def _find(self, key: bytes) -> bool:
+        width = self.records.width
+        if len(key) > width:
+            return False
+        rec = key.ljust(width, b"\0")
+        i = bisect.bisect_left(self.records, rec)
+        return i < len(self.records) and self.records[i] == rec
+
+    def classify(self, ids) -> tuple:
+        """
+        คืน (present, absent, unknown)
+        absent  = ไม่มีใน snapshot (อาจถูกเพิ่มใน Spanner หลัง export) — ต้องยืนยันก่อนรายงานว่าหาย
+        unknown = Bloom positive ที่ยืนยันในเครื่องไม่ได้
+        """
+        present, absent, unknown = [], [], []
+        counts = dict.fromkeys(self.counts, 0)
+        for i in ids:
+            key = str(i).encode("utf-8")
+            counts["lookups"] += 1
+            if key not in self.bloom:
+                counts["bloom_negative"] += 1
+                absent.append(i)
+            elif self.records is None:
+                counts["unconfirmed"] += 1
+                unknown.append(i)
+            elif self._find(key):
+                counts["confirmed"] += 1
+                present.append(i)
+            else:
+                counts["false_positive"] += 1
+                absent.append(i)
+        with self._lock:
+            for k, v in counts.items():
+                self.counts[k] += v
+        return present, absent, unknown
+
+    def __contains__(self, id_val) -> bool:
+        present, _, unknown = self.classify([id_val])
+        if unknown:
+            raise LookupError(f"{id_val}: ยืนยันใน snapshot ไม่ได้ (ไม่มีไฟล์ .ids)")
+        return bool(present)
+
+    def stats(self) -> dict:
+        return {"version": self.version, "count": self.meta["count"], **self.counts}
+
+
+_snapshots: dict = {}
+_lock = threading.Lock()
+
+
+def load(database: str, table: str, root: str = DEFAULT_DIR):
+    """IdSnapshot ของ table (cache ต่อ process) — None ถ้าไม่มีไฟล์ หรือเก่ากว่า MAX_AGE_HOURS"""
+    key = (root, database, table)
+    if key in _snapshots:
+        return _snapshots[key]
+    with _lock:
+        if key not in _snapshots:
+            snap = None
+            if os.path.exists(_paths(root, database, table)["meta"]):
+                snap = IdSnapshot(root, database, table)
+                if MAX_AGE_HOURS and snap.age_hours() > MAX_AGE_HOURS:
+                    print(f"  ⚠️  ID snapshot {database}.{table} ({snap.version}) เก่ากว่า "
+                          f"{MAX_AGE_HOURS:g} ชม. — ใช้ Spanner แทน")
+                    snap = None
+            _snapshots[key] = snap
+    return _snapshots[key]
+
+
+def lookup(source):
+    """
+    IdSnapshot สำหรับ source ของ qa_common.spanner_verify
+    ใช้ได้เฉพาะ source แบบ (project, instance, database, table) — SQL template มี filter = ไม่ใช่แค่ membership
+    """
+    if not ENABLED or not (isinstance(source, tuple) and len(source) == 4):
+        return None
+    _, _, database, table = source
+    if not str(table).startswith("mst_"):
+        return None
+    return load(database, table)
+
+
+def stats() -> dict:
+    return {f"{db}.{table}": snap.stats()
+            for (_, db, table), snap in list(_snapshots.items()) if snap is not None}
+
+
+# ======================================================
+# EXPORT
+# ======================================================
+def export_from_spanner(root: str = DEFAULT_DIR, tables: list = None) -> list:
+    """ดึง id ของทุก mst_* ที่ src/ อ้างถึง จากทุก database ที่มี table นั้น"""
+    from qa_common import spanner_client, spanner_emulator
+    from google.cloud.spanner_v1 import param_types
+
+    tables = tables or spanner_emulator.referenced_tables()
+    metas = []
+    for database in spanner_emulator.DATABASES:
+        found = spanner_client.query_rows(
+            spanner_emulator.PROJECT, spanner_emulator.INSTANCE, database,
+            "SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES "
+            "WHERE TABLE_SCHEMA = '' AND TABLE_NAME IN UNNEST(@tables)",
+            {"tables": tables}, {"tables": param_types.Array(param_types.STRING)})
+        db = spanner_client.get_database(spanner_emulator.PROJECT, spanner_emulator.INSTANCE, database)
+        for table in sorted(r["TABLE_NAME"] for r in found):
+            with db.snapshot() as snap:
+                ids = [row[0] for row in snap.execute_sql(f"SELECT id FROM {table}")]
+            metas.append(write_snapshot(root, database, table, ids, source="spanner"))
+    return metas
+
+
+def export_from_emulator_snapshot(path: str, root: str = DEFAULT_DIR) -> list:
+    """ดึง id จาก snapshot ของ qa_common.spanner_emulator (offline)"""
+    from qa_common.spanner_emulator import iter_rows
+
+    metas, schema, col, ids = [], None, None, []
+
+    def flush():
+        if schema is not None and col is not None:
+            metas.append(write_snapshot(root, schema["database"], schema["table"], ids,
+                                        source=os.path.basename(path)))
+
+    for s, row in iter_rows(path):
+        if row is None:
+            flush()
+            names = [name for name, _ in s["columns"]]
+            schema, col, ids = s, names.index("id") if "id" in names else None, []
+        elif col is not None:
+            ids.append(row[col])
+    flush()
+    return metas
+
+
+# ======================================================
+# CLI
+# ======================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="ID-membership snapshot ของ mst_* tables")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export")
+    ex.add_argument("--out", default=DEFAULT_DIR)
+    ex.add_argument("--from-snapshot", help="snapshot ของ qa_common.spanner_emulator แทน Spanner จริง")
+    ex.add_argument("--tables", help="comma-separated (default: mst_* ที่ src/ อ้างถึง)")
+    ck = sub.add_parser("check", help="เช็ค ID กับ snapshot")
+    ck.add_argument("database")
+    ck.add_argument("table")
+    ck.add_argument("ids", nargs="+")
+    ck.add_argument("--dir", default=DEFAULT_DIR)
+    args = ap.parse_args()
+
+    if args.cmd == "export":
+        t0 = time.perf_counter()
+        if args.from_snapshot:
+            metas = export_from_emulator_snapshot(args.from_snapshot, args.out)
+        else:
+            tables = [t for t in (args.tables or "").split(",") if t] or None
+            metas = export_from_spanner(args.out, tables)
+        for m in metas:
+            print(f"  📦 {m['database']}.{m['table']:<32} {m['count']:>8} IDs  version {m['version']}")
+        print(f"✅ {len(metas)} tables → {args.out} ({time.perf_counter() - t0:.1f} s)")
+    else:
+        snap = load(args.database, args.table, args.dir)
+        if snap is None:
+            sys.exit(f"❌ ไม่มี snapshot ของ {args.database}.{args.table} ใน {args.dir}")
+        present, absent, unknown = snap.classify(args.ids)
+        print(f"version {snap.version}")
+        for label, group in (("✅ มี", present), ("❌ ไม่มีใน snapshot", absent), ("❓ ยืนยันไม่ได้", unknown)):
+            for i in group:
+                print(f"  {label:<20} {i}")
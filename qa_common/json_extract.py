@@ -0,0 +1,216 @@
+"""
+json_extract.py — ดึงเฉพาะ node ที่ต้องการจาก verbose=debug body โดยไม่ parse ทั้งก้อน
+
+verbose=debug response มีหลาย MB แต่ check ส่วนใหญ่ใช้แค่ 1-3 node
+(merge_page, get_seen_item_redis, order_object_card_type, ...)
+json.loads ทั้งก้อน = สร้าง dict/list/str ของทุก node → RAM ~ 5-10 เท่าของ body
+
+extract_nodes():
+  1. regex หา key ที่ต้องการใน raw text   "merge_page": {...}
+     หรือ node แบบ                         {"name": "merge_page", "result": ...}
+  2. json.JSONDecoder.raw_decode() เฉพาะ subtree ตรงนั้น (C decoder)
+  3. ข้ามส่วนที่เหลือทั้งหมด — เจอครบทุกชื่อแล้วหยุด scan ทันที
+
+path=("data", "results") → รับเฉพาะ key ที่เป็นลูกตรงของ data.results (เหมือน
+j["data"]["results"].get(name)) — key ชื่อเดียวกันที่ซ้อนอยู่ที่อื่นไม่นับ
+ตรวจระดับ nesting ด้วยการนับวงเล็บของช่วง text ระหว่าง match (ตัด string ออกก่อน)
+
+path=None → node แรกตามลำดับใน document ไม่ว่าจะอยู่ลึกแค่ไหน
+(ไม่ใช่ลำดับของ NodeIndex — NodeIndex เก็บทุก key ของ dict ก่อนลงไปใน children)
+ถ้ามีกรณีที่ regex ตัดสินไม่ได้ (เช่น "name" ไม่ใช่ key แรกของ object)
+→ fallback เป็น json.loads ทั้งก้อนแล้วหาตามลำดับ document เฉพาะครั้งนั้น (ผลถูกเสมอ)
+
+Usage:
+    from qa_common.json_extract import RESULTS_PATH, extract_nodes
+
+    nodes = extract_nodes(resp.content, {"merge_page", "candidate_pin_global"}, path=RESULTS_PATH)
+    merge = nodes.get("merge_page")          # None ถ้าไม่มีใน data.results
+"""
+
+import json
+import re
+from typing import Any, Iterable, Optional, Sequence, Union
+
+RESULTS_PATH = ("data", "results")
+
+_DECODER     = json.JSONDecoder()
+_WS          = " \t\n\r"
+# ทุก byte ยกเว้น { } [ " — ลบทิ้งก่อนนับวงเล็บ
+_NOT_STRUCTURAL = bytes(b for b in range(256) if b not in b'{}[]"')
+_STRING         = re.compile(rb'"[^"]*"')
+
+
+def _alt(names) -> str:
+    # ชื่อ node เป็น identifier ธรรมดา → escape เป็น JSON string แล้ว escape regex
+    return "|".join(re.escape(json.dumps(n)[1:-1]) for n in sorted(names, key=len, reverse=True))
+
+
+def _pattern(names) -> "re.Pattern":
+    alt = _alt(names)
+    return re.compile(rf'"({alt})"[{_WS}]*:[{_WS}]*|"name"[{_WS}]*:[{_WS}]*"({alt})"')
+
+
+def _key_pattern(names) -> "re.Pattern":
+    return re.compile(rf'"({_alt(names)})"[{_WS}]*:[{_WS}]*')
+
+
+def _prev_char(text: str, pos: int) -> str:
+    pos -= 1
+    while pos >= 0 and text[pos] in _WS:
+        pos -= 1
+    return text[pos] if pos >= 0 else ""
+
+
+def _object_start(text: str, pos: int) -> int:
+    """ตำแหน่ง "{" ที่ครอบ "name" ณ pos — หาได้เฉพาะเมื่อ "name" เป็น key แรก (-1 = ไม่รู้)"""
+    pos -= 1
+    while pos >= 0 and text[pos] in _WS:
+        pos -= 1
+    return pos if pos >= 0 and text[pos] == "{" else -1
+
+
+# ======================================================
+# ANCHORED (path=...)
+# ======================================================
+def _unclosed(text: str, start: int, end: int) -> bytes:
+    """
+    วงเล็บที่ยังไม่ปิดใน text[start:end] (ไม่นับที่อยู่ใน string)
+    b"" = end อยู่ระดับเดียวกับ start, ขึ้นต้นด้วย "}" / "]" = object ของ start ปิดไปแล้ว
+    ทำบน bytes ด้วย replace / translate (C) ทั้งหมด — ไม่สร้าง object ต่อ token
+    """
+    seg = text[start:end].encode("utf-8").replace(b"\\\\", b"").replace(b'\\"', b"")
+    seg = seg.translate(None, _NOT_STRUCTURAL).replace(b'""', b"")
+    if b'"' in seg:
+        seg = _STRING.sub(b"", seg)           # string ที่มีวงเล็บอยู่ข้างใน (พบน้อย)
+    while b"{}" in seg or b"[]" in seg:
+        seg = seg.replace(b"{}", b"").replace(b"[]", b"")
+    return seg
+
+
+def _next_child(text: str, pattern: "re.Pattern", mark: int, pos: int):
+    """
+    match ถัดไป (หลัง pos) ที่เป็น key ลูกตรงของ object — mark = ตำแหน่งที่รู้ว่าอยู่ระดับลูกตรง
+    None ถ้าไม่มีแล้ว หรือ object ปิดก่อนถึง match
+    """
+    while True:
+        m = pattern.search(text, pos)
+        if m is None:
+            return None
+        pos = m.end()
+        # key จริงต้องตามหลัง "{" หรือ "," (ใน string จะเป็น \" แทน)
+        if _prev_char(text, m.start()) not in "{,":
+            continue
+        depth = _unclosed(text, mark, m.start())
+        if not depth:
+            return m
+        if depth[:1] in (b"}", b"]"):
+            return None
+        # key ชื่อเดียวกันที่ซ้อนอยู่ลึกกว่า → ข้าม
+
+
+def _object_at(text: str, path: Sequence[str]) -> int:
+    """ตำแหน่ง "{" ของ object ตาม path จาก root (-1 = ไม่มี / ไม่ใช่ dict)"""
+    start = len(text) - len(text.lstrip(_WS))
+    if not text.startswith("{", start):
+        return -1
+    for key in path:
+        m = _next_child(text, _key_pattern([key]), start + 1, start + 1)
+        if m is None or not text.startswith("{", m.end()):
+            return -1
+        start = m.end()
+    return start
+
+
+def _extract_children(text: str, obj_start: int, wanted: set) -> dict:
+    found: dict = {}
+    pattern = _key_pattern(wanted)
+    mark = pos = obj_start + 1
+    while len(found) < len(wanted):
+        m = _next_child(text, pattern, mark, pos)
+        if m is None:
+            break
+        value, end = _DECODER.raw_decode(text, m.end())
+        if isinstance(value, dict) and m.group(1) not in found:
+            found[m.group(1)] = value
+        mark = pos = end          # ท้าย value = ระดับลูกตรงอีกครั้ง
+    return found
+
+
+# ======================================================
+# ANYWHERE (path=None)
+# ======================================================
+def _first_node(obj: Any, name: str) -> Optional[dict]:
+    """node แรกตามลำดับใน document (ทั้ง 2 รูปแบบ) — ใช้ตอน fallback"""
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            if k == "name" and v == name:
+                return obj
+            if k == name and isinstance(v, dict):
+                return v
+            hit = _first_node(v, name)
+            if hit is not None:
+                return hit
+    elif isinstance(obj, list):
+        for v in obj:
+            hit = _first_node(v, name)
+            if hit is not None:
+                return hit
+    return None
+
+
+def _extract_anywhere(text: str, wanted: set) -> dict:
+    found: dict = {}
+    pattern    = _pattern(wanted)
+    unresolved = set()   # ชื่อที่มี match ซึ่ง regex ตัดสินไม่ได้ → match หลังจากนั้นใช้ไม่ได้แล้ว
+    pos = 0
+    while len(found) + len(unresolved) < len(wanted):
+        m = pattern.search(text, pos)
+        if m is None:
+            break
+        pos = m.end()
+        key_name, node_name = m.group(1), m.group(2)
+        name = key_name if key_name is not None else node_name
+        if name in found or name in unresolved:
+            continue
+
+        if key_name is not None:
+            if _prev_char(text, m.start()) not in "{,":
+                continue
+            value, _ = _DECODER.raw_decode(text, m.end())
+            if isinstance(value, dict):
+                found[key_name] = value
+        else:
+            start = _object_start(text, m.start())
+            if start < 0:
+                unresolved.add(node_name)
+                continue
+            value, _ = _DECODER.raw_decode(text, start)
+            found[node_name] = value
+
+    if unresolved:
+        obj = json.loads(text)
+        for name in unresolved:
+            node = _first_node(obj, name)
+            if node is not None:
+                found[name] = node
+    return found
+
+
+def extract_nodes(raw: Union[bytes, str], names: Iterable[str],
+                  path: Optional[Sequence[str]] = None) -> dict:
+    """
+    คืน {name: node_dict} เฉพาะชื่อที่เจอ
+      path=("data", "results") → เฉพาะ {"<name>": {...}} ที่เป็นลูกตรงของ data.results
+      path=None                → ที่ไหนก็ได้ (node แรกตามลำดับใน document):
+                                   {"<name>": {...}}                → value (ต้องเป็น dict)
+                                   {"name": "<name>", "result": ...} → object ทั้งก้อน
+    raise ValueError ถ้า body ไม่ใช่ JSON ที่ถูกต้องตรงจุดที่ decode
+    """
+    text   = raw.decode("utf-8") if isinstance(raw, (bytes, bytearray)) else raw
+    wanted = set(names)
+    if not wanted:
+        return {}
+    if path is None:
+        return _extract_anywhere(text, wanted)
+    start = _object_at(text, path)
+    return _extract_children(text, start, wanted) if start >= 0 else {}
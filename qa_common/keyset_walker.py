@@ -0,0 +1,312 @@
+"""
+keyset_walker.py — เดินทุกหน้าของ Metadata endpoint ด้วย keyset cursor (last_score / last_publish_date / last_id)
+
+SQL template ทุกตัวมี KEYSET PAGINATION (BaseData):
+    combined_score < p_last_score
+    OR (= AND publish_date < p_last_publish_date)
+    OR (= AND = AND id < p_last_id)
+→ ลำดับของ cursor = (combined_score, publish_date, id) DESC
+  combined_score = hit_count_day_7 (sfv) หรือ 0.0 (sfv_series / ugcsfv / gameitem)
+
+แต่หน้าที่ API คืนไม่ได้เรียงตาม keyset: MainResults เลือก item ตาม sort_field แล้ว id ASC
+และ SELECT สุดท้าย ORDER BY id ASC → walker จึง:
+  - ส่ง sort_field / sort_order ที่ primary key ตรงกับ keyset (ENDPOINTS[...]["sort"])
+  - ใช้ item ที่ keyset_key ต่ำสุดของหน้าเป็น cursor ของหน้าถัดไป (ไม่ใช่ item สุดท้าย)
+  - เทียบ keyset เฉพาะข้ามหน้า: ทุก item ต้องอยู่ "ต่ำกว่า" cursor ของหน้าก่อน (ในหน้าไม่สนลำดับ)
+  - ถ้า template มี score แต่ _source ไม่มี field ของ score → error (cursor ที่เดา 0.0 จะทิ้ง row)
+  - tie ของ sort key ตรงขอบหน้า: template ตัดด้วย id ASC แต่ keyset ไปต่อด้วย id DESC
+    → row ที่เหลือใน tie นั้นหายไป — ดูได้จาก gap ของ oracle
+
+walker ยิงหน้าแรกไม่มี cursor แล้วเดินต่อจนหมด:
+  - memory ต่อหน้าคงที่: ไม่เก็บ response — เก็บแค่ cursor, counters และ seen-set
+  - seen-set = digest 64-bit ของ id (ไม่เก็บ string) → จับ ID ซ้ำข้ามหน้า
+  - order violation = item ที่ไม่อยู่ "ต่ำกว่า" cursor ของหน้าก่อน (API ไม่เคารพ keyset predicate)
+  - stall = cursor ไม่ขยับ (หยุดทันที ไม่วนไม่รู้จบ)
+  - gap = ID ที่ oracle บอกว่าควรมีแต่ไม่เคยเห็น (เมื่อตั้ง QA_ORACLE_SNAPSHOT — qa_common.metadata_oracle)
+  - latency ต่อหน้า → p50 / p95 / max และเทียบหน้าต้น ๆ กับหน้าลึก ๆ
+
+filter combinations หลายชุดเดินพร้อมกันด้วย ThreadPoolExecutor (QA_WALK_WORKERS)
+
+Usage:
+    python -m qa_common.keyset_walker sfv
+    python -m qa_common.keyset_walker ugcsfv --page-size 200 --workers 8 --max-pages 500
+    python -m qa_common.keyset_walker sfv --combos combos.json     # list ของ parameters dict
+
+    from qa_common.keyset_walker import walk_all
+    reports = walk_all("sfv", [{"language": "th"}, {"language": "en"}])
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.http_client import post_json
+
+BASE_URL = "http://ai-metadata-service.preprod-gcp-ai-bn.int-ai-platform.gcp.dmp.true.th/metadata/"
+
+# endpoint → url, table / template (ใช้กับ oracle), field ของ combined_score ใน _source (None = 0.0),
+# sort ที่ส่งไปให้ MainResults เลือก item ตาม primary key ของ keyset
+_BY_DATE  = {"sort_field": "publish_date", "sort_order": "desc"}
+_BY_SCORE = {"sort_field": "HIT_COUNT_DAY_7", "sort_order": "desc"}
+ENDPOINTS = {
+    "sfv":        {"url": BASE_URL + "sfv",        "table": "mst_sfv_nonprod",
+                   "template": "sfv_standard.sql",       "score_field": "hit_count_day_7", "sort": _BY_SCORE},
+    "sfv_series": {"url": BASE_URL + "sfv_series", "table": "mst_sfvseries_nonprod",
+                   "template": "sfvseries_standard.sql", "score_field": None, "sort": _BY_DATE},
+    "ugcsfv":     {"url": BASE_URL + "ugcsfv",     "table": "mst_ugcsfv_nonprod",
+                   "template": "ugcsfv_standard.sql",    "score_field": None, "sort": _BY_DATE},
+    "gameitem":   {"url": BASE_URL + "game_item",  "table": "mst_gameitem_nonprod",
+                   "template": "gameitem_standard.sql",  "score_field": None, "sort": _BY_DATE},
+}
+
+DEFAULT_COMBOS = [
+    {"language": "th"},
+    {"language": "en"},
+    {"language": "th", "filter_out_category": ["series"]},
+    {"language": "th", "tophit_date_filter": 0},
+]
+
+DEFAULT_OPTIONS = {"rename_mapping": False, "dry_run": False, "debug": False, "cache": False}
+
+PAGE_SIZE = int(os.environ.get("QA_WALK_PAGE_SIZE", "100"))
+MAX_PAGES = int(os.environ.get("QA_WALK_MAX_PAGES", "10000"))
+WORKERS   = int(os.environ.get("QA_WALK_WORKERS", "4"))
+EXAMPLES  = 10      # จำนวนตัวอย่างที่เก็บต่อปัญหา
+
+
+# ======================================================
+# SEEN SET
+# ======================================================
+class SeenSet:
+    """set ของ digest 64-bit ต่อ id (ชนกันโอกาส ~n²/2^65 — ไม่มีนัยที่ขนาด catalogue)"""
+
+    def __init__(self):
+        self._digests = set()
+
+    @staticmethod
+    def digest(id_val: str) -> int:
+        return int.from_bytes(hashlib.blake2b(id_val.encode("utf-8"), digest_size=8).digest(), "little")
+
+    def add(self, id_val: str) -> bool:
+        """True = เห็นครั้งแรก, False = ซ้ำ"""
+        d = self.digest(id_val)
+        if d in self._digests:
+            return False
+        self._digests.add(d)
+        return True
+
+    def __contains__(self, id_val: str) -> bool:
+        return self.digest(id_val) in self._digests
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+
+# ======================================================
+# CURSOR
+# ======================================================
+def _ts(value) -> int:
+    """publish_date → UNIX micros (None / parse ไม่ได้ = เล็กที่สุด)"""
+    if not value:
+        return -(2 ** 63)
+    try:
+        dt = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return -(2 ** 63)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return int(dt.timestamp()) * 1_000_000 + dt.microsecond
+
+
+def keyset_key(source: dict, score_field: str = None) -> tuple:
+    """(combined_score, publish_date micros, id) — เรียง DESC ตาม keyset ของ template"""
+    score = float(source.get(score_field) or 0.0) if score_field else 0.0
+    return score, _ts(source.get("publish_date")), source.get("id") or ""
+
+
+def cursor_params(source: dict, score_field: str = None) -> dict:
+    """parameters ของหน้าถัดไปจาก item ที่ keyset_key ต่ำสุดของหน้า"""
+    score = float(source.get(score_field) or 0.0) if score_field else 0.0
+    return {"last_score": score, "last_publish_date": source.get("publish_date"), "last_id": source.get("id")}
+
+
+# ======================================================
+# WALK
+# ======================================================
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _oracle_gaps(endpoint: dict, filters: dict, seen: SeenSet) -> dict:
+    """ID ที่ oracle คาดว่าควรมีแต่ walker ไม่เคยเห็น (None = ไม่ได้ตั้ง QA_ORACLE_SNAPSHOT / จำลองไม่ได้)"""
+    snapshot = os.environ.get("QA_ORACLE_SNAPSHOT")
+    if not snapshot:
+        return None
+    from qa_common.columnar import load_table
+    from qa_common.metadata_oracle import OracleUnsupported, expected_ids
+
+    try:
+        expected = expected_ids(load_table(snapshot, endpoint["table"]),
+                                os.path.join(ROOT_DIR, "src", endpoint["template"]), {**filters, "limit": 0})
+    except (OracleUnsupported, KeyError) as e:
+        return {"skipped": str(e)}
+    missing = [i for i in expected if i not in seen]
+    return {"expected": len(expected), "missing": len(missing), "missing_examples": missing[:EXAMPLES],
+            "unexpected": max(0, len(seen) - (len(expected) - len(missing)))}
+
+
+def walk(endpoint_name: str, filters: dict, page_size: int = PAGE_SIZE, max_pages: int = MAX_PAGES,
+         timeout: float = 60) -> dict:
+    """เดินทุกหน้าของ filters ชุดเดียว → report dict (ไม่เก็บ response)"""
+    endpoint = ENDPOINTS[endpoint_name]
+    score_field = endpoint["score_field"]
+    seen = SeenSet()
+    report = {
+        "endpoint": endpoint_name, "filters": filters, "pages": 0, "items": 0,
+        "duplicates": 0, "duplicate_examples": [],
+        "order_violations": 0, "order_examples": [],
+        "stalled": False, "truncated": False, "error": None, "latency_ms": [],
+    }
+    cursor, cursor_key = {}, None
+    while True:
+        if report["pages"] >= max_pages:
+            report["truncated"] = True
+            break
+        body = {"parameters": {**endpoint["sort"], **filters, "limit": page_size, **cursor},
+                "options": DEFAULT_OPTIONS}
+        t0 = time.perf_counter()
+        try:
+            resp = post_json(endpoint["url"], body, timeout=timeout)
+        except RuntimeError as e:
+            report["error"] = f"page {report['pages'] + 1}: {e}"
+            break
+        report["latency_ms"].append((time.perf_counter() - t0) * 1000)
+        report["pages"] += 1
+
+        sources = [h.get("_source", {}) for h in resp.get("data", {}).get("hits", {}).get("hits", [])]
+        lowest, lowest_key = None, None
+        for src in sources:
+            id_val = src.get("id")
+            if not id_val:
+                continue
+            report["items"] += 1
+            if not seen.add(id_val):
+                report["duplicates"] += 1
+                if len(report["duplicate_examples"]) < EXAMPLES:
+                    report["duplicate_examples"].append({"page": report["pages"], "id": id_val})
+            key = keyset_key(src, score_field)
+            if cursor_key is not None and not key < cursor_key:
+                report["order_violations"] += 1
+                if len(report["order_examples"]) < EXAMPLES:
+                    report["order_examples"].append({"page": report["pages"], "id": id_val})
+            if lowest_key is None or key < lowest_key:
+                lowest, lowest_key = src, key
+
+        if len(sources) < page_size or lowest is None:
+            break                                            # หน้าสุดท้าย
+        if score_field and score_field not in lowest:
+            report["error"] = (f"page {report['pages']}: _source ไม่มี {score_field} "
+                               f"— สร้าง cursor ของหน้าถัดไปไม่ได้")
+            break
+        next_cursor = cursor_params(lowest, score_field)
+        if next_cursor == cursor:
+            report["stalled"] = True
+            break
+        cursor, cursor_key = next_cursor, lowest_key
+
+    report["unique"] = len(seen)
+    report["gaps"] = _oracle_gaps(endpoint, filters, seen)
+    lat = report.pop("latency_ms")
+    depth = max(1, len(lat) // 10)
+    report["latency"] = {
+        "p50": _percentile(lat, 50), "p95": _percentile(lat, 95), "max": max(lat, default=0.0),
+        "first_pages_p50": statistics.median(lat[:depth]) if lat else 0.0,
+        "deep_pages_p50":  statistics.median(lat[-depth:]) if lat else 0.0,
+    }
+    return report
+
+
+def walk_all(endpoint_name: str, combos: list = None, page_size: int = PAGE_SIZE,
+             max_pages: int = MAX_PAGES, workers: int = WORKERS) -> list:
+    """เดินหลาย filter combinations พร้อมกัน (ชุดละ 1 thread — แต่ละชุดเป็นลำดับหน้าที่ขึ้นกับ cursor)"""
+    combos = combos or DEFAULT_COMBOS
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(combos)))) as pool:
+        return list(pool.map(lambda f: walk(endpoint_name, f, page_size, max_pages), combos))
+
+
+def passed(report: dict) -> bool:
+    gaps = report["gaps"] or {}
+    return not (report["error"] or report["stalled"] or report["duplicates"]
+                or report["order_violations"] or gaps.get("missing") or gaps.get("unexpected"))
+
+
+def print_report(reports: list):
+    print(f"\n  {'filters':<48} {'pages':>6} {'unique':>7} {'dup':>5} {'order':>6} {'gap':>6}"
+          f" {'p50 ms':>7} {'p95 ms':>7} {'deep/first':>10}")
+    print(f"  {'-'*48} {'-'*6} {'-'*7} {'-'*5} {'-'*6} {'-'*6} {'-'*7} {'-'*7} {'-'*10}")
+    for r in reports:
+        lat  = r["latency"]
+        gaps = r["gaps"] or {}
+        gap  = gaps.get("missing", "-") if "skipped" not in gaps else "skip"
+        ratio = lat["deep_pages_p50"] / lat["first_pages_p50"] if lat["first_pages_p50"] else 0.0
+        mark = "✅" if passed(r) else "❌"
+        print(f"{mark} {json.dumps(r['filters'], ensure_ascii=False)[:48]:<48} {r['pages']:>6} {r['unique']:>7}"
+              f" {r['duplicates']:>5} {r['order_violations']:>6} {gap:>6}"
+              f" {lat['p50']:>7.0f} {lat['p95']:>7.0f} {ratio:>9.1f}x")
+        if r["error"]:
+            print(f"     ❌ {r['error']}")
+        if r["stalled"]:
+            print(f"     ❌ cursor ไม่ขยับที่หน้า {r['pages']}")
+        if r["truncated"]:
+            print(f"     ⚠️  หยุดที่ --max-pages {r['pages']} (ยังไม่หมด)")
+        if r["duplicate_examples"]:
+            print(f"     ❌ ซ้ำ: {r['duplicate_examples'][:3]}")
+        if r["order_examples"]:
+            print(f"     ❌ ลำดับผิด keyset: {r['order_examples'][:3]}")
+        if gaps.get("missing_examples"):
+            print(f"     ❌ gap (oracle): {gaps['missing_examples'][:5]}")
+        if gaps.get("unexpected"):
+            print(f"     ❌ API คืน {gaps['unexpected']} IDs ที่ไม่ผ่าน filter ของ oracle")
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="keyset pagination walker ของ Metadata endpoints")
+    ap.add_argument("endpoint", choices=sorted(ENDPOINTS))
+    ap.add_argument("--combos", help="JSON file: list ของ parameters dict (default: DEFAULT_COMBOS)")
+    ap.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    ap.add_argument("--max-pages", type=int, default=MAX_PAGES)
+    ap.add_argument("--workers",   type=int, default=WORKERS)
+    ap.add_argument("--out", help="เขียน reports เป็น JSON")
+    args = ap.parse_args()
+
+    combos = None
+    if args.combos:
+        with open(args.combos, encoding="utf-8") as f:
+            combos = json.load(f)
+
+    t0 = time.perf_counter()
+    reports = walk_all(args.endpoint, combos, args.page_size, args.max_pages, args.workers)
+    print(f"🚶 {args.endpoint}: {len(reports)} combinations, "
+          f"{sum(r['pages'] for r in reports)} pages ใน {time.perf_counter() - t0:.1f} s")
+    print_report(reports)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 {args.out}")
+    sys.exit(0 if all(passed(r) for r in reports) else 1)
@@ -0,0 +1,279 @@
+"""
+metadata_oracle.py — คำนวณ ID ที่ Metadata API "ควร" คืน จาก snapshot ในเครื่อง (NumPy)
+
+เดิม parameter suites ยืนยันได้แค่ว่า ID ที่ API คืนมี "อยู่จริง" ใน Spanner
+แต่ไม่รู้ว่าได้ ID "ที่ถูกต้อง" ครบไหม
+
+oracle นี้ประเมิน WHERE / ORDER BY / LIMIT ของ SQL template (src/*.sql) เป็น boolean mask
+บน column arrays (qa_common.columnar) → expected IDs ของ parameters dict ใด ๆ
+
+  - predicate ที่ใช้ = predicate ที่ template นั้นมีจริง (ตรวจจาก SQL text ของ template)
+  - ค่า default ของ p_* มาจาก Params CTE ของ template (qa_common.sql_template)
+  - parameter ที่ oracle จำลองไม่ได้ (p_more_likes, p_is_random, p_multimatch_query, keyset p_last_*)
+    → raise OracleUnsupported (ไม่เดาผล)
+
+Usage:
+    from qa_common.columnar import load_table
+    from qa_common.metadata_oracle import expected_ids
+
+    table = load_table(SNAPSHOT, "mst_sfv_nonprod")
+    want  = expected_ids(table, "src/sfv_standard.sql", {"limit": 20, "filter_out_category": ["series"]})
+    assert api_ids == want
+
+  # ใน parameter suite (opt-in: QA_ORACLE_SNAPSHOT=fixtures/spanner_snapshot.jsonl.gz)
+  ok, msg, detail = compare_with_oracle("limit=20", "mst_sfv_nonprod", SQL_ORACLE, params, api_ids)
+"""
+
+import datetime
+import os
+import re
+
+from qa_common.columnar import NULL_TS, ColumnarTable, import_numpy, load_table, to_micros
+from qa_common.sql_template import load_template
+
+DAY_US    = 86_400 * 1_000_000
+MINUTE_US = 60 * 1_000_000
+
+# API parameter → p_* ใน Params CTE (ที่เหลือใช้ "p_" + ชื่อเดิม)
+API_TO_PARAM = {"id": "p_id_list", "title": "p_multimatch_query"}
+
+# parameter ที่ไม่กระทบชุด ID ของ main list
+IGNORED_PARAMS = {"fields"}
+
+
+class OracleUnsupported(ValueError):
+    """parameter / template ที่ oracle จำลองไม่ได้ — ห้ามใช้ผล oracle เทียบ"""
+
+
+# ======================================================
+# PREDICATES (SQL fragment ใน template → mask)
+# ======================================================
+def _ts_valid(ts):
+    return ts != NULL_TS
+
+
+def _hour_floor(now_us: int) -> int:
+    return now_us - now_us % (3600 * 1_000_000)
+
+
+# fragment ที่ไม่ขึ้นกับ parameter
+BASE_PREDICATES = [
+    ("m.status = 'publish'",
+     lambda t, p, now: t.string("status").eq("publish")),
+    ("m.searchable = 'Y'",
+     lambda t, p, now: t.string("searchable").eq("Y")),
+    ("m.publish_date <= CURRENT_TIMESTAMP()",
+     lambda t, p, now: _ts_valid(t.timestamp("publish_date")) & (t.timestamp("publish_date") <= now)),
+    ("m.publish_date <= TIMESTAMP_TRUNC(CURRENT_TIMESTAMP(), HOUR)",
+     lambda t, p, now: _ts_valid(t.timestamp("publish_date")) & (t.timestamp("publish_date") <= _hour_floor(now))),
+    ("m.expire_date IS NULL OR m.expire_date > TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 5 MINUTE)",
+     lambda t, p, now: ~_ts_valid(t.timestamp("expire_date")) | (t.timestamp("expire_date") > now - 5 * MINUTE_US)),
+    ("m.title != 'empty title'",
+     lambda t, p, now: t.string("title").ne("empty title")),
+]
+
+
+def _lang(t: ColumnarTable, p: dict, now: int):
+    return t.string("lang").eq(p.get("p_language") or "th")
+
+
+def _if_list(name: str, fn):
+    """predicate ที่ทำงานเฉพาะเมื่อ ARRAY parameter ไม่ว่าง (ARRAY_LENGTH(p) = 0 OR ...)"""
+    def predicate(t, p, now):
+        values = p.get(name) or []
+        if not values:
+            return None
+        return fn(t, values, now)
+    return predicate
+
+
+def _category_date(t: ColumnarTable, p: dict, now: int):
+    targets = p.get("p_category_date_filter_target") or []
+    hit = t.array("article_category").any_in(targets)
+    pd  = t.timestamp("publish_date")
+    day = p.get("p_category_date_filter_day") or 0
+    return (hit & _ts_valid(pd) & (pd >= now - day * DAY_US)) | ~hit
+
+
+def _tophit_date(t: ColumnarTable, p: dict, now: int):
+    days = p.get("p_tophit_date_filter")
+    if not days:
+        return None
+    pd = t.timestamp("publish_date")
+    return _ts_valid(pd) & (pd >= now - days * DAY_US)
+
+
+def _related_ecommerce(t: ColumnarTable, p: dict, now: int):
+    if not p.get("p_is_related_ecommerce"):
+        return None
+    return t.array("related_ecommerce_id").lengths() > 0
+
+
+# p_* ที่ template ใช้ใน WHERE (ตรวจจาก "SELECT <p> FROM Params" ใน SQL) → mask (None = ผ่านทุก row)
+PARAM_PREDICATES = {
+    "p_language":             _lang,
+    "p_exclude_ids":          _if_list("p_exclude_ids", lambda t, v, now: ~t.string("id").isin(v)),
+    "p_id_list":              _if_list("p_id_list", lambda t, v, now: t.string("id").isin(v)),
+    "p_filter_out_category":  _if_list("p_filter_out_category", lambda t, v, now: ~t.array("article_category").any_in(v)),
+    "p_exclude_partner_related": _if_list("p_exclude_partner_related", lambda t, v, now: ~t.array("partner_related").any_in(v)),
+    "p_genres":               _if_list("p_genres", lambda t, v, now: t.array("genres").any_in(v)),
+    "p_article_category":     _if_list("p_article_category", lambda t, v, now: t.array("article_category").any_in(v)),
+    "p_is_related_ecommerce": _related_ecommerce,
+    "p_category_date_filter_target": _category_date,
+    "p_tophit_date_filter":   _tophit_date,
+}
+
+# ค่าที่ถ้าตั้ง → oracle ตอบไม่ได้
+UNSUPPORTED = {
+    "p_more_likes":        lambda v: bool(v),
+    "p_is_random":         lambda v: bool(v),
+    "p_multimatch_query":  lambda v: bool(v),
+    "p_last_publish_date": lambda v: v is not None,
+    "p_keymap_order":      lambda v: bool(v),
+}
+
+
+# ======================================================
+# PARAMETERS
+# ======================================================
+def resolve_params(template_path: str, parameters: dict) -> dict:
+    """รวม default ของ template กับ API parameters → {p_name: value}"""
+    tpl = load_template(template_path)
+    known = set(tpl.types) | set(tpl.literal)
+    resolved = dict(tpl.defaults)
+    unknown = []
+    for key, value in parameters.items():
+        if key in IGNORED_PARAMS or key.startswith("agg_"):
+            continue
+        name = API_TO_PARAM.get(key, f"p_{key}")
+        if name not in known:
+            unknown.append(key)
+            continue
+        resolved[name] = value
+    if unknown:
+        raise OracleUnsupported(f"template {tpl.path} ไม่มี parameter {sorted(unknown)}")
+    for name, is_set in UNSUPPORTED.items():
+        if name in resolved and is_set(resolved[name]):
+            raise OracleUnsupported(f"oracle จำลอง {name} ไม่ได้")
+    return resolved
+
+
+def _uses(sql: str, name: str) -> bool:
+    return f"SELECT {name} FROM Params" in sql
+
+
+# ======================================================
+# EVALUATE
+# ======================================================
+def filter_mask(table: ColumnarTable, template_path: str, params: dict, now_us: int):
+    """WHERE ของ BaseDataRaw → boolean mask"""
+    np  = import_numpy()
+    sql = load_template(template_path).sql
+    mask = np.ones(table.n, dtype=bool)
+    for fragment, predicate in BASE_PREDICATES:
+        if fragment in sql:
+            mask &= predicate(table, params, now_us)
+    for name, predicate in PARAM_PREDICATES.items():
+        if _uses(sql, name):
+            m = predicate(table, params, now_us)
+            if m is not None:
+                mask &= m
+    return mask
+
+
+def _hit_column(table: ColumnarTable, sql: str):
+    """column ที่ template ใช้เป็น hit_7 (COALESCE(m.<col>, 0) AS hit_7 หรือค่าคงที่)"""
+    np = import_numpy()
+    m = re.search(r"COALESCE\(m\.(\w+),\s*0\)\s+AS\s+hit_7", sql)
+    if m is None:
+        return np.zeros(table.n)
+    return np.nan_to_num(table.number(m.group(1)), nan=0.0)
+
+
+def order_rows(table: ColumnarTable, template_path: str, params: dict, rows):
+    """ORDER BY ของ MainResults (sort_field publish_date / HIT_COUNT* แล้ว id ASC)"""
+    np  = import_numpy()
+    sql = load_template(template_path).sql
+    field, direction = params.get("p_sort_field") or "", params.get("p_sort_field_value") or ""
+    keys = [table.id_rank()[rows]]                      # lexsort: key สุดท้าย = primary
+    if direction in ("asc", "desc"):
+        primary = None
+        if field == "publish_date":
+            primary = table.timestamp("publish_date")[rows].astype(np.float64)
+        elif field.startswith("HIT_COUNT"):
+            primary = _hit_column(table, sql)[rows]
+        if primary is not None:
+            keys.append(-primary if direction == "desc" else primary)
+    return rows[np.lexsort(keys)]
+
+
+def expected_ids(table: ColumnarTable, template_path: str, parameters: dict,
+                 now: datetime.datetime = None) -> list:
+    """ID ที่ main list ควรคืน (ลำดับตาม ORDER BY ของ template, ตัดที่ limit)"""
+    np = import_numpy()
+    params = resolve_params(template_path, parameters)
+    now_us = to_micros(now or datetime.datetime.now(datetime.timezone.utc))
+    rows = np.flatnonzero(filter_mask(table, template_path, params, now_us))
+    rows = order_rows(table, template_path, params, rows)
+    limit = params.get("p_limit")
+    if limit:
+        rows = rows[:int(limit)]
+    ids = table.ids()
+    return [ids[i] for i in rows]
+
+
+def first_divergence(api_ids: list, expected: list):
+    """ตำแหน่งแรก (0-based) ที่ API กับ oracle ต่างกัน — None = เหมือนกันทุกตำแหน่ง"""
+    for pos, (got, want) in enumerate(zip(api_ids, expected)):
+        if got != want:
+            return pos
+    return None if len(api_ids) == len(expected) else min(len(api_ids), len(expected))
+
+
+def diff_ids(api_ids: list, expected: list) -> dict:
+    """เทียบ API กับ oracle — missing = ควรได้แต่ไม่ได้, unexpected = ได้แต่ไม่ควรได้"""
+    api_set, exp_set = set(api_ids), set(expected)
+    diverge = first_divergence(list(api_ids), list(expected))
+    return {
+        "expected_count":   len(expected),
+        "api_count":        len(api_ids),
+        "missing":          [i for i in expected if i not in api_set],
+        "unexpected":       [i for i in api_ids if i not in exp_set],
+        "same_order":       diverge is None,
+        "first_divergence": diverge,
+    }
+
+
+# ======================================================
+# PARAMETER SUITES (opt-in)
+# ======================================================
+def compare_with_oracle(label: str, table_name: str, template_path: str,
+                        parameters: dict, api_ids: list) -> tuple:
+    """
+    เทียบ IDs จาก API กับ expected IDs ของ oracle — คืน (passed, msg, detail) แบบ compare_with_spanner
+    ทำงานเฉพาะเมื่อตั้ง QA_ORACLE_SNAPSHOT=<snapshot ของ qa_common.spanner_emulator>
+    (snapshot ต้อง export ใกล้เวลารัน — filter ที่อิง CURRENT_TIMESTAMP ใช้เวลาปัจจุบัน)
+    """
+    snapshot = os.environ.get("QA_ORACLE_SNAPSHOT")
+    if not snapshot:
+        return True, "oracle: ข้าม (ไม่ได้ตั้ง QA_ORACLE_SNAPSHOT)", {}
+    try:
+        expected = expected_ids(load_table(snapshot, table_name), template_path, parameters)
+    except OracleUnsupported as e:
+        return True, f"oracle: ข้าม ({e})", {}
+
+    detail = diff_ids(api_ids, expected)
+    print(f"\n    🔮 Oracle compare [{label}]")
+    print(f"       Expected IDs  : {detail['expected_count']}")
+    print(f"       API IDs       : {detail['api_count']}")
+    if detail["missing"]:
+        print(f"       ❌ Missing (ควรได้แต่ API ไม่คืน): {detail['missing'][:10]}")
+    if detail["unexpected"]:
+        print(f"       ❌ Unexpected (API คืนแต่ไม่ผ่าน filter): {detail['unexpected'][:10]}")
+
+    if detail["missing"] or detail["unexpected"]:
+        return False, (
+            f"Oracle: missing {len(detail['missing'])} / unexpected {len(detail['unexpected'])}"
+            f" → {(detail['missing'] + detail['unexpected'])[:5]}"
+        ), detail
+    return True, f"Oracle: ตรงกับ expected {detail['expected_count']} IDs ✓", detail
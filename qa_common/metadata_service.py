@@ -0,0 +1,459 @@
+"""
+metadata_service.py — engine กลางของ Metadata API parameter tests (src/test_*_parameters.py)
+
+ทุก module เดิม copy call_api / get_sources / get_ids / query_spanner / build_existence_sql /
+compare_with_spanner / run_test / MAIN ชุดเดียวกัน ต่างกันแค่ endpoint, table และ SQL template
+→ module เหลือแค่ spec + test cases:
+
+    SERVICE = ServiceSpec("shelf", endpoint="shelf", database="ai_trueidcms_nonprod",
+                          table="mst_shelf_nonprod", sql_template="shelf_main.sql",
+                          title="Shelf — Parameter Test Suite (Standard)")
+    call_api             = SERVICE.call_api
+    compare_with_spanner = SERVICE.compare_with_spanner
+
+    SUITE = [("STANDARD", [("1. id filter — IDs อยู่ใน id list เท่านั้น", test_id_filter)])]
+
+    if __name__ == "__main__":
+        sys.exit(SERVICE.main(SUITE))
+
+compare_with_spanner มี 2 แบบ (prints / ข้อความคืนค่าเหมือนเดิมทุกตัว):
+  - sql_template=None → existence check ใน table
+  - sql_template      → bind IDs เข้า SQL template (fallback existence check ถ้าไม่มีไฟล์)
+
+รันหลาย service ใน process เดียว (HTTP session + Spanner session pool ใช้ร่วมกัน):
+  - service ละ 1 thread, test ภายใน service รันตามลำดับเดิม
+  - stdout ของแต่ละ service buffer แยกแล้ว print ทีละก้อนเมื่อ service นั้นจบ
+  - เวลารวม ≈ service ที่ช้าที่สุด แทนผลรวมของทุก service
+
+Usage:
+    python -m qa_common.metadata_service                   # ทุก src/test_*_parameters.py
+    python -m qa_common.metadata_service sfv shelf ttv_movie
+    python -m qa_common.metadata_service --workers 4 --quiet
+"""
+
+import argparse
+import glob
+import importlib.util
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from qa_common.http_client import post_json
+from qa_common.response_planner import ResponsePlanner, stats as planner_stats
+from qa_common.spanner_client import query_ids
+from qa_common.spanner_verify import verified_ids
+from qa_common.sql_template import ROW_LIMIT_PARAM, existence_query, load_template
+
+# ปิด Spanner telemetry warnings
+os.environ["SPANNER_ENABLE_BUILTIN_METRICS"] = "false"
+warnings.filterwarnings("ignore")
+logging.disable(logging.CRITICAL)
+
+# ======================================================
+# CONFIG
+# ======================================================
+BASE_URL = "http://ai-metadata-service.preprod-gcp-ai-bn.int-ai-platform.gcp.dmp.true.th/metadata"
+
+SP_PROJECT  = "tdg-ai-platform-nonprod02-bxev"
+SP_INSTANCE = "g1d-ai-spannerb01"
+
+DEFAULT_OPTIONS = {
+    "rename_mapping": False,
+    "dry_run": False,
+    "debug": True,
+    "cache": False
+}
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR  = os.path.join(ROOT_DIR, "src")
+WORKERS  = int(os.environ.get("QA_SERVICE_WORKERS", "16"))
+
+
+# ======================================================
+# RESPONSE HELPERS
+# ======================================================
+def get_sources(response: dict) -> list:
+    """ดึง list ของ _source dict จาก standard hits"""
+    hits = response.get("data", {}).get("hits", {}).get("hits", [])
+    return [h.get("_source", {}) for h in hits]
+
+
+def get_ids(sources: list) -> list:
+    """ดึง list ของ id จาก sources"""
+    seen, ids = set(), []
+    for s in sources:
+        id_val = s.get("id")
+        if id_val and id_val not in seen:
+            ids.append(id_val)
+            seen.add(id_val)
+    return ids
+
+
+# ── Tophit-specific helpers ──────────────────────────────
+def get_tophit_buckets(response: dict) -> list:
+    """ดึง list ของ buckets จาก aggregations.agg_tophit"""
+    return (response.get("data", {})
+                    .get("aggregations", {})
+                    .get("agg_tophit", {})
+                    .get("buckets", []))
+
+
+def get_bucket_hits(bucket: dict) -> list:
+    """ดึง hits จาก bucket (รองรับทั้ง sort_by_hit_count และ hits fallback)"""
+    for key in ["sort_by_hit_count", "hits"]:
+        hits = bucket.get(key, {}).get("hits", {}).get("hits", [])
+        if hits:
+            return hits
+    return []
+
+
+def get_all_tophit_sources(response: dict) -> list:
+    """ดึง _source ทุกตัวจากทุก bucket รวมกัน"""
+    sources = []
+    for bucket in get_tophit_buckets(response):
+        for h in get_bucket_hits(bucket):
+            sources.append(h.get("_source", {}))
+    return sources
+
+
+def get_tophit_ids_from_response(response: dict) -> list:
+    """ดึง unique IDs ทั้งหมดจาก tophit buckets"""
+    return get_ids(get_all_tophit_sources(response))
+
+
+# ── Latest-specific helpers ───────────────────────────────
+def get_latest_buckets(response: dict) -> list:
+    """ดึง list ของ buckets จาก aggregations.agg_latest"""
+    return (response.get("data", {})
+                    .get("aggregations", {})
+                    .get("agg_latest", {})
+                    .get("buckets", []))
+
+
+def get_latest_bucket_hits(bucket: dict) -> list:
+    """ดึง hits จาก latest bucket (รองรับ sort_by_publish_date / latest / hits)"""
+    for key in ["sort_by_publish_date", "latest", "hits"]:
+        hits = bucket.get(key, {}).get("hits", {}).get("hits", [])
+        if hits:
+            return hits
+    return []
+
+
+def get_all_latest_sources(response: dict) -> list:
+    """ดึง _source ทุกตัวจากทุก latest bucket"""
+    sources = []
+    for bucket in get_latest_buckets(response):
+        for h in get_latest_bucket_hits(bucket):
+            sources.append(h.get("_source", {}))
+    return sources
+
+
+def get_latest_ids_from_response(response: dict) -> list:
+    """ดึง unique IDs ทั้งหมดจาก latest buckets"""
+    return get_ids(get_all_latest_sources(response))
+
+
+# ======================================================
+# SERVICE SPEC
+# ======================================================
+class ServiceSpec:
+    """
+    ค่าที่ต่างกันระหว่าง service: endpoint, database, table, SQL template, หัวรายงาน, ไฟล์ผล
+    ทุก helper ของ module เดิมเป็น method ที่อ่านค่าจาก spec นี้
+    """
+
+    def __init__(self, name: str, endpoint: str, database: str, table: str,
+                 sql_template: str = None, title: str = None, report_file: str = None):
+        self.name         = name
+        self.api_url      = f"{BASE_URL}/{endpoint}"
+        self.database     = database
+        self.table        = table
+        self.sql_template = os.path.join(SRC_DIR, sql_template) if sql_template else None
+        self.title        = title or f"{name} — Parameter Test Suite"
+        self.report_file  = report_file or f"test_{name}_result.json"
+        self.results: list = []
+        self.planner      = ResponsePlanner(self._post)
+
+    def __repr__(self):
+        return f"ServiceSpec({self.name!r}, {self.api_url!r})"
+
+    # ── API ──────────────────────────────────────────────
+    def _post(self, params: dict) -> dict:
+        body = {"parameters": params, "options": DEFAULT_OPTIONS}
+        return post_json(self.api_url, body, timeout=60, cache=True)
+
+    def call_api(self, params: dict, no_derive=()) -> dict:
+        """
+        ยิง API แล้ว return response dict
+        QA_DERIVE=1 → derive จาก response ที่ใหญ่กว่าได้ (qa_common.response_planner) ยกเว้น parameter ใน no_derive
+        """
+        return self.planner.fetch(params, no_derive)
+
+    def call_api_variants(self, params: dict, name: str, values: list) -> dict:
+        """query เดียวกันหลายค่าของ parameter ที่ test ตรวจ → {value: response} (ยิงจริงทุกค่า)"""
+        return self.planner.fetch_variants(params, name, values)
+
+    # ── Spanner ──────────────────────────────────────────
+    def query_spanner(self, sql: str, params: dict = None, param_types: dict = None) -> list:
+        """รัน SQL ใน Spanner แล้วคืน list ของ id (database handle + session pool ใช้ร่วมกันทั้ง process)"""
+        return query_ids(SP_PROJECT, SP_INSTANCE, self.database, sql, params, param_types)
+
+    def inject_ids(self, sql_path: str, ids: list) -> tuple:
+        """
+        โหลด SQL template (parse Params CTE ครั้งเดียวต่อไฟล์ — qa_common.sql_template)
+        แล้ว bind IDs เข้า @p_id_list และ LIMIT @row_limit ตามจำนวน IDs เพื่อให้ได้ผลครบ
+        (template ที่ไม่มี LIMIT 10 เช่น *_agg_*.sql ไม่มี @row_limit → bind เฉพาะ IDs)
+        คืน (sql, params, param_types) — SQL text เดิมทุกชุด ID → Spanner reuse query plan ได้
+        """
+        tpl    = load_template(sql_path)
+        values = {"p_id_list": list(ids)}
+        if ROW_LIMIT_PARAM in tpl.types:
+            values[ROW_LIMIT_PARAM] = max(len(ids), 1000)
+        return tpl.bind(**values)
+
+    def build_existence_sql(self, ids: list) -> tuple:
+        """SQL เช็คว่า IDs จาก API มีใน table ของ service ไหม (IDs bind เป็น @ids)"""
+        return existence_query(self.table, ids)
+
+    def _verify_source(self) -> tuple:
+        if self.sql_template is None:
+            return self.table, self.build_existence_sql
+        if os.path.exists(self.sql_template):
+            path = self.sql_template
+            return path, lambda ids: self.inject_ids(path, ids)
+        print(f"    ⚠️  ไม่พบ {self.sql_template} — ใช้ existence check แทน")
+        return self.table, self.build_existence_sql
+
+    def compare_with_spanner(self, label: str, api_ids: list) -> tuple:
+        """
+        เอา IDs จาก API ไปเช็คใน Spanner (SQL template ของ service หรือ existence check)
+        คืน (passed, summary_msg, detail_dict)
+        - passed = True ถ้า api_ids ทุกตัวมีใน Spanner (only_api ว่าง)
+        """
+        if not api_ids:
+            return True, "ไม่มี IDs ให้ตรวจสอบใน Spanner", {}
+
+        # ID ที่เคยตรวจแล้วใน session ใช้ผลเดิม, ที่เหลือ query รวมทีเดียว (qa_common.spanner_verify)
+        source, build_sql = self._verify_source()
+        sp_ids  = verified_ids((SP_PROJECT, SP_INSTANCE, self.database, source),
+                               api_ids, build_sql, self.query_spanner)
+        api_set = set(api_ids)
+        sp_set  = set(sp_ids)
+
+        only_api = sorted(api_set - sp_set)   # อยู่ใน API แต่ไม่มีใน Spanner
+        only_sp  = sorted(sp_set  - api_set)  # อยู่ใน Spanner แต่ไม่มีใน API (ปกติ)
+        both     = sorted(api_set & sp_set)
+
+        detail = {
+            "api_count":     len(api_ids),
+            "spanner_count": len(sp_ids),
+            "match":         len(both),
+            "only_api":      only_api,
+            "only_spanner":  only_sp,
+        }
+
+        print(f"\n    📊 Spanner compare [{label}]")
+        print(f"       API IDs       : {len(api_ids)}")
+        print(f"       Spanner found : {len(sp_ids)}")
+        print(f"       ✅ Match      : {len(both)}")
+        if only_api:
+            print(f"       ❌ Only API (ไม่มีใน Spanner): {only_api}")
+        if only_sp:
+            print(f"       ⚠️  Only Spanner (API ไม่ส่งออกมา): {only_sp}")
+
+        if only_api:
+            return False, (
+                f"Spanner: {len(only_api)} IDs อยู่ใน API แต่ไม่มีใน Spanner → {only_api[:5]}"
+            ), detail
+        return True, f"Spanner: ทุก {len(both)} IDs match ✓", detail
+
+    # ── Runner ───────────────────────────────────────────
+    def run_test(self, name: str, fn):
+        print(f"\n{'─'*60}")
+        print(f"🧪  {name}")
+        print(f"{'─'*60}")
+        try:
+            passed, msg = fn()
+            icon = "✅ PASS" if passed else "❌ FAIL"
+            print(f"  {icon}: {msg}")
+            self.results.append({"name": name, "passed": passed, "msg": msg})
+        except Exception as e:
+            print(f"  💥 ERROR: {e}")
+            self.results.append({"name": name, "passed": False, "msg": f"ERROR: {e}"})
+
+    def run_suite(self, suite: list) -> list:
+        """รันทุก section ของ SUITE ตามลำดับ → list ของ {name, passed, msg}"""
+        self.results = []
+        print("=" * 60)
+        print(f"🚀  {self.title}")
+        print(f"    API     : {self.api_url}")
+        print(f"    Spanner : {SP_PROJECT} / {SP_INSTANCE} / {self.database}")
+        print("=" * 60)
+
+        for section, cases in suite:
+            print(f"\n{'━'*60}")
+            print(f"📌  {section}")
+            print(f"{'━'*60}")
+            for name, fn in cases:
+                self.run_test(name, fn)
+        return self.results
+
+    def print_summary(self):
+        print(f"\n{'='*60}")
+        print("📋  สรุปผลการทดสอบ")
+        print(f"{'='*60}")
+        passed_count = sum(1 for r in self.results if r["passed"])
+        total_count  = len(self.results)
+
+        for r in self.results:
+            icon = "✅" if r["passed"] else "❌"
+            print(f"  {icon}  {r['name']}")
+
+        print(f"\n  ผลรวม: {passed_count}/{total_count} passed", end="")
+        if passed_count == total_count:
+            print("  🎉")
+        else:
+            print(f"  ({total_count - passed_count} failed)")
+
+    def write_report(self) -> str:
+        """บันทึกผลออกเป็น JSON ข้าง module (src/<report_file>)"""
+        report_path = os.path.join(SRC_DIR, self.report_file)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(self.results, f, ensure_ascii=False, indent=2)
+        print(f"\n  💾 บันทึกผลที่: {report_path}")
+        return report_path
+
+    def all_passed(self) -> bool:
+        return all(r["passed"] for r in self.results)
+
+    def main(self, suite: list) -> int:
+        """MAIN ของ module: รัน suite + สรุป + บันทึก JSON → exit code"""
+        self.run_suite(suite)
+        self.print_summary()
+        self.write_report()
+        return 0 if self.all_passed() else 1
+
+
+# ======================================================
+# CONCURRENT RUNNER (หลาย service ใน process เดียว)
+# ======================================================
+class _ThreadStdout(io.TextIOBase):
+    """sys.stdout แทน: thread ที่ตั้ง buffer ไว้เขียนลง buffer ของตัวเอง, thread อื่นเขียนออกจริง"""
+
+    def __init__(self, target):
+        self.target = target
+        self.local  = threading.local()
+
+    def write(self, s):
+        buf = getattr(self.local, "buffer", None)
+        return (buf or self.target).write(s)
+
+    def flush(self):
+        if getattr(self.local, "buffer", None) is None:
+            self.target.flush()
+
+
+def discover() -> dict:
+    """ชื่อ service → path ของ src/test_<name>_parameters.py"""
+    paths = sorted(glob.glob(os.path.join(SRC_DIR, "test_*_parameters.py")))
+    return {os.path.basename(p)[len("test_"):-len("_parameters.py")]: p for p in paths}
+
+
+def load_service(path: str):
+    """import module ของ service → (SERVICE, SUITE)"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    module = sys.modules.get(name)
+    if module is None or getattr(module, "__file__", None) != path:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return module.SERVICE, module.SUITE
+
+
+def _run_one(name: str, path: str, router: _ThreadStdout) -> dict:
+    router.local.buffer = io.StringIO()
+    t0 = time.perf_counter()
+    try:
+        service, suite = load_service(path)
+        service.run_suite(suite)
+        service.print_summary()
+        service.write_report()
+        results = service.results
+    except Exception as e:
+        print(f"  💥 ERROR: {e}")
+        results = [{"name": f"load {name}", "passed": False, "msg": f"ERROR: {e}"}]
+    finally:
+        log = router.local.buffer.getvalue()
+        router.local.buffer = None
+    return {"service": name, "results": results, "seconds": time.perf_counter() - t0, "log": log}
+
+
+def run_services(names: list = None, workers: int = WORKERS, quiet: bool = False) -> list:
+    """
+    รันหลาย service พร้อมกัน (service ละ 1 thread) → list ของ
+    {"service", "results", "seconds", "log"} เรียงตามลำดับที่จบ
+    """
+    available = discover()
+    names = names or list(available)
+    unknown = [n for n in names if n not in available]
+    if unknown:
+        raise ValueError(f"ไม่รู้จัก service: {unknown} (มี: {sorted(available)})")
+
+    router = _ThreadStdout(sys.stdout)
+    sys.stdout, real_stdout = router, sys.stdout
+    reports = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(names)))) as pool:
+            futures = [pool.submit(_run_one, n, available[n], router) for n in names]
+            for fut in as_completed(futures):
+                report = fut.result()
+                reports.append(report)
+                if not quiet:
+                    real_stdout.write(report["log"])
+                    real_stdout.flush()
+    finally:
+        sys.stdout = real_stdout
+    return reports
+
+
+def print_report(reports: list, wall: float):
+    serial = sum(r["seconds"] for r in reports)
+    print(f"\n{'='*60}")
+    print("📋  สรุปผลทุก service")
+    print(f"{'='*60}")
+    print(f"  {'service':<16} {'passed':>8} {'seconds':>8}")
+    print(f"  {'-'*16} {'-'*8} {'-'*8}")
+    for r in sorted(reports, key=lambda r: r["service"]):
+        ok    = sum(1 for x in r["results"] if x["passed"])
+        total = len(r["results"])
+        mark  = "✅" if ok == total else "❌"
+        print(f"{mark} {r['service']:<16} {f'{ok}/{total}':>8} {r['seconds']:>8.1f}")
+    print(f"\n  ⚡ wall {wall:.1f} s vs ผลรวมทีละ service {serial:.1f} s"
+          f" (x{serial / wall if wall else 0:.1f})")
+    rp = planner_stats()
+    if rp["derived"]:
+        print(f"  ♻️  derived {rp['derived']} responses จาก query ที่ใหญ่กว่า / {rp['fetched']} fetched"
+              f" / {rp['verified']} verified ({rp['mismatches']} mismatches)")
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="รัน Metadata parameter suites หลาย service พร้อมกัน")
+    ap.add_argument("services", nargs="*", help=f"default: ทุก service ({', '.join(discover())})")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--quiet", action="store_true", help="ไม่ print log ของแต่ละ service (เฉพาะสรุป)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    reports = run_services(args.services, args.workers, args.quiet)
+    print_report(reports, time.perf_counter() - t0)
+    sys.exit(0 if all(x["passed"] for r in reports for x in r["results"]) else 1)
@@ -0,0 +1,147 @@
+"""
+node_index.py — index node ของ verbose=debug response ด้วยการ walk ครั้งเดียว
+
+เดิมแต่ละไฟล์มี recursive finder ของตัวเอง (find_node, _find_key_recursive,
+_find_node_in, _recursive_find_node, deep_find_node, find_key) และทุก lookup
+walk tree ใหม่ทั้งก้อน → test ที่ต้องใช้ 5 node = walk 5 รอบ
+
+NodeIndex walk ครั้งเดียว (depth-first, children ตามลำดับ) แบบ resume ได้ แล้วเก็บ:
+  - nodes[name]  → node dict แรกที่เจอ ทั้ง 2 รูปแบบ
+                     {"merge_page": {"result": ...}}          (key → dict)
+                     {"name": "merge_page", "result": ...}   (name field)
+  - values[key]  → value แรก (ไม่ใช่ None) ของ key นั้น ไม่ว่าจะเป็น type อะไร
+
+ลำดับที่ได้ = ลำดับของ recursive finder แบบ "เช็ก dict ปัจจุบันก่อน แล้วค่อยลง values ตามลำดับ"
+  - ใน dict เดียวกัน name field ของ dict นั้นมาก่อน key → dict (เหมือน _find_node_in)
+  - ทุก key ของ dict ถูกเก็บก่อนลงไปใน children (ไม่ใช่ลำดับใน document)
+option ต่อ call site (ให้ตรงกับ finder เดิมที่ถูกแทน):
+  - name_needs_result=True → name field นับเฉพาะ object ที่มี "result"   (_find_node_in)
+  - lists=False            → ไม่ลงไปใน list                              (find_key)
+ต่างจาก finder เดิมจุดเดียว: key ที่ value เป็น None ไม่ถูกเก็บ และ walk ลง subtree ที่เหลือต่อ
+(เดิม return None ที่ dict นั้นแล้วข้าม values ที่เหลือของ dict นั้น — None ใช้เป็น node ไม่ได้อยู่แล้ว)
+
+finder ที่ precedence / ความลึกต่างจากนี้ (key-form ก่อน name-form, จำกัดลึก, stack กลับลำดับ)
+ยังใช้ recursive ของตัวเอง: test_card_type_ordering._recursive_find_node,
+check_tophit_violations.deep_find_node, Verify_merge_page_random_p7._find_key_recursive,
+Verify_duplicate_item_all_cursor_p8.find_node
+
+Usage:
+    from qa_common.node_index import index_of
+
+    idx   = index_of(resp_json)          # walk ครั้งแรก, ครั้งถัดไปของ object เดิมคืนจาก cache
+    idx   = index_of(body, lists=False)  # find_key: ค้นเฉพาะใน dict
+    items = idx.result("merge_page")     # == node.get("result", node)
+    node  = idx.node("bucketize_tophit_sfv")
+    raw   = idx.value("external_user_feature")
+
+cache ผูกกับ object (id) — ถ้าแก้ response หลัง index แล้ว ให้สร้าง NodeIndex(obj) ใหม่
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+_MISSING = object()
+
+
+class NodeIndex:
+    """
+    name → node map ของ response หนึ่งก้อน
+
+    walk แบบ resume ได้: lookup แต่ละครั้ง walk ต่อจากจุดที่หยุดไว้จนเจอชื่อที่ต้องการ
+    → node ที่อยู่ต้น ๆ ไม่ต้อง walk ทั้งก้อน, รวมทุก lookup แล้ว walk ไม่เกิน 1 รอบ
+    ชื่อที่ index แล้ว lookup O(1)
+    """
+
+    __slots__ = ("nodes", "values", "_stack", "_lock", "_lists", "_name_needs_result")
+
+    def __init__(self, obj: Any, lists: bool = True, name_needs_result: bool = False):
+        self.nodes:  dict = {}
+        self.values: dict = {}
+        self._stack = [obj]
+        self._lock  = threading.Lock()
+        self._lists = lists
+        self._name_needs_result = name_needs_result
+
+    def _walk_until(self, table: dict, name: str) -> bool:
+        """walk ต่อ (depth-first, children ตามลำดับ) จน name อยู่ใน table หรือหมด tree"""
+        nodes, values, stack = self.nodes, self.values, self._stack
+        lists, needs_result = self._lists, self._name_needs_result
+        with self._lock:
+            while name not in table and stack:
+                cur = stack.pop()
+                if isinstance(cur, dict):
+                    node_name = cur.get("name")
+                    if (isinstance(node_name, str) and node_name not in nodes
+                            and (not needs_result or "result" in cur)):
+                        nodes[node_name] = cur
+                    # key ใน dict เดียวกันไม่ซ้ำ → วนกลับหลังได้ แล้ว push ลง stack ตรง ๆ
+                    # (pop ออกมาตามลำดับเดิม → pre-order)
+                    for k, v in reversed(cur.items()):
+                        if v is None:
+                            continue
+                        if k not in values:
+                            values[k] = v
+                        if isinstance(v, dict):
+                            if k not in nodes:
+                                nodes[k] = v
+                            stack.append(v)
+                        elif lists and isinstance(v, list):
+                            stack.append(v)
+                elif isinstance(cur, list):
+                    stack.extend(v for v in reversed(cur) if isinstance(v, (dict, list)))
+            return name in table
+
+    def build(self) -> "NodeIndex":
+        """walk ให้ครบทั้ง tree (ปกติไม่ต้องเรียก — lookup walk เท่าที่จำเป็นเอง)"""
+        self._walk_until({}, "")
+        return self
+
+    def node(self, name: str) -> Optional[dict]:
+        """node dict แรกที่ชื่อ name (key → dict หรือ {"name": name, ...})"""
+        if name in self.nodes or self._walk_until(self.nodes, name):
+            return self.nodes[name]
+        return None
+
+    def result(self, name: str, default: Any = None) -> Any:
+        """node["result"] ถ้ามี ไม่งั้นคืน node เอง (พฤติกรรมเดียวกับ _find_node_in เดิม)"""
+        node = self.node(name)
+        if node is None:
+            return default
+        return node.get("result", node)
+
+    def value(self, key: str, default: Any = None) -> Any:
+        """value แรกของ key (ไม่สน type) — แทน find_key"""
+        if key in self.values or self._walk_until(self.values, key):
+            return self.values[key]
+        return default
+
+    def __contains__(self, name: str) -> bool:
+        return self.node(name) is not None or self.value(name) is not None
+
+
+# ======================================================
+# PER-OBJECT CACHE
+# ======================================================
+# key = (id(obj), option); เก็บ obj ไว้ใน entry ด้วยเพื่อไม่ให้ id ถูก reuse ระหว่างที่ยังอยู่ใน cache
+_CACHE_SIZE = 16
+_cache: "OrderedDict[int, tuple]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def index_of(obj: Any, lists: bool = True, name_needs_result: bool = False) -> NodeIndex:
+    """คืน NodeIndex ของ obj — response เดิมถูก walk แค่ครั้งเดียว (ต่อชุด option)"""
+    key = (id(obj), lists, name_needs_result)
+    with _cache_lock:
+        entry = _cache.get(key, _MISSING)
+        if entry is not _MISSING and entry[0] is obj:
+            _cache.move_to_end(key)
+            return entry[1]
+
+    idx = NodeIndex(obj, lists=lists, name_needs_result=name_needs_result)
+    with _cache_lock:
+        _cache[key] = (obj, idx)
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return idx
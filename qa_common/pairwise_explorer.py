@@ -0,0 +1,314 @@
+"""
+pairwise_explorer.py — ยิง Metadata endpoint ด้วยชุด parameter combinations แบบ pairwise (t-wise)
+
+suite เดิมทดสอบทีละ parameter (language / is_related_ecommerce / filter_out_category /
+exclude_ids / id / fields) → bug ที่เกิดเมื่อ parameter หลายตัวมาด้วยกัน และ combination ที่ช้า ไม่ถูกเห็น
+
+  - domain ต่อ service: DOMAIN ใน src/test_<svc>_parameters.py (ถ้ามี)
+    ไม่งั้นสร้างจากค่าคงที่ของ module (ID_LIST / FIELDS_* / FILTER_OUT_CATEGORY / EXCLUDE_ID)
+    ค่า OMIT = ไม่ส่ง parameter นั้น
+  - covering set: ทุกคู่ (t=2) หรือทุก t-tuple ของค่า parameter ปรากฏในอย่างน้อย 1 combination
+    (greedy แบบ AETG — deterministic, จำนวน combination ≈ หลักสิบแทนผลคูณของ domain)
+  - ยิงพร้อมกันผ่าน thread pool (QA_EXPLORE_WORKERS) ภายใต้ limiter ของ host (qa_common.host_limiter)
+    --rps / QA_EXPLORE_RPS > 0 → ตั้ง rps ของ host นั้นใหม่สำหรับรอบนี้
+    ไม่ผ่าน HTTP cache — latency ที่วัดคือ round-trip จริง
+  - ต่อ combination: latency (median ของ --repeat), จำนวน items, invariant ที่ผิด
+      * จำนวน items ≤ limit
+      * exclude_ids ไม่ปรากฏ, ทุก ID อยู่ใน id list, ไม่มี category ที่ filter_out_category
+      * is_related_ecommerce True / False ↔ มี / ไม่มี related_ecommerce_id
+      * fields: _source ไม่มี field เกิน และไม่ขาด (ยกเว้น related_ecommerce_id เมื่อ
+        is_related_ecommerce ไม่ใช่ True — พฤติกรรมเดียวกับ test 9b)
+  - latency outlier: ช้ากว่า median ของ "เพื่อนบ้าน" (combination ที่ต่างกันน้อยที่สุด ≤ NEIGHBOURS ตัว)
+    เกิน QA_EXPLORE_OUTLIER_X เท่า และเกิน QA_EXPLORE_OUTLIER_MS
+
+Usage:
+    python -m qa_common.pairwise_explorer sfv
+    python -m qa_common.pairwise_explorer ugcsfv --strength 3 --workers 8 --rps 10 --repeat 3
+    python -m qa_common.pairwise_explorer sfv --out reports/explore_sfv.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common import host_limiter
+from qa_common.http_client import post_json
+from qa_common.metadata_service import DEFAULT_OPTIONS, discover, get_sources, load_service
+
+# ======================================================
+# CONFIG
+# ======================================================
+WORKERS    = int(os.environ.get("QA_EXPLORE_WORKERS", "8"))
+RPS        = float(os.environ.get("QA_EXPLORE_RPS", "0"))
+OUTLIER_X  = float(os.environ.get("QA_EXPLORE_OUTLIER_X", "3"))
+OUTLIER_MS = float(os.environ.get("QA_EXPLORE_OUTLIER_MS", "250"))
+NEIGHBOURS = 5
+SEED_CANDIDATES = 16
+TIMEOUT    = 60
+
+
+class _Omit:
+    def __repr__(self):
+        return "-"
+
+
+OMIT = _Omit()   # ไม่ส่ง parameter นี้
+
+
+# ======================================================
+# DOMAIN
+# ======================================================
+def default_domain(module) -> dict:
+    """parameter → ค่าที่จะลอง จากค่าคงที่ของ test module"""
+    domain = {"limit": [10, 100], "language": ["th", "en"]}
+    fields = next((getattr(module, n) for n in ("FIELDS_5", "FIELDS_4", "FIELDS_WITH_POINT")
+                   if hasattr(module, n)), None)
+    if getattr(module, "ID_LIST", None):
+        domain["id"] = [OMIT, list(module.ID_LIST)]
+    if fields:
+        domain["fields"] = [OMIT, list(fields)]
+    if getattr(module, "FILTER_OUT_CATEGORY", None):
+        domain["filter_out_category"] = [OMIT, list(module.FILTER_OUT_CATEGORY)]
+    if getattr(module, "EXCLUDE_ID", None):
+        domain["exclude_ids"] = [OMIT, [module.EXCLUDE_ID]]
+    if fields and "related_ecommerce_id" in fields:
+        domain["is_related_ecommerce"] = [OMIT, True, False]
+    return domain
+
+
+def service_domain(name: str) -> tuple:
+    """(ServiceSpec, domain) ของ service"""
+    service, _ = load_service(discover()[name])
+    module = sys.modules[f"test_{name}_parameters"]
+    return service, getattr(module, "DOMAIN", None) or default_domain(module)
+
+
+# ======================================================
+# COVERING SET (greedy AETG)
+# ======================================================
+def covering_set(domain: dict, strength: int = 2) -> list:
+    """
+    list ของ combination (dict parameter → ค่า, ไม่รวม OMIT) ที่ครอบคลุมทุก t-tuple ของค่า
+    แต่ละรอบ: เริ่มจาก tuple ที่ยังไม่ครอบคลุม (ลอง SEED_CANDIDATES ตัว) แล้วเติม parameter
+    ที่เหลือทีละตัวด้วยค่าที่ครอบคลุม tuple ใหม่ได้มากที่สุด → เก็บแถวที่ครอบคลุมได้มากสุด
+    """
+    names = list(domain)
+    t = max(1, min(strength, len(names)))
+    uncovered = set()
+    for cols in itertools.combinations(range(len(names)), t):
+        for vals in itertools.product(*(range(len(domain[names[c]])) for c in cols)):
+            uncovered.add(tuple(zip(cols, vals)))
+
+    def gain(row: dict) -> int:
+        fixed = sorted(row.items())
+        return sum(1 for combo in itertools.combinations(fixed, t) if combo in uncovered)
+
+    def build(seed: tuple) -> dict:
+        row = dict(seed)
+        for c in range(len(names)):
+            if c in row:
+                continue
+            best, best_gain = 0, -1
+            for v in range(len(domain[names[c]])):
+                g = gain({**row, c: v})
+                if g > best_gain:
+                    best, best_gain = v, g
+            row[c] = best
+        return row
+
+    rows = []
+    while uncovered:
+        # ลองเริ่มจาก tuple ที่ยังไม่ครอบคลุมหลายตัว แล้วเลือกแถวที่ครอบคลุมได้มากสุด
+        seeds = sorted(uncovered)[:SEED_CANDIDATES]
+        row = max((build(seed) for seed in seeds), key=gain)
+        uncovered.difference_update(itertools.combinations(sorted(row.items()), t))
+        rows.append(row)
+
+    out = []
+    for row in rows:
+        params = {names[c]: domain[names[c]][v] for c, v in sorted(row.items())}
+        out.append({k: v for k, v in params.items() if v is not OMIT})
+    return out
+
+
+# ======================================================
+# INVARIANTS
+# ======================================================
+def check_invariants(params: dict, response: dict) -> list:
+    """รายการ invariant ที่ผิดของ response (ว่าง = ผ่าน)"""
+    if not isinstance(response.get("data"), dict):
+        return [f"response ไม่มี data: {json.dumps(response, ensure_ascii=False)[:120]}"]
+    sources = get_sources(response)
+    problems = []
+
+    limit = params.get("limit")
+    if limit is not None and len(sources) > limit:
+        problems.append(f"ได้ {len(sources)} items เกิน limit={limit}")
+
+    excluded = set(params.get("exclude_ids") or [])
+    leaked = [s.get("id") for s in sources if s.get("id") in excluded]
+    if leaked:
+        problems.append(f"exclude_ids ไม่ถูกกรอง: {leaked}")
+
+    if "id" in params:
+        allowed = set(params["id"])
+        outside = [s.get("id") for s in sources if s.get("id") not in allowed]
+        if outside:
+            problems.append(f"{len(outside)} IDs ไม่อยู่ใน id list: {outside[:5]}")
+
+    banned = set(params.get("filter_out_category") or [])
+    if banned:
+        hit = [s.get("id") for s in sources if banned & set(s.get("article_category") or [])]
+        if hit:
+            problems.append(f"{len(hit)} items มี category ใน filter_out_category: {hit[:5]}")
+
+    related = params.get("is_related_ecommerce")
+    if related is not None:
+        with_key = [s for s in sources if "related_ecommerce_id" in s]
+        wrong = [s.get("id") for s in with_key if bool(s.get("related_ecommerce_id")) != related]
+        if wrong:
+            problems.append(f"is_related_ecommerce={related} แต่ {len(wrong)} items ไม่ตรง: {wrong[:5]}")
+
+    if "fields" in params:
+        expected = set(params["fields"])
+        optional = {"related_ecommerce_id"} if related is not True else set()
+        for s in sources:
+            extra   = set(s) - expected
+            missing = expected - set(s) - optional
+            if extra or missing:
+                problems.append(f"ID={s.get('id')} fields ไม่ตรง: missing={missing or '∅'}, extra={extra or '∅'}")
+                break
+    return problems
+
+
+# ======================================================
+# RUNNER
+# ======================================================
+def _probe(url: str, params: dict, repeat: int) -> dict:
+    body = {"parameters": params, "options": DEFAULT_OPTIONS}
+    latencies, response, error = [], {}, None
+    for _ in range(repeat):
+        # ถือ slot ของ host เอง → เวลารอ limiter ไม่ปนใน latency (post_json ใช้ slot เดียวกัน)
+        with host_limiter.limited(url):
+            t0 = time.perf_counter()
+            try:
+                response = post_json(url, body, timeout=TIMEOUT)
+            except RuntimeError as e:
+                error = str(e)
+                break
+            latencies.append((time.perf_counter() - t0) * 1000)
+    problems = [f"HTTP error: {error}"] if error else check_invariants(params, response)
+    return {
+        "params":     params,
+        "latency_ms": round(statistics.median(latencies), 1) if latencies else None,
+        "items":      len(get_sources(response)) if not error else 0,
+        "violations": problems,
+        "outlier":    None,
+    }
+
+
+def _distance(a: dict, b: dict) -> int:
+    keys = set(a) | set(b)
+    return sum(1 for k in keys if a.get(k, OMIT) != b.get(k, OMIT))
+
+
+def flag_outliers(results: list, neighbours: int = NEIGHBOURS,
+                  factor: float = OUTLIER_X, min_ms: float = OUTLIER_MS) -> list:
+    """ใส่ results[i]["outlier"] = {neighbour_median_ms, ratio} เมื่อช้ากว่าเพื่อนบ้านผิดปกติ"""
+    timed = [r for r in results if r["latency_ms"] is not None]
+    for r in timed:
+        near = sorted((x for x in timed if x is not r), key=lambda x: _distance(r["params"], x["params"]))
+        near = near[:neighbours]
+        if not near:
+            continue
+        median = statistics.median(x["latency_ms"] for x in near)
+        if r["latency_ms"] >= median * factor and r["latency_ms"] - median >= min_ms:
+            r["outlier"] = {"neighbour_median_ms": round(median, 1),
+                            "ratio": round(r["latency_ms"] / median, 1) if median else None}
+    return [r for r in results if r["outlier"]]
+
+
+def explore(name: str, strength: int = 2, workers: int = WORKERS, rps: float = RPS,
+            repeat: int = 1, domain: dict = None) -> dict:
+    """สร้าง covering set ของ service แล้วยิงทุก combination → report dict"""
+    service, default = service_domain(name)
+    domain = domain or default
+    combos = covering_set(domain, strength)
+    if rps:
+        host_limiter.configure(service.api_url, rps=rps)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(combos)))) as pool:
+        results = list(pool.map(lambda p: _probe(service.api_url, p, repeat), combos))
+    flag_outliers(results)
+
+    exhaustive = 1
+    for values in domain.values():
+        exhaustive *= len(values)
+    return {
+        "service":      name,
+        "url":          service.api_url,
+        "strength":     strength,
+        "domain":       {k: [repr(v) if v is OMIT else v for v in vs] for k, vs in domain.items()},
+        "combinations": len(combos),
+        "exhaustive":   exhaustive,
+        "seconds":      round(time.perf_counter() - t0, 2),
+        "results":      results,
+    }
+
+
+def passed(report: dict) -> bool:
+    return not any(r["violations"] for r in report["results"])
+
+
+def print_report(report: dict):
+    print(f"🧭 {report['service']}: {report['combinations']} combinations (t={report['strength']}, "
+          f"exhaustive {report['exhaustive']}) ใน {report['seconds']:.1f} s")
+    print(f"\n  {'parameters':<72} {'items':>6} {'ms':>7}")
+    print(f"  {'-'*72} {'-'*6} {'-'*7}")
+    ordered = sorted(report["results"], key=lambda r: -(r["latency_ms"] or 0))
+    for r in ordered:
+        mark = "❌" if r["violations"] else ("🐢" if r["outlier"] else "✅")
+        ms = f"{r['latency_ms']:.0f}" if r["latency_ms"] is not None else "-"
+        print(f"{mark} {json.dumps(r['params'], ensure_ascii=False)[:72]:<72} {r['items']:>6} {ms:>7}")
+        for v in r["violations"]:
+            print(f"     ❌ {v}")
+        if r["outlier"]:
+            print(f"     🐢 ช้ากว่าเพื่อนบ้าน x{r['outlier']['ratio']} "
+                  f"(median {r['outlier']['neighbour_median_ms']:.0f} ms)")
+    bad = sum(1 for r in report["results"] if r["violations"])
+    slow = sum(1 for r in report["results"] if r["outlier"])
+    print(f"\n  ผลรวม: {report['combinations'] - bad}/{report['combinations']} ผ่าน invariants, "
+          f"{slow} latency outliers")
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="pairwise / t-wise parameter explorer ของ Metadata endpoints")
+    ap.add_argument("service", choices=sorted(discover()))
+    ap.add_argument("--strength", type=int, default=2, help="t ของ t-wise coverage (default 2 = pairwise)")
+    ap.add_argument("--workers",  type=int, default=WORKERS)
+    ap.add_argument("--rps",      type=float, default=RPS, help="request / วินาที สูงสุดของ host (0 = ตาม QA_HOST_LIMITS)")
+    ap.add_argument("--repeat",   type=int, default=1, help="ยิงซ้ำต่อ combination แล้วใช้ median latency")
+    ap.add_argument("--out", help="เขียน report เป็น JSON")
+    args = ap.parse_args()
+
+    report = explore(args.service, args.strength, args.workers, args.rps, args.repeat)
+    print_report(report)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 {args.out}")
+    sys.exit(0 if passed(report) else 1)
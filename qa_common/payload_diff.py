@@ -0,0 +1,232 @@
+"""
+payload_diff.py — structural diff ของ recommendation payload (แทน DeepDiff ignore_order ใน Atlas comparison)
+
+DeepDiff(ignore_order=True) จับคู่ element ของ list แบบทุกคู่ → เกือบ O(n²) บน items หลายร้อยตัว
+และให้ผลเป็นข้อความที่ต้องตัดทิ้ง; payload ของ recommendation มีโครงสร้างที่รู้อยู่แล้ว:
+
+  - list ของ dict ที่มี "id" ทุกตัว → จับคู่ด้วย id (hash map, O(n))
+      * items_added / items_removed  — id ที่มีฝั่งเดียว (พร้อม index)
+      * items_moved                  — ลำดับเทียบกับ item อื่นเปลี่ยน (ไม่อยู่ใน longest order-preserved
+                                       subsequence — O(n log n))
+      * items_shifted                — ลำดับเดิม แต่ index เปลี่ยนเพราะมี item เพิ่ม / หายก่อนหน้า
+      * field ที่ต่าง → diff ต่อลงไปใน item คู่นั้น (path: items[id=abc].title)
+  - list ของ scalar / dict ที่ไม่มี id → เทียบแบบ multiset (ไม่สนลำดับ เหมือน ignore_order เดิม)
+      * values_added / values_removed พร้อมจำนวน
+  - dict → keys_added / keys_removed แล้ว diff ต่อใน key ที่มีทั้งคู่
+  - scalar → values_changed (float เทียบที่ FLOAT_DIGITS ตำแหน่ง) / type_changes
+             (bool / int / float แยก type กัน: True → 1 หรือ 1 → 1.0 = type_changes)
+  - subtree ที่ == กันและ type ตรงกันทั้งก้อน (เทียบใน C) ข้ามทันที → เวลาขึ้นกับส่วนที่ต่าง ไม่ใช่ขนาด payload
+
+ผลเป็น dict ของ list (structured — เขียน JSON ได้ตรง ๆ), summarize() ทำข้อความสั้นสำหรับ report
+  equal        — ไม่มีความต่างเลย
+  same_content — ต่างแค่ลำดับ (items_moved / items_shifted) — เทียบเท่า DeepDiff ignore_order ว่าง
+
+Usage:
+    from qa_common.payload_diff import diff_payloads, summarize
+
+    diff = diff_payloads(body1, body2, exclude_keys=("schemaId", "request_id"))
+    if not diff["equal"]:
+        print(summarize(diff))
+"""
+
+import bisect
+import json
+from collections import Counter
+
+FLOAT_DIGITS = 2
+ID_KEY = "id"
+
+KINDS = ("values_changed", "type_changes", "keys_added", "keys_removed",
+         "items_added", "items_removed", "items_moved", "items_shifted",
+         "values_added", "values_removed")
+ORDER_KINDS = ("items_moved", "items_shifted")   # ลำดับต่างอย่างเดียว — content เหมือนกัน
+
+
+# ======================================================
+# HELPERS
+# ======================================================
+def _scalar_equal(a, b, digits: int) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        return round(a, digits) == round(b, digits)
+    return a == b
+
+
+def _same_tree(a, b) -> bool:
+    """
+    a == b แบบไม่ยอมให้ True / 1 / 1.0 เท่ากัน
+    container: == (C) ก่อน แล้วยืนยันด้วย json.dumps (C เช่นกัน: true / 1 / 1.0 ต่างกัน)
+    """
+    if type(a) is not type(b) or a != b:
+        return False
+    if not isinstance(a, (dict, list)):
+        return True
+    try:
+        return json.dumps(a, sort_keys=True) == json.dumps(b, sort_keys=True)
+    except (TypeError, ValueError):
+        return False     # มี object ที่ serialise ไม่ได้ → walk ตามปกติ
+
+
+def _multiset_key(obj, digits: int) -> str:
+    """key ของ element ใน multiset: float ปัดเศษ, dict เรียง key, list ข้างในไม่สนลำดับเช่นกัน"""
+    if isinstance(obj, dict):
+        return "{" + ",".join(f"{json.dumps(str(k), ensure_ascii=False)}:{_multiset_key(obj[k], digits)}"
+                              for k in sorted(obj, key=str)) + "}"
+    if isinstance(obj, list):
+        return "[" + ",".join(sorted(_multiset_key(x, digits) for x in obj)) + "]"
+    if isinstance(obj, float):
+        return f"f{round(obj, digits)!r}"
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
+
+def _keyed(a: list, b: list, id_key: str) -> bool:
+    """list ทั้งสองฝั่ง (อย่างน้อยฝั่งหนึ่งไม่ว่าง) เป็น dict ที่มี id ทุกตัว"""
+    return bool(a or b) and all(isinstance(x, dict) and id_key in x for x in (*a, *b))
+
+
+def _index_by_id(items: list, id_key: str) -> dict:
+    """(id, ลำดับที่ซ้ำ) → index — id ซ้ำใน list เดียวกันจับคู่ตามลำดับที่เจอ"""
+    seen, out = Counter(), {}
+    for i, x in enumerate(items):
+        key = x[id_key]
+        hashable = key if isinstance(key, (str, int, float, bool, type(None))) else json.dumps(key, default=str)
+        out[(hashable, seen[hashable])] = i
+        seen[hashable] += 1
+    return out
+
+
+def _in_order(positions: list) -> set:
+    """index (ใน positions) ของ longest increasing subsequence — item ที่ลำดับสัมพัทธ์ไม่เปลี่ยน"""
+    tails, tails_at, parent = [], [], [None] * len(positions)
+    for i, p in enumerate(positions):
+        j = bisect.bisect_left(tails, p)
+        if j == len(tails):
+            tails.append(p)
+            tails_at.append(i)
+        else:
+            tails[j] = p
+            tails_at[j] = i
+        parent[i] = tails_at[j - 1] if j else None
+    keep, i = set(), tails_at[-1] if tails_at else None
+    while i is not None:
+        keep.add(i)
+        i = parent[i]
+    return keep
+
+
+def _label(key) -> str:
+    return str(key[0]) if key[1] == 0 else f"{key[0]}#{key[1]}"
+
+
+# ======================================================
+# DIFF
+# ======================================================
+class _Differ:
+    def __init__(self, digits: int, id_key: str):
+        self.digits = digits
+        self.id_key = id_key
+        self.out = {k: [] for k in KINDS}
+
+    def walk(self, a, b, path: str):
+        # subtree ที่เหมือนกัน (ส่วนใหญ่ของ payload) ไม่ต้อง walk — เทียบใน C แบบแยก type
+        if _same_tree(a, b):
+            return
+        if isinstance(a, dict) and isinstance(b, dict):
+            self._dict(a, b, path)
+        elif isinstance(a, list) and isinstance(b, list):
+            if _keyed(a, b, self.id_key):
+                self._keyed_list(a, b, path)
+            else:
+                self._multiset(a, b, path)
+        elif type(a) is not type(b):
+            self.out["type_changes"].append({"path": path, "old_type": type(a).__name__,
+                                             "new_type": type(b).__name__, "old": a, "new": b})
+        elif not _scalar_equal(a, b, self.digits):
+            self.out["values_changed"].append({"path": path, "old": a, "new": b})
+
+    def _dict(self, a: dict, b: dict, path: str):
+        for k in a:
+            if k not in b:
+                self.out["keys_removed"].append(f"{path}.{k}" if path else str(k))
+        for k, v in b.items():
+            sub = f"{path}.{k}" if path else str(k)
+            if k not in a:
+                self.out["keys_added"].append(sub)
+            else:
+                self.walk(a[k], v, sub)
+
+    def _keyed_list(self, a: list, b: list, path: str):
+        ia, ib = _index_by_id(a, self.id_key), _index_by_id(b, self.id_key)
+        for key, i in ia.items():
+            if key not in ib:
+                self.out["items_removed"].append({"path": path, "id": a[i][self.id_key], "index": i})
+        for key, j in ib.items():
+            if key not in ia:
+                self.out["items_added"].append({"path": path, "id": b[j][self.id_key], "index": j})
+
+        common = [(key, i, ib[key]) for key, i in ia.items() if key in ib]   # เรียงตาม index ฝั่ง a
+        keep = _in_order([j for _, _, j in common])
+        for n, (key, i, j) in enumerate(common):
+            if n not in keep:
+                self.out["items_moved"].append({"path": path, "id": a[i][self.id_key], "from": i, "to": j})
+            elif i != j:
+                self.out["items_shifted"].append({"path": path, "id": a[i][self.id_key], "from": i, "to": j})
+            self.walk(a[i], b[j], f"{path}[{self.id_key}={_label(key)}]")
+
+    def _multiset(self, a: list, b: list, path: str):
+        values = {}
+        def count(items):
+            c = Counter()
+            for x in items:
+                key = _multiset_key(x, self.digits)
+                values.setdefault(key, x)
+                c[key] += 1
+            return c
+        ca, cb = count(a), count(b)
+        if ca == cb:
+            return
+        for key, n in (ca - cb).items():
+            self.out["values_removed"].append({"path": path, "value": values[key], "count": n})
+        for key, n in (cb - ca).items():
+            self.out["values_added"].append({"path": path, "value": values[key], "count": n})
+
+
+def diff_payloads(a, b, exclude_keys=(), float_digits: int = FLOAT_DIGITS, id_key: str = ID_KEY) -> dict:
+    """
+    structured diff ของ a → b
+    exclude_keys: key ระดับบนสุดที่ไม่เทียบ (เช่น schemaId / request_id)
+    คืน {"equal": bool, "same_content": bool, <kind>: [...], ...} ตาม KINDS
+    path เริ่มจาก root ("items[id=x].title")
+    """
+    if exclude_keys and isinstance(a, dict) and isinstance(b, dict):
+        a = {k: v for k, v in a.items() if k not in exclude_keys}
+        b = {k: v for k, v in b.items() if k not in exclude_keys}
+    differ = _Differ(float_digits, id_key)
+    differ.walk(a, b, "")
+    out = {"equal":        not any(differ.out.values()),
+           "same_content": not any(v for k, v in differ.out.items() if k not in ORDER_KINDS)}
+    out.update(differ.out)
+    return out
+
+
+def summarize(diff: dict, limit: int = 3) -> str:
+    """ข้อความสั้น 1 บรรทัด: จำนวนต่อชนิด + ตัวอย่างไม่เกิน limit ตัว"""
+    parts = []
+    for kind in KINDS:
+        entries = diff.get(kind) or []
+        if not entries:
+            continue
+        if kind == "values_changed":
+            sample = [f"{e['path']}({e['old']!r} → {e['new']!r})" for e in entries[:limit]]
+        elif kind == "type_changes":
+            sample = [f"{e['path']}({e['old_type']} → {e['new_type']})" for e in entries[:limit]]
+        elif kind in ("keys_added", "keys_removed"):
+            sample = entries[:limit]
+        elif kind in ("items_moved", "items_shifted"):
+            sample = [f"{e['id']}({e['from']}→{e['to']})" for e in entries[:limit]]
+        elif kind in ("items_added", "items_removed"):
+            sample = [f"{e['id']}@{e['index']}" for e in entries[:limit]]
+        else:
+            sample = [f"{e['path']}:{e['value']!r}x{e['count']}" for e in entries[:limit]]
+        more = f" +{len(entries) - limit}" if len(entries) > limit else ""
+        parts.append(f"{kind}: {len(entries)} {sample}{more}")
+    return " | ".join(parts)
@@ -0,0 +1,105 @@
+"""
+pytest_cassette.py — pytest plugin: --record / --replay (qa_common.cassette)
+
+  pytest --record                 # ยิงจริง + อัด response ลง cassettes/
+  pytest --replay                 # รัน offline จาก cassettes/ (ไม่แตะ network)
+  pytest --replay --cassette-dir=/path/to/cassettes
+
+โหลดผ่าน:
+  - root conftest.py           → pytest_plugins
+  - src/Test_7-11_New_prod     → pytest.ini addopts "-p qa_common.pytest_cassette"
+                                  (directory นั้นมี pytest.ini ของตัวเอง = rootdir แยก)
+
+ทั้ง record และ replay seed `random` ด้วยชื่อไฟล์ + ชื่อ test
+→ URL ที่สุ่ม (เช่น ga_id ใน Verify_merge_page_random_p7) ตรงกันทั้ง 2 รอบ
+
+record อัดเวลาเริ่มของแต่ละ test ลง cassette (clock.json)
+replay เลื่อน datetime.now() / time.time() กลับไปที่เวลานั้น เฉพาะใน module ของ repo
+(ทั้ง import datetime / import time และ from datetime import datetime) — library ใช้นาฬิกาจริง
+→ check ที่เทียบกับ "ตอนนี้" (Verify_latest_logic, Verify_tophit_logic) ได้ผลเดียวกับตอนอัด
+cassette ที่อัดก่อนมี clock.json → replay ด้วยนาฬิกาจริง (นับใน summary เป็น "no clock")
+"""
+
+import os
+import random
+import time
+
+import pytest
+
+from qa_common import cassette
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("cassette", "HTTP record / replay")
+    group.addoption("--record", action="store_true", default=False,
+                    help="ยิง API จริงแล้วอัด response ลง cassette directory")
+    group.addoption("--replay", action="store_true", default=False,
+                    help="ตอบทุก request จาก cassette (offline) — request ที่ไม่มีใน cassette = error")
+    group.addoption("--cassette-dir", default=cassette.DEFAULT_DIR,
+                    help="cassette directory (default: %(default)s)")
+
+
+def _mode(config):
+    record, replay = config.getoption("--record"), config.getoption("--replay")
+    if record and replay:
+        raise pytest.UsageError("--record กับ --replay ใช้พร้อมกันไม่ได้")
+    return "record" if record else "replay" if replay else None
+
+
+_store = None
+_no_clock = []   # test ที่ replay โดยไม่มีเวลาอัดไว้
+
+
+def pytest_configure(config):
+    global _store
+    mode = _mode(config)
+    if mode:
+        try:
+            _store = cassette.activate(mode, config.getoption("--cassette-dir"))
+        except FileNotFoundError as e:
+            raise pytest.UsageError(str(e))
+
+
+@pytest.fixture(autouse=True)
+def _cassette_seed(request):
+    """seed random + นาฬิกาต่อ test ให้ request ที่สุ่ม / เวลา "ตอนนี้" ตรงกันระหว่าง record / replay"""
+    mode = cassette.active_mode()
+    if not mode:
+        yield
+        return
+    # ไม่ใช้ nodeid ตรง ๆ — nodeid เปลี่ยนตาม rootdir (รันจาก root vs รันใน sub-directory)
+    test_key = f"{os.path.basename(str(request.node.fspath))}::{request.node.name}"
+    random.seed(test_key)
+    if mode == "record":
+        _store.record_time(test_key, time.time())
+        yield
+        return
+    epoch = _store.recorded_time(test_key)
+    if epoch is None:
+        _no_clock.append(test_key)
+        yield
+        return
+    cassette.shift_clock(epoch, roots=(ROOT_DIR,))
+    try:
+        yield
+    finally:
+        cassette.restore_clock()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    mode = cassette.active_mode()
+    if mode and _store is not None:
+        s = _store.stats()
+        terminalreporter.write_line(
+            f"📼 Cassette ({mode}) : {s['hits']} replayed / {s['misses']} missed"
+            f" / {s['recorded']} recorded  → {_store.root}")
+        if _no_clock:
+            terminalreporter.write_line(
+                f"⚠️  {len(_no_clock)} test replay ด้วยนาฬิกาจริง (no clock ใน cassette — อัดใหม่ด้วย --record)")
+
+
+def pytest_unconfigure(config):
+    if cassette.active_mode():
+        cassette.deactivate()   # restore patch + เขียน index ที่อัดไว้
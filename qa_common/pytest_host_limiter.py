@@ -0,0 +1,30 @@
+"""
+pytest_host_limiter.py — pytest plugin: ให้ทุก request ใน session ผ่าน limiter ต่อ host (qa_common.host_limiter)
+
+  pytest                                              # limit ตาม HOST_LIMITS
+  QA_HOST_LIMITS="atlas-serving=4:10" pytest ...      # override ราย service
+  QA_HOST_LIMIT=0 pytest ...                          # ปิด
+
+โหลดผ่าน:
+  - root conftest.py           → pytest_plugins
+  - src/Test_7-11_New_prod     → pytest.ini addopts "-p qa_common.pytest_host_limiter"
+"""
+
+from qa_common import host_limiter
+
+
+def pytest_configure(config):
+    if host_limiter.LIMIT_ENABLED:
+        host_limiter.install()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    for host, s in host_limiter.stats().items():
+        rps = f"{s['rps']:g} rps" if s["rps"] else "ไม่จำกัด rps"
+        terminalreporter.write_line(
+            f"🚦 {host}: {s['requests']} requests, peak {s['peak_inflight']}/{s['max_inflight']} in-flight "
+            f"({rps}), รอ limiter รวม {s['waited_s']:.1f} s")
+
+
+def pytest_unconfigure(config):
+    host_limiter.uninstall()
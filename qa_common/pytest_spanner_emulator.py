@@ -0,0 +1,59 @@
+"""
+pytest_spanner_emulator.py — pytest plugin: --spanner-emulator (qa_common.spanner_emulator)
+
+  pytest --spanner-emulator                                  # เปิด emulator + seed จาก fixtures/spanner_snapshot.jsonl.gz
+  pytest --spanner-emulator --spanner-snapshot=/path/snap.jsonl.gz
+  SPANNER_EMULATOR_HOST=localhost:9010 pytest --spanner-emulator   # ใช้ emulator ที่รันอยู่แล้ว
+
+session fixture (autouse) seed ก่อน test แรก → compare_with_spanner / query_spanner
+ของทุก src/test_*_parameters.py ยิง emulator แทน g1d-ai-spannerb01 โดยไม่ต้องแก้ test
+
+โหลดผ่าน root conftest.py → pytest_plugins
+"""
+
+import os
+
+import pytest
+
+from qa_common import spanner_client, spanner_emulator
+
+_seed_stats: dict = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("spanner-emulator", "Spanner emulator fixture")
+    group.addoption("--spanner-emulator", action="store_true", default=False,
+                    help="รัน Spanner checks กับ emulator ที่ seed จาก snapshot (ไม่แตะ Spanner จริง)")
+    group.addoption("--spanner-snapshot", default=spanner_emulator.DEFAULT_SNAPSHOT,
+                    help="snapshot file (default: %(default)s)")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def spanner_emulator_session(request):
+    """เปิด emulator + seed mst_* tables ครั้งเดียวต่อ session (เฉพาะเมื่อใช้ --spanner-emulator)"""
+    config = request.config
+    if not config.getoption("--spanner-emulator"):
+        yield None
+        return
+
+    previous = os.environ.get(spanner_emulator.EMULATOR_ENV)
+    try:
+        proc = spanner_emulator.start_emulator()
+        _seed_stats.update(spanner_emulator.seed_snapshot(config.getoption("--spanner-snapshot")))
+    except (RuntimeError, FileNotFoundError) as e:
+        pytest.exit(f"❌ Spanner emulator: {e}", returncode=4)
+
+    yield os.environ[spanner_emulator.EMULATOR_ENV]
+
+    spanner_client.close_all()
+    spanner_emulator.stop_emulator(proc)
+    if previous is None:
+        os.environ.pop(spanner_emulator.EMULATOR_ENV, None)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if _seed_stats:
+        s = _seed_stats
+        terminalreporter.write_line(
+            f"🧪 Spanner emulator : seeded {s['rows']} rows / {s['tables']} tables"
+            f" ({s['batches']} batches) in {s['seconds']} s")
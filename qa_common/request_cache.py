@@ -0,0 +1,93 @@
+"""
+request_cache.py — session cache + request coalescing สำหรับ request ที่ซ้ำกัน
+
+  - request_key(): canonical key = URL + JSON body แบบ sort_keys (ลำดับ key ไม่มีผล)
+  - RequestCache.get_or_fetch():
+      * key เคยยิงแล้ว         → คืนจาก memory (hit)
+      * key กำลังยิงอยู่ (thread อื่น) → รอผลของ request เดียวกัน (coalesced)
+      * ยังไม่เคย              → ยิงจริง (miss)
+  - เก็บ raw bytes → caller แต่ละตัว decode เองได้ object ใหม่ (แก้ dict แล้วไม่กระทบกัน)
+  - request ที่ error ไม่ถูก cache, ผลที่ cacheable(data) เป็น False ก็ไม่ถูก cache
+    (thread ที่รอ request เดียวกันอยู่ได้ผลนั้นไป แต่ครั้งถัดไปยิงใหม่)
+
+ปิดได้ด้วย env QA_HTTP_CACHE=0
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+
+CACHE_ENABLED = os.environ.get("QA_HTTP_CACHE", "1") != "0"
+
+
+def canonical_body(body) -> str:
+    """JSON body แบบ canonical — sort key, ไม่มี whitespace, ไม่ escape ภาษาไทย"""
+    return json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def request_key(method: str, url: str, body=None) -> str:
+    """sha256 ของ METHOD + URL + canonical body"""
+    raw = f"{method.upper()} {url}\n{canonical_body(body) if body is not None else ''}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class RequestCache:
+    """Thread-safe response cache ต่อ session พร้อม counter hit / miss / coalesced"""
+
+    def __init__(self):
+        self._store:    dict = {}
+        self._inflight: dict = {}
+        self._lock = threading.Lock()
+        self.hits      = 0
+        self.misses    = 0
+        self.coalesced = 0
+
+    def get_or_fetch(self, key: str, fetch, cacheable=None):
+        with self._lock:
+            if key in self._store:
+                self.hits += 1
+                return self._store[key]
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return fut.result()
+
+        try:
+            data = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            if cacheable is None or cacheable(data):
+                self._store[key] = data
+            self._inflight.pop(key, None)
+        fut.set_result(data)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+            self.hits = self.misses = self.coalesced = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits":        self.hits,
+            "misses":      self.misses,
+            "coalesced":   self.coalesced,
+            "saved_calls": self.hits + self.coalesced,
+            "entries":     len(self._store),
+        }
+
+
+# cache ตัวเดียวของ process (ใช้ผ่าน http_client.post_json(..., cache=True))
+SESSION_CACHE = RequestCache()
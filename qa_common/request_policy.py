@@ -0,0 +1,312 @@
+"""
+request_policy.py — deadline ต่อ endpoint + retry แบบ jittered exponential + hedged request สำหรับ GET
+
+response ช้าตัวเดียว (tail) ไม่ควรทำให้ทั้ง run fail หรือค้าง TIMEOUT เต็ม ๆ:
+  - deadline      : เวลารวมทั้งหมดของ 1 fetch (ทุก attempt + backoff) — หมดแล้วหยุด ไม่เริ่ม attempt ใหม่
+  - attempt       : timeout ต่อครั้ง = min(attempt_timeout, เวลาที่เหลือของ deadline)
+                    (ไม่ idempotent: เวลาที่เหลือของ deadline ทั้งหมด — ไม่มี retry หลัง timeout)
+  - idempotent    : caller ต้องบอกเอง (fetch(url, idempotent=True)) — ค่าตั้งต้น False
+                    endpoint ของ ai-universal-service ที่มี ga_id / cursor เก็บ state ต่อ user (seen items /
+                    last_id) → ยิงซ้ำ = เปลี่ยน state ที่ check กำลังตรวจ
+  - retry         : idempotent  → connection error / timeout / 429 / 5xx
+                    ไม่ idempotent → เฉพาะกรณีที่ request ไม่ถึง server แน่ ๆ (connect ไม่ได้ / connect timeout / 429)
+                                   ไม่ retry หลัง read timeout หรือ 5xx
+                    รอ full jitter: uniform(0, min(backoff_cap, backoff_base * 2^n)) — ไม่ retry ถ้ารอแล้วเกิน deadline
+  - hedge         : ปิดเป็นค่าตั้งต้น (QA_HEDGE=1 เปิด) และเฉพาะ idempotent=True
+                    attempt ที่ยังไม่เสร็จหลัง p95 ที่วัดได้ของ endpoint นั้น → ยิงซ้ำอีก 1 ตัว เอาตัวที่เสร็จก่อน
+                    (ต้องมี latency อย่างน้อย HEDGE_MIN_SAMPLES ตัวก่อน — ช่วงแรกไม่ hedge)
+                    ตัวที่แพ้: ถ้ายังไม่เริ่มจะถูกยกเลิก, ถ้ากำลังยิงอยู่จะวิ่งต่อจนจบ / ถึง attempt timeout
+                    (requests ยกเลิก request ที่ส่งไปแล้วไม่ได้ — server ยังทำงานกับมัน)
+  - ทุก attempt ผ่าน limiter ของ host (qa_common.host_limiter) — hedge ไม่ทะลุ in-flight / rps ที่ตั้งไว้
+  - cassette (qa_common.cassette) record / replay → ไม่ hedge (response ต้องตรงกับที่อัดไว้ 1:1)
+
+ทุก fetch คืน transport record (attempt / retry / hedge / latency) แยกจากผลของ check
+→ script เก็บลง evidence ได้ตรง ๆ และรู้ว่า tail ถูก hit บ่อยแค่ไหน (stats())
+
+Policy ต่อ endpoint: ENDPOINT_POLICIES (จับคู่ path ที่ยาวที่สุดที่ url ขึ้นต้นด้วย) — ไม่เจอใช้ DEFAULT_POLICY
+
+Override (env):
+  QA_DEADLINE=45        # deadline (วินาที) ของทุก endpoint
+  QA_RETRIES=0          # ปิด retry
+  QA_HEDGE=1            # เปิด hedge (เฉพาะ call ที่ idempotent=True)
+
+Usage:
+    from qa_common.request_policy import fetch
+
+    resp, transport = fetch(url)                    # stateful (cursor / ga_id): deadline + retry ที่ปลอดภัยเท่านั้น
+    resp, transport = fetch(url, idempotent=True)   # read-only: retry เต็ม + hedge (ถ้า QA_HEDGE=1)
+    evidence["transport"] = transport               # raise TransportError ถ้าไม่มี attempt ไหนได้ response
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from qa_common import cassette
+from qa_common.host_limiter import limited
+from qa_common.http_client import get_session
+
+# ======================================================
+# CONFIG
+# ======================================================
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+RETRY_STATUSES     = {429, 500, 502, 503, 504}
+
+HEDGE_ENABLED       = os.environ.get("QA_HEDGE", "0") == "1"
+HEDGE_MIN_SAMPLES   = 5      # latency ขั้นต่ำก่อนเริ่มใช้ p95
+HEDGE_PERCENTILE    = 0.95
+LATENCY_WINDOW      = 200    # latency ล่าสุดต่อ endpoint ที่ใช้คำนวณ p95
+HEDGE_POOL_SIZE     = 16
+
+
+class RequestPolicy:
+    """deadline / timeout ต่อ attempt / retry / hedge ของ endpoint หนึ่ง"""
+
+    def __init__(self, deadline: float, attempt_timeout: float, retries: int = 2,
+                 backoff_base: float = 0.2, backoff_cap: float = 2.0, hedge: bool = True):
+        self.deadline        = deadline
+        self.attempt_timeout = attempt_timeout
+        self.retries         = retries
+        self.backoff_base    = backoff_base
+        self.backoff_cap     = backoff_cap
+        self.hedge           = hedge
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def _env_policy(policy: RequestPolicy) -> RequestPolicy:
+    if "QA_DEADLINE" in os.environ:
+        policy.deadline = float(os.environ["QA_DEADLINE"])
+    if "QA_RETRIES" in os.environ:
+        policy.retries = int(os.environ["QA_RETRIES"])
+    return policy
+
+
+# path prefix (หลัง host) → policy
+ENDPOINT_POLICIES = {
+    "/api/v1/universal/": _env_policy(RequestPolicy(deadline=30, attempt_timeout=10)),
+}
+DEFAULT_POLICY = _env_policy(RequestPolicy(deadline=30, attempt_timeout=20))
+
+
+class TransportError(RuntimeError):
+    """ไม่มี attempt ไหนได้ response (retry หมด / deadline หมด) — transport record อยู่ใน .transport"""
+
+    def __init__(self, msg: str, transport: dict):
+        super().__init__(msg)
+        self.transport = transport
+
+
+# ======================================================
+# LATENCY  (p95 ต่อ endpoint)
+# ======================================================
+_latencies: dict = {}          # endpoint → deque ของ latency (วินาที)
+_counters:  dict = {}          # endpoint → {"requests", "retries", "hedges", ...}
+_lock = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix="hedge")
+
+
+def endpoint_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+def policy_for(url: str) -> RequestPolicy:
+    path = urlsplit(url).path
+    prefixes = [p for p in ENDPOINT_POLICIES if path.startswith(p)]
+    return ENDPOINT_POLICIES[max(prefixes, key=len)] if prefixes else DEFAULT_POLICY
+
+
+def _observe(endpoint: str, seconds: float):
+    with _lock:
+        _latencies.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+
+def hedge_after(endpoint: str):
+    """p95 ของ latency ที่วัดได้ (วินาที) — None ถ้า sample ยังไม่พอ"""
+    with _lock:
+        samples = sorted(_latencies.get(endpoint, ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(len(samples) - 1, int(HEDGE_PERCENTILE * len(samples)))]
+
+
+def _count(endpoint: str, **inc):
+    with _lock:
+        c = _counters.setdefault(endpoint, {"requests": 0, "attempts": 0, "retries": 0, "hedges": 0,
+                                            "hedge_wins": 0, "failed": 0})
+        for k, v in inc.items():
+            c[k] += v
+
+
+def stats() -> dict:
+    """endpoint → จำนวน request / attempt / retry / hedge / hedge ที่ชนะ / ไม่ได้ response + p95 ปัจจุบัน"""
+    with _lock:
+        counters = {ep: dict(c) for ep, c in sorted(_counters.items())}
+    for ep, c in counters.items():
+        p95 = hedge_after(ep)
+        c["p95_ms"] = round(p95 * 1000) if p95 is not None else None
+    return counters
+
+
+# ======================================================
+# FETCH
+# ======================================================
+def _not_sent(e: requests.RequestException) -> bool:
+    """request ไม่ถึง server แน่ ๆ (connect ไม่สำเร็จ) — retry ได้แม้ endpoint ไม่ idempotent"""
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    reason = getattr(e.args[0], "reason", None) if e.args else None
+    return isinstance(e, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def _attempt(method: str, url: str, timeout: float, kwargs: dict, endpoint: str):
+    """1 attempt (รันใน pool) — คืน (response | None, error | None, elapsed วินาที, ไม่ถึง server)"""
+    with limited(url):
+        t0 = time.monotonic()
+        try:
+            resp = get_session().request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            return None, f"{type(e).__name__}: {e}", time.monotonic() - t0, _not_sent(e)
+        elapsed = time.monotonic() - t0
+    if resp.status_code not in RETRY_STATUSES:
+        _observe(endpoint, elapsed)
+    return resp, None, elapsed, False
+
+
+def _backoff(policy: RequestPolicy, n: int) -> float:
+    return random.uniform(0, min(policy.backoff_cap, policy.backoff_base * 2 ** n))
+
+
+def fetch(url: str, method: str = "GET", policy: RequestPolicy = None, idempotent: bool = False,
+          **kwargs) -> tuple:
+    """
+    ยิง request ตาม policy ของ endpoint — คืน (response, transport)
+    idempotent=True เฉพาะ request ที่ยิงซ้ำแล้วไม่เปลี่ยน state ฝั่ง server (และ method เป็น GET / HEAD)
+    response สุดท้ายที่ได้ (อาจเป็น 5xx ถ้า retry หมดแล้ว) — caller ตรวจ status เองเหมือนเดิม
+    transport = {"endpoint", "policy", "attempts": [...], "retries", "hedges", "hedge_won",
+                 "elapsed_ms", "tail_hit"}
+    raise TransportError ถ้าไม่มี attempt ไหนได้ response เลย
+    """
+    method   = method.upper()
+    policy   = policy or policy_for(url)
+    endpoint = endpoint_of(url)
+    idempotent = idempotent and method in IDEMPOTENT_METHODS
+    retries  = policy.retries
+    hedging  = (HEDGE_ENABLED and policy.hedge and idempotent
+                and cassette.active_mode() is None)
+
+    def retryable(resp, not_sent) -> bool:
+        if resp is None:
+            return idempotent or not_sent
+        return resp.status_code in (RETRY_STATUSES if idempotent else {429})
+
+    t_start  = time.monotonic()
+    deadline = t_start + policy.deadline
+    attempts = []
+    last_resp, last_error, hedge_won = None, None, False
+
+    def record(kind, n, resp, error, elapsed, won):
+        attempts.append({"attempt": n, "kind": kind,
+                         "status": resp.status_code if resp is not None else None,
+                         "error": error, "elapsed_ms": round(elapsed * 1000, 1), "won": won})
+
+    _count(endpoint, requests=1)
+    for n in range(retries + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # ไม่ idempotent: ไม่ retry หลัง read timeout → attempt เดียวได้เวลาที่เหลือทั้งหมด
+        timeout = min(policy.attempt_timeout, remaining) if idempotent else remaining
+        kind    = "primary" if n == 0 else "retry"
+        _count(endpoint, attempts=1, retries=int(n > 0))
+
+        futures = {_pool.submit(_attempt, method, url, timeout, kwargs, endpoint): kind}
+        threshold = hedge_after(endpoint) if hedging else None
+        if threshold is not None and threshold < timeout:
+            done, _ = wait(futures, timeout=threshold)
+            if not done:
+                futures[_pool.submit(_attempt, method, url, timeout, kwargs, endpoint)] = "hedge"
+                _count(endpoint, hedges=1)
+
+        # ตัวแรกที่ได้ response ที่ไม่ต้อง retry ชนะ — ตัวที่ยังไม่เริ่มถูกยกเลิก ตัวที่กำลังยิงจบเองใน pool
+        winner, pending = None, set(futures)
+        retry_ok = False
+        while pending and winner is None:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for f in done:
+                resp, error, elapsed, not_sent = f.result()
+                again = retryable(resp, not_sent)
+                ok = resp is not None and not again
+                record(futures[f], n, resp, error, elapsed, ok and winner is None)
+                if resp is not None:
+                    last_resp = resp
+                last_error = error or last_error
+                retry_ok = retry_ok or again
+                if ok and winner is None:
+                    winner = f
+        for f in pending:
+            cancelled = f.cancel()
+            attempts.append({"attempt": n, "kind": futures[f], "status": None,
+                             "error": ("cancelled" if cancelled else "superseded") if winner is not None
+                                      else "deadline",
+                             "elapsed_ms": None, "won": False})
+
+        if winner is not None:
+            hedge_won = futures[winner] == "hedge"
+            if hedge_won:
+                _count(endpoint, hedge_wins=1)
+            break
+        if not retry_ok:
+            # read timeout / 5xx ของ request ที่ไม่ idempotent — server อาจทำไปแล้ว ห้ามยิงซ้ำ
+            break
+
+        if n < retries:
+            pause = _backoff(policy, n)
+            if time.monotonic() + pause >= deadline:
+                break
+            time.sleep(pause)
+
+    transport = {
+        "endpoint":   endpoint,
+        "policy":     policy.as_dict(),
+        "idempotent": idempotent,
+        "attempts":   attempts,
+        "retries":    sum(1 for a in attempts if a["kind"] == "retry"),
+        "hedges":     sum(1 for a in attempts if a["kind"] == "hedge"),
+        "hedge_won":  hedge_won,
+        "elapsed_ms": round((time.monotonic() - t_start) * 1000, 1),
+    }
+    transport["tail_hit"] = bool(transport["retries"] or transport["hedges"])
+
+    if last_resp is None:
+        _count(endpoint, failed=1)
+        raise TransportError(f"no response from {endpoint} within {policy.deadline}s "
+                               f"({len(attempts)} attempts, last error: {last_error})", transport)
+    return last_resp, transport
+
+
+def summarize(transports: list) -> dict:
+    """รวม transport record ของหลาย fetch → ใส่ summary ของ evidence"""
+    transports = [t for t in transports if t]
+    latencies  = sorted(t["elapsed_ms"] for t in transports)
+    return {
+        "fetches":        len(transports),
+        "tail_hits":      sum(1 for t in transports if t["tail_hit"]),
+        "retries":        sum(t["retries"] for t in transports),
+        "hedges":         sum(t["hedges"] for t in transports),
+        "hedge_wins":     sum(1 for t in transports if t["hedge_won"]),
+        "p50_ms":         latencies[len(latencies) // 2] if latencies else None,
+        "max_ms":         latencies[-1] if latencies else None,
+    }
@@ -0,0 +1,279 @@
+"""
+response_planner.py — ใช้ response ของ query ที่ "ใหญ่กว่า" ตอบ query ที่เล็กกว่า (monotonic parameters)
+
+หลาย test ยิง query เดียวกันหลายขนาดเพื่อเทียบกัน (limit 5/20/50, agg_tophit_limit 50/100,
+tophit_date_filter 30/50) — ผลของขนาดเล็กหาได้จากผลของขนาดใหญ่ตาม contract ของ SQL template:
+
+  limit               → ORDER BY ... LIMIT n : ผลของ n = n ตัวแรกของผลที่ N ≥ n
+                        เฉพาะ response ที่ไม่มี aggregation buckets, query ไม่ใช่ is_random
+                        และ hit ตัวที่ n กับ n+1 มีค่า "sort" ต่างกัน (ไม่มี tie ที่ขอบ — ลำดับของ tie
+                        ระหว่าง query คนละขนาดไม่รับประกัน; ไม่มี "sort" ให้ดู → ยิงจริง)
+  agg_<name>_limit    → top-n ต่อ bucket ของ aggregations.agg_<name> : ตัด hits ในทุก bucket เหลือ n
+                        (ชุด bucket ไม่ขึ้นกับ n)
+  tophit_date_filter  → publish_date >= now - d วัน : กรอง hits ของช่วง D ≥ d (0 = ไม่กรอง = กว้างสุด)
+                        เฉพาะเมื่อผลของช่วงใหญ่ "ครบ" (จำนวน hits < limit), ทุก hit มี publish_date
+                        และไม่มี hit อยู่ใกล้ขอบ d วันเกิน QA_DERIVE_SKEW_S วินาที (นาฬิกาเครื่อง vs server)
+                        ไม่เข้าเงื่อนไข → ยิงจริง
+
+ปิดเป็นค่าตั้งต้น — derive = ผลของ test บางข้อจริงโดยโครงสร้าง (limit=5 ที่ตัดจาก limit=50 ไม่มีทาง
+เกิน 5) จึงใช้ได้เฉพาะ run ที่ต้องการลดจำนวน request และไม่ได้ตรวจ parameter ที่ถูก derive
+
+ResponsePlanner.fetch(params, no_derive=()):
+  - QA_DERIVE=1 และเคยยิง query ที่ parameter อื่นเหมือนกันทุกตัว และต่างแค่ monotonic parameter
+    ตัวเดียวที่ "ใหญ่กว่า" (และไม่อยู่ใน no_derive) → derive จาก response นั้น (ไม่ยิง)
+  - ไม่งั้นยิงจริงแล้วจำไว้
+ResponsePlanner.fetch_variants(params, name, values) — contract test ของ name: ยิงจริงทุกค่าเสมอ
+  (ไม่ derive name ที่ test กำลังตรวจ แม้ QA_DERIVE=1)
+
+QA_DERIVE=1          → เปิด derive (ค่าตั้งต้น 0 = ยิงจริงทุก query)
+QA_DERIVE_VERIFY=0.2 → สุ่ม 20% ของ response ที่ derive มายิงจริงเทียบด้วย (1 = ทุกตัว)
+                       ID / ลำดับไม่ตรง → raise DerivationMismatch (server ผิด contract)
+
+Usage:
+    planner = ResponsePlanner(lambda params: post_json(url, {"parameters": params, ...}))
+    resp    = planner.fetch({"limit": 20, "language": "th"})
+    by_lim  = planner.fetch_variants({"language": "th"}, "limit", [5, 20, 50])   # ยิงจริงทุกค่า
+"""
+
+import copy
+import datetime
+import json
+import os
+import random
+import re
+import threading
+
+DERIVE_ENABLED = os.environ.get("QA_DERIVE", "0") == "1"
+VERIFY_RATE    = float(os.environ.get("QA_DERIVE_VERIFY", "0") or 0)
+BOUNDARY_SKEW  = datetime.timedelta(seconds=int(os.environ.get("QA_DERIVE_SKEW_S", "300")))
+
+AGG_LIMIT_RE = re.compile(r"^(agg_\w+)_limit$")
+WINDOW_PARAMS = {"tophit_date_filter"}
+
+_planners: list = []
+_planners_lock = threading.Lock()
+
+
+class DerivationMismatch(RuntimeError):
+    """response ที่ derive ไม่ตรงกับที่ server ตอบจริง (verify mode)"""
+
+
+# ======================================================
+# RESPONSE SHAPE
+# ======================================================
+def _hits(response: dict) -> list:
+    return response.get("data", {}).get("hits", {}).get("hits", [])
+
+
+def _agg_buckets(response: dict) -> dict:
+    """ชื่อ aggregation → list ของ buckets (เฉพาะตัวที่มี bucket)"""
+    aggs = response.get("data", {}).get("aggregations") or {}
+    return {name: agg.get("buckets") for name, agg in aggs.items()
+            if isinstance(agg, dict) and agg.get("buckets")}
+
+
+def _bucket_hit_lists(bucket: dict) -> list:
+    """hits list ทุกชุดใน bucket (sort_by_hit_count / sort_by_publish_date / latest / hits ...)"""
+    return [v["hits"]["hits"] for v in bucket.values()
+            if isinstance(v, dict) and isinstance(v.get("hits"), dict)
+            and isinstance(v["hits"].get("hits"), list)]
+
+
+def _set_total(hits_obj: dict, count: int):
+    total = hits_obj.get("total")
+    if isinstance(total, dict) and "value" in total:
+        total["value"] = count
+    elif isinstance(total, int):
+        hits_obj["total"] = count
+
+
+def _publish_date(hit: dict):
+    value = (hit.get("_source") or {}).get("publish_date")
+    if not value:
+        return None
+    try:
+        dt = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=datetime.timezone.utc)
+
+
+def fingerprint(response: dict) -> dict:
+    """ID + ลำดับของ hits และทุก bucket — ใช้เทียบ response ที่ derive กับของจริง"""
+    out = {"hits": [(h.get("_source") or {}).get("id") for h in _hits(response)]}
+    for name, buckets in _agg_buckets(response).items():
+        out[name] = {str(b.get("key")): [[(h.get("_source") or {}).get("id") for h in hits]
+                                         for hits in _bucket_hit_lists(b)]
+                     for b in buckets}
+    return out
+
+
+# ======================================================
+# MONOTONIC PARAMETERS
+# ======================================================
+def monotonic_kind(name: str):
+    """ชนิดของ monotonic parameter: "limit" / "agg_limit" / "window" / None"""
+    if name == "limit":
+        return "limit"
+    if AGG_LIMIT_RE.match(name):
+        return "agg_limit"
+    if name in WINDOW_PARAMS:
+        return "window"
+    return None
+
+
+def covers(name: str, big, small) -> bool:
+    """ค่า big ครอบคลุมผลของค่า small ไหม (window: 0 = ไม่กรอง = กว้างสุด)"""
+    if not isinstance(big, int) or not isinstance(small, int) or isinstance(big, bool) or big == small:
+        return False
+    if monotonic_kind(name) == "window":
+        return small > 0 and (big == 0 or big > small)
+    return big > small >= 0
+
+
+def derive(response: dict, params: dict, name: str, value: int, now: datetime.datetime = None):
+    """
+    response ของ params (ค่า name ใหญ่กว่า) → response ของ name=value
+    คืน None ถ้า contract ไม่พอจะ derive ได้ (ต้องยิงจริง)
+    """
+    kind = monotonic_kind(name)
+    out = copy.deepcopy(response)
+    hits_obj = out.get("data", {}).get("hits")
+
+    if kind == "limit":
+        if _agg_buckets(response) or not isinstance(hits_obj, dict) or params.get("is_random"):
+            return None
+        hits = hits_obj.get("hits", [])
+        if 0 < value < len(hits):
+            # tie ที่ขอบ: server จัดลำดับ tie ต่างกันได้ระหว่าง LIMIT คนละค่า
+            last, first_cut = hits[value - 1].get("sort"), hits[value].get("sort")
+            if last is None or last == first_cut:
+                return None
+        hits_obj["hits"] = hits[:value]
+        return out
+
+    if kind == "agg_limit":
+        agg = AGG_LIMIT_RE.match(name).group(1)
+        buckets = (out.get("data", {}).get("aggregations") or {}).get(agg, {}).get("buckets")
+        if buckets is None:
+            return None
+        for bucket in buckets:
+            for hits in _bucket_hit_lists(bucket):
+                del hits[value:]
+        return out
+
+    if kind == "window":
+        limit = params.get("limit")
+        hits  = _hits(response)
+        if (_agg_buckets(response) or not isinstance(hits_obj, dict)
+                or not isinstance(limit, int) or len(hits) >= limit):
+            return None
+        dates = [_publish_date(h) for h in hits]
+        if any(d is None for d in dates):
+            return None
+        since = (now or datetime.datetime.now(datetime.timezone.utc)) - datetime.timedelta(days=value)
+        if any(abs(d - since) <= BOUNDARY_SKEW for d in dates):
+            return None
+        hits_obj["hits"] = [h for h, d in zip(hits_obj["hits"], dates) if d >= since]
+        _set_total(hits_obj, len(hits_obj["hits"]))
+        return out
+
+    return None
+
+
+def _rest_key(params: dict, name: str) -> str:
+    rest = {k: v for k, v in params.items() if k != name}
+    return json.dumps(rest, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+# ======================================================
+# PLANNER
+# ======================================================
+class ResponsePlanner:
+    """จำ response ที่ยิงจริง แล้วตอบ query ที่ถูกครอบคลุมด้วย derive (thread-safe)"""
+
+    def __init__(self, fetch, enabled: bool = DERIVE_ENABLED, verify_rate: float = VERIFY_RATE):
+        self._fetch      = fetch
+        self.enabled     = enabled
+        self.verify_rate = verify_rate
+        self._seen: dict = {}        # (name, rest_key) → [(value, params, response)]
+        self._lock = threading.Lock()
+        self.fetched    = 0
+        self.derived    = 0
+        self.verified   = 0
+        self.mismatches = 0
+        with _planners_lock:
+            _planners.append(self)
+
+    def _remember(self, params: dict, response: dict):
+        with self._lock:
+            for name, value in params.items():
+                if monotonic_kind(name) and isinstance(value, int):
+                    self._seen.setdefault((name, _rest_key(params, name)), []).append((value, params, response))
+
+    def _candidates(self, params: dict, no_derive=()) -> list:
+        """response ที่เคยยิงแล้วครอบคลุม params (เล็กสุดที่ครอบคลุมก่อน — derive ถูกสุด)"""
+        out = []
+        with self._lock:
+            for name, value in params.items():
+                if not monotonic_kind(name) or name in no_derive:
+                    continue
+                for big, big_params, response in self._seen.get((name, _rest_key(params, name)), []):
+                    if covers(name, big, value):
+                        out.append((name, big, big_params, response))
+        window_last = lambda c: (monotonic_kind(c[0]) == "window", c[1] if c[1] else float("inf"))
+        return sorted(out, key=window_last)
+
+    def fetch(self, params: dict, no_derive=()) -> dict:
+        """no_derive = parameter ที่ test กำลังตรวจ — ไม่ derive จาก response ของค่าอื่น"""
+        if self.enabled:
+            for name, big, big_params, response in self._candidates(params, no_derive):
+                derived = derive(response, big_params, name, params[name])
+                if derived is None:
+                    continue
+                with self._lock:
+                    self.derived += 1
+                if self.verify_rate and random.random() < self.verify_rate:
+                    self._verify(params, derived, f"{name}={params[name]} จาก {name}={big}")
+                return derived
+
+        response = self._fetch(params)
+        with self._lock:
+            self.fetched += 1
+        if self.enabled:
+            self._remember(params, response)
+        return copy.deepcopy(response)
+
+    def fetch_variants(self, params: dict, name: str, values: list) -> dict:
+        """
+        query เดียวกันหลายค่าของ name → {value: response}
+        test ของ name ตรวจว่า server ทำตาม contract ของ name → ยิงจริงทุกค่า (ไม่ derive name)
+        """
+        return {v: self.fetch({**params, name: v}, no_derive={name}) for v in values}
+
+    def _verify(self, params: dict, derived: dict, how: str):
+        actual = self._fetch(params)
+        with self._lock:
+            self.verified += 1
+        want, got = fingerprint(actual), fingerprint(derived)
+        if want != got:
+            with self._lock:
+                self.mismatches += 1
+            raise DerivationMismatch(f"response ที่ derive ({how}) ไม่ตรงกับ server: "
+                                     f"derived={json.dumps(got, ensure_ascii=False)[:200]} "
+                                     f"server={json.dumps(want, ensure_ascii=False)[:200]}")
+        print(f"    ♻️  verify derive {how} — ตรงกับ server ✓")
+
+    def stats(self) -> dict:
+        return {"fetched": self.fetched, "derived": self.derived,
+                "verified": self.verified, "mismatches": self.mismatches}
+
+
+def stats() -> dict:
+    """รวม stats ของทุก planner ใน process (conftest สรุปท้าย session)"""
+    total = {"fetched": 0, "derived": 0, "verified": 0, "mismatches": 0}
+    with _planners_lock:
+        for planner in _planners:
+            for k, v in planner.stats().items():
+                total[k] += v
+    return total
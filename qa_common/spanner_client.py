@@ -0,0 +1,158 @@
+"""
+spanner_client.py — Spanner database handle + session pool ที่ใช้ร่วมกันทั้ง process
+
+เดิม query_spanner() ในทุก src/test_*_parameters.py สร้าง
+spanner.Client → instance → database ใหม่ทุกครั้ง (auth + gRPC channel + session ใหม่ทุก label)
+
+ที่นี่:
+  - cache database handle ต่อ (project, instance, database) — สร้างครั้งแรกที่ใช้
+  - Client ต่อ project ใช้ร่วมกัน
+  - session pool (BurstyPool) ขนาดปรับได้ด้วย env QA_SPANNER_POOL_SIZE
+  - METRICS: latency ต่อ query + จำนวน session ที่ถูกสร้างจริง
+    (ชี้ SPANNER_EMULATOR_HOST ไป emulator แล้วเทียบ sessions_created ได้)
+
+Usage:
+    from qa_common.spanner_client import query_ids
+
+    ids = query_ids(SP_PROJECT, SP_INSTANCE, SP_DATABASE, sql)
+"""
+
+import os
+import statistics
+import threading
+import time
+
+# ======================================================
+# CONFIG
+# ======================================================
+SESSION_POOL_SIZE = int(os.environ.get("QA_SPANNER_POOL_SIZE", "4"))
+
+_INSTALL_HINT = (
+    "ไม่พบ google-cloud-spanner กรุณารัน:\n"
+    "  pip install google-cloud-spanner --break-system-packages"
+)
+
+_clients:   dict = {}   # project → spanner.Client
+_databases: dict = {}   # (project, instance, database) → Database
+_lock = threading.Lock()
+
+
+# ======================================================
+# METRICS
+# ======================================================
+class SpannerMetrics:
+    """latency ต่อ query + session ที่สร้าง (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies_ms: list = []
+        self.rows             = 0
+        self.sessions_created = 0
+        self.databases_opened = 0
+
+    def record_query(self, ms: float, rows: int):
+        with self._lock:
+            self.latencies_ms.append(ms)
+            self.rows += rows
+
+    def record_session(self):
+        with self._lock:
+            self.sessions_created += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lat = sorted(self.latencies_ms)
+        return {
+            "queries":          len(lat),
+            "rows":             self.rows,
+            "total_ms":         round(sum(lat), 1),
+            "p50_ms":           round(statistics.median(lat), 1) if lat else 0.0,
+            "p95_ms":           round(lat[max(int(len(lat) * 0.95) - 1, 0)], 1) if lat else 0.0,
+            "max_ms":           round(lat[-1], 1) if lat else 0.0,
+            "sessions_created": self.sessions_created,
+            "databases_opened": self.databases_opened,
+        }
+
+
+METRICS = SpannerMetrics()
+
+
+# ======================================================
+# DATABASE HANDLE
+# ======================================================
+def _import_spanner():
+    try:
+        from google.cloud import spanner
+    except ImportError:
+        raise RuntimeError(_INSTALL_HINT)
+    return spanner
+
+
+def _make_pool(spanner, size: int):
+    class _CountingPool(spanner.BurstyPool):
+        """BurstyPool ที่นับ session ที่สร้างใหม่ (pool ว่าง / session หมดอายุ)"""
+
+        def _new_session(self):
+            METRICS.record_session()
+            return super()._new_session()
+
+    return _CountingPool(target_size=size)
+
+
+def get_database(project: str, instance: str, database: str):
+    """คืน Database handle ของ (project, instance, database) — สร้างครั้งเดียวต่อ process"""
+    key = (project, instance, database)
+    db = _databases.get(key)
+    if db is not None:
+        return db
+
+    spanner = _import_spanner()
+    with _lock:
+        db = _databases.get(key)
+        if db is None:
+            client = _clients.get(project)
+            if client is None:
+                client = _clients[project] = spanner.Client(project=project)
+            db = client.instance(instance).database(database, pool=_make_pool(spanner, SESSION_POOL_SIZE))
+            _databases[key] = db
+            METRICS.databases_opened += 1
+    return db
+
+
+def close_all():
+    """ทิ้ง handle ทั้งหมด (session ใน pool ถูกลบตอน pool ถูก garbage collect / หมดอายุฝั่ง server)"""
+    with _lock:
+        _databases.clear()
+        for client in _clients.values():
+            close = getattr(client, "close", None)
+            if close:
+                close()
+        _clients.clear()
+
+
+# ======================================================
+# QUERY HELPERS
+# ======================================================
+def query_rows(project: str, instance: str, database: str, sql: str,
+               params: dict = None, param_types: dict = None) -> list:
+    """รัน SQL (read-only snapshot) แล้วคืน list ของ dict ต่อ row"""
+    db = get_database(project, instance, database)
+    t0 = time.perf_counter()
+    with db.snapshot() as snapshot:
+        results = snapshot.execute_sql(sql, params=params, param_types=param_types)
+        rows = list(results)
+        cols = [col.name for col in results.fields]
+    METRICS.record_query((time.perf_counter() - t0) * 1000, len(rows))
+    return [dict(zip(cols, row)) for row in rows]
+
+
+def query_ids(project: str, instance: str, database: str, sql: str,
+              params: dict = None, param_types: dict = None, column: str = "id") -> list:
+    """รัน SQL แล้วคืน list ของ id ไม่ซ้ำ (ลำดับตามผลจาก Spanner)"""
+    ids, seen = [], set()
+    for row in query_rows(project, instance, database, sql, params, param_types):
+        id_val = row.get(column)
+        if id_val and id_val not in seen:
+            ids.append(id_val)
+            seen.add(id_val)
+    return ids
@@ -0,0 +1,374 @@
+"""
+spanner_emulator.py — Spanner emulator + seed mst_* tables จาก snapshot file
+
+ครึ่ง Spanner ของ src/test_*_parameters.py ต้องยิง g1d-ai-spannerb01 เท่านั้น
+→ CI / เครื่อง local ต้องข้าม หรือรอ instance จริง
+
+ที่นี่:
+  - start_emulator()  : เปิด emulator (gcloud หรือ docker) แล้วตั้ง SPANNER_EMULATOR_HOST
+                        (ถ้าตั้ง SPANNER_EMULATOR_HOST ไว้แล้ว = ใช้ emulator ที่รันอยู่)
+  - seed_snapshot()   : สร้าง instance / database ชื่อเดียวกับของจริง
+                        (SP_PROJECT / SP_INSTANCE / SP_DATABASE ใน test module)
+                        + CREATE TABLE ตาม schema ใน snapshot + bulk load แบบ batch mutation
+  - export_snapshot() : ดึง schema + rows ของ mst_* ที่ src/*.sql / src/*.py อ้างถึง จาก Spanner จริง
+
+google-cloud-spanner ต่อ emulator เองเมื่อมี SPANNER_EMULATOR_HOST (credentials anonymous)
+→ query_spanner() / qa_common.spanner_client ไม่ต้องแก้อะไร
+
+Snapshot format (gzip, 1 JSON ต่อบรรทัด):
+  {"database": "...", "table": "mst_x", "columns": [["id", "STRING(MAX)"], ...], "primary_key": ["id"]}
+  ["id1", "title", "2025-01-01T00:00:00+00:00", ...]       ← row ของ table ล่าสุด (ลำดับตาม columns)
+  ...
+  {"database": "...", "table": "mst_y", ...}               ← table ถัดไป
+
+Usage:
+  # อัด snapshot จาก Spanner จริง (ต้องมีสิทธิ์อ่าน)
+  python -m qa_common.spanner_emulator export --limit 100000
+
+  # seed emulator ที่รันอยู่แล้ว
+  SPANNER_EMULATOR_HOST=localhost:9010 python -m qa_common.spanner_emulator seed
+
+  # pytest (qa_common.pytest_spanner_emulator)
+  pytest --spanner-emulator [--spanner-snapshot fixtures/spanner_snapshot.jsonl.gz]
+"""
+
+import argparse
+import base64
+import datetime
+import decimal
+import glob
+import gzip
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common import spanner_client
+
+# ======================================================
+# CONFIG
+# ======================================================
+EMULATOR_ENV     = "SPANNER_EMULATOR_HOST"
+DEFAULT_HOST     = "localhost:9010"
+DEFAULT_SNAPSHOT = os.environ.get(
+    "QA_SPANNER_SNAPSHOT", os.path.join(ROOT_DIR, "fixtures", "spanner_snapshot.jsonl.gz"))
+
+# ชื่อเดียวกับ SP_PROJECT / SP_INSTANCE / SP_DATABASE ใน src/test_*_parameters.py
+PROJECT   = "tdg-ai-platform-nonprod02-bxev"
+INSTANCE  = "g1d-ai-spannerb01"
+DATABASES = ("ai_raas_nonprod", "ai_trueidcms_nonprod")
+
+# cell ต่อ commit (Spanner จำกัด 80,000 mutations ต่อ transaction)
+MUTATIONS_PER_BATCH = int(os.environ.get("QA_SPANNER_SEED_MUTATIONS", "40000"))
+
+EMULATOR_COMMANDS = (
+    lambda port: ["gcloud", "emulators", "spanner", "start", f"--host-port=0.0.0.0:{port}"],
+    lambda port: ["docker", "run", "--rm", "-p", f"{port}:9010", "gcr.io/cloud-spanner-emulator/emulator"],
+)
+
+
+# ======================================================
+# EMULATOR PROCESS
+# ======================================================
+def _port_open(host: str, port: int) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def start_emulator(host_port: str = DEFAULT_HOST, timeout: float = 60):
+    """
+    เปิด emulator แล้วตั้ง SPANNER_EMULATOR_HOST
+    คืน Popen (ต้อง stop_emulator ทีหลัง) หรือ None ถ้าใช้ emulator ที่รันอยู่แล้ว
+    """
+    existing = os.environ.get(EMULATOR_ENV)
+    if existing:
+        host, port = existing.rsplit(":", 1)
+        if not _port_open(host, int(port)):
+            raise RuntimeError(f"{EMULATOR_ENV}={existing} แต่ต่อ emulator ไม่ได้")
+        return None
+
+    host, port = host_port.rsplit(":", 1)
+    for build in EMULATOR_COMMANDS:
+        cmd = build(port)
+        if shutil.which(cmd[0]) is None:
+            continue
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                start_new_session=True)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and proc.poll() is None:
+            if _port_open(host, int(port)):
+                os.environ[EMULATOR_ENV] = host_port
+                return proc
+            time.sleep(0.2)
+        stop_emulator(proc)
+    raise RuntimeError(
+        "เปิด Spanner emulator ไม่ได้ — ติดตั้ง gcloud (cloud-spanner-emulator) หรือ docker\n"
+        f"  หรือรัน emulator เองแล้วตั้ง {EMULATOR_ENV}=host:port"
+    )
+
+
+def stop_emulator(proc):
+    if proc is None or proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# ======================================================
+# VALUE ENCODE / DECODE (snapshot ↔ Spanner)
+# ======================================================
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decoder(spanner_type: str):
+    """คืนฟังก์ชันแปลงค่าจาก snapshot → ค่าที่ batch.insert รับ (ตาม SPANNER_TYPE)"""
+    if spanner_type.startswith("ARRAY<"):
+        inner = _decoder(spanner_type[6:-1])
+        return lambda v: None if v is None else [inner(x) for x in v]
+    base = spanner_type.split("(")[0]
+    if base == "TIMESTAMP":
+        return lambda v: None if v is None else datetime.datetime.fromisoformat(v.replace("Z", "+00:00"))
+    if base == "DATE":
+        return lambda v: None if v is None else datetime.date.fromisoformat(v)
+    if base == "NUMERIC":
+        return lambda v: None if v is None else decimal.Decimal(v)
+    if base == "BYTES":
+        return lambda v: None if v is None else v.encode("ascii")   # client ส่ง base64 ตามที่ให้
+    if base == "JSON":
+        from google.cloud.spanner_v1 import JsonObject
+        return lambda v: None if v is None else JsonObject(v)
+    return lambda v: v
+
+
+# ======================================================
+# SNAPSHOT READ
+# ======================================================
+def read_schemas(path: str) -> list:
+    """header ของทุก table ใน snapshot (ไม่ parse rows)"""
+    schemas = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("{"):
+                schemas.append(json.loads(line))
+    return schemas
+
+
+def iter_rows(path: str):
+    """yield (schema, None) ที่ header ของแต่ละ table แล้ว (schema, row) ของทุก row ใน table นั้น"""
+    schema = None
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("{"):
+                schema = json.loads(line)
+                yield schema, None
+            else:
+                yield schema, json.loads(line)
+
+
+def create_table_ddl(schema: dict) -> str:
+    key  = schema["primary_key"]
+    cols = ",\n  ".join(
+        f"{name} {typ}{' NOT NULL' if name in key else ''}" for name, typ in schema["columns"])
+    return f"CREATE TABLE {schema['table']} (\n  {cols}\n) PRIMARY KEY ({', '.join(key)})"
+
+
+# ======================================================
+# SEED
+# ======================================================
+def _emulator_client(project: str):
+    if not os.environ.get(EMULATOR_ENV):
+        raise RuntimeError(f"ไม่ได้ตั้ง {EMULATOR_ENV} — จะไม่ seed ลง Spanner จริง")
+    return spanner_client._import_spanner().Client(project=project)
+
+
+def _ensure_instance(client, project: str, instance_id: str):
+    instance = client.instance(
+        instance_id,
+        configuration_name=f"projects/{project}/instanceConfigs/emulator-config",
+        display_name=instance_id, node_count=1)
+    if not instance.exists():
+        instance.create().result(120)
+    return instance
+
+
+def seed_snapshot(path: str = DEFAULT_SNAPSHOT, project: str = PROJECT,
+                  instance_id: str = INSTANCE) -> dict:
+    """
+    สร้าง database ทุกตัวใน snapshot ใหม่ (drop ของเดิม) แล้ว insert rows
+    ทีละ batch (≤ MUTATIONS_PER_BATCH cells ต่อ commit) — คืนสถิติการ seed
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"ไม่พบ Spanner snapshot: {path}\n"
+            "  อัดจาก Spanner จริงด้วย: python -m qa_common.spanner_emulator export")
+
+    t0 = time.perf_counter()
+    client   = _emulator_client(project)
+    instance = _ensure_instance(client, project, instance_id)
+
+    ddl: dict = {}
+    for schema in read_schemas(path):
+        ddl.setdefault(schema["database"], []).append(create_table_ddl(schema))
+    databases = {}
+    for name, statements in ddl.items():
+        db = instance.database(name, ddl_statements=statements)
+        if db.exists():
+            db.drop()
+        db.create().result(300)
+        databases[name] = db
+
+    stats = {"databases": len(databases), "tables": 0, "rows": 0, "batches": 0}
+    table = chunk = None
+
+    def flush():
+        if chunk:
+            _insert(databases[table["database"]], table["table"], columns, chunk)
+            stats["rows"] += len(chunk)
+            stats["batches"] += 1
+
+    for schema, row in iter_rows(path):
+        if row is None:                     # header ของ table ถัดไป
+            flush()
+            table, chunk = schema, []
+            columns   = [name for name, _ in schema["columns"]]
+            decoders  = [_decoder(typ) for _, typ in schema["columns"]]
+            per_batch = max(MUTATIONS_PER_BATCH // max(len(columns), 1), 1)
+            stats["tables"] += 1
+            continue
+        chunk.append([dec(v) for dec, v in zip(decoders, row)])
+        if len(chunk) >= per_batch:
+            flush()
+            chunk = []
+    flush()
+
+    close = getattr(client, "close", None)
+    if close:
+        close()
+    spanner_client.close_all()      # handle ที่เปิดไว้ก่อนหน้า (ถ้ามี) → เปิดใหม่ผ่าน emulator
+    stats["seconds"] = round(time.perf_counter() - t0, 2)
+    return stats
+
+
+def _insert(db, table: str, columns: list, values: list):
+    with db.batch() as batch:
+        batch.insert(table=table, columns=columns, values=values)
+
+
+# ======================================================
+# EXPORT (จาก Spanner จริง)
+# ======================================================
+def referenced_tables() -> list:
+    """mst_* ทุกตัวที่ src/*.sql และ src/*.py อ้างถึง"""
+    names = set()
+    for path in glob.glob(os.path.join(ROOT_DIR, "src", "*.sql")) + \
+            glob.glob(os.path.join(ROOT_DIR, "src", "*.py")):
+        with open(path, "r", encoding="utf-8") as f:
+            names.update(re.findall(r"\bmst_\w+", f.read()))
+    return sorted(names)
+
+
+def _table_schemas(project: str, instance_id: str, database: str, tables: list) -> list:
+    from google.cloud.spanner_v1 import param_types
+
+    params, types = {"tables": tables}, {"tables": param_types.Array(param_types.STRING)}
+    cols = spanner_client.query_rows(project, instance_id, database, """
+SELECT TABLE_NAME, COLUMN_NAME, SPANNER_TYPE
+FROM INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_SCHEMA = '' AND TABLE_NAME IN UNNEST(@tables) AND IS_GENERATED = 'NEVER'
+ORDER BY TABLE_NAME, ORDINAL_POSITION
+""", params, types)
+    keys = spanner_client.query_rows(project, instance_id, database, """
+SELECT TABLE_NAME, COLUMN_NAME
+FROM INFORMATION_SCHEMA.INDEX_COLUMNS
+WHERE TABLE_SCHEMA = '' AND INDEX_TYPE = 'PRIMARY_KEY' AND TABLE_NAME IN UNNEST(@tables)
+ORDER BY TABLE_NAME, ORDINAL_POSITION
+""", params, types)
+
+    schemas: dict = {}
+    for c in cols:
+        s = schemas.setdefault(c["TABLE_NAME"], {"database": database, "table": c["TABLE_NAME"],
+                                                 "columns": [], "primary_key": []})
+        s["columns"].append([c["COLUMN_NAME"], c["SPANNER_TYPE"]])
+    for k in keys:
+        if k["TABLE_NAME"] in schemas:
+            schemas[k["TABLE_NAME"]]["primary_key"].append(k["COLUMN_NAME"])
+    return [schemas[t] for t in sorted(schemas)]
+
+
+def export_snapshot(path: str = DEFAULT_SNAPSHOT, project: str = PROJECT, instance_id: str = INSTANCE,
+                    databases=DATABASES, tables: list = None, limit: int = None) -> dict:
+    """เขียน snapshot ของ tables (default: referenced_tables()) จากทุก database ที่มี table นั้น"""
+    tables = tables or referenced_tables()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    stats = {"tables": 0, "rows": 0}
+    with gzip.open(path, "wt", encoding="utf-8") as out:
+        for database in databases:
+            db = spanner_client.get_database(project, instance_id, database)
+            for schema in _table_schemas(project, instance_id, database, tables):
+                out.write(json.dumps(schema, ensure_ascii=False) + "\n")
+                columns = ", ".join(name for name, _ in schema["columns"])
+                sql = f"SELECT {columns} FROM {schema['table']}" + (f" LIMIT {int(limit)}" if limit else "")
+                with db.snapshot() as snap:
+                    for row in snap.execute_sql(sql):
+                        out.write(json.dumps(_encode(list(row)), ensure_ascii=False,
+                                             separators=(",", ":")) + "\n")
+                        stats["rows"] += 1
+                stats["tables"] += 1
+                print(f"  📦 {database}.{schema['table']}")
+    return stats
+
+
+# ======================================================
+# CLI
+# ======================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Spanner emulator snapshot: export / seed")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export", help="อัด snapshot จาก Spanner จริง")
+    ex.add_argument("--out",    default=DEFAULT_SNAPSHOT)
+    ex.add_argument("--limit",  type=int, help="rows สูงสุดต่อ table")
+    ex.add_argument("--tables", help="comma-separated (default: mst_* ที่ src/ อ้างถึง)")
+    sd = sub.add_parser("seed", help="seed emulator (เปิดใหม่ถ้าไม่ได้ตั้ง SPANNER_EMULATOR_HOST)")
+    sd.add_argument("--snapshot", default=DEFAULT_SNAPSHOT)
+    args = ap.parse_args()
+
+    if args.cmd == "export":
+        if os.environ.get(EMULATOR_ENV):
+            sys.exit(f"❌ ตั้ง {EMULATOR_ENV} ไว้ — export ต้องอ่านจาก Spanner จริง")
+        tables = [t for t in (args.tables or "").split(",") if t] or None
+        s = export_snapshot(args.out, tables=tables, limit=args.limit)
+        print(f"✅ {s['rows']} rows / {s['tables']} tables → {args.out}")
+    else:
+        proc = start_emulator()
+        s = seed_snapshot(args.snapshot)
+        print(f"✅ seeded {s['rows']} rows / {s['tables']} tables ({s['batches']} batches)"
+              f" in {s['seconds']} s → {os.environ[EMULATOR_ENV]}")
+        if proc is not None:
+            print("   emulator ยังรันอยู่ — Ctrl+C เพื่อปิด")
+            try:
+                proc.wait()
+            except KeyboardInterrupt:
+                stop_emulator(proc)
@@ -0,0 +1,171 @@
+"""
+spanner_verify.py — ตรวจ ID กับ Spanner แบบ batch + cache ผลต่อ ID ทั้ง session
+
+compare_with_spanner(label, api_ids) ของทุก module เดิมยิง query ใหม่ทุก label
+ทั้งที่หลาย label ได้ ID ชุดเดียวกัน (เช่น limit 50 ⊂ limit 100, language th/en ซ้ำกัน)
+
+IdVerifier ต่อ "source" (table หรือ SQL template เดียวกันใน database เดียวกัน) = cache ผลต่อ ID:
+  - ID ที่เคยตรวจแล้วใน session (จาก label ไหนก็ได้) → ตอบจาก cache (มี / ไม่มี)
+  - ID ของ label ที่ยังไม่เคยตรวจ → query ทีเดียวต่อ label
+    แบ่ง chunk ละ QA_SPANNER_CHUNK_SIZE ตัว (array ใน IN UNNEST ไม่ใหญ่เกิน limit ของ Spanner)
+    (ไม่ได้รวม ID ข้าม label เอง — ถ้ารู้ ID ของหลาย label ล่วงหน้า เรียก prefetch(union) ก่อนได้)
+  - query ยิงนอก lock: label อื่นไม่ต้องรอ network ของกันและกัน
+    ID ที่อีก thread กำลัง query อยู่ → รอผลของ thread นั้น (ไม่ query ซ้ำ)
+  - ผลต่อ label ยังคำนวณจาก api_ids ของ label นั้น → only_api / only_spanner เหมือนเดิม
+
+ใช้ได้เพราะ SQL ที่ใช้ตรวจเป็น predicate ต่อ row (ID ผ่าน / ไม่ผ่าน ไม่ขึ้นกับ ID อื่นใน list)
+
+source แบบ table (project, instance, database, "mst_*") + QA_ID_SNAPSHOT=1 (qa_common.id_snapshot)
+→ default: ทุก ID ยังยืนยันกับ Spanner — snapshot ใช้แค่นับ ID ที่ snapshot ตอบต่างจาก Spanner (stale)
+→ + QA_ID_SNAPSHOT_TRUST=1: ID ที่ snapshot บอกว่ามี ตอบเลย (ยอมรับว่า ID ที่ถูกลบหลัง export ผ่านได้)
+  ID ที่ snapshot บอกว่าไม่มี / ยืนยันไม่ได้ → query Spanner เสมอ (snapshot อาจเก่ากว่า row ที่เพิ่มใหม่)
+
+Usage (ใน compare_with_spanner):
+    sp_ids = verified_ids((SP_PROJECT, SP_INSTANCE, SP_DATABASE, "mst_sfv_nonprod"),
+                          api_ids, build_existence_sql, query_spanner)
+"""
+
+import os
+import threading
+from typing import Callable, Hashable, Iterable
+
+from qa_common import id_snapshot
+
+CHUNK_SIZE = int(os.environ.get("QA_SPANNER_CHUNK_SIZE", "1000"))
+
+
+class IdVerifier:
+    """cache ผลตรวจต่อ ID ของ source หนึ่ง (thread-safe)"""
+
+    def __init__(self, build_sql: Callable[[list], str], run_query: Callable[[str], list],
+                 chunk_size: int = CHUNK_SIZE, local: "id_snapshot.IdSnapshot" = None,
+                 trust_local: bool = None):
+        self.build_sql  = build_sql
+        self.run_query  = run_query
+        self.chunk_size = chunk_size
+        self.local      = local       # ID snapshot ของ table (None = ไม่มี snapshot)
+        self.trust_local = id_snapshot.TRUST_PRESENT if trust_local is None else trust_local
+        self._known: dict = {}       # id → True (มีใน Spanner) / False
+        self._inflight: dict = {}    # id → threading.Event ของ prefetch ที่กำลัง query ID นั้น
+        self._lock = threading.Lock()
+        self.queries   = 0
+        self.checked   = 0           # ID ที่ส่งไป query จริง
+        self.cache_hit = 0           # ID ที่ตอบจาก cache
+        self.local_hit = 0           # ID ที่ตอบจาก ID snapshot (มี — เฉพาะ trust_local)
+        self.reconfirmed = 0         # ID ที่ snapshot ตอบแล้วส่งไปยืนยันกับ Spanner
+        self.stale = 0               # ID ที่ snapshot ตอบต่างจาก Spanner
+
+    def _lookup(self, pending: list) -> dict:
+        """ตรวจ pending (snapshot แล้ว Spanner) — เรียกนอก lock, คืน {id: มี / ไม่มี}"""
+        known, local_hit, reconfirmed, queries = {}, 0, 0, 0
+        local = {}                   # id → คำตอบของ snapshot (ไว้เทียบกับ Spanner)
+        if self.local is not None and pending:
+            present, absent, unknown = self.local.classify(pending)
+            local.update(dict.fromkeys(absent, False))
+            if self.trust_local:
+                # ยอมรับความเก่าของ snapshot: "มี" ตอบในเครื่อง — "ไม่มี" ยังต้องยืนยันก่อนรายงานว่าหาย
+                known.update(dict.fromkeys(present, True))
+                local_hit = len(present)
+                pending = absent + unknown
+            else:
+                local.update(dict.fromkeys(present, True))
+            reconfirmed = len(local)
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = pending[start:start + self.chunk_size]
+            query = self.build_sql(chunk)
+            # build_sql คืน SQL string หรือ (sql, params, param_types) จาก qa_common.sql_template
+            found = set(self.run_query(*query) if isinstance(query, tuple) else self.run_query(query))
+            known.update((i, i in found) for i in chunk)
+            queries += 1
+        stale = sum(1 for i, in_local in local.items() if known[i] != in_local)
+        with self._lock:
+            self.local_hit   += local_hit
+            self.reconfirmed += reconfirmed
+            self.stale       += stale
+            self.queries     += queries
+            self.checked     += len(pending)
+        return known
+
+    def prefetch(self, ids: Iterable[str]):
+        """ตรวจ ID ที่ยังไม่รู้ผลล่วงหน้า (รวมหลาย label แล้วเรียกทีเดียวได้)"""
+        with self._lock:
+            unique  = list(dict.fromkeys(ids))
+            waiting = {self._inflight[i] for i in unique if i in self._inflight}
+            pending = [i for i in unique if i not in self._known and i not in self._inflight]
+            done = threading.Event()
+            for i in pending:
+                self._inflight[i] = done
+        try:
+            known = self._lookup(pending) if pending else {}
+            with self._lock:
+                self._known.update(known)
+        finally:
+            with self._lock:
+                for i in pending:
+                    self._inflight.pop(i, None)
+            done.set()
+        for event in waiting:
+            event.wait()
+
+    def found(self, ids: Iterable[str]) -> list:
+        """คืน ID ที่มีใน Spanner (ไม่ซ้ำ, ลำดับตาม input)"""
+        unique = list(dict.fromkeys(ids))
+        with self._lock:
+            self.cache_hit += sum(1 for i in unique if i in self._known)
+        self.prefetch(unique)
+        missing = [i for i in unique if i not in self._known]
+        while missing:                           # query ของ thread อื่นที่รออยู่ล้มเหลว → ตรวจเอง
+            self.prefetch(missing)
+            missing = [i for i in missing if i not in self._known]
+        return [i for i in unique if self._known[i]]
+
+    def stats(self) -> dict:
+        return {"queries": self.queries, "checked": self.checked, "cache_hit": self.cache_hit,
+                "local_hit": self.local_hit, "reconfirmed": self.reconfirmed, "stale": self.stale,
+                "known": len(self._known)}
+
+
+# ======================================================
+# REGISTRY (ต่อ session)
+# ======================================================
+_verifiers: dict = {}
+_registry_lock = threading.Lock()
+
+
+def get_verifier(source: Hashable, build_sql: Callable[[list], str],
+                 run_query: Callable[[str], list]) -> IdVerifier:
+    """
+    source = key ที่ระบุ query เดียวกัน เช่น (project, instance, database, table)
+    ครั้งแรกของ source จะจำ build_sql / run_query ไว้ใช้ตลอด session
+    """
+    v = _verifiers.get(source)
+    if v is None:
+        with _registry_lock:
+            v = _verifiers.get(source)
+            if v is None:
+                v = _verifiers[source] = IdVerifier(build_sql, run_query,
+                                                    local=id_snapshot.lookup(source))
+    return v
+
+
+def verified_ids(source: Hashable, ids: list, build_sql: Callable[[list], str],
+                 run_query: Callable[[str], list]) -> list:
+    """ID ใน ids ที่ผ่าน query ของ source (ใช้ผลที่ cache ไว้ก่อน, ที่เหลือ query แบบ batch)"""
+    return get_verifier(source, build_sql, run_query).found(ids)
+
+
+def stats() -> dict:
+    """รวม stats ทุก source — ใช้ใน conftest summary"""
+    total = {"sources": len(_verifiers), "queries": 0, "checked": 0, "cache_hit": 0, "local_hit": 0,
+             "reconfirmed": 0, "stale": 0}
+    for v in list(_verifiers.values()):
+        s = v.stats()
+        for k in ("queries", "checked", "cache_hit", "local_hit", "reconfirmed", "stale"):
+            total[k] += s[k]
+    total["snapshots"] = id_snapshot.stats()
+    return total
+
+
+def clear():
+    with _registry_lock:
+        _verifiers.clear()
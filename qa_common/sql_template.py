@@ -0,0 +1,212 @@
+"""
+sql_template.py — โหลด .sql template แล้วแปลง p_* ใน Params CTE เป็น @param bindings
+
+เดิม inject_ids() อ่านไฟล์ทุกครั้ง แล้ว string-replace
+    CAST([] AS ARRAY<STRING>) AS p_id_list  →  CAST(['id1','id2',...] AS ARRAY<STRING>) AS p_id_list
+และ regex LIMIT 10 → LIMIT <n>
+→ SQL text ไม่ซ้ำกันเลยสักครั้ง: Spanner ต้อง parse / plan ใหม่ทุก query และยาวขึ้นตามจำนวน ID
+
+load_template(path):
+  - parse Params CTE ครั้งเดียวต่อไฟล์ (cache ตาม path + mtime)
+  - field ที่เป็น scalar / ARRAY<scalar>  →  @p_xxx AS p_xxx  (type + default จาก expression เดิม)
+  - field ที่ bind ไม่ได้ (เช่น ARRAY<STRUCT<...>>) คง literal เดิมไว้
+  - LIMIT 10 (ค่าที่ไฟล์ hardcode ไว้)  →  LIMIT @row_limit
+  - bind(**values) → (sql, params, param_types) — SQL text เดิมทุกครั้ง → reuse query plan
+
+Usage:
+    sql, params, types = load_template(SQL_STANDARD).bind(p_id_list=ids, row_limit=1000)
+    query_ids(SP_PROJECT, SP_INSTANCE, SP_DATABASE, sql, params, types)
+"""
+
+import os
+import re
+import threading
+
+ROW_LIMIT_PARAM   = "row_limit"
+_TEMPLATE_LIMIT   = re.compile(r"\bLIMIT\s+10\b")
+_PARAMS_CTE       = re.compile(r"\bParams\s+AS\s*\(\s*SELECT\b", re.IGNORECASE)
+_ITEM             = re.compile(r"^(?P<expr>.+?)\s+AS\s+(?P<name>p_\w+)$", re.IGNORECASE | re.DOTALL)
+_CAST_EMPTY_ARRAY = re.compile(r"^CAST\(\s*\[\s*\]\s+AS\s+ARRAY<\s*(\w+)\s*>\s*\)$", re.IGNORECASE)
+_CAST_NULL        = re.compile(r"^CAST\(\s*NULL\s+AS\s+(\w+)\s*\)$", re.IGNORECASE)
+
+SCALAR_TYPES = ("STRING", "INT64", "FLOAT64", "BOOL", "TIMESTAMP", "DATE", "NUMERIC", "BYTES", "JSON")
+
+
+class SqlTemplateError(ValueError):
+    """ไฟล์ .sql ไม่มี Params CTE ที่ parse ได้"""
+
+
+# ======================================================
+# PARSE Params CTE
+# ======================================================
+def _split_items(sql: str, start: int):
+    """
+    แยก item ใน SELECT ของ Params CTE ตาม comma ที่ depth 0
+    คืน (items, end) — items = [(expr_start, expr_text_ดิบ)], end = ตำแหน่ง ')' ที่ปิด CTE
+    ข้าม '...' string และ -- comment
+    """
+    items, depth, i, item_start = [], 0, start, start
+    n = len(sql)
+    while i < n:
+        c = sql[i]
+        if c == "'":
+            i += 1
+            while i < n and sql[i] != "'":
+                i += 2 if sql[i] == "\\" else 1
+        elif c == "-" and sql.startswith("--", i):
+            nl = sql.find("\n", i)
+            i = n if nl < 0 else nl
+            continue
+        elif c in "([":
+            depth += 1
+        elif c in ")]":
+            if depth == 0:
+                items.append((item_start, sql[item_start:i]))
+                return items, i
+            depth -= 1
+        elif c == "," and depth == 0:
+            items.append((item_start, sql[item_start:i]))
+            item_start = i + 1
+        i += 1
+    raise SqlTemplateError("Params CTE ไม่มีวงเล็บปิด")
+
+
+def _strip_comments(text: str) -> str:
+    return re.sub(r"--[^\n]*", "", text)
+
+
+def _infer(expr: str):
+    """คืน (type, default) ของ expression ใน Params — None ถ้า bind ไม่ได้"""
+    m = _CAST_EMPTY_ARRAY.match(expr)
+    if m and m.group(1).upper() in SCALAR_TYPES:
+        return f"ARRAY<{m.group(1).upper()}>", []
+    m = _CAST_NULL.match(expr)
+    if m and m.group(1).upper() in SCALAR_TYPES:
+        return m.group(1).upper(), None
+    if re.fullmatch(r"'(?:[^'\\]|\\.)*'", expr):
+        return "STRING", expr[1:-1].replace("\\'", "'")
+    if expr.upper() in ("TRUE", "FALSE"):
+        return "BOOL", expr.upper() == "TRUE"
+    if re.fullmatch(r"-?\d+", expr):
+        return "INT64", int(expr)
+    if re.fullmatch(r"-?\d+\.\d*", expr):
+        return "FLOAT64", float(expr)
+    return None
+
+
+# ======================================================
+# TEMPLATE
+# ======================================================
+class SqlTemplate:
+    """SQL ที่เตรียมไว้แล้ว + type / default ของทุก @param"""
+
+    def __init__(self, path: str, raw: str):
+        self.path = path
+        self.types:    dict = {}     # name → "STRING" / "ARRAY<STRING>" / ...
+        self.defaults: dict = {}
+        self.literal:  list = []     # p_* ที่คง literal ไว้ (bind ไม่ได้)
+
+        m = _PARAMS_CTE.search(raw)
+        if m is None:
+            raise SqlTemplateError(f"ไม่พบ Params CTE ใน {path}")
+        items, _ = _split_items(raw, m.end())
+
+        replacements = []
+        for item_start, text in items:
+            expr_text = _strip_comments(text).strip()
+            im = _ITEM.match(expr_text)
+            if im is None:
+                continue
+            name, expr = im.group("name"), im.group("expr").strip()
+            inferred = _infer(expr)
+            if inferred is None:
+                self.literal.append(name)
+                continue
+            self.types[name], self.defaults[name] = inferred
+            # ตำแหน่ง expr ใน raw (ข้าม comment / whitespace นำหน้า)
+            offset = text.find(expr)
+            if offset < 0:
+                raise SqlTemplateError(f"{path}: หา expression ของ {name} ไม่เจอ")
+            replacements.append((item_start + offset, item_start + offset + len(expr), f"@{name}"))
+
+        sql = raw
+        for start, end, new in sorted(replacements, reverse=True):
+            sql = sql[:start] + new + sql[end:]
+
+        if _TEMPLATE_LIMIT.search(sql):
+            sql = _TEMPLATE_LIMIT.sub(f"LIMIT @{ROW_LIMIT_PARAM}", sql)
+            self.types[ROW_LIMIT_PARAM], self.defaults[ROW_LIMIT_PARAM] = "INT64", 10
+
+        self.sql = sql
+        self._spanner_types = None
+
+    def bind(self, **values) -> tuple:
+        """คืน (sql, params, param_types) — ค่าไม่ได้ระบุใช้ default จากไฟล์"""
+        unknown = set(values) - self.types.keys()
+        if unknown:
+            raise KeyError(f"{os.path.basename(self.path)}: ไม่มี parameter {sorted(unknown)}")
+        if self._spanner_types is None:
+            self._spanner_types = spanner_param_types(self.types)
+        params = {**self.defaults, **values}
+        return self.sql, params, self._spanner_types
+
+
+_templates: dict = {}
+_lock = threading.Lock()
+
+
+def load_template(path: str) -> SqlTemplate:
+    """SqlTemplate ของไฟล์ (parse ครั้งเดียว, โหลดใหม่เมื่อไฟล์ถูกแก้)"""
+    path  = os.path.abspath(path)
+    mtime = os.path.getmtime(path)
+    cached = _templates.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        tpl = SqlTemplate(path, f.read())
+    with _lock:
+        _templates[path] = (mtime, tpl)
+    return tpl
+
+
+# ======================================================
+# EXISTENCE QUERY
+# ======================================================
+_existence_sql: dict = {}
+
+
+def existence_query(table: str, ids: list, column: str = "id") -> tuple:
+    """SELECT id FROM <table> WHERE id IN UNNEST(@ids) — คืน (sql, params, param_types)"""
+    sql = _existence_sql.get((table, column))
+    if sql is None:
+        sql = _existence_sql[(table, column)] = (
+            f"\nSELECT {column}\nFROM {table}\nWHERE {column} IN UNNEST(@ids)\n"
+        )
+    return sql, {"ids": list(ids)}, spanner_param_types({"ids": "ARRAY<STRING>"})
+
+
+# ======================================================
+# SPANNER param_types
+# ======================================================
+_type_cache: dict = {}
+
+
+def spanner_param_types(types: dict) -> dict:
+    """แปลง {"p_id_list": "ARRAY<STRING>"} → google.cloud.spanner_v1.param_types"""
+    try:
+        from google.cloud.spanner_v1 import param_types as pt
+    except ImportError:
+        raise RuntimeError(
+            "ไม่พบ google-cloud-spanner กรุณารัน:\n"
+            "  pip install google-cloud-spanner --break-system-packages"
+        )
+
+    def convert(name: str):
+        if name not in _type_cache:
+            if name.startswith("ARRAY<"):
+                _type_cache[name] = pt.Array(getattr(pt, name[6:-1]))
+            else:
+                _type_cache[name] = getattr(pt, name)
+        return _type_cache[name]
+
+    return {k: convert(v) for k, v in types.items()}
@@ -7,6 +7,12 @@
 #   ./run_metadata_tests.sh -k "privilege"       # กรองเฉพาะ privilege tests
 #   ./run_metadata_tests.sh -k "sfv and not sfvseries"
 #   ./run_metadata_tests.sh src/test_gameitem_parameters.py
+#   ./run_metadata_tests.sh --spanner-emulator   # Spanner checks กับ emulator (seed จาก fixtures/spanner_snapshot.jsonl.gz)
+#   QA_DERIVE=1 QA_DERIVE_VERIFY=1 ./run_metadata_tests.sh  # derive จาก query ที่ใหญ่กว่า (ค่าตั้งต้นปิด) + ยิงจริงเทียบทุกตัว
+#   QA_HOST_LIMITS="ai-metadata-service=8:20" ./run_metadata_tests.sh  # in-flight:rps ต่อ host (qa_common/host_limiter.py)
+#
+#   python -m qa_common.metadata_service         # ทุก service พร้อมกันใน process เดียว (ไม่ผ่าน pytest, ไม่มี evidence)
+#   python -m qa_common.pairwise_explorer sfv    # ยิง combination ของ parameter แบบ pairwise + ตรวจ invariants / latency outliers
 #
 # Output:
 #   src/results/junit_report.xml    ← import Xray UI (Test Execution)
@@ -16,9 +16,15 @@ Usage:
 """
 
 import json
-import subprocess
+import os
 import sys
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.http_client import post_json
+
 # ======================================================
 # CONFIG
 # ======================================================
@@ -50,24 +56,10 @@ REQUEST_BODY = {
 # ======================================================
 def fetch_response():
     print("🚀 กำลังยิง API...")
-    curl_cmd = [
-        "curl", "--location", "--silent",
-        API_URL,
-        "--header", "Content-Type: application/json",
-        "--data", json.dumps(REQUEST_BODY)
-    ]
-
-    result = subprocess.run(curl_cmd, capture_output=True, text=True, timeout=60)
-
-    if result.returncode != 0:
-        print(f"❌ curl error: {result.stderr}")
-        sys.exit(1)
-
     try:
-        response = json.loads(result.stdout)
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON parse error: {e}")
-        print(f"Raw (500 chars): {result.stdout[:500]}")
+        response = post_json(API_URL, REQUEST_BODY, timeout=60)
+    except RuntimeError as e:
+        print(f"❌ {e}")
         sys.exit(1)
 
     print("✅ API response OK")
@@ -1,11 +1,18 @@
 import json
 import time
-import requests
 import os
+import sys
 import csv
 from datetime import datetime
 from collections import Counter
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.json_extract import extract_nodes
+from qa_common.request_policy import TransportError, fetch, summarize as summarize_transport
+
 # ===================== CONFIG =====================
 PLACEMENTS = [
     {
@@ -30,7 +37,7 @@ START_CURSOR = 1
 CURSOR_STEP = 1
 MAX_CURSORS = 500
 
-TIMEOUT_SEC = 20
+# timeout / retry / hedge ต่อ request: qa_common.request_policy (deadline ต่อ endpoint)
 SLEEP_SEC = 0.05
 
 FAIL_FAST_ON_INTRA_DUP = True
@@ -114,14 +121,34 @@ def extract_candidate_pin_global_ids(j: dict):
     return [x for x in ids if isinstance(x, str) and x]
 
 
+# node ที่ check ใช้ — parse เฉพาะ subtree เหล่านี้ (body ที่เหลือไม่ถูกสร้างเป็น dict)
+WANTED_NODES = {"merge_page", "candidate_pin_global"}
+
+
+def parse_full(body: bytes):
+    try:
+        return json.loads(body)
+    except Exception:
+        return {"_raw": body.decode("utf-8", errors="replace")}
+
+
 def fetch_json(base_url: str, cursor: int):
+    """
+    คืน (status, nodes, url, body, transport)
+    nodes = {node_name: node} เฉพาะ WANTED_NODES → memory ต่อ cursor คงที่แม้ MAX_CURSORS=500
+    body  = raw bytes ไว้ dump ตอน error (ทิ้งไปพร้อม iteration)
+    transport = attempt / retry / hedge ของ request นี้ (qa_common.request_policy)
+    """
     url = build_url(base_url, cursor)
-    r = requests.get(url, timeout=TIMEOUT_SEC)
+    # cursor walk อัปเดต seen items ของ ga_id ฝั่ง server → ไม่ idempotent (ไม่ hedge / ไม่ยิงซ้ำหลัง timeout)
+    r, transport = fetch(url)
+    if r.status_code != 200:
+        return r.status_code, parse_full(r.content), url, r.content, transport
     try:
-        j = r.json()
-    except Exception:
+        j = extract_nodes(r.content, WANTED_NODES)
+    except ValueError:
         j = {"_raw": r.text}
-    return r.status_code, j, url
+    return r.status_code, j, url, r.content, transport
 
 
 def tc01_intra_cursor_no_duplicate(ids):
@@ -167,14 +194,27 @@ def run_check(placement: dict, max_cursors: int = 10) -> dict:
     seen = {}
     cross_duplicates = []
     logs = []
+    transports = []   # transport record ต่อ cursor (retry / hedge) — แยกจากผลของ check
 
     cursor = START_CURSOR
     first_error = None
+    transport_failed = False   # ไม่ได้ response ภายใน deadline → ERROR (ไม่ใช่ผลของ check)
 
     tlog(f"START run_check placement={name} max_cursors={max_cursors}")
 
     for i in range(max_cursors):
-        status, j, url = fetch_json(base_url, cursor)
+        try:
+            status, j, url, body, transport = fetch_json(base_url, cursor)
+        except TransportError as e:
+            first_error = f"transport error at cursor={cursor}: {e}"
+            transport_failed = True
+            transports.append(e.transport)
+            tlog(first_error)
+            break
+        transports.append(transport)
+        if transport["tail_hit"]:
+            tlog(f"TRANSPORT cursor={cursor} retries={transport['retries']} hedges={transport['hedges']} "
+                 f"hedge_won={transport['hedge_won']} elapsed={transport['elapsed_ms']}ms")
         tlog(f"FETCH cursor={cursor} status={status} url={url}")
 
         cursor_entry = {
@@ -190,6 +230,7 @@ def run_check(placement: dict, max_cursors: int = 10) -> dict:
             "tc01_intra_dup_count": 0,
             "tc01_intra_dup_sample": [],
             "error": None,
+            "transport": transport,
         }
 
         if status != 200:
@@ -208,7 +249,7 @@ def run_check(placement: dict, max_cursors: int = 10) -> dict:
                 first_error = f"merge_page empty at cursor={cursor}"
                 cursor_entry["error"] = first_error
                 logs.append(cursor_entry)
-                dump_json(os.path.join(art_dir, f"debug_empty_cursor_{cursor}.json"), j)
+                dump_json(os.path.join(art_dir, f"debug_empty_cursor_{cursor}.json"), parse_full(body))
                 tlog(first_error)
             else:
                 tlog(f"STOP no merge_page items at cursor={cursor}")
@@ -291,6 +332,7 @@ def run_check(placement: dict, max_cursors: int = 10) -> dict:
             "cross_duplicates_sample": cross_duplicates[:20],
             "first_error": first_error,
         },
+        "transport": summarize_transport(transports),
         "cursor_results": logs,
     }
 
@@ -306,7 +348,7 @@ def run_check(placement: dict, max_cursors: int = 10) -> dict:
         status = "FAIL"
     elif ENABLE_CROSS_CURSOR_CHECK and cross_duplicates:
         status = "FAIL"
-    elif not logs:
+    elif not logs or transport_failed:
         status = "ERROR"
 
     print(f"\n[{name}] {status}: cursors={len(logs)} intra_fail={len(tc01_failed)} cross_dups={len(cross_duplicates)}")
@@ -325,6 +367,7 @@ def run_check(placement: dict, max_cursors: int = 10) -> dict:
         "cross_duplicates_sample": cross_duplicates[:5],
         "cross_duplicates": cross_duplicates,
         "first_error": first_error,
+        "transport": summarize_transport(transports),
     }
 
 
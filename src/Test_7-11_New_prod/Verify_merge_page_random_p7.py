@@ -1,10 +1,16 @@
 import random
-import requests
 import json
 import os
+import sys
 from datetime import datetime
 from collections import Counter
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.request_policy import TransportError, fetch, summarize as summarize_transport
+
 # ===================== CONFIG =====================
 PLACEMENT = {
     "name": "sfv-p7",
@@ -29,7 +35,7 @@ GA_ID_PREFIX = "999999999"
 
 RUNS = 10
 TOP_K = 50
-TIMEOUT = 20
+# timeout / retry / hedge ต่อ request: qa_common.request_policy (deadline ต่อ endpoint)
 
 LAST_ID_KEYS   = [f"last_id_{i}"   for i in range(5)]   # last_id_0 … last_id_4
 LAST_TAGS_KEYS = [f"last_tags_{i}" for i in range(5)]   # last_tags_0 … last_tags_4
@@ -181,6 +187,7 @@ def run_check(placement: dict) -> dict:
     log(f"RUNS={RUNS}  TOP_K={TOP_K}  (unique ga_id per run)")
 
     run_lists          = []
+    transports         = []   # transport record ต่อ run (retry / hedge) — แยกจากผลของ check
     skipped_not_null   = 0   # runs ที่ user มี history → ข้าม
     null_confirmed_runs = 0  # runs ที่ผ่าน null-check
 
@@ -188,7 +195,12 @@ def run_check(placement: dict) -> dict:
         url, ga_id = _make_url(placement)
         log(f"RUN {i}  ga_id={ga_id}")
         try:
-            r    = requests.get(url, timeout=TIMEOUT)
+            # ga_id ใหม่ทุก run แต่ request แรกเขียน last_id ของ ga_id นั้น → ห้าม hedge / ยิงซ้ำหลัง timeout
+            r, transport = fetch(url)
+            transports.append(transport)
+            if transport["tail_hit"]:
+                log(f"  transport: retries={transport['retries']} hedges={transport['hedges']} "
+                    f"hedge_won={transport['hedge_won']} elapsed={transport['elapsed_ms']}ms")
             data = r.json()
 
             # ── step 1: ตรวจ last_id / last_tags ──────────────────
@@ -223,6 +235,9 @@ def run_check(placement: dict) -> dict:
             if ids:
                 run_lists.append(ids[:TOP_K])
 
+        except TransportError as e:
+            transports.append(e.transport)
+            log(f"ERROR: {e}")
         except Exception as e:
             log(f"ERROR: {e}")
 
@@ -234,6 +249,7 @@ def run_check(placement: dict) -> dict:
                 f"only {len(run_lists)} successful run(s) with null last_id/last_tags. "
                 f"skipped_not_null={skipped_not_null}"
             ),
+            "transport": summarize_transport(transports),
         }
 
     # ── similarity analysis ────────────────────────
@@ -287,6 +303,7 @@ def run_check(placement: dict) -> dict:
         "sticky_positions"     : sticky,
         "VERDICT"              : verdict,
         "fail_reasons"         : fail_reasons,
+        "transport"            : summarize_transport(transports),
     }
 
     # save outputs
@@ -294,7 +311,8 @@ def run_check(placement: dict) -> dict:
     write_csv(run_lists, csv_path)
 
     with open(json_path, "w") as f:
-        json.dump(summary, f, indent=2, ensure_ascii=False)
+        # transport_runs = attempt / retry / hedge ของแต่ละ run (ไม่มีผลต่อ VERDICT)
+        json.dump({**summary, "transport_runs": transports}, f, indent=2, ensure_ascii=False)
 
     log(f"RESULT = {summary}")
     return summary
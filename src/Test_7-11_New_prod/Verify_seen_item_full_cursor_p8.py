@@ -1,10 +1,17 @@
 import json
+import sys
 import time
 import requests
 import os
 from datetime import datetime
 from collections import deque
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.json_extract import RESULTS_PATH, extract_nodes
+
 # ===================== CONFIG =====================
 BASE_URL = (
     "http://ai-universal-service-711.prod-gcp-ai-bn.ai-platform.gcp.dmp.true.th/api/v1/universal/sfv-p6"
@@ -53,11 +60,8 @@ def dump_json(path: str, obj):
         json.dump(obj, f, ensure_ascii=False, indent=2)
 
 
-def extract_slice_pagination_ids(j: dict):
-    data = j.get("data", {}) if isinstance(j.get("data", {}), dict) else {}
-    results = data.get("results", {}) if isinstance(data.get("results", {}), dict) else {}
-
-    node = results.get("slice_pagination", {})
+def extract_slice_pagination_ids(nodes: dict):
+    node = nodes.get("slice_pagination", {})
     if not isinstance(node, dict):
         return []
 
@@ -72,11 +76,8 @@ def extract_slice_pagination_ids(j: dict):
     return [it["id"] for it in items if isinstance(it, dict) and it.get("id")]
 
 
-def extract_seen_ids(j: dict):
-    data = j.get("data", {}) if isinstance(j.get("data", {}), dict) else {}
-    results = data.get("results", {}) if isinstance(data.get("results", {}), dict) else {}
-
-    node = results.get("get_seen_item_redis", {})
+def extract_seen_ids(nodes: dict):
+    node = nodes.get("get_seen_item_redis", {})
     if not isinstance(node, dict):
         return []
 
@@ -94,14 +95,32 @@ def extract_seen_ids(j: dict):
     return out
 
 
+# node ที่ check ใช้ (data.results.<node>) — parse เฉพาะ subtree เหล่านี้ (body ที่เหลือไม่ถูกสร้างเป็น dict)
+WANTED_NODES = {"slice_pagination", "get_seen_item_redis"}
+
+
+def parse_full(body: bytes):
+    try:
+        return json.loads(body)
+    except Exception:
+        return {"_raw": body.decode("utf-8", errors="replace")}
+
+
 def fetch_json(cursor: int):
+    """
+    คืน (status, nodes, url, body)
+    nodes = {node_name: node} เฉพาะ WANTED_NODES → memory ต่อ cursor คงที่
+    body  = raw bytes ไว้ dump (error / response แรก)
+    """
     url = build_url(cursor)
     r = requests.get(url, timeout=TIMEOUT_SEC)
+    if r.status_code != 200:
+        return r.status_code, parse_full(r.content), url, r.content
     try:
-        j = r.json()
-    except Exception:
+        j = extract_nodes(r.content, WANTED_NODES, path=RESULTS_PATH)
+    except ValueError:
         j = {"_raw": r.text}
-    return r.status_code, j, url
+    return r.status_code, j, url, r.content
 
 
 def fifo_push_strict(queue: deque, incoming_ids: list, limit: int):
@@ -130,7 +149,7 @@ def run():
     cursor = START_CURSOR
 
     for step in range(MAX_CURSORS):
-        status, j, url = fetch_json(cursor)
+        status, j, url, body = fetch_json(cursor)
         tlog(f"\n[FETCH] cursor={cursor}")
 
         if status != 200:
@@ -139,7 +158,7 @@ def run():
             break
 
         if step == 0:
-            dump_json(f"first_response_cursor_{cursor}.json", j)
+            dump_json(f"first_response_cursor_{cursor}.json", parse_full(body))
 
         slice_ids = extract_slice_pagination_ids(j)
         seen_ids = extract_seen_ids(j)
@@ -13,12 +13,18 @@ Usage:
 """
 
 import json
-import subprocess
 import sys
 import os
 import warnings
 import logging
-import re
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.http_client import post_json
+from qa_common.spanner_client import query_ids
+from qa_common.sql_template import existence_query, load_template, spanner_param_types
 
 # ปิด Spanner telemetry warnings
 os.environ["SPANNER_ENABLE_BUILTIN_METRICS"] = "false"
@@ -43,22 +49,11 @@ SQL_STANDARD = os.path.join(SQL_DIR, "channel_main.sql")
 
 def inject_ids(sql_path, ids):
     """
-    อ่าน SQL file แล้ว inject IDs จาก API เข้าไปใน p_id_list
-    แทนที่:  CAST([] AS ARRAY<STRING>) AS p_id_list
-    ด้วย:    CAST(['id1','id2',...] AS ARRAY<STRING>) AS p_id_list
-    และแทน LIMIT 10 ด้วยจำนวน IDs ที่ inject เพื่อให้ได้ผลครบ
+    โหลด SQL template (parse Params CTE ครั้งเดียวต่อไฟล์ — qa_common.sql_template)
+    แล้ว bind IDs จาก API เข้า @p_id_list และ LIMIT @row_limit ตามจำนวน IDs เพื่อให้ได้ผลครบ
+    คืน (sql, params, param_types) — SQL text เดิมทุกชุด ID → Spanner reuse query plan ได้
     """
-    with open(sql_path, "r") as f:
-        sql = f.read()
-    id_array = "[" + ", ".join(f"'{i}'" for i in ids) + "]"
-    sql = sql.replace(
-        "CAST([] AS ARRAY<STRING>) AS p_id_list",
-        f"CAST({id_array} AS ARRAY<STRING>) AS p_id_list"
-    )
-    # แทน LIMIT hardcode ให้รองรับ IDs ทั้งหมดที่ inject
-    new_limit = max(len(ids), 1000)
-    sql = re.sub(r'\bLIMIT\s+10\b', f'LIMIT {new_limit}', sql)
-    return sql
+    return load_template(sql_path).bind(p_id_list=list(ids), row_limit=max(len(ids), 1000))
 
 
 # ======================================================
@@ -87,21 +82,10 @@ def fetch_api_response(request_body, label="API"):
     print(f"🚀 กำลังยิง Metadata API (channel) [{label}]...")
     print(f"📤 Request body [{label}]:")
     print(json.dumps(request_body, ensure_ascii=False, indent=2))
-    curl_cmd = [
-        "curl", "--location", "--silent",
-        API_URL,
-        "--header", "Content-Type: application/json",
-        "--data", json.dumps(request_body)
-    ]
-    result = subprocess.run(curl_cmd, capture_output=True, text=True, timeout=60)
-    if result.returncode != 0:
-        print(f"❌ curl error: {result.stderr}")
-        sys.exit(1)
     try:
-        response = json.loads(result.stdout)
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON parse error: {e}")
-        print(f"Raw (500 chars): {result.stdout[:500]}")
+        response = post_json(API_URL, request_body, timeout=60)
+    except RuntimeError as e:
+        print(f"❌ {e}")
         sys.exit(1)
     print(f"✅ API response OK [{label}]")
     return response
@@ -131,40 +115,18 @@ def get_hits_ids(response):
 # ======================================================
 def build_existence_check_sql(ids):
     """
-    SQL อย่างง่ายสำหรับเช็คว่า IDs จาก API มีอยู่ใน Spanner ไหม
+    SQL อย่างง่ายสำหรับเช็คว่า IDs จาก API มีอยู่ใน Spanner ไหม (IDs bind เป็น @ids)
     """
-    id_array = "[" + ", ".join(f"'{i}'" for i in ids) + "]"
-    return f"""
-SELECT id
-FROM mst_channel_nonprod
-WHERE id IN UNNEST(CAST({id_array} AS ARRAY<STRING>))
-"""
+    return existence_query("mst_channel_nonprod", ids)
 
 
-def query_spanner(sql):
+def query_spanner(sql, params=None, param_types=None):
     try:
-        from google.cloud import spanner
-    except ImportError:
-        print("❌ ไม่พบ google-cloud-spanner กรุณารัน:")
-        print("   pip install google-cloud-spanner --break-system-packages")
+        return query_ids(SP_PROJECT, SP_INSTANCE, SP_DATABASE, sql, params, param_types)
+    except RuntimeError as e:   # ไม่มี google-cloud-spanner
+        print(f"❌ {e}")
         sys.exit(1)
 
-    client   = spanner.Client(project=SP_PROJECT)
-    instance = client.instance(SP_INSTANCE)
-    database = instance.database(SP_DATABASE)
-
-    ids = []
-    seen = set()
-    with database.snapshot() as snapshot:
-        results = snapshot.execute_sql(sql)
-        for row in results:
-            row_dict = dict(zip([col.name for col in results.fields], row))
-            id_val = row_dict.get("id")
-            if id_val and id_val not in seen:
-                ids.append(id_val)
-                seen.add(id_val)
-    return ids
-
 
 # ======================================================
 # STEP 3: Compare
@@ -221,12 +183,16 @@ if __name__ == "__main__":
 
     # Step 2: Spanner — ลอง inject ผ่าน SQL file ก่อน ถ้าไม่มีไฟล์ใช้ existence check แทน
     print("\n🔍 Query Spanner...")
-    if os.path.exists(SQL_STANDARD):
-        print("  กำลัง query standard (via SQL file)...")
-        sp_standard = query_spanner(inject_ids(SQL_STANDARD, hits_ids))
-    else:
-        print(f"  ⚠️  ไม่พบ {SQL_STANDARD} — ใช้ existence check แทน")
-        sp_standard = query_spanner(build_existence_check_sql(hits_ids))
+    try:
+        if os.path.exists(SQL_STANDARD):
+            print("  กำลัง query standard (via SQL file)...")
+            sp_standard = query_spanner(*inject_ids(SQL_STANDARD, hits_ids))
+        else:
+            print(f"  ⚠️  ไม่พบ {SQL_STANDARD} — ใช้ existence check แทน")
+            sp_standard = query_spanner(*build_existence_check_sql(hits_ids))
+    except RuntimeError as e:   # ไม่มี google-cloud-spanner (แปลง param_types ไม่ได้)
+        print(f"❌ {e}")
+        sys.exit(1)
     print(f"  ✅ standard : {len(sp_standard)} IDs")
 
     # Step 3: Compare
@@ -272,27 +238,28 @@ if __name__ == "__main__":
         print("  ✅ ไม่มี IDs ที่หายจาก Spanner")
     else:
         print(f"  🔍 ตรวจสอบ {len(all_missing)} IDs ใน source table...")
-        id_array = "[" + ", ".join(f"'{i}'" for i in all_missing) + "]"
+        id_params = {"ids": all_missing}
+        id_types  = spanner_param_types({"ids": "ARRAY<STRING>"})   # ถึงตรงนี้ได้ = มี google-cloud-spanner แล้ว
 
         # เช็ค 1: มีในตารางไหม (ไม่มี filter ใดๆ)
-        sql_exists = f"""
+        sql_exists = """
 SELECT DISTINCT id
 FROM mst_channel_nonprod
-WHERE id IN UNNEST(CAST({id_array} AS ARRAY<STRING>))
+WHERE id IN UNNEST(@ids)
 """
         # เช็ค 2: ผ่าน business logic filters ไหม
-        sql_filtered = f"""
+        sql_filtered = """
 SELECT DISTINCT id
 FROM mst_channel_nonprod
-WHERE id IN UNNEST(CAST({id_array} AS ARRAY<STRING>))
+WHERE id IN UNNEST(@ids)
   AND status = 'publish'
   AND searchable = 'Y'
   AND publish_date <= CURRENT_TIMESTAMP()
   AND (expire_date IS NULL OR expire_date > TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 5 MINUTE))
   AND publish_date >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 30 DAY)
 """
-        found_in_source = query_spanner(sql_exists)
-        passed_filter   = query_spanner(sql_filtered)
+        found_in_source = query_spanner(sql_exists, id_params, id_types)
+        passed_filter   = query_spanner(sql_filtered, id_params, id_types)
 
         found_set    = set(found_in_source)
         passed_set   = set(passed_filter)
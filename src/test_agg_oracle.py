@@ -0,0 +1,203 @@
+"""
+test_agg_oracle.py
+
+Unit tests ของ qa_common.agg_oracle บน table สังเคราะห์ (ไม่ยิง network / Spanner)
+
+Test Cases:
+  1. top_k_per_group   — heap ต่อกลุ่ม = sort (score DESC, id ASC) ทั้งกลุ่มแล้วตัด limit (รวม score ซ้ำ)
+  2. expected_tophit   — src/sfv_agg_tophit.sql เทียบกับการกรอง + จัดกลุ่มทีละ row ใน Python
+  3. group_keys        — category กีฬารวมเป็น 'sports', ใช้สมาชิกตัวแรก, array ว่าง = None
+  4. api_bucket_ids    — อ่าน hits ตาม inner key ที่รู้จัก / auto-detect, ตัด id ซ้ำ
+  5. latest_n_per_group — rank ในกลุ่มตาม latest_order = sort (publish_date DESC, id ASC) แล้วตัด limit
+  6. expected_latest   — src/sfv_agg_latest.sql เทียบกับ brute force, latest_order sort ครั้งเดียวต่อ table
+"""
+
+import datetime
+import random
+import sys
+import os
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+np = pytest.importorskip("numpy")
+
+from qa_common.agg_oracle import (SPORTS_CATEGORIES, api_bucket_ids, diff_buckets, expected_latest,
+                                  expected_tophit, group_keys, latest_n_per_group, latest_order,
+                                  top_k_per_group)
+from qa_common.columnar import _build
+
+pytestmark = pytest.mark.unit
+
+SRC_DIR    = os.path.dirname(os.path.abspath(__file__))
+SQL_TOPHIT = os.path.join(SRC_DIR, "sfv_agg_tophit.sql")
+SQL_LATEST = os.path.join(SRC_DIR, "sfv_agg_latest.sql")
+NOW = datetime.datetime(2026, 1, 15, 12, 30, tzinfo=datetime.timezone.utc)
+
+SCHEMA = [
+    ("id", "STRING(MAX)"), ("status", "STRING(MAX)"), ("searchable", "STRING(MAX)"),
+    ("lang", "STRING(MAX)"), ("title", "STRING(MAX)"),
+    ("publish_date", "TIMESTAMP"), ("expire_date", "TIMESTAMP"),
+    ("article_category", "ARRAY<STRING(MAX)>"), ("most_popular", "JSON"),
+]
+CATEGORIES = ["nba", "tennis", "f1", "drama", "news", "series", None]
+
+
+def _make_rows(n: int = 800, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        plays = rng.choice([None, {}, {"PLAY_COUNT_DAY_14": rng.randrange(30)},
+                            {"PLAY_COUNT_DAY_14": rng.randrange(30), "PLAY_COUNT_DAY_30": 1}])
+        rows.append({
+            "id":           f"sfv-{rng.randrange(10 ** 6):06d}-{i:03d}",
+            "status":       rng.choice(["publish", "publish", "publish", "draft"]),
+            "searchable":   rng.choice(["Y", "Y", "Y", "N"]),
+            "lang":         rng.choice(["th", "th", "en"]),
+            "title":        rng.choice(["t", "t", "empty title"]),
+            "publish_date": rng.choice([None] + [NOW - datetime.timedelta(hours=rng.randint(-12, 24 * 40))
+                                                 for _ in range(9)]),
+            "expire_date":  rng.choice([None, None, NOW - datetime.timedelta(minutes=30)]),
+            "article_category": [rng.choice(CATEGORIES) for _ in range(rng.randint(0, 3))],
+            "most_popular": plays,
+        })
+    return rows
+
+
+def _table(rows: list):
+    iso = lambda dt: dt.isoformat().replace("+00:00", "Z") if dt else None
+    raw = [[iso(r[c]) if typ == "TIMESTAMP" else r[c] for c, typ in SCHEMA] for r in rows]
+    return _build("mst_sfv_nonprod", SCHEMA, raw)
+
+
+def _base_where(r: dict, days: int = 30) -> bool:
+    """WHERE ของ BaseDataRaw ใน sfv_agg_*.sql ด้วยค่า default ของ Params"""
+    pd, ex = r["publish_date"], r["expire_date"]
+    return (r["status"] == "publish" and r["searchable"] == "Y" and r["lang"] == "th"
+            and r["title"] != "empty title"
+            and pd is not None and pd <= NOW and pd >= NOW - datetime.timedelta(days=days)
+            and (ex is None or ex > NOW - datetime.timedelta(minutes=5)))
+
+
+def _group_key(r: dict):
+    first = next((c for c in r["article_category"] if c is not None), None)
+    return "sports" if first in SPORTS_CATEGORIES else first
+
+
+def _brute_force_buckets(rows: list, sort_key, limit: int) -> dict:
+    groups: dict = {}
+    for r in rows:
+        groups.setdefault(_group_key(r), []).append(r)
+    ordered = sorted(groups, key=lambda k: (k is None, k or ""))
+    return {k: [r["id"] for r in sorted(groups[k], key=sort_key)[:limit]] for k in ordered}
+
+
+# ======================================================
+# TESTS
+# ======================================================
+def test_top_k_per_group_matches_sort():
+    """score ซ้ำเยอะ → ลำดับ id ASC ในกลุ่มต้องตรงกับ sort เต็ม"""
+    rng = np.random.default_rng(3)
+    n = 5000
+    groups = rng.integers(-1, 6, n)
+    scores = rng.integers(0, 20, n).astype(np.float64)
+    ranks  = rng.permutation(n)
+    rows   = np.arange(n)
+    for limit in (1, 7, 50, n):
+        got = top_k_per_group(groups, scores, ranks, rows, limit)
+        for g in np.unique(groups).tolist():
+            members = rows[groups == g]
+            want = sorted(members.tolist(), key=lambda r: (-scores[r], ranks[r]))[:limit]
+            if got.get(g) != want:
+                return False, f"limit={limit} group={g}: heap ต่างจาก sort ที่ตำแหน่ง " \
+                              f"{next((i for i, (a, b) in enumerate(zip(got.get(g, []), want)) if a != b), None)}"
+    return True, "top-k ต่อกลุ่มตรงกับ sort เต็ม ✓"
+
+
+def test_expected_tophit_matches_brute_force():
+    rows  = _make_rows()
+    table = _table(rows)
+
+    def score(r):
+        return (r["most_popular"] or {}).get("PLAY_COUNT_DAY_14")
+
+    candidates = [r for r in rows if _base_where(r) and score(r) is not None]
+    for limit in (3, 50):
+        want = _brute_force_buckets(candidates, lambda r: (-score(r), r["id"]), limit)
+        got  = expected_tophit(table, SQL_TOPHIT, {"agg_tophit_limit": limit}, now=NOW)
+        detail = diff_buckets(got, want)
+        if detail["missing_buckets"] or detail["unexpected_buckets"] or detail["mismatched"]:
+            return False, f"limit={limit}: {detail}"
+    if sum(len(v) for v in want.values()) < 20:
+        return False, "ข้อมูลสังเคราะห์ผ่าน filter น้อยเกินไป"
+    return True, f"{len(want)} buckets ตรงกับ brute force ✓"
+
+
+def test_group_keys():
+    rows = [{"id": f"g{i}", "status": "publish", "searchable": "Y", "lang": "th", "title": "t",
+             "publish_date": NOW, "expire_date": None, "article_category": cats, "most_popular": None}
+            for i, cats in enumerate([["nba", "drama"], [None, "drama"], [], ["ufc"], ["news"]])]
+    codes, keys = group_keys(_table(rows))
+    got = [keys[c] if c >= 0 else None for c in codes.tolist()]
+    if got != ["sports", "drama", None, "sports", "news"]:
+        return False, f"group keys = {got}"
+    return True, "agg_group_key ✓"
+
+
+def test_api_bucket_ids():
+    hits = lambda *ids: {"hits": {"hits": [{"_source": {"id": i}} for i in ids]}}
+    buckets = [
+        {"key": "sports", "doc_count": 3, "sort_by_hit_count": hits("a", "b", "a")},
+        {"key": "drama",  "doc_count": 1, "top_by_plays": hits("c")},            # auto-detect
+        {"key": "news",   "doc_count": 0, "sort_by_hit_count": hits()},
+    ]
+    got = api_bucket_ids(buckets, "agg_tophit")
+    if got != {"sports": ["a", "b"], "drama": ["c"], "news": []}:
+        return False, f"api buckets = {got}"
+    return True, "api_bucket_ids ✓"
+
+
+def test_latest_n_per_group_matches_sort():
+    """publish_date ซ้ำเยอะ + mask บางส่วน → ในกลุ่มเรียง publish_date DESC, id ASC"""
+    rng = np.random.default_rng(5)
+    n = 4000
+    pd     = rng.integers(0, 50, n)
+    ranks  = rng.permutation(n)
+    groups = rng.integers(-1, 5, n)
+    mask   = rng.random(n) < 0.6
+    order  = np.lexsort((ranks, -pd.astype(np.float64)))
+    for limit in (1, 10, n):
+        got = latest_n_per_group(order, mask, groups, limit)
+        want: dict = {}
+        for r in sorted(np.flatnonzero(mask).tolist(), key=lambda r: (-pd[r], ranks[r])):
+            bucket = want.setdefault(int(groups[r]), [])
+            if len(bucket) < limit:
+                bucket.append(r)
+        if got != want:
+            bad = [g for g in want if got.get(g) != want[g]]
+            return False, f"limit={limit}: กลุ่มที่ไม่ตรง {bad}"
+    if latest_n_per_group(order, np.zeros(n, dtype=bool), groups, 10) != {}:
+        return False, "mask ว่างต้องได้ {}"
+    return True, "latest-N ต่อกลุ่มตรงกับ sort เต็ม ✓"
+
+
+def test_expected_latest_matches_brute_force():
+    rows  = _make_rows()
+    table = _table(rows)
+    candidates = [r for r in rows if _base_where(r)]
+    order_key  = lambda r: (-r["publish_date"].timestamp(), r["id"])
+    for limit in (2, 50):
+        want = _brute_force_buckets(candidates, order_key, limit)
+        got  = expected_latest(table, SQL_LATEST, {"agg_latest_limit": limit}, now=NOW)
+        detail = diff_buckets(got, want)
+        if detail["missing_buckets"] or detail["unexpected_buckets"] or detail["mismatched"]:
+            return False, f"limit={limit}: {detail}"
+
+    first = latest_order(table)
+    expected_latest(table, SQL_LATEST, {"agg_latest_limit": 5, "language": "en"}, now=NOW)
+    if latest_order(table) is not first:
+        return False, "latest_order ต้อง sort ครั้งเดียวต่อ table"
+    return True, f"{len(want)} buckets ตรงกับ brute force ✓"
@@ -0,0 +1,133 @@
+"""
+test_cassette_clock.py
+
+Unit tests ของนาฬิกาใน qa_common.cassette (ไม่ยิง network)
+record เก็บเวลาเริ่ม test ลง clock.json → replay เลื่อนนาฬิกาเฉพาะ module ใต้ roots
+
+Test Cases:
+  1. record → replay  — check ที่เทียบกับ "ตอนนี้" ได้ผลเดียวกับตอนอัด (ทั้ง import datetime / import time
+                        และ from datetime import datetime)
+  2. library ไม่โดน   — module datetime / time และ module นอก roots ยังเห็นนาฬิกาจริงระหว่าง replay
+  3. restore          — หลัง restore_clock() ทุก module กลับเป็นของเดิม
+"""
+
+import datetime
+import importlib.util
+import sys
+import os
+import time
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common import cassette
+
+pytestmark = pytest.mark.unit
+
+DAY = 86400
+
+# check ที่ขึ้นกับเวลา "ตอนนี้" แบบ Verify_latest_logic — เขียนได้ทั้ง 3 แบบ import
+REPO_MODULE = '''
+import datetime
+import time
+from datetime import datetime as dt
+
+def is_fresh(publish_ts, days=1):
+    return publish_ts >= time.time() - days * 86400
+
+def is_fresh_dt(publish_ts, days=1):
+    return datetime.datetime.now().timestamp() - publish_ts <= days * 86400
+
+def now_ts():
+    return dt.now().timestamp()
+'''
+
+LIBRARY_MODULE = '''
+import time
+from datetime import datetime
+
+def now_pair():
+    return time.time(), datetime.now().timestamp()
+'''
+
+
+def _load(path, name: str, source: str):
+    path.write_text(source, encoding="utf-8")
+    spec = importlib.util.spec_from_file_location(name, str(path))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture
+def modules(tmp_path):
+    repo = tmp_path / "repo"
+    lib  = tmp_path / "lib"
+    repo.mkdir()
+    lib.mkdir()
+    mods = (_load(repo / "clock_repo_mod.py", "clock_repo_mod", REPO_MODULE),
+            _load(lib / "clock_lib_mod.py", "clock_lib_mod", LIBRARY_MODULE))
+    yield str(repo), mods
+    cassette.restore_clock()
+    for m in mods:
+        sys.modules.pop(m.__name__, None)
+
+
+def test_record_replay_reproduces_outcome(tmp_path, modules):
+    """อัดเมื่อ 3 วันก่อน: item ที่ publish ก่อนอัด 1 ชม. ยัง fresh ตอน replay"""
+    root, (repo_mod, _) = modules
+    recorded = time.time() - 3 * DAY
+    store = cassette.CassetteStore(str(tmp_path / "cassettes"))
+    store.record_time("test_x.py::test_latest", recorded)
+    store.flush()
+
+    publish_ts = recorded - 3600
+    if repo_mod.is_fresh(publish_ts):
+        return False, "นาฬิกาจริงไม่ควรเห็น item นี้ว่า fresh (setup ผิด)"
+
+    epoch = cassette.CassetteStore(str(tmp_path / "cassettes")).recorded_time("test_x.py::test_latest")
+    if epoch != recorded:
+        return False, f"clock.json คืน {epoch} ควรเป็น {recorded}"
+    cassette.shift_clock(epoch, roots=(root,))
+    if not (repo_mod.is_fresh(publish_ts) and repo_mod.is_fresh_dt(publish_ts)):
+        return False, "replay: check ที่เทียบกับ 'ตอนนี้' ได้ผลต่างจากตอนอัด"
+    if abs(repo_mod.now_ts() - recorded) > 60:
+        return False, f"from datetime import datetime ไม่ถูกเลื่อน (ต่าง {repo_mod.now_ts() - recorded:.0f} s)"
+    return True, "replay ได้ผลเดียวกับตอนอัด ✓"
+
+
+def test_replay_leaves_library_clock(modules):
+    """module datetime / time และ module นอก roots ใช้นาฬิกาจริงระหว่าง replay"""
+    root, (repo_mod, lib_mod) = modules
+    cassette.shift_clock(time.time() - 3 * DAY, roots=(root,))
+    real = cassette._real_time()
+    checks = {
+        "time.time":             time.time(),
+        "datetime.now":          datetime.datetime.now().timestamp(),
+        "lib time.time":         lib_mod.now_pair()[0],
+        "lib datetime.now":      lib_mod.now_pair()[1],
+    }
+    shifted = [name for name, ts in checks.items() if abs(ts - real) > 60]
+    if shifted:
+        return False, f"นาฬิกาของ {shifted} ถูกเลื่อนด้วย"
+    if time.time is not cassette._real_time or datetime.datetime is not cassette._REAL_DATETIME:
+        return False, "module datetime / time ถูก patch"
+    if abs(repo_mod.now_ts() - real) < DAY:
+        return False, "module ใต้ roots ไม่ถูกเลื่อน"
+    return True, "library เห็นนาฬิกาจริง ✓"
+
+
+def test_restore_clock(modules):
+    """restore_clock() คืน binding เดิมของทุก module"""
+    root, (repo_mod, _) = modules
+    before = (repo_mod.time, repo_mod.datetime, repo_mod.dt)
+    cassette.shift_clock(time.time() - DAY, roots=(root,))
+    cassette.restore_clock()
+    after = (repo_mod.time, repo_mod.datetime, repo_mod.dt)
+    if after != before:
+        return False, f"binding ไม่กลับ: {after}"
+    return True, "restore ครบ ✓"
@@ -0,0 +1,135 @@
+"""
+test_host_limiter.py
+
+Unit tests ของ qa_common.host_limiter (ไม่ยิง network — TokenBucket ใช้นาฬิกาปลอม)
+
+Test Cases:
+  1. TokenBucket burst   — burst ตัวแรกไม่รอ, ตัวถัดไปจองคิว 1/rate, 2/rate, ...
+  2. TokenBucket refill  — token เติมตามเวลาที่ผ่านไป แต่ไม่เกิน burst
+  3. rps 0               — ไม่จำกัด
+  4. HostLimiter         — in-flight ไม่เกิน max และ slot ซ้อนใน thread เดียวกันไม่ deadlock
+  5. limits_for          — จับคู่ service ที่ยาวที่สุด, host อื่นใช้ DEFAULT_LIMIT
+"""
+
+import threading
+import sys
+import os
+import time
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common import host_limiter
+from qa_common.host_limiter import DEFAULT_LIMIT, HOST_LIMITS, HostLimiter, TokenBucket, limits_for
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClock:
+    """monotonic() / sleep() ของ module time — sleep เลื่อนเวลาทันที"""
+
+    def __init__(self):
+        self.now    = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(host_limiter, "time", fake)
+    return fake
+
+
+# ======================================================
+# TESTS
+# ======================================================
+def test_bucket_burst_then_queue(clock):
+    """burst=3, rate=10: 3 ตัวแรกไม่รอ — ตัวที่ 4 รอ 0.1 s"""
+    bucket = TokenBucket(rate=10, burst=3)
+    waits = [bucket.acquire() for _ in range(3)]
+    if any(waits):
+        return False, f"burst ไม่ควรรอ: {waits}"
+    w = bucket.acquire()
+    if w != pytest.approx(0.1):
+        return False, f"ตัวที่ 4 ควรรอ 0.1 s ได้ {w}"
+    # จองคิวโดยไม่ sleep: token ติดลบ = คนที่รออยู่ก่อน
+    bucket.tokens, bucket._last = -1.0, clock.now
+    w = bucket.acquire()
+    if w != pytest.approx(0.2):
+        return False, f"มีคนรออยู่ 1 คน → ควรรอ 0.2 s ได้ {w}"
+    return True, "burst + คิว ✓"
+
+
+def test_bucket_refill_capped(clock):
+    """token เติม rate × เวลา แต่ไม่เกิน burst"""
+    bucket = TokenBucket(rate=5, burst=2)
+    for _ in range(2):
+        bucket.acquire()
+    clock.now += 10                                  # เติมได้ 50 แต่ cap ที่ 2
+    waits = [bucket.acquire() for _ in range(3)]
+    if waits[:2] != [0.0, 0.0] or waits[2] != pytest.approx(0.2):
+        return False, f"waits = {waits}"
+    return True, "refill ไม่เกิน burst ✓"
+
+
+def test_bucket_unlimited(clock):
+    bucket = TokenBucket(rate=0, burst=1)
+    if any(bucket.acquire() for _ in range(100)) or clock.sleeps:
+        return False, "rate 0 ต้องไม่รอ"
+    return True, "rps 0 ไม่จำกัด ✓"
+
+
+def test_host_limiter_inflight_and_reentrant():
+    """max in-flight 2 จาก 8 threads — และ slot ซ้อน (redirect) ใช้ slot เดิม"""
+    limiter = HostLimiter("limiter-test.local", max_inflight=2, rps=0)
+    gate = threading.Barrier(8)
+
+    def work():
+        gate.wait()
+        with limiter.slot():
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if limiter.peak > 2 or limiter.requests != 8:
+        return False, f"peak={limiter.peak} requests={limiter.requests}"
+
+    single = HostLimiter("limiter-test.local", max_inflight=1, rps=0)
+    done = threading.Event()
+
+    def nested():
+        with single.slot():
+            with single.slot():
+                done.set()
+
+    t = threading.Thread(target=nested, daemon=True)
+    t.start()
+    if not done.wait(2):
+        return False, "slot ซ้อนใน thread เดียวกัน deadlock"
+    return True, f"peak in-flight {limiter.peak} ✓"
+
+
+def test_limits_for():
+    cases = {
+        "ai-metadata-service.preprod-gcp-ai-bn.int-ai-platform.gcp.dmp.true.th": HOST_LIMITS["ai-metadata-service"],
+        "ai-universal-service-711-2.example:8080": HOST_LIMITS["ai-universal-service-711"],
+        "ai-universal-service-new.example": HOST_LIMITS["ai-universal-service-new"],
+        "unknown-host.example": DEFAULT_LIMIT,
+    }
+    for host, want in cases.items():
+        if limits_for(host) != want:
+            return False, f"{host} → {limits_for(host)} ควรเป็น {want}"
+    return True, "จับคู่ service ✓"
@@ -0,0 +1,124 @@
+"""
+test_json_extract.py
+
+Unit tests ของ qa_common.json_extract — extract_nodes ต้องได้ผลเดียวกับ json.loads ทั้งก้อน
+
+Test Cases:
+  1. path=data.results — key ชื่อเดียวกันที่ซ้อนอยู่ที่อื่น / อยู่ใน string ไม่นับ
+  2. path=None         — node แรกตามลำดับ document ทั้งแบบ key และแบบ {"name": ...}
+  3. fuzz              — document สุ่ม (seed คงที่) ทั้ง 2 โหมด เทียบกับ full parse
+"""
+
+import json
+import random
+import sys
+import os
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.json_extract import RESULTS_PATH, _first_node, extract_nodes
+
+pytestmark = pytest.mark.unit
+
+NAMES = {"merge_page", "slice_pagination"}
+
+
+# ======================================================
+# REFERENCE (full parse)
+# ======================================================
+def results_ref(doc, names) -> dict:
+    """j["data"]["results"].get(name) ที่เป็น dict"""
+    data    = doc.get("data") if isinstance(doc, dict) else None
+    results = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(results, dict):
+        return {}
+    return {n: results[n] for n in names if isinstance(results.get(n), dict)}
+
+
+def anywhere_ref(doc, names) -> dict:
+    found = {n: _first_node(doc, n) for n in names}
+    return {n: v for n, v in found.items() if v is not None}
+
+
+def _dumps_variants(doc):
+    return [json.dumps(doc), json.dumps(doc, indent=2), json.dumps(doc, ensure_ascii=False).encode("utf-8")]
+
+
+def _random_doc(rng: random.Random, depth: int = 0):
+    r = rng.random()
+    if depth > 4 or r < 0.3:
+        return rng.choice([1, None, "x", '{["\\', "ไทย}", "merge_page", True])
+    if r < 0.6:
+        return [_random_doc(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+    keys = rng.sample(["merge_page", "slice_pagination", "data", "results", "a", "name", "result"],
+                      rng.randint(0, 4))
+    return {k: _random_doc(rng, depth + 1) for k in keys}
+
+
+# ======================================================
+# TESTS
+# ======================================================
+def test_results_path_ignores_nested_and_strings():
+    """path=data.results: เอาเฉพาะลูกตรงของ data.results"""
+    doc = {"data": {
+        "debug":   {"merge_page": {"from": "debug"}},
+        "results": {
+            "a":   {"merge_page": {"from": "nested"}},
+            "s":   '"merge_page": {"from": "string"}',
+            "esc": 'ก\\"}{[',
+            "merge_page": {"from": "results"},
+            "slice_pagination": {"k": "}]{"},
+        },
+    }}
+    for raw in _dumps_variants(doc):
+        got = extract_nodes(raw, NAMES, path=RESULTS_PATH)
+        if got != results_ref(doc, NAMES):
+            return False, f"ได้ {got}"
+    return True, "ตรงกับ j['data']['results'] ✓"
+
+
+def test_results_path_missing_or_not_dict():
+    """ไม่มี data.results หรือ node ไม่ใช่ dict → ไม่คืน node นั้น"""
+    docs = [
+        {"data": {"results": {"merge_page": 5}}},
+        {"data": [], "results": {"merge_page": {}}},
+        {"x": {"data": {"results": {"merge_page": {}}}}, "data": {"results": {}}},
+    ]
+    for doc in docs:
+        got = extract_nodes(json.dumps(doc), NAMES, path=RESULTS_PATH)
+        if got:
+            return False, f"{doc} ควรได้ {{}} แต่ได้ {got}"
+    return True, "ไม่มี node → {} ✓"
+
+
+def test_anywhere_document_order():
+    """path=None: node แรกตามลำดับ document ทั้งแบบ key และแบบ name/result"""
+    doc = {"data": {
+        "list": [{"name": "merge_page", "result": {"n": 1}}],
+        "merge_page": {"n": 2},
+        "other": {"result": 3, "name": "slice_pagination"},      # "name" ไม่ใช่ key แรก → fallback
+    }}
+    for raw in _dumps_variants(doc):
+        got = extract_nodes(raw, NAMES)
+        if got != anywhere_ref(doc, NAMES):
+            return False, f"ได้ {got}"
+    return True, "ตรงกับลำดับ document ✓"
+
+
+def test_fuzz_matches_full_parse():
+    """document สุ่ม 500 ชุด × 3 รูปแบบ serialise → เทียบกับ full parse ทั้ง 2 โหมด"""
+    rng = random.Random(1)
+    for _ in range(500):
+        doc = {"data": {"results": _random_doc(rng, 1)} if rng.random() < 0.8 else _random_doc(rng)}
+        for raw in _dumps_variants(doc):
+            got = extract_nodes(raw, NAMES, path=RESULTS_PATH)
+            if got != results_ref(doc, NAMES):
+                return False, f"path=data.results ต่างจาก full parse: {raw!r:.200}"
+            got = extract_nodes(raw, NAMES)
+            if got != anywhere_ref(doc, NAMES):
+                return False, f"path=None ต่างจาก full parse: {raw!r:.200}"
+    return True, "500 documents ตรงกับ full parse ✓"
@@ -0,0 +1,130 @@
+"""
+test_keyset_walker.py
+
+Unit tests ของ qa_common.keyset_walker กับ fake endpoint (ไม่ยิง network)
+fake endpoint ทำตาม sfv_standard.sql:
+  - BaseData   = keyset predicate (combined_score, publish_date, id) < cursor
+  - MainResults = ORDER BY sort_field แล้ว id ASC, LIMIT
+  - SELECT สุดท้าย ORDER BY id ASC  → หน้าที่ได้ไม่ได้เรียงตาม keyset
+
+Test Cases:
+  1. no score (sfv_series) — เดินครบทุก ID ไม่ซ้ำ ไม่มี order violation
+  2. score (sfv)           — hit_count_day_7 อยู่ใน _source → เดินครบ
+  3. score ไม่ถูก project  — report error แทนการเดาคะแนน 0.0 แล้วทิ้ง row
+  4. cursor advance        — cursor = item ที่ keyset_key ต่ำสุดของหน้า ไม่ใช่ item สุดท้าย
+"""
+
+import sys
+import os
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common import keyset_walker
+from qa_common.keyset_walker import cursor_params, keyset_key, walk
+
+pytestmark = pytest.mark.unit
+
+
+# ======================================================
+# FAKE ENDPOINT
+# ======================================================
+def make_items(n: int, with_hits: bool) -> list:
+    """id ไม่เรียงตาม publish_date / hit — ลำดับ id ASC ต่างจาก keyset"""
+    items = []
+    for i in range(n):
+        item = {"id": f"id{(i * 37) % n:04d}",
+                "publish_date": f"2024-01-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:00Z"}
+        if with_hits:
+            item["hit_count_day_7"] = (i * 53) % n       # ไม่มี tie ของ sort key ตรงขอบหน้า
+        items.append(item)
+    return items
+
+
+def fake_endpoint(items: list, score_field: str = None, project_score: bool = True):
+    """post_json แทน API: คืนหน้าแบบที่ template เลือก (sort_field แล้ว id ASC) และเรียง id ASC"""
+    def score(item):
+        return float(item.get(score_field) or 0.0) if score_field else 0.0
+
+    def post_json(url, body, timeout=None):
+        p = body["parameters"]
+        rows = list(items)
+        if p.get("last_publish_date") is not None:
+            cursor = (p["last_score"], keyset_walker._ts(p["last_publish_date"]), p["last_id"])
+            rows = [r for r in rows
+                    if (score(r), keyset_walker._ts(r["publish_date"]), r["id"]) < cursor]
+        rows.sort(key=lambda r: r["id"])
+        if p.get("sort_field") == "publish_date":
+            rows.sort(key=lambda r: keyset_walker._ts(r["publish_date"]), reverse=True)
+        elif str(p.get("sort_field", "")).startswith("HIT_COUNT"):
+            rows.sort(key=score, reverse=True)
+        page = sorted(rows[:p["limit"]], key=lambda r: r["id"])
+        if not project_score:
+            page = [{k: v for k, v in r.items() if k != score_field} for r in page]
+        return {"data": {"hits": {"hits": [{"_source": r} for r in page]}}}
+    return post_json
+
+
+@pytest.fixture(autouse=True)
+def _no_oracle(monkeypatch):
+    monkeypatch.delenv("QA_ORACLE_SNAPSHOT", raising=False)
+
+
+# ======================================================
+# TESTS
+# ======================================================
+def test_walk_without_score(monkeypatch):
+    """sfv_series: combined_score = 0.0 → sort publish_date desc, เดินครบทุก ID"""
+    items = make_items(250, with_hits=False)
+    monkeypatch.setattr(keyset_walker, "post_json", fake_endpoint(items))
+    r = walk("sfv_series", {"language": "th"}, page_size=30)
+    if r["error"] or r["stalled"]:
+        return False, f"walk หยุดก่อนหมด: error={r['error']} stalled={r['stalled']}"
+    if r["unique"] != len(items) or r["duplicates"] or r["order_violations"]:
+        return False, (f"unique={r['unique']}/{len(items)} dup={r['duplicates']} "
+                       f"order={r['order_violations']}")
+    return True, f"{r['pages']} pages, {r['unique']} IDs ครบ ✓"
+
+
+def test_walk_with_score(monkeypatch):
+    """sfv: hit_count_day_7 อยู่ใน _source → cursor ใช้คะแนนจริง เดินครบทุก ID"""
+    items = make_items(250, with_hits=True)
+    monkeypatch.setattr(keyset_walker, "post_json", fake_endpoint(items, "hit_count_day_7"))
+    r = walk("sfv", {"language": "th"}, page_size=30)
+    if r["error"] or r["stalled"]:
+        return False, f"walk หยุดก่อนหมด: error={r['error']} stalled={r['stalled']}"
+    if r["unique"] != len(items) or r["duplicates"] or r["order_violations"]:
+        return False, (f"unique={r['unique']}/{len(items)} dup={r['duplicates']} "
+                       f"order={r['order_violations']}")
+    return True, f"{r['pages']} pages, {r['unique']} IDs ครบ ✓"
+
+
+def test_walk_score_not_projected(monkeypatch):
+    """sfv: API ไม่คืน hit_count_day_7 → error ที่หน้าแรก ไม่ส่ง last_score=0.0"""
+    items = make_items(250, with_hits=True)
+    monkeypatch.setattr(keyset_walker, "post_json",
+                        fake_endpoint(items, "hit_count_day_7", project_score=False))
+    r = walk("sfv", {"language": "th"}, page_size=30)
+    if not r["error"] or "hit_count_day_7" not in r["error"]:
+        return False, f"ควร error เรื่อง hit_count_day_7 แต่ได้ error={r['error']}"
+    if r["pages"] != 1:
+        return False, f"ควรหยุดที่หน้าแรก แต่เดินไป {r['pages']} หน้า"
+    return True, f"หยุดพร้อม error: {r['error']} ✓"
+
+
+def test_cursor_from_lowest_key():
+    """หน้าที่เรียง id ASC → cursor ต้องมาจาก item ที่ keyset_key ต่ำสุด"""
+    page = [
+        {"id": "a", "publish_date": "2024-01-03T00:00:00Z"},
+        {"id": "b", "publish_date": "2024-01-01T00:00:00Z"},
+        {"id": "c", "publish_date": "2024-01-02T00:00:00Z"},
+    ]
+    lowest = min(page, key=keyset_key)
+    got = cursor_params(lowest)
+    want = {"last_score": 0.0, "last_publish_date": "2024-01-01T00:00:00Z", "last_id": "b"}
+    if got != want:
+        return False, f"cursor={got} ควรเป็น {want}"
+    return True, "cursor = item ที่เก่าที่สุดของหน้า ✓"
@@ -0,0 +1,164 @@
+"""
+test_metadata_oracle.py
+
+Unit tests ของ qa_common.metadata_oracle บน table สังเคราะห์ (ไม่ยิง network / Spanner)
+
+Test Cases:
+  1. expected_ids vs brute force — WHERE / ORDER BY / LIMIT ของ src/sfv_standard.sql
+                                   เทียบกับการกรองทีละ row ใน Python หลายชุด parameter
+  2. unsupported                 — p_is_random / keyset / parameter ที่ template ไม่มี → OracleUnsupported
+  3. diff_ids                    — missing / unexpected / first_divergence
+"""
+
+import datetime
+import random
+import sys
+import os
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+pytest.importorskip("numpy")
+
+from qa_common.columnar import _build
+from qa_common.metadata_oracle import OracleUnsupported, diff_ids, expected_ids
+
+pytestmark = pytest.mark.unit
+
+SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sfv_standard.sql")
+NOW = datetime.datetime(2026, 1, 15, 12, 30, tzinfo=datetime.timezone.utc)
+
+SCHEMA = [
+    ("id", "STRING(MAX)"), ("status", "STRING(MAX)"), ("searchable", "STRING(MAX)"),
+    ("lang", "STRING(MAX)"), ("title", "STRING(MAX)"),
+    ("publish_date", "TIMESTAMP"), ("expire_date", "TIMESTAMP"),
+    ("article_category", "ARRAY<STRING(MAX)>"), ("genres", "ARRAY<STRING(MAX)>"),
+    ("partner_related", "ARRAY<STRING(MAX)>"), ("related_ecommerce_id", "ARRAY<STRING(MAX)>"),
+    ("hit_count_day_7", "INT64"),
+]
+
+
+def _iso(dt):
+    return dt.isoformat().replace("+00:00", "Z") if dt else None
+
+
+def _make_rows(n: int = 600, seed: int = 7) -> list:
+    """dict ต่อ row — ค่าสุ่มที่ครอบคลุมทุก predicate ของ template (รวม NULL)"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        rows.append({
+            "id":           f"sfv-{rng.randrange(10 ** 6):06d}-{i:03d}",
+            "status":       rng.choice(["publish", "publish", "publish", "draft"]),
+            "searchable":   rng.choice(["Y", "Y", "Y", "N"]),
+            "lang":         rng.choice(["th", "th", "en"]),
+            "title":        rng.choice(["t", "t", "t", "empty title", None]),
+            "publish_date": rng.choice([None] + [NOW + datetime.timedelta(hours=rng.randint(-24 * 45, 24))
+                                                 for _ in range(9)]),
+            "expire_date":  rng.choice([None, None, NOW - datetime.timedelta(minutes=rng.randint(1, 20)),
+                                        NOW + datetime.timedelta(days=3)]),
+            "article_category": rng.sample(["series", "nba", "tennis", "drama", "news"], rng.randint(0, 2)),
+            "genres":       rng.sample(["action", "comedy", "horror"], rng.randint(0, 2)),
+            "partner_related": rng.sample(["p1", "p2"], rng.randint(0, 1)),
+            "related_ecommerce_id": rng.sample(["e1", "e2"], rng.randint(0, 1)),
+            "hit_count_day_7": rng.choice([None, rng.randrange(50)]),
+        })
+    return rows
+
+
+def _table(rows: list):
+    raw = [[_iso(r[c]) if typ == "TIMESTAMP" else r[c] for c, typ in SCHEMA] for r in rows]
+    return _build("mst_sfv_nonprod", SCHEMA, raw)
+
+
+def _brute_force(rows: list, p: dict) -> list:
+    """WHERE / ORDER BY / LIMIT ของ sfv_standard.sql ทีละ row (default ตาม Params CTE)"""
+    language = p.get("language") or "th"
+    days = p.get("tophit_date_filter", 30)
+    out = []
+    for r in rows:
+        pd, ex, cats = r["publish_date"], r["expire_date"], set(r["article_category"])
+        if r["status"] != "publish" or r["searchable"] != "Y" or r["lang"] != language:
+            continue
+        if pd is None or pd > NOW or (ex is not None and ex <= NOW - datetime.timedelta(minutes=5)):
+            continue
+        if r["title"] is None or r["title"] == "empty title":
+            continue
+        if r["id"] in p.get("exclude_ids", []) or cats & set(p.get("filter_out_category", [])):
+            continue
+        if set(r["partner_related"]) & set(p.get("exclude_partner_related", [])):
+            continue
+        if p.get("genres") and not set(r["genres"]) & set(p["genres"]):
+            continue
+        if p.get("article_category") and not cats & set(p["article_category"]):
+            continue
+        if p.get("id") and r["id"] not in p["id"]:
+            continue
+        if p.get("is_related_ecommerce") and not r["related_ecommerce_id"]:
+            continue
+        if days and pd < NOW - datetime.timedelta(days=days):
+            continue
+        out.append(r)
+
+    out.sort(key=lambda r: r["id"])
+    field, direction = p.get("sort_field", ""), p.get("sort_field_value", "")
+    if direction in ("asc", "desc"):
+        if field == "publish_date":
+            out.sort(key=lambda r: r["publish_date"], reverse=direction == "desc")
+        elif field.startswith("HIT_COUNT"):
+            out.sort(key=lambda r: r["hit_count_day_7"] or 0, reverse=direction == "desc")
+    return [r["id"] for r in out[:p.get("limit", 10)]]
+
+
+# ======================================================
+# TESTS
+# ======================================================
+def test_expected_ids_match_brute_force():
+    rows  = _make_rows()
+    table = _table(rows)
+    cases = [
+        {},
+        {"limit": 600},
+        {"limit": 600, "language": "en"},
+        {"limit": 20, "sort_field": "HIT_COUNT_DAY_7", "sort_field_value": "desc"},
+        {"limit": 20, "sort_field": "HIT_COUNT_DAY_7", "sort_field_value": "asc"},
+        {"limit": 20, "sort_field": "publish_date", "sort_field_value": "desc"},
+        {"limit": 600, "filter_out_category": ["series", "nba"], "exclude_partner_related": ["p1"]},
+        {"limit": 600, "article_category": ["tennis"], "genres": ["comedy", "horror"]},
+        {"limit": 600, "is_related_ecommerce": True, "tophit_date_filter": 7},
+        {"limit": 600, "tophit_date_filter": 0},
+        {"limit": 600, "id": [r["id"] for r in rows[:40]], "exclude_ids": [r["id"] for r in rows[:10]]},
+    ]
+    for params in cases:
+        got, want = expected_ids(table, SQL, params, now=NOW), _brute_force(rows, params)
+        if got != want:
+            detail = diff_ids(got, want)
+            return False, (f"{params}: oracle {len(got)} / brute force {len(want)} IDs — "
+                           f"first_divergence {detail['first_divergence']}")
+    return True, f"{len(cases)} parameter sets ตรงกับ brute force ✓"
+
+
+def test_unsupported_params():
+    table = _table(_make_rows(20))
+    for params in ({"is_random": True}, {"last_publish_date": "2026-01-01T00:00:00Z"},
+                   {"more_likes": ["x"]}, {"no_such_param": 1}):
+        with pytest.raises(OracleUnsupported):
+            expected_ids(table, SQL, params, now=NOW)
+    if expected_ids(table, SQL, {"fields": ["id"], "is_random": False}, now=NOW) != expected_ids(table, SQL, {}, now=NOW):
+        return False, "fields / is_random=False ต้องไม่กระทบผล"
+    return True, "OracleUnsupported ✓"
+
+
+def test_diff_ids():
+    d = diff_ids(["a", "c", "x"], ["a", "b", "c"])
+    if d["missing"] != ["b"] or d["unexpected"] != ["x"] or d["first_divergence"] != 1 or d["same_order"]:
+        return False, f"diff = {d}"
+    d = diff_ids(["a", "b"], ["a", "b", "c"])
+    if d["first_divergence"] != 2 or d["same_order"]:
+        return False, f"prefix diff = {d}"
+    if not diff_ids(["a"], ["a"])["same_order"]:
+        return False, "เหมือนกันต้อง same_order"
+    return True, "diff_ids ✓"
@@ -0,0 +1,107 @@
+"""
+test_pairwise_explorer.py
+
+Unit tests ของ covering set ใน qa_common.pairwise_explorer (ไม่ยิง network)
+
+Test Cases:
+  1. pairwise (t=2)   — ทุกคู่ค่าของทุกคู่ parameter (รวม OMIT) ปรากฏในอย่างน้อย 1 combination
+  2. t=3              — ทุก 3-tuple ครอบคลุม และยังน้อยกว่าผลคูณของ domain
+  3. OMIT             — ค่า OMIT = ไม่มี key ใน combination
+  4. deterministic    — รันซ้ำได้ชุดเดิม
+  5. strength > จำนวน parameter — ได้ผลคูณทั้งหมด
+"""
+
+import itertools
+import math
+import sys
+import os
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.pairwise_explorer import OMIT, covering_set
+
+pytestmark = pytest.mark.unit
+
+DOMAIN = {
+    "limit":                [10, 100],
+    "language":             ["th", "en"],
+    "id":                   [OMIT, ["a", "b"]],
+    "fields":               [OMIT, ["id", "title"]],
+    "filter_out_category":  [OMIT, ["series"]],
+    "exclude_ids":          [OMIT, ["x"]],
+    "is_related_ecommerce": [OMIT, True, False],
+}
+
+
+def _value_index(domain: dict, name: str, row: dict) -> int:
+    """index ของค่าใน domain (ไม่มี key = OMIT) — เทียบด้วย type + == (True ≠ 1)"""
+    value = row.get(name, OMIT)
+    for i, v in enumerate(domain[name]):
+        if v is value or (v is not OMIT and type(v) is type(value) and v == value):
+            return i
+    raise AssertionError(f"{name}={value!r} ไม่อยู่ใน domain")
+
+
+def _missing_tuples(domain: dict, rows: list, t: int) -> list:
+    names = list(domain)
+    seen = {tuple(_value_index(domain, n, row) for n in names) for row in rows}
+    missing = []
+    for cols in itertools.combinations(range(len(names)), t):
+        covered = {tuple(r[c] for c in cols) for r in seen}
+        for vals in itertools.product(*(range(len(domain[names[c]])) for c in cols)):
+            if vals not in covered:
+                missing.append({names[c]: domain[names[c]][v] for c, v in zip(cols, vals)})
+    return missing
+
+
+# ======================================================
+# TESTS
+# ======================================================
+def test_pairwise_covers_every_pair():
+    rows = covering_set(DOMAIN, strength=2)
+    missing = _missing_tuples(DOMAIN, rows, 2)
+    if missing:
+        return False, f"{len(missing)} คู่ไม่ถูกครอบคลุม เช่น {missing[:3]}"
+    full = math.prod(len(v) for v in DOMAIN.values())
+    if len(rows) >= full / 4:
+        return False, f"{len(rows)} combinations — ไม่ได้ลดจากผลคูณ {full}"
+    return True, f"{len(rows)} combinations ครอบคลุมทุกคู่ (ผลคูณ {full}) ✓"
+
+
+def test_three_wise():
+    rows = covering_set(DOMAIN, strength=3)
+    missing = _missing_tuples(DOMAIN, rows, 3)
+    if missing:
+        return False, f"{len(missing)} 3-tuples ไม่ถูกครอบคลุม เช่น {missing[:3]}"
+    if len(rows) >= math.prod(len(v) for v in DOMAIN.values()):
+        return False, f"{len(rows)} combinations ไม่น้อยกว่าผลคูณ"
+    return True, f"{len(rows)} combinations ครอบคลุมทุก 3-tuple ✓"
+
+
+def test_omit_is_absent_key():
+    rows = covering_set(DOMAIN, strength=2)
+    if any(v is OMIT for row in rows for v in row.values()):
+        return False, "OMIT ต้องไม่ถูกส่งเป็นค่า"
+    if not any("id" not in row for row in rows) or not any("id" in row for row in rows):
+        return False, "ต้องมีทั้ง combination ที่ส่งและไม่ส่ง id"
+    return True, "OMIT = ไม่ส่ง parameter ✓"
+
+
+def test_deterministic():
+    if covering_set(DOMAIN, strength=2) != covering_set(DOMAIN, strength=2):
+        return False, "รันซ้ำได้ combination ต่างกัน"
+    return True, "deterministic ✓"
+
+
+def test_strength_above_parameter_count():
+    domain = {"a": [1, 2], "b": ["x", "y", "z"]}
+    rows = covering_set(domain, strength=5)
+    want = [{"a": a, "b": b} for a in domain["a"] for b in domain["b"]]
+    key = lambda r: (r["a"], r["b"])
+    if sorted(rows, key=key) != sorted(want, key=key):
+        return False, f"ได้ {rows}"
+    return True, "t ≥ จำนวน parameter = ผลคูณทั้งหมด ✓"
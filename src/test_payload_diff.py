@@ -0,0 +1,96 @@
+"""
+test_payload_diff.py
+
+Unit tests ของ qa_common.payload_diff (ไม่ยิง network)
+
+Test Cases:
+  1. type changes     — True ↔ 1, 1 ↔ 1.0, ทั้ง scalar และใน container ที่ == กันใน Python
+  2. float            — ต่างกันหลัง FLOAT_DIGITS ตำแหน่ง = เท่ากัน
+  3. keyed list       — จับคู่ด้วย id: added / removed / moved / shifted + diff field ใน item
+  4. multiset list    — list ไม่มี id ไม่สนลำดับ นับจำนวนซ้ำ
+  5. exclude_keys     — key ระดับบนสุดที่ไม่เทียบ
+"""
+
+import sys
+import os
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.payload_diff import diff_payloads, summarize
+
+pytestmark = pytest.mark.unit
+
+
+def _paths(diff: dict, kind: str) -> list:
+    return sorted(e["path"] if isinstance(e, dict) else e for e in diff[kind])
+
+
+# ======================================================
+# TESTS
+# ======================================================
+def test_type_changes():
+    """bool / int / float ต่าง type = type_changes แม้ == กันใน Python"""
+    cases = [
+        ({"flag": True},          {"flag": 1},            "flag",     ("bool", "int")),
+        ({"n": 1},                {"n": 1.0},             "n",        ("int", "float")),
+        ({"xs": [{"id": "a", "v": 0}]}, {"xs": [{"id": "a", "v": False}]}, "xs[id=a].v", ("int", "bool")),
+        ({"d": {"k": {"x": 1}}},  {"d": {"k": {"x": 1.0}}}, "d.k.x",  ("int", "float")),
+    ]
+    for a, b, path, (old, new) in cases:
+        diff = diff_payloads(a, b)
+        got = [(e["path"], e["old_type"], e["new_type"]) for e in diff["type_changes"]]
+        if got != [(path, old, new)] or diff["equal"] or diff["same_content"]:
+            return False, f"{a} → {b}: type_changes = {got}"
+    return True, f"{len(cases)} type changes ✓"
+
+
+def test_float_rounding():
+    same = diff_payloads({"score": 0.123}, {"score": 0.1249})
+    diff = diff_payloads({"score": 0.12}, {"score": 0.13})
+    if not same["equal"] or _paths(diff, "values_changed") != ["score"]:
+        return False, f"same={same['equal']} diff={diff['values_changed']}"
+    return True, "float เทียบที่ 2 ตำแหน่ง ✓"
+
+
+def test_keyed_list():
+    """จับคู่ด้วย id — added / removed / moved / shifted และ field ที่ต่างใน item"""
+    a = {"items": [{"id": "a"}, {"id": "b", "title": "x"}, {"id": "c"}, {"id": "d"}]}
+    b = {"items": [{"id": "z"}, {"id": "b", "title": "y"}, {"id": "d"}, {"id": "c"}]}
+    diff = diff_payloads(a, b)
+    if [e["id"] for e in diff["items_removed"]] != ["a"] or [e["id"] for e in diff["items_added"]] != ["z"]:
+        return False, f"added={diff['items_added']} removed={diff['items_removed']}"
+    if len(diff["items_moved"]) != 1 or diff["items_moved"][0]["id"] not in ("c", "d"):
+        return False, f"items_moved = {diff['items_moved']}"
+    if _paths(diff, "values_changed") != ["items[id=b].title"]:
+        return False, f"values_changed = {diff['values_changed']}"
+
+    order_only = diff_payloads({"items": [{"id": "a"}, {"id": "b"}]}, {"items": [{"id": "b"}, {"id": "a"}]})
+    if order_only["equal"] or not order_only["same_content"]:
+        return False, "สลับลำดับอย่างเดียวต้องเป็น same_content"
+    return True, summarize(diff)
+
+
+def test_multiset_list():
+    """list ที่ไม่มี id: ไม่สนลำดับ แต่นับจำนวนซ้ำ"""
+    if not diff_payloads({"tags": ["a", "b", "b"]}, {"tags": ["b", "a", "b"]})["equal"]:
+        return False, "ลำดับต่างอย่างเดียวใน list ไม่มี id ต้องเท่ากัน"
+    diff = diff_payloads({"tags": ["a", "b", "b"]}, {"tags": ["a", "b", "c"]})
+    removed = [(e["value"], e["count"]) for e in diff["values_removed"]]
+    added   = [(e["value"], e["count"]) for e in diff["values_added"]]
+    if removed != [("b", 1)] or added != [("c", 1)]:
+        return False, f"removed={removed} added={added}"
+    return True, "multiset ✓"
+
+
+def test_exclude_keys():
+    a = {"request_id": "r1", "schemaId": 1, "items": [{"id": "a"}]}
+    b = {"request_id": "r2", "schemaId": 2, "items": [{"id": "a"}]}
+    if not diff_payloads(a, b, exclude_keys=("request_id", "schemaId"))["equal"]:
+        return False, "exclude_keys ไม่ถูกข้าม"
+    if diff_payloads(a, b)["equal"]:
+        return False, "ไม่ exclude ต้องต่างกัน"
+    return True, "exclude_keys ✓"
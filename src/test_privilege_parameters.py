@@ -31,33 +31,25 @@ Test Cases — MAX POINT:
   M2. max_point=5 (0-10 bracket) → ทุก items มี redeem_point อยู่ในช่วง 0-10
 """
 
-import json
-import subprocess
 import sys
 import os
-import warnings
-import logging
 
-# ปิด Spanner telemetry warnings (เหมือนต้นฉบับ)
-os.environ["SPANNER_ENABLE_BUILTIN_METRICS"] = "false"
-warnings.filterwarnings("ignore")
-logging.disable(logging.CRITICAL)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.metadata_service import ServiceSpec, get_sources, get_ids
 
 # ======================================================
 # CONFIG
 # ======================================================
-API_URL = "http://ai-metadata-service.preprod-gcp-ai-bn.int-ai-platform.gcp.dmp.true.th/metadata/privilege"
-
-SP_PROJECT  = "tdg-ai-platform-nonprod02-bxev"
-SP_INSTANCE = "g1d-ai-spannerb01"
-SP_DATABASE = "ai_raas_nonprod"
-
-DEFAULT_OPTIONS = {
-    "rename_mapping": False,
-    "dry_run": False,
-    "debug": True,
-    "cache": False
-}
+SERVICE = ServiceSpec(
+    "privilege", endpoint="privilege", database="ai_raas_nonprod", table="mst_privilege_nonprod",
+    title="Privilege — Parameter Test Suite (Standard + Predictions + Card Type + Max Point)",
+)
+call_api             = SERVICE.call_api
+call_api_variants    = SERVICE.call_api_variants
+compare_with_spanner = SERVICE.compare_with_spanner
 
 # ค่า id list จริงจาก REQUEST_BODY_STANDARD
 ID_LIST = [
@@ -98,142 +90,6 @@ ARTICLE_CATEGORY = ["dining"]
 CARD_TYPES_OTHER = ["red", "blue", "green", "white", "no_card"]
 
 
-# ======================================================
-# API HELPERS
-# ======================================================
-def call_api(params: dict) -> dict:
-    """ยิง API แล้ว return response dict"""
-    body = {"parameters": params, "options": DEFAULT_OPTIONS}
-    curl_cmd = [
-        "curl", "--location", "--silent",
-        API_URL,
-        "--header", "Content-Type: application/json",
-        "--data", json.dumps(body, ensure_ascii=False)
-    ]
-    result = subprocess.run(curl_cmd, capture_output=True, text=True, timeout=60)
-    if result.returncode != 0:
-        raise RuntimeError(f"curl error: {result.stderr}")
-    try:
-        return json.loads(result.stdout)
-    except json.JSONDecodeError as e:
-        raise RuntimeError(f"JSON parse error: {e}\nRaw: {result.stdout[:300]}")
-
-
-def get_sources(response: dict) -> list:
-    """ดึง list ของ _source dict จาก standard hits"""
-    hits = response.get("data", {}).get("hits", {}).get("hits", [])
-    return [h.get("_source", {}) for h in hits]
-
-
-def get_ids(sources: list) -> list:
-    """ดึง list ของ id จาก sources"""
-    seen, ids = set(), []
-    for s in sources:
-        id_val = s.get("id")
-        if id_val and id_val not in seen:
-            ids.append(id_val)
-            seen.add(id_val)
-    return ids
-
-
-# ======================================================
-# SPANNER HELPERS (เหมือนต้นฉบับ)
-# ======================================================
-def query_spanner(sql: str) -> list:
-    """รัน SQL ใน Spanner แล้วคืน list ของ id"""
-    try:
-        from google.cloud import spanner
-    except ImportError:
-        raise RuntimeError(
-            "ไม่พบ google-cloud-spanner กรุณารัน:\n"
-            "  pip install google-cloud-spanner --break-system-packages"
-        )
-    client   = spanner.Client(project=SP_PROJECT)
-    instance = client.instance(SP_INSTANCE)
-    database = instance.database(SP_DATABASE)
-
-    ids, seen = [], set()
-    with database.snapshot() as snapshot:
-        results = snapshot.execute_sql(sql)
-        for row in results:
-            row_dict = dict(zip([col.name for col in results.fields], row))
-            id_val = row_dict.get("id")
-            if id_val and id_val not in seen:
-                ids.append(id_val)
-                seen.add(id_val)
-    return ids
-
-
-def build_existence_sql(ids: list) -> str:
-    """SQL ง่ายๆ เช็คว่า IDs จาก API มีใน mst_privilege_nonprod ไหม"""
-    id_array = "[" + ", ".join(f"'{i}'" for i in ids) + "]"
-    return f"""
-SELECT id
-FROM mst_privilege_nonprod
-WHERE id IN UNNEST(CAST({id_array} AS ARRAY<STRING>))
-"""
-
-
-def compare_with_spanner(label: str, api_ids: list) -> tuple:
-    """
-    เอา IDs จาก API ไปเช็คใน Spanner
-    คืน (passed, summary_msg, detail_dict)
-    - passed = True ถ้า api_ids ทุกตัวมีใน Spanner (only_api ว่าง)
-    """
-    if not api_ids:
-        return True, "ไม่มี IDs ให้ตรวจสอบใน Spanner", {}
-
-    sp_ids  = query_spanner(build_existence_sql(api_ids))
-    api_set = set(api_ids)
-    sp_set  = set(sp_ids)
-
-    only_api = sorted(api_set - sp_set)
-    only_sp  = sorted(sp_set  - api_set)
-    both     = sorted(api_set & sp_set)
-
-    detail = {
-        "api_count":     len(api_ids),
-        "spanner_count": len(sp_ids),
-        "match":         len(both),
-        "only_api":      only_api,
-        "only_spanner":  only_sp,
-    }
-
-    print(f"\n    📊 Spanner compare [{label}]")
-    print(f"       API IDs       : {len(api_ids)}")
-    print(f"       Spanner found : {len(sp_ids)}")
-    print(f"       ✅ Match      : {len(both)}")
-    if only_api:
-        print(f"       ❌ Only API (ไม่มีใน Spanner): {only_api}")
-    if only_sp:
-        print(f"       ⚠️  Only Spanner (API ไม่ส่งออกมา): {only_sp}")
-
-    if only_api:
-        return False, (
-            f"Spanner: {len(only_api)} IDs อยู่ใน API แต่ไม่มีใน Spanner → {only_api[:5]}"
-        ), detail
-    return True, f"Spanner: ทุก {len(both)} IDs match ✓", detail
-
-
-# ======================================================
-# TEST RUNNER
-# ======================================================
-test_results = []
-
-def run_test(name: str, fn):
-    print(f"\n{'─'*60}")
-    print(f"🧪  {name}")
-    print(f"{'─'*60}")
-    try:
-        passed, msg = fn()
-        icon = "✅ PASS" if passed else "❌ FAIL"
-        print(f"  {icon}: {msg}")
-        test_results.append({"name": name, "passed": passed, "msg": msg})
-    except Exception as e:
-        print(f"  💥 ERROR: {e}")
-        test_results.append({"name": name, "passed": False, "msg": f"ERROR: {e}"})
-
-
 # ======================================================
 # STANDARD TEST CASES
 # ======================================================
@@ -241,8 +97,9 @@ def run_test(name: str, fn):
 # ── 1. limit ────────────────────────────────────────────
 def test_limit():
     """จำนวน items ที่ได้ต้องไม่เกิน limit ที่กำหนด และ IDs match Spanner"""
+    responses = call_api_variants({"language": "th"}, "limit", [5, 20, 50])
     for lim in [5, 20, 50]:
-        resp    = call_api({"limit": lim, "language": "th"})
+        resp    = responses[lim]
         sources = get_sources(resp)
         count   = len(sources)
         print(f"    limit={lim:>3} → {count} items")
@@ -744,73 +601,38 @@ def test_max_point_bracket():
     return True, f"ทุก {len(sources)} items มี redeem_point <= 10 (bracket 0-10) และ {sp_msg}"
 
 
+# ======================================================
+# SUITE
+# ======================================================
+SUITE = [
+    ("STANDARD", [
+        ("1.  limit (5 / 20 / 50)",                                               test_limit),
+        ("2.  language = th",                                                     test_language_th),
+        ("3.  language = en",                                                     test_language_en),
+        ("4.  sort_field = HIT_COUNT_DAY_14",                                     test_sort_field),
+        ("5.  article_category — items อยู่ใน category ที่กำหนด",                 test_article_category),
+        ("6.  fields — ครบ 4 fields ตามที่กำหนด",                                 test_fields),
+        ("7.  exclude_ids — ID ไม่ปรากฏเมื่อกำหนด",                               test_exclude_ids_when_set),
+        ("8.  exclude_ids — ID ปรากฏเมื่อไม่กำหนด",                               test_exclude_ids_when_not_set),
+    ]),
+    ("PREDICTIONS + ID", [
+        ("P1. predictions+id paired — items ปรากฏ + เรียง score desc",            test_predictions_paired_and_ordered),
+        ("P2. id ไม่มีใน predictions — item ไม่ปรากฏ",                            test_id_not_in_predictions),
+        ("P3. predictions ไม่มีใน id list — item ไม่ปรากฏ",                       test_predictions_not_in_id),
+    ]),
+    ("CARD TYPE", [
+        ("C1. card_type=['black'] + full params — items มี card_type=black",      test_card_type_black),
+        ("C2. card_type (red/blue/green/white/no_card) — items ตรงกับ card_type", test_card_type_others),
+    ]),
+    ("MAX POINT", [
+        ("M1. max_point=200 (>10) — redeem_point <= 200",                         test_max_point_normal),
+        ("M2. max_point=5 (0-10 bracket) — redeem_point in [0, 10]",              test_max_point_bracket),
+    ]),
+]
+
+
 # ======================================================
 # MAIN
 # ======================================================
 if __name__ == "__main__":
-    print("=" * 60)
-    print("🚀  Privilege — Parameter Test Suite (Standard + Predictions + Card Type + Max Point)")
-    print(f"    API     : {API_URL}")
-    print(f"    Spanner : {SP_PROJECT} / {SP_INSTANCE} / {SP_DATABASE}")
-    print("=" * 60)
-
-    # ── Standard ─────────────────────────────────────────
-    print(f"\n{'━'*60}")
-    print("📌  STANDARD")
-    print(f"{'━'*60}")
-    run_test("1.  limit (5 / 20 / 50)",                                      test_limit)
-    run_test("2.  language = th",                                             test_language_th)
-    run_test("3.  language = en",                                             test_language_en)
-    run_test("4.  sort_field = HIT_COUNT_DAY_14",                            test_sort_field)
-    run_test("5.  article_category — items อยู่ใน category ที่กำหนด",       test_article_category)
-    run_test("6.  fields — ครบ 4 fields ตามที่กำหนด",                       test_fields)
-    run_test("7.  exclude_ids — ID ไม่ปรากฏเมื่อกำหนด",                     test_exclude_ids_when_set)
-    run_test("8.  exclude_ids — ID ปรากฏเมื่อไม่กำหนด",                     test_exclude_ids_when_not_set)
-
-    # ── Predictions + ID ─────────────────────────────────
-    print(f"\n{'━'*60}")
-    print("📌  PREDICTIONS + ID")
-    print(f"{'━'*60}")
-    run_test("P1. predictions+id paired — items ปรากฏ + เรียง score desc",   test_predictions_paired_and_ordered)
-    run_test("P2. id ไม่มีใน predictions — item ไม่ปรากฏ",                  test_id_not_in_predictions)
-    run_test("P3. predictions ไม่มีใน id list — item ไม่ปรากฏ",             test_predictions_not_in_id)
-
-    # ── Card Type ─────────────────────────────────────────
-    print(f"\n{'━'*60}")
-    print("📌  CARD TYPE")
-    print(f"{'━'*60}")
-    run_test("C1. card_type=['black'] + full params — items มี card_type=black",         test_card_type_black)
-    run_test("C2. card_type (red/blue/green/white/no_card) — items ตรงกับ card_type",    test_card_type_others)
-
-    # ── Max Point ─────────────────────────────────────────
-    print(f"\n{'━'*60}")
-    print("📌  MAX POINT")
-    print(f"{'━'*60}")
-    run_test("M1. max_point=200 (>10) — redeem_point <= 200",                test_max_point_normal)
-    run_test("M2. max_point=5 (0-10 bracket) — redeem_point in [0, 10]",    test_max_point_bracket)
-
-    # ── Summary ──────────────────────────────────────────
-    print(f"\n{'='*60}")
-    print("📋  สรุปผลการทดสอบ")
-    print(f"{'='*60}")
-    passed_count = sum(1 for r in test_results if r["passed"])
-    total_count  = len(test_results)
-
-    for r in test_results:
-        icon = "✅" if r["passed"] else "❌"
-        print(f"  {icon}  {r['name']}")
-
-    print(f"\n  ผลรวม: {passed_count}/{total_count} passed", end="")
-    if passed_count == total_count:
-        print("  🎉")
-    else:
-        print(f"  ({total_count - passed_count} failed)")
-
-    # บันทึกผลออกเป็น JSON
-    out_dir     = os.path.dirname(os.path.abspath(__file__))
-    report_path = os.path.join(out_dir, "test_privilege_result.json")
-    with open(report_path, "w", encoding="utf-8") as f:
-        json.dump(test_results, f, ensure_ascii=False, indent=2)
-    print(f"\n  💾 บันทึกผลที่: {report_path}")
-
-    sys.exit(0 if passed_count == total_count else 1)
+    sys.exit(SERVICE.main(SUITE))
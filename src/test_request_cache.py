@@ -0,0 +1,135 @@
+"""
+test_request_cache.py
+
+Unit tests ของ qa_common.request_cache และ cache ใน http_client.post_json (ไม่ยิง network)
+
+Test Cases:
+  1. request_key       — ลำดับ key ใน body ไม่มีผล, method / URL / body ต่าง = key ต่าง
+  2. hit / miss        — key เดิมยิงจริงครั้งเดียว
+  3. coalesced         — thread ที่ขอ key เดียวกันพร้อมกันรอผลของ request เดียว
+  4. error             — fetch ที่ raise ไม่ติด cache
+  5. post_json         — cache เฉพาะ 2xx ที่ body เป็น JSON, 4xx/5xx และ body เสียยิงใหม่
+"""
+
+import threading
+import sys
+import os
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.request_cache import RequestCache, request_key
+
+pytestmark = pytest.mark.unit
+
+
+# ======================================================
+# TESTS
+# ======================================================
+def test_request_key_canonical():
+    url = "http://cache-test.local/api"
+    a = request_key("post", url, {"limit": 10, "language": "th", "ids": ["ก", "b"]})
+    b = request_key("POST", url, {"ids": ["ก", "b"], "language": "th", "limit": 10})
+    if a != b:
+        return False, "ลำดับ key / ตัวพิมพ์ของ method ต้องไม่มีผล"
+    others = [
+        request_key("GET", url, {"limit": 10, "language": "th", "ids": ["ก", "b"]}),
+        request_key("POST", url + "2", {"limit": 10, "language": "th", "ids": ["ก", "b"]}),
+        request_key("POST", url, {"limit": 10, "language": "th", "ids": ["b", "ก"]}),
+        request_key("POST", url),
+    ]
+    if a in others or len(set(others)) != len(others):
+        return False, "method / URL / body ต่างกันต้องได้ key ต่างกัน"
+    return True, "canonical key ✓"
+
+
+def test_hit_and_miss():
+    cache = RequestCache()
+    calls = []
+    fetch = lambda: calls.append(1) or b"{}"
+    for _ in range(3):
+        cache.get_or_fetch("k", fetch)
+    cache.get_or_fetch("other", fetch)
+    stats = cache.stats()
+    if len(calls) != 2 or stats["hits"] != 2 or stats["misses"] != 2 or stats["entries"] != 2:
+        return False, f"calls={len(calls)} stats={stats}"
+    return True, f"{stats['saved_calls']} calls ไม่ได้ยิง ✓"
+
+
+def test_coalesced():
+    """8 threads ขอ key เดียวกันขณะ fetch ยังไม่เสร็จ — ยิงจริงครั้งเดียว"""
+    cache = RequestCache()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b'{"ok": true}'
+
+    owner = threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", fetch)))
+    owner.start()
+    started.wait(5)
+    waiters = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", fetch)))
+               for _ in range(7)]
+    for t in waiters:
+        t.start()
+    while cache.coalesced < len(waiters):
+        threading.Event().wait(0.005)
+    release.set()
+    for t in [owner] + waiters:
+        t.join()
+
+    if len(calls) != 1 or results != [b'{"ok": true}'] * 8 or cache.coalesced != 7:
+        return False, f"calls={len(calls)} coalesced={cache.coalesced} results={len(results)}"
+    return True, "coalesced 7 requests ✓"
+
+
+def test_error_not_cached():
+    cache = RequestCache()
+
+    def boom():
+        raise RuntimeError("HTTP error")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("k", boom)
+    if cache.get_or_fetch("k", lambda: b"{}") != b"{}" or cache.misses != 2:
+        return False, f"error ติด cache: {cache.stats()}"
+    return True, "error ไม่ติด cache ✓"
+
+
+def test_post_json_caches_only_2xx_json(monkeypatch):
+    """ผลจาก _post_raw: 503 และ body ที่ไม่ใช่ JSON ยิงใหม่, 200 JSON ยิงครั้งเดียว"""
+    pytest.importorskip("requests")
+    from qa_common import http_client
+
+    responses = {
+        "ok":     (200, b'{"items": []}'),
+        "error":  (503, b'{"error": "busy"}'),
+        "broken": (200, b"<html>gateway</html>"),
+    }
+    calls = []
+
+    def fake_post_raw(url, data, timeout):
+        calls.append(url)
+        return responses[url.rsplit("/", 1)[1]]
+
+    monkeypatch.setattr(http_client, "_post_raw", fake_post_raw)
+    monkeypatch.setattr(http_client, "CACHE_ENABLED", True)
+    monkeypatch.setattr(http_client, "SESSION_CACHE", RequestCache())
+
+    for name in responses:
+        url = f"http://cache-test.local/{name}"
+        for _ in range(2):
+            try:
+                http_client.post_json(url, {"limit": 10}, cache=True)
+            except RuntimeError:
+                pass                            # body เสีย → JSON parse error (ไม่ใช่สิ่งที่ทดสอบ)
+    counts = {name: sum(u.endswith("/" + name) for u in calls) for name in responses}
+    if counts != {"ok": 1, "error": 2, "broken": 2}:
+        return False, f"จำนวนครั้งที่ยิงจริง = {counts}"
+    return True, "cache เฉพาะ 2xx JSON ✓"
@@ -0,0 +1,148 @@
+"""
+test_request_policy.py
+
+Unit tests ของ qa_common.request_policy กับ session ปลอม (ไม่ยิง network)
+
+Test Cases:
+  1. ไม่ idempotent + read timeout → ไม่ยิงซ้ำ (TransportError หลัง 1 attempt)
+  2. ไม่ idempotent + 5xx          → คืน 5xx ไม่ยิงซ้ำ
+  3. ไม่ idempotent + 429 / connect timeout → retry ได้ (request ไม่ถึง server / server ปฏิเสธ)
+  4. idempotent GET               → retry timeout / 5xx จนได้ 200
+  5. idempotent=True กับ POST      → ถือว่าไม่ idempotent
+  6. hedge                        → ปิดเป็นค่าตั้งต้น, เปิดแล้วยิงตัวที่ 2 หลัง p95 และเอาตัวที่เสร็จก่อน
+"""
+
+import itertools
+import threading
+import sys
+import os
+import time
+
+import pytest
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common import request_policy
+from qa_common.request_policy import RequestPolicy, TransportError, fetch
+
+pytestmark = pytest.mark.unit
+
+POLICY = RequestPolicy(deadline=5, attempt_timeout=1, retries=2, backoff_base=0.0, backoff_cap=0.0)
+_urls  = itertools.count()
+
+
+class FakeResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+class ScriptedSession:
+    """request() ครั้งที่ n ทำตาม script[n]: status code, exception หรือ (delay, status)"""
+
+    def __init__(self, script: list):
+        self.script = list(script)
+        self.calls  = 0
+        self._lock  = threading.Lock()
+
+    def request(self, method, url, timeout=None, **kwargs):
+        with self._lock:
+            step = self.script[min(self.calls, len(self.script) - 1)]
+            self.calls += 1
+        if isinstance(step, BaseException):
+            raise step
+        if isinstance(step, tuple):
+            delay, step = step
+            time.sleep(delay)
+        return FakeResponse(step)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    holder = {}
+
+    def use(script):
+        holder["s"] = ScriptedSession(script)
+        monkeypatch.setattr(request_policy, "get_session", lambda: holder["s"])
+        return holder["s"]
+    return use
+
+
+def _url() -> str:
+    # endpoint ใหม่ทุก test — p95 / counters ไม่ปนกัน
+    return f"http://policy-test.local/api/v1/universal/t{next(_urls)}"
+
+
+# ======================================================
+# TESTS
+# ======================================================
+def test_stateful_read_timeout_not_retried(session):
+    s = session([requests.ReadTimeout("slow")])
+    with pytest.raises(TransportError) as exc:
+        fetch(_url(), policy=POLICY)
+    if s.calls != 1:
+        return False, f"read timeout ของ request ที่ไม่ idempotent ถูกยิงซ้ำ ({s.calls} calls)"
+    if len(exc.value.transport["attempts"]) != 1:
+        return False, f"transport = {exc.value.transport['attempts']}"
+    return True, "ไม่ยิงซ้ำหลัง read timeout ✓"
+
+
+def test_stateful_5xx_not_retried(session):
+    s = session([503, 200])
+    resp, transport = fetch(_url(), policy=POLICY)
+    if s.calls != 1 or resp.status_code != 503 or transport["retries"]:
+        return False, f"calls={s.calls} status={resp.status_code} retries={transport['retries']}"
+    return True, "คืน 503 โดยไม่ยิงซ้ำ ✓"
+
+
+def test_stateful_retries_only_unsent(session):
+    for first in (429, requests.ConnectTimeout("connect")):
+        s = session([first, 200])
+        resp, transport = fetch(_url(), policy=POLICY)
+        if s.calls != 2 or resp.status_code != 200 or transport["retries"] != 1:
+            return False, f"{first!r}: calls={s.calls} status={resp.status_code}"
+    return True, "429 / connect timeout retry ได้ ✓"
+
+
+def test_idempotent_get_retries(session):
+    s = session([requests.ReadTimeout("slow"), 502, 200])
+    resp, transport = fetch(_url(), policy=POLICY, idempotent=True)
+    if s.calls != 3 or resp.status_code != 200 or transport["retries"] != 2:
+        return False, f"calls={s.calls} status={resp.status_code} retries={transport['retries']}"
+    if not transport["idempotent"] or not transport["tail_hit"]:
+        return False, f"transport = {transport}"
+    return True, "retry timeout + 5xx จนได้ 200 ✓"
+
+
+def test_idempotent_post_is_stateful(session):
+    s = session([503, 200])
+    resp, transport = fetch(_url(), method="POST", policy=POLICY, idempotent=True)
+    if s.calls != 1 or transport["idempotent"]:
+        return False, f"POST ถูก retry แบบ idempotent (calls={s.calls})"
+    return True, "POST ไม่ retry 5xx ✓"
+
+
+def test_hedge(session, monkeypatch):
+    url = _url()
+    for _ in range(4 * request_policy.HEDGE_MIN_SAMPLES):          # p95 ≈ 10 ms
+        request_policy._observe(request_policy.endpoint_of(url), 0.01)
+
+    monkeypatch.setattr(request_policy, "HEDGE_ENABLED", False)       # ค่าตั้งต้น (ไม่ได้ตั้ง QA_HEDGE)
+    s = session([(0.3, 200), 200])
+    resp, transport = fetch(url, policy=POLICY, idempotent=True)
+    if s.calls != 1 or transport["hedges"]:
+        return False, f"QA_HEDGE ไม่ได้เปิด แต่ hedge (calls={s.calls})"
+
+    monkeypatch.setattr(request_policy, "HEDGE_ENABLED", True)
+    s = session([(0.3, 200), 200])
+    resp, transport = fetch(url, policy=POLICY, idempotent=True)
+    if transport["hedges"] != 1 or not transport["hedge_won"] or resp.status_code != 200:
+        return False, f"hedges={transport['hedges']} hedge_won={transport['hedge_won']}"
+
+    s = session([(0.3, 200), 200])
+    resp, transport = fetch(url, policy=POLICY)
+    if transport["hedges"]:
+        return False, "request ที่ไม่ idempotent ต้องไม่ hedge"
+    return True, "hedge เฉพาะ idempotent เมื่อเปิด ✓"
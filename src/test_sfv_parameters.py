@@ -34,33 +34,40 @@ Test Cases — LATEST:
   L3. agg_latest_output_fields — _source ทุกตัวมีครบตาม output_fields ที่กำหนด
 """
 
-import json
-import subprocess
 import sys
 import os
-import warnings
-import logging
 
-# ปิด Spanner telemetry warnings (เหมือนต้นฉบับ)
-os.environ["SPANNER_ENABLE_BUILTIN_METRICS"] = "false"
-warnings.filterwarnings("ignore")
-logging.disable(logging.CRITICAL)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.agg_oracle import api_bucket_ids, compare_latest_with_oracle, compare_tophit_with_oracle
+from qa_common.metadata_oracle import compare_with_oracle
+from qa_common.metadata_service import (
+    ServiceSpec, get_sources, get_ids,
+    get_tophit_buckets, get_bucket_hits,
+    get_all_tophit_sources, get_tophit_ids_from_response,
+    get_latest_buckets, get_latest_bucket_hits,
+    get_all_latest_sources, get_latest_ids_from_response,
+)
 
 # ======================================================
 # CONFIG
 # ======================================================
-API_URL = "http://ai-metadata-service.preprod-gcp-ai-bn.int-ai-platform.gcp.dmp.true.th/metadata/sfv"
+SERVICE = ServiceSpec(
+    "sfv", endpoint="sfv", database="ai_raas_nonprod", table="mst_sfv_nonprod",
+    title="SFV — Parameter Test Suite (Standard + Tophit + Latest)",
+    report_file="test_sfv_standard_result.json",
+)
+call_api             = SERVICE.call_api
+call_api_variants    = SERVICE.call_api_variants
+compare_with_spanner = SERVICE.compare_with_spanner
 
-SP_PROJECT  = "tdg-ai-platform-nonprod02-bxev"
-SP_INSTANCE = "g1d-ai-spannerb01"
-SP_DATABASE = "ai_raas_nonprod"
+# template ที่ oracle ใช้คำนวณ expected IDs (QA_ORACLE_SNAPSHOT — qa_common.metadata_oracle)
+SQL_ORACLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sfv_standard.sql")
+SQL_ORACLE_TOPHIT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sfv_agg_tophit.sql")
+SQL_ORACLE_LATEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sfv_agg_latest.sql")
 
-DEFAULT_OPTIONS = {
-    "rename_mapping": False,
-    "dry_run": False,
-    "debug": True,
-    "cache": False
-}
 
 # ค่า id list จริงจาก REQUEST_BODY_STANDARD
 ID_LIST = [
@@ -102,206 +109,6 @@ LATEST_BASE_PARAMS = {
 LATEST_OUTPUT_FIELDS = ["id", "publish_date", "article_category", "tags", "create_by"]
 
 
-# ======================================================
-# API HELPERS
-# ======================================================
-def call_api(params: dict) -> dict:
-    """ยิง API แล้ว return response dict"""
-    body = {"parameters": params, "options": DEFAULT_OPTIONS}
-    curl_cmd = [
-        "curl", "--location", "--silent",
-        API_URL,
-        "--header", "Content-Type: application/json",
-        "--data", json.dumps(body, ensure_ascii=False)
-    ]
-    result = subprocess.run(curl_cmd, capture_output=True, text=True, timeout=60)
-    if result.returncode != 0:
-        raise RuntimeError(f"curl error: {result.stderr}")
-    try:
-        return json.loads(result.stdout)
-    except json.JSONDecodeError as e:
-        raise RuntimeError(f"JSON parse error: {e}\nRaw: {result.stdout[:300]}")
-
-
-def get_sources(response: dict) -> list:
-    """ดึง list ของ _source dict จาก standard hits"""
-    hits = response.get("data", {}).get("hits", {}).get("hits", [])
-    return [h.get("_source", {}) for h in hits]
-
-
-def get_ids(sources: list) -> list:
-    """ดึง list ของ id จาก sources"""
-    seen, ids = set(), []
-    for s in sources:
-        id_val = s.get("id")
-        if id_val and id_val not in seen:
-            ids.append(id_val)
-            seen.add(id_val)
-    return ids
-
-
-# ── Tophit-specific helpers ──────────────────────────────
-def get_tophit_buckets(response: dict) -> list:
-    """ดึง list ของ buckets จาก aggregations.agg_tophit"""
-    return (response.get("data", {})
-                    .get("aggregations", {})
-                    .get("agg_tophit", {})
-                    .get("buckets", []))
-
-
-def get_bucket_hits(bucket: dict) -> list:
-    """ดึง hits จาก bucket (รองรับทั้ง sort_by_hit_count และ hits fallback)"""
-    for key in ["sort_by_hit_count", "hits"]:
-        hits = bucket.get(key, {}).get("hits", {}).get("hits", [])
-        if hits:
-            return hits
-    return []
-
-
-def get_all_tophit_sources(response: dict) -> list:
-    """ดึง _source ทุกตัวจากทุก bucket รวมกัน"""
-    sources = []
-    for bucket in get_tophit_buckets(response):
-        for h in get_bucket_hits(bucket):
-            sources.append(h.get("_source", {}))
-    return sources
-
-
-def get_tophit_ids_from_response(response: dict) -> list:
-    """ดึง unique IDs ทั้งหมดจาก tophit buckets"""
-    return get_ids(get_all_tophit_sources(response))
-
-
-# ── Latest-specific helpers ───────────────────────────────
-def get_latest_buckets(response: dict) -> list:
-    """ดึง list ของ buckets จาก aggregations.agg_latest"""
-    return (response.get("data", {})
-                    .get("aggregations", {})
-                    .get("agg_latest", {})
-                    .get("buckets", []))
-
-
-def get_latest_bucket_hits(bucket: dict) -> list:
-    """ดึง hits จาก latest bucket (รองรับ sort_by_publish_date / latest / hits)"""
-    for key in ["sort_by_publish_date", "latest", "hits"]:
-        hits = bucket.get(key, {}).get("hits", {}).get("hits", [])
-        if hits:
-            return hits
-    return []
-
-
-def get_all_latest_sources(response: dict) -> list:
-    """ดึง _source ทุกตัวจากทุก latest bucket"""
-    sources = []
-    for bucket in get_latest_buckets(response):
-        for h in get_latest_bucket_hits(bucket):
-            sources.append(h.get("_source", {}))
-    return sources
-
-
-def get_latest_ids_from_response(response: dict) -> list:
-    """ดึง unique IDs ทั้งหมดจาก latest buckets"""
-    return get_ids(get_all_latest_sources(response))
-
-
-# ======================================================
-# SPANNER HELPERS (เหมือนต้นฉบับ)
-# ======================================================
-def query_spanner(sql: str) -> list:
-    """รัน SQL ใน Spanner แล้วคืน list ของ id"""
-    try:
-        from google.cloud import spanner
-    except ImportError:
-        raise RuntimeError(
-            "ไม่พบ google-cloud-spanner กรุณารัน:\n"
-            "  pip install google-cloud-spanner --break-system-packages"
-        )
-    client   = spanner.Client(project=SP_PROJECT)
-    instance = client.instance(SP_INSTANCE)
-    database = instance.database(SP_DATABASE)
-
-    ids, seen = [], set()
-    with database.snapshot() as snapshot:
-        results = snapshot.execute_sql(sql)
-        for row in results:
-            row_dict = dict(zip([col.name for col in results.fields], row))
-            id_val = row_dict.get("id")
-            if id_val and id_val not in seen:
-                ids.append(id_val)
-                seen.add(id_val)
-    return ids
-
-
-def build_existence_sql(ids: list) -> str:
-    """SQL ง่ายๆ เช็คว่า IDs จาก API มีใน mst_sfv_nonprod ไหม"""
-    id_array = "[" + ", ".join(f"'{i}'" for i in ids) + "]"
-    return f"""
-SELECT id
-FROM mst_sfv_nonprod
-WHERE id IN UNNEST(CAST({id_array} AS ARRAY<STRING>))
-"""
-
-
-def compare_with_spanner(label: str, api_ids: list) -> tuple:
-    """
-    เอา IDs จาก API ไปเช็คใน Spanner
-    คืน (passed, summary_msg, detail_dict)
-    - passed = True ถ้า api_ids ทุกตัวมีใน Spanner (only_api ว่าง)
-    """
-    if not api_ids:
-        return True, "ไม่มี IDs ให้ตรวจสอบใน Spanner", {}
-
-    sp_ids  = query_spanner(build_existence_sql(api_ids))
-    api_set = set(api_ids)
-    sp_set  = set(sp_ids)
-
-    only_api = sorted(api_set - sp_set)   # อยู่ใน API แต่ไม่มีใน Spanner
-    only_sp  = sorted(sp_set  - api_set)  # อยู่ใน Spanner แต่ไม่มีใน API (ปกติ)
-    both     = sorted(api_set & sp_set)
-
-    detail = {
-        "api_count":     len(api_ids),
-        "spanner_count": len(sp_ids),
-        "match":         len(both),
-        "only_api":      only_api,
-        "only_spanner":  only_sp,
-    }
-
-    print(f"\n    📊 Spanner compare [{label}]")
-    print(f"       API IDs       : {len(api_ids)}")
-    print(f"       Spanner found : {len(sp_ids)}")
-    print(f"       ✅ Match      : {len(both)}")
-    if only_api:
-        print(f"       ❌ Only API (ไม่มีใน Spanner): {only_api}")
-    if only_sp:
-        print(f"       ⚠️  Only Spanner (API ไม่ส่งออกมา): {only_sp}")
-
-    if only_api:
-        return False, (
-            f"Spanner: {len(only_api)} IDs อยู่ใน API แต่ไม่มีใน Spanner → {only_api[:5]}"
-        ), detail
-    return True, f"Spanner: ทุก {len(both)} IDs match ✓", detail
-
-
-# ======================================================
-# TEST RUNNER
-# ======================================================
-test_results = []
-
-def run_test(name: str, fn):
-    print(f"\n{'─'*60}")
-    print(f"🧪  {name}")
-    print(f"{'─'*60}")
-    try:
-        passed, msg = fn()
-        icon = "✅ PASS" if passed else "❌ FAIL"
-        print(f"  {icon}: {msg}")
-        test_results.append({"name": name, "passed": passed, "msg": msg})
-    except Exception as e:
-        print(f"  💥 ERROR: {e}")
-        test_results.append({"name": name, "passed": False, "msg": f"ERROR: {e}"})
-
-
 # ======================================================
 # TEST CASES
 # ======================================================
@@ -310,8 +117,10 @@ def run_test(name: str, fn):
 def test_limit():
     """ทดสอบ limit 5, 20, 50 — items ที่ได้ต้องไม่เกิน limit"""
     all_sp_detail = []
+    responses = call_api_variants({"language": "th"}, "limit", [5, 20, 50])
     for lim in [5, 20, 50]:
-        resp    = call_api({"limit": lim, "language": "th"})
+        params  = {"limit": lim, "language": "th"}
+        resp    = responses[lim]
         sources = get_sources(resp)
         count   = len(sources)
         print(f"    limit={lim} → ได้ {count} items")
@@ -325,13 +134,19 @@ def test_limit():
         if not sp_ok:
             return False, f"limit={lim} — {sp_msg}"
 
+        # Oracle verify (ID ที่ควรได้จาก snapshot — ข้ามถ้าไม่ได้ตั้ง QA_ORACLE_SNAPSHOT)
+        or_ok, or_msg, _ = compare_with_oracle(f"limit={lim}", "mst_sfv_nonprod", SQL_ORACLE, params, api_ids)
+        if not or_ok:
+            return False, f"limit={lim} — {or_msg}"
+
     return True, "limit 5/20/50 — จำนวน items ไม่เกิน limit และทุก IDs match Spanner ✓"
 
 
 # ── 2. language = th ────────────────────────────────────
 def test_language_th():
     """language=th ต้องได้ items กลับมา และ IDs match Spanner"""
-    resp    = call_api({"limit": 10, "language": "th"})
+    params  = {"limit": 10, "language": "th"}
+    resp    = call_api(params)
     sources = get_sources(resp)
     if not sources:
         return False, "language=th → ไม่มี items ใน response"
@@ -341,13 +156,17 @@ def test_language_th():
     sp_ok, sp_msg, _ = compare_with_spanner("language=th", api_ids)
     if not sp_ok:
         return False, f"language=th parameter OK แต่ {sp_msg}"
+    or_ok, or_msg, _ = compare_with_oracle("language=th", "mst_sfv_nonprod", SQL_ORACLE, params, api_ids)
+    if not or_ok:
+        return False, f"language=th — {or_msg}"
     return True, f"language=th → {len(sources)} items, {sp_msg}"
 
 
 # ── 3. language = en ────────────────────────────────────
 def test_language_en():
     """language=en ต้องได้ items กลับมา และ IDs match Spanner"""
-    resp    = call_api({"limit": 10, "language": "en"})
+    params  = {"limit": 10, "language": "en"}
+    resp    = call_api(params)
     sources = get_sources(resp)
     if not sources:
         return False, "language=en → ไม่มี items ใน response"
@@ -357,6 +176,9 @@ def test_language_en():
     sp_ok, sp_msg, _ = compare_with_spanner("language=en", api_ids)
     if not sp_ok:
         return False, f"language=en parameter OK แต่ {sp_msg}"
+    or_ok, or_msg, _ = compare_with_oracle("language=en", "mst_sfv_nonprod", SQL_ORACLE, params, api_ids)
+    if not or_ok:
+        return False, f"language=en — {or_msg}"
     return True, f"language=en → {len(sources)} items, {sp_msg}"
 
 
@@ -367,8 +189,8 @@ def test_tophit_date_filter_50():
     และ IDs ทั้ง 2 set match Spanner
     """
     base = {"limit": 200, "language": "th"}
-    resp_30 = call_api({**base, "tophit_date_filter": 30})
-    resp_50 = call_api({**base, "tophit_date_filter": 50})
+    responses = call_api_variants(base, "tophit_date_filter", [30, 50])
+    resp_30, resp_50 = responses[30], responses[50]
     c30 = len(get_sources(resp_30))
     c50 = len(get_sources(resp_50))
     print(f"    tophit_date_filter=30 → {c30} items")
@@ -657,9 +479,10 @@ def test_tophit_limit():
     limit=100 รวม >= limit=50 รวม (ช่วงเดียวกัน แต่เลือกได้มากกว่า)
     """
     results = {}
+    responses = call_api_variants(TOPHIT_BASE_PARAMS, "agg_tophit_limit", [50, 100])
     for lim in [50, 100]:
         params = {**TOPHIT_BASE_PARAMS, "agg_tophit_limit": lim}
-        resp   = call_api(params)
+        resp   = responses[lim]
         buckets = get_tophit_buckets(resp)
         if not buckets:
             return False, f"agg_tophit_limit={lim} → ไม่มี buckets"
@@ -683,6 +506,12 @@ def test_tophit_limit():
         if not sp_ok:
             return False, f"limit={lim} parameter OK แต่ {sp_msg}"
 
+        # Oracle verify — สมาชิก + ลำดับของทุก bucket (ข้ามถ้าไม่ได้ตั้ง QA_ORACLE_SNAPSHOT)
+        or_ok, or_msg, _ = compare_tophit_with_oracle(f"tophit limit={lim}", "mst_sfv_nonprod", SQL_ORACLE_TOPHIT,
+                                                      params, api_bucket_ids(buckets, "agg_tophit"))
+        if not or_ok:
+            return False, f"limit={lim} — {or_msg}"
+
     if results[100]["total"] < results[50]["total"]:
         return False, (
             f"limit=100 ({results[100]['total']} hits) น้อยกว่า "
@@ -804,9 +633,10 @@ def test_latest_limit():
     limit=100 รวม >= limit=50 รวม
     """
     results = {}
+    responses = call_api_variants(LATEST_BASE_PARAMS, "agg_latest_limit", [50, 100])
     for lim in [50, 100]:
         params  = {**LATEST_BASE_PARAMS, "agg_latest_limit": lim}
-        resp    = call_api(params)
+        resp    = responses[lim]
         buckets = get_latest_buckets(resp)
         if not buckets:
             return False, f"agg_latest_limit={lim} → ไม่มี buckets"
@@ -829,6 +659,12 @@ def test_latest_limit():
         if not sp_ok:
             return False, f"limit={lim} parameter OK แต่ {sp_msg}"
 
+        # Oracle verify — latest N ต่อ bucket ตาม publish_date (ข้ามถ้าไม่ได้ตั้ง QA_ORACLE_SNAPSHOT)
+        or_ok, or_msg, _ = compare_latest_with_oracle(f"latest limit={lim}", "mst_sfv_nonprod", SQL_ORACLE_LATEST,
+                                                      params, api_bucket_ids(buckets, "agg_latest"))
+        if not or_ok:
+            return False, f"limit={lim} — {or_msg}"
+
     if results[100]["total"] < results[50]["total"]:
         return False, (
             f"limit=100 ({results[100]['total']} hits) น้อยกว่า "
@@ -869,73 +705,41 @@ def test_latest_output_fields():
     return True, f"ทุก {len(sources)} items มีครบ {len(LATEST_OUTPUT_FIELDS)} fields และ {sp_msg}"
 
 
+# ======================================================
+# SUITE
+# ======================================================
+SUITE = [
+    ("STANDARD", [
+        ("1.  limit (5 / 20 / 50)",                                                       test_limit),
+        ("2.  language = th",                                                             test_language_th),
+        ("3.  language = en",                                                             test_language_en),
+        ("4.  tophit_date_filter 30 → 50",                                                test_tophit_date_filter_50),
+        ("5.  title — ทุก items มีคำว่า 'รัก'",                                           test_title_contains_rak),
+        ("6.  is_related_ecommerce=False → ไม่มี related",                                test_is_related_ecommerce_false),
+        ("7.  is_related_ecommerce=True  → มี related ทุก item",                          test_is_related_ecommerce_true),
+        ("8.  id filter — IDs อยู่ใน id list เท่านั้น",                                   test_id_filter),
+        ("9a. fields — is_related_ecommerce=True  → ครบ 5 fields",                        test_fields_5_with_related),
+        ("9b. fields — is_related_ecommerce=False → ได้ 4 fields",                        test_fields_4_without_related),
+        ("10. filter_out_category — ไม่มี category ต้องห้าม",                             test_filter_out_category),
+        ("11. exclude_ids — ID ไม่ปรากฏเมื่อกำหนด",                                       test_exclude_ids_when_set),
+        ("12. exclude_ids — ID ปรากฏเมื่อไม่กำหนด",                                       test_exclude_ids_when_not_set),
+    ]),
+    ("TOPHIT", [
+        ("T1. agg_tophit_group_field — required, แบ่งกลุ่มตาม article_category",          test_tophit_group_field_required),
+        ("T2. agg_tophit_limit 50 / 100 — hits ต่อ bucket ไม่เกิน limit",                 test_tophit_limit),
+        ("T3. agg_tophit_output_fields — _source ครบตาม fields ที่กำหนด",                 test_tophit_output_fields),
+        ("T4. agg_tophit_sort_by — required (PLAY_COUNT_DAY_14), ไม่ใส่ → ไม่มี buckets", test_tophit_sort_by),
+    ]),
+    ("LATEST", [
+        ("L1. agg_latest_group_field — required, แบ่งกลุ่มตาม article_category",          test_latest_group_field_required),
+        ("L2. agg_latest_limit 50 / 100 — hits ต่อ bucket ไม่เกิน limit",                 test_latest_limit),
+        ("L3. agg_latest_output_fields — _source ครบตาม fields ที่กำหนด",                 test_latest_output_fields),
+    ]),
+]
+
+
 # ======================================================
 # MAIN
 # ======================================================
 if __name__ == "__main__":
-    print("=" * 60)
-    print("🚀  SFV — Parameter Test Suite (Standard + Tophit + Latest)")
-    print(f"    API     : {API_URL}")
-    print(f"    Spanner : {SP_PROJECT} / {SP_INSTANCE} / {SP_DATABASE}")
-    print("=" * 60)
-
-    # ── Standard ─────────────────────────────────────────
-    print(f"\n{'━'*60}")
-    print("📌  STANDARD")
-    print(f"{'━'*60}")
-    run_test("1.  limit (5 / 20 / 50)",                                   test_limit)
-    run_test("2.  language = th",                                          test_language_th)
-    run_test("3.  language = en",                                          test_language_en)
-    run_test("4.  tophit_date_filter 30 → 50",                            test_tophit_date_filter_50)
-    run_test("5.  title — ทุก items มีคำว่า 'รัก'",                      test_title_contains_rak)
-    run_test("6.  is_related_ecommerce=False → ไม่มี related",           test_is_related_ecommerce_false)
-    run_test("7.  is_related_ecommerce=True  → มี related ทุก item",     test_is_related_ecommerce_true)
-    run_test("8.  id filter — IDs อยู่ใน id list เท่านั้น",             test_id_filter)
-    run_test("9a. fields — is_related_ecommerce=True  → ครบ 5 fields",   test_fields_5_with_related)
-    run_test("9b. fields — is_related_ecommerce=False → ได้ 4 fields",   test_fields_4_without_related)
-    run_test("10. filter_out_category — ไม่มี category ต้องห้าม",       test_filter_out_category)
-    run_test("11. exclude_ids — ID ไม่ปรากฏเมื่อกำหนด",                 test_exclude_ids_when_set)
-    run_test("12. exclude_ids — ID ปรากฏเมื่อไม่กำหนด",                 test_exclude_ids_when_not_set)
-
-    # ── Tophit ───────────────────────────────────────────
-    print(f"\n{'━'*60}")
-    print("📌  TOPHIT")
-    print(f"{'━'*60}")
-    run_test("T1. agg_tophit_group_field — required, แบ่งกลุ่มตาม article_category", test_tophit_group_field_required)
-    run_test("T2. agg_tophit_limit 50 / 100 — hits ต่อ bucket ไม่เกิน limit",        test_tophit_limit)
-    run_test("T3. agg_tophit_output_fields — _source ครบตาม fields ที่กำหนด",        test_tophit_output_fields)
-    run_test("T4. agg_tophit_sort_by — required (PLAY_COUNT_DAY_14), ไม่ใส่ → ไม่มี buckets", test_tophit_sort_by)
-
-    # ── Latest ───────────────────────────────────────────
-    print(f"\n{'━'*60}")
-    print("📌  LATEST")
-    print(f"{'━'*60}")
-    run_test("L1. agg_latest_group_field — required, แบ่งกลุ่มตาม article_category", test_latest_group_field_required)
-    run_test("L2. agg_latest_limit 50 / 100 — hits ต่อ bucket ไม่เกิน limit",        test_latest_limit)
-    run_test("L3. agg_latest_output_fields — _source ครบตาม fields ที่กำหนด",        test_latest_output_fields)
-
-    # ── Summary ──────────────────────────────────────────
-    print(f"\n{'='*60}")
-    print("📋  สรุปผลการทดสอบ")
-    print(f"{'='*60}")
-    passed_count = sum(1 for r in test_results if r["passed"])
-    total_count  = len(test_results)
-
-    for r in test_results:
-        icon = "✅" if r["passed"] else "❌"
-        print(f"  {icon}  {r['name']}")
-
-    print(f"\n  ผลรวม: {passed_count}/{total_count} passed", end="")
-    if passed_count == total_count:
-        print("  🎉")
-    else:
-        print(f"  ({total_count - passed_count} failed)")
-
-    # บันทึกผลออกเป็น JSON
-    out_dir     = os.path.dirname(os.path.abspath(__file__))
-    report_path = os.path.join(out_dir, "test_sfv_standard_result.json")
-    with open(report_path, "w", encoding="utf-8") as f:
-        json.dump(test_results, f, ensure_ascii=False, indent=2)
-    print(f"\n  💾 บันทึกผลที่: {report_path}")
-
-    sys.exit(0 if passed_count == total_count else 1)
+    sys.exit(SERVICE.main(SUITE))
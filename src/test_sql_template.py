@@ -0,0 +1,136 @@
+"""
+test_sql_template.py
+
+Unit tests ของ qa_common.sql_template (ไม่ยิง Spanner)
+
+Test Cases:
+  1. parse Params      — scalar / ARRAY<scalar> → @p_xxx พร้อม type + default, STRUCT คง literal
+  2. LIMIT 10          — → LIMIT @row_limit เฉพาะ template ที่มี (agg template ไม่มี row_limit)
+  3. inject_ids        — bind p_id_list + row_limit เฉพาะ template ที่ประกาศ, SQL text เดิมทุกชุด ID
+  4. bind unknown      — parameter ที่ template ไม่มี → KeyError
+  5. ทุก template ใน src — parse ได้และไม่เหลือ literal ของ p_id_list
+"""
+
+import glob
+import sys
+import os
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.sql_template import ROW_LIMIT_PARAM, SqlTemplate, SqlTemplateError, load_template
+
+pytestmark = pytest.mark.unit
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TEMPLATE = """WITH
+  Params AS (
+  SELECT
+    CAST([] AS ARRAY<STRING>) AS p_id_list,   -- ids, จาก API
+    'th' AS p_language,
+    'it\\'s' AS p_quoted,
+    FALSE AS p_is_random,
+    CAST([] AS ARRAY<STRUCT<id STRING, priority INT64>>) AS p_keymap_order,
+    CAST(NULL AS FLOAT64) AS p_last_score,
+    30 AS p_days,
+    0.5 AS p_ratio
+  ),
+Main AS (
+  SELECT id FROM mst_x WHERE id IN UNNEST((SELECT p_id_list FROM Params))
+  LIMIT 10
+)
+SELECT * FROM Main;
+"""
+
+
+# ======================================================
+# TESTS
+# ======================================================
+def test_parse_params():
+    """type / default ของทุก p_* ที่ bind ได้ — STRUCT คง literal"""
+    tpl = SqlTemplate("inline.sql", TEMPLATE)
+    want_types = {"p_id_list": "ARRAY<STRING>", "p_language": "STRING", "p_quoted": "STRING",
+                  "p_is_random": "BOOL", "p_last_score": "FLOAT64", "p_days": "INT64",
+                  "p_ratio": "FLOAT64", ROW_LIMIT_PARAM: "INT64"}
+    want_defaults = {"p_id_list": [], "p_language": "th", "p_quoted": "it's", "p_is_random": False,
+                     "p_last_score": None, "p_days": 30, "p_ratio": 0.5, ROW_LIMIT_PARAM: 10}
+    if tpl.types != want_types:
+        return False, f"types = {tpl.types}"
+    if tpl.defaults != want_defaults:
+        return False, f"defaults = {tpl.defaults}"
+    if tpl.literal != ["p_keymap_order"]:
+        return False, f"literal = {tpl.literal}"
+    for name in want_types:
+        if name != ROW_LIMIT_PARAM and f"@{name} AS {name}" not in tpl.sql:
+            return False, f"{name} ไม่ถูกแทนด้วย @{name}"
+    if "ARRAY<STRUCT<id STRING, priority INT64>>) AS p_keymap_order" not in tpl.sql:
+        return False, "p_keymap_order ต้องคง literal เดิม"
+    if "-- ids, จาก API" not in tpl.sql:
+        return False, "comment ใน Params หายไป"
+    return True, f"{len(tpl.types)} parameters ✓"
+
+
+def test_limit_rewrite():
+    """LIMIT 10 → LIMIT @row_limit; template ที่ไม่มี LIMIT 10 ไม่มี row_limit"""
+    tpl = SqlTemplate("inline.sql", TEMPLATE)
+    if "LIMIT @row_limit" not in tpl.sql or "LIMIT 10" in tpl.sql:
+        return False, "LIMIT 10 ไม่ถูกแทน"
+    no_limit = SqlTemplate("agg.sql", TEMPLATE.replace("  LIMIT 10\n", ""))
+    if ROW_LIMIT_PARAM in no_limit.types:
+        return False, "template ที่ไม่มี LIMIT 10 ไม่ควรมี row_limit"
+    return True, "row_limit เฉพาะ template ที่มี LIMIT 10 ✓"
+
+
+def test_inject_ids_binds_declared_params(tmp_path, monkeypatch):
+    """ServiceSpec.inject_ids: row_limit เฉพาะ template ที่ประกาศ, SQL text คงเดิมทุกชุด ID"""
+    metadata_service = pytest.importorskip("qa_common.metadata_service")
+    bound = []
+    monkeypatch.setattr(SqlTemplate, "bind", lambda self, **values: (self.sql, values, None))
+
+    std = tmp_path / "std.sql"
+    agg = tmp_path / "agg.sql"
+    std.write_text(TEMPLATE, encoding="utf-8")
+    agg.write_text(TEMPLATE.replace("  LIMIT 10\n", ""), encoding="utf-8")
+    spec = metadata_service.ServiceSpec("x", endpoint="x", database="db", table="mst_x")
+    for path, ids in ((std, ["a", "b"]), (std, ["c"] * 1500), (agg, ["a"])):
+        bound.append(spec.inject_ids(str(path), ids))
+
+    (sql1, p1, _), (sql2, p2, _), (_, p3, _) = bound
+    if sql1 != sql2:
+        return False, "SQL text เปลี่ยนตามชุด ID (Spanner reuse plan ไม่ได้)"
+    if p1 != {"p_id_list": ["a", "b"], ROW_LIMIT_PARAM: 1000} or p2[ROW_LIMIT_PARAM] != 1500:
+        return False, f"params = {p1} / row_limit {p2[ROW_LIMIT_PARAM]}"
+    if p3 != {"p_id_list": ["a"]}:
+        return False, f"agg template ไม่ควรได้ row_limit: {p3}"
+    return True, "bind ตาม parameter ที่ template ประกาศ ✓"
+
+
+def test_bind_unknown_param():
+    """bind parameter ที่ template ไม่มี → KeyError ก่อนแตะ Spanner"""
+    tpl = SqlTemplate("inline.sql", TEMPLATE)
+    with pytest.raises(KeyError):
+        tpl.bind(p_not_there=1)
+    with pytest.raises(SqlTemplateError):
+        SqlTemplate("broken.sql", "SELECT 1")
+    return True, "KeyError / SqlTemplateError ✓"
+
+
+def test_all_repo_templates_parse():
+    """ทุก *.sql ใน src ที่มี p_id_list → bind p_id_list ได้"""
+    paths = sorted(glob.glob(os.path.join(SRC_DIR, "*.sql")))
+    checked = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            if "AS p_id_list" not in f.read():
+                continue
+        tpl = load_template(path)
+        if tpl.types.get("p_id_list") != "ARRAY<STRING>" or "@p_id_list AS p_id_list" not in tpl.sql:
+            return False, f"{os.path.basename(path)}: p_id_list ไม่ได้เป็น @param"
+        checked += 1
+    if not checked:
+        return False, "ไม่พบ template ที่มี p_id_list"
+    return True, f"{checked} templates ✓"
@@ -11,14 +11,21 @@ Logic การตรวจสอบ:
 """
 
 import csv
+import os
 import pathlib
+import time
 import pytest
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from urllib.parse import urlencode
 
+from qa_common.http_client import get_session
+
 REPORT_DIR = pathlib.Path(__file__).parent / "card_type_reports"
 
+# จำนวน request ที่ prefetch พร้อมกันสูงสุด (bounded pool)
+PREFETCH_WORKERS = int(os.environ.get("CARD_TYPE_PREFETCH_WORKERS", "8"))
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
@@ -136,33 +143,59 @@ for _cfg in _ENDPOINT_CONFIGS:
 # ---------------------------------------------------------------------------
 
 
-def call_api(endpoint: str, params: dict, method: str = "GET") -> dict:
-    """เรียก API แล้วคืน JSON response พร้อม log URL ที่ถูกเรียก"""
+def _send(endpoint: str, params: dict, method: str = "GET"):
     url = f"{BASE_URL}/{endpoint}"
-    full_url = f"{url}?{urlencode(params)}"
+    if method == "POST":
+        return get_session().post(url, params=params, data="", timeout=30)
+    return get_session().get(url, params=params, timeout=30)
+
+
+def _print_call(method: str, full_url: str, status: int, data=None):
     print(f"\n{'='*70}")
     print(f"  METHOD : {method}")
     print(f"  URL    : {full_url}")
     print(f"{'='*70}")
-    if method == "POST":
-        resp = requests.post(url, params=params, data="", timeout=30)
-    else:
-        resp = requests.get(url, params=params, timeout=30)
-    print(f"  STATUS : {resp.status_code}")
-    resp.raise_for_status()
-    data = resp.json()
+    print(f"  STATUS : {status}")
     # แสดง top-level keys เพื่อช่วย debug structure ของ response
     if isinstance(data, dict):
         print(f"  RESPONSE TOP-LEVEL KEYS: {list(data.keys())}")
+
+
+def call_api(endpoint: str, params: dict, method: str = "GET") -> dict:
+    """เรียก API แล้วคืน JSON response พร้อม log URL ที่ถูกเรียก"""
+    resp = _send(endpoint, params, method)
+    full_url = f"{BASE_URL}/{endpoint}?{urlencode(params)}"
+    if not resp.ok:
+        _print_call(method, full_url, resp.status_code)
+    resp.raise_for_status()
+    data = resp.json()
+    _print_call(method, full_url, resp.status_code, data)
     return data
 
 
+def fetch_case(tc: dict) -> dict:
+    """
+    ยิง API ของ test case 1 ตัว (ไม่ print — ใช้ตอน prefetch แบบ concurrent)
+    คืน {"status", "response", "fetch_s"} หรือ {"error", "fetch_s"} ถ้า request fail
+    """
+    t0 = time.perf_counter()
+    try:
+        resp = _send(tc["endpoint"], tc["params"], tc.get("method", "GET"))
+        resp.raise_for_status()
+        return {"status": resp.status_code, "response": resp.json(),
+                "fetch_s": time.perf_counter() - t0}
+    except Exception as e:   # เก็บ error ไว้ raise ตอน test ที่ใช้ case นี้
+        return {"error": e, "fetch_s": time.perf_counter() - t0}
+
+
 def _recursive_find_node(data, node_name: str, _depth: int = 0):
     """
     ค้นหา node แบบ recursive ใน dict/list ทุก level
     คืน node["result"] ถ้าเจอ dict ที่มี key "name" == node_name
     หรือคืน dict ที่ key == node_name แล้วมี "result" อยู่ข้างใน
     """
+    # ไม่ใช้ qa_common.node_index: ที่นี่ key-form มาก่อน name-form และจำกัดลึก 5 level
+    # (walk ถูกจำกัดอยู่แล้ว — index ไม่ช่วยอะไร)
     if _depth > 5 or data is None:
         return None
 
@@ -424,20 +457,64 @@ def categorize_item(card_types: list, user_card_type: Optional[str]) -> str:
 # ---------------------------------------------------------------------------
 
 
+# ── Prefetch stage ─────────────────────────────────────────────────────────
+# ยิงทุก case ที่ถูกเลือก (หลัง -k / -m) พร้อมกันครั้งเดียวต่อ session
+# แล้วทุก test method ใช้ response เดียวกันของ case นั้น (memoised)
+_TIMINGS = {"fetch_wall_s": 0.0, "fetch_sum_s": 0.0, "validate_s": 0.0, "cases": 0}
+
+
+@pytest.fixture(scope="session")
+def prefetched_responses(request):
+    """Fixture: prefetch response ของทุก case ที่ถูกเลือกด้วย bounded thread pool"""
+    selected = {}
+    for item in request.session.items:
+        tc = getattr(item, "callspec", None) and item.callspec.params.get("api_response")
+        if isinstance(tc, dict) and "endpoint" in tc:
+            selected.setdefault(tc["name"], tc)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS) as pool:
+        results = dict(zip(selected, pool.map(fetch_case, selected.values())))
+    _TIMINGS["fetch_wall_s"] = time.perf_counter() - t0
+    _TIMINGS["fetch_sum_s"]  = sum(r["fetch_s"] for r in results.values())
+    _TIMINGS["cases"]        = len(results)
+
+    yield results
+
+    print(
+        f"\n[card_type timing] prefetch {_TIMINGS['cases']} cases: "
+        f"wall={_TIMINGS['fetch_wall_s']:.2f}s (sum={_TIMINGS['fetch_sum_s']:.2f}s, "
+        f"workers={PREFETCH_WORKERS}) | validation={_TIMINGS['validate_s']:.2f}s"
+    )
+
+
 @pytest.fixture(params=TEST_CASES, ids=lambda tc: tc["name"])
-def api_response(request):
-    """Fixture: เรียก API แต่ละ endpoint แล้วคืน response dict"""
+def api_response(request, prefetched_responses, record_property):
+    """Fixture: คืน response ของ case จาก prefetch cache (ไม่ยิง API ซ้ำต่อ test method)"""
     tc = request.param
-    response = call_api(tc["endpoint"], tc["params"], tc.get("method", "GET"))
+    entry = prefetched_responses.get(tc["name"]) or fetch_case(tc)
+    record_property("fetch_s", round(entry["fetch_s"], 3))
+    if "error" in entry:
+        raise entry["error"]
+
+    _print_call(tc.get("method", "GET"), tc["url"], entry["status"], entry["response"])
     return {
         "name": tc["name"],
         "result_node": tc.get("result_node", "merge_page"),
         "user_card_type_node": tc.get("user_card_type_node", "feature_segments"),
         "params": tc["params"],
-        "response": response,
+        "response": entry["response"],
     }
 
 
+@pytest.fixture(autouse=True)
+def _validation_timer(api_response):
+    """จับเวลาเฉพาะส่วน validation (หลัง api_response พร้อมแล้ว) แยกจากเวลา fetch"""
+    t0 = time.perf_counter()
+    yield
+    _TIMINGS["validate_s"] += time.perf_counter() - t0
+
+
 # ---------------------------------------------------------------------------
 # Tests
 # ---------------------------------------------------------------------------
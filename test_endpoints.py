@@ -13,6 +13,8 @@ import pytest
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 
+from qa_common.host_limiter import limited
+
 BASE = (
     "http://ai-universal-service-new.preprod-gcp-ai-bn"
     ".int-ai-platform.gcp.dmp.true.th/api/v1/universal"
@@ -78,10 +80,11 @@ def check_item(item: dict) -> list[dict]:
 
 # ── Fetch ──────────────────────────────────────────────────────────────────────
 def fetch(url: str) -> tuple[int, Any]:
-    r = subprocess.run(
-        ["curl", "--silent", "--location", "--write-out", "\n%{http_code}", url],
-        capture_output=True, text=True, timeout=30,
-    )
+    with limited(url):
+        r = subprocess.run(
+            ["curl", "--silent", "--location", "--write-out", "\n%{http_code}", url],
+            capture_output=True, text=True, timeout=30,
+        )
     lines = r.stdout.rsplit("\n", 1)
     body, code = lines[0], lines[-1].strip()
     status = int(code) if code.isdigit() else 0
@@ -4,24 +4,29 @@ test_live_commerce.py
 pytest — validate live commerce items จาก 7 endpoints
 
 Test cases:
-  [Endpoint]       E1: HTTP 200 | E2: node found | E3: response time ≤ 5s
+  [Endpoint]       E1: HTTP 200 | E2: node found | E3: response time ≤ 5s (server: TTFB + download)
   [Item]           I1–I11 per ActivityId
   [Cross-node]     C1: consistent fields | C2: merge_page IDs ⊆ get_all_live_today
   [Pagination]     P1: no duplicate ActivityId across cursor 1-5
 
 รัน:  pytest test_live_commerce.py -v
       pytest test_live_commerce.py -v -k "e1 or e2"
+
+timing ของ request (DNS / connect / TTFB / download / bytes) แนบใน properties.timing
+ของ reports/evidence/<test>.json (root conftest.py)
 """
 
 import json
 import re
-import subprocess
-import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 
 import pytest
 
+from qa_common.curl_timing import curl_get
+from qa_common.host_limiter import limiter_for
+from qa_common.node_index import index_of
+
 # ── Config ───────────────────────────────────────────────────────────────────
 BASE = (
     "http://ai-universal-service-new.preprod-gcp-ai-bn"
@@ -29,6 +34,7 @@ BASE = (
 )
 RESPONSE_TIME_LIMIT = 5.0
 CURSOR_RANGE = range(1, 6)
+PAGE_TIMINGS: dict = {}   # ep_name → {cursor: timing} (pagination_responses)
 NODES = ["get_all_live_today", "merge_page"]
 
 ENDPOINTS = [
@@ -71,41 +77,18 @@ EP_BY_NAME    = {ep["name"]: ep for ep in ENDPOINTS}
 
 
 # ── HTTP + extraction helpers ─────────────────────────────────────────────────
-def fetch(url: str) -> tuple[int, float, Any]:
+def fetch(url: str) -> tuple[int, dict, Any]:
+    """คืน (status, timing, data) — timing = เวลาแยกตาม phase จาก curl (qa_common.curl_timing)"""
     try:
-        t0  = time.monotonic()
-        res = subprocess.run(
-            ["curl", "-s", "-o", "-", "-w", "\n__STATUS__%{http_code}", url],
-            capture_output=True, text=True, timeout=30,
-        )
-        elapsed = time.monotonic() - t0
-        *body_parts, status_line = res.stdout.rsplit("\n__STATUS__", 1)
-        body   = "\n__STATUS__".join(body_parts)
-        status = int(status_line.strip()) if status_line.strip().isdigit() else 0
-        return status, elapsed, json.loads(body)
+        status, body, timing = curl_get(url, timeout=30)
+        return status, timing, json.loads(body)
     except Exception as e:
-        return 0, 0.0, {"_error": str(e)}
+        return 0, {}, {"_error": str(e)}
 
 
 def _find_node_in(obj: Any, node_name: str):
-    if isinstance(obj, dict):
-        if obj.get("name") == node_name and "result" in obj:
-            return obj["result"]
-        node = obj.get(node_name)
-        if isinstance(node, dict):
-            return node.get("result", node)
-        for v in obj.values():
-            if isinstance(v, (dict, list)):
-                found = _find_node_in(v, node_name)
-                if found is not None:
-                    return found
-    elif isinstance(obj, list):
-        for elem in obj:
-            if isinstance(elem, (dict, list)):
-                found = _find_node_in(elem, node_name)
-                if found is not None:
-                    return found
-    return None
+    # response เดียวกันถูก walk ครั้งเดียว แล้ว lookup ทุก node จาก index
+    return index_of(obj, name_needs_result=True).result(node_name)
 
 
 def get_node_result(response_data: dict, node_name: str):
@@ -158,10 +141,11 @@ def all_responses():
         futures = {ex.submit(fetch, ep["url"]): ep for ep in ENDPOINTS}
         for fut in as_completed(futures):
             ep = futures[fut]
-            status, elapsed, data = fut.result()
+            status, timing, data = fut.result()
             results[ep["name"]] = {
                 "status":  status,
-                "elapsed": elapsed,
+                "elapsed": timing.get("server_s", 0.0),   # เวลาฝั่ง server (ไม่รวม spawn curl)
+                "timing":  timing,
                 "data":    data if status == 200 else None,
             }
     return results
@@ -175,7 +159,8 @@ def pagination_responses():
 
     def _fetch_one(ep, cursor):
         url    = make_cursor_url(ep["url"], cursor)
-        status, _, data = fetch(url)
+        status, timing, data = fetch(url)
+        PAGE_TIMINGS.setdefault(ep["name"], {})[cursor] = timing
         if status != 200 or data is None:
             return ep["name"], cursor, []
         result = get_node_result(data, "merge_page")
@@ -186,8 +171,9 @@ def pagination_responses():
             str(i.get("ActivityId") or i.get("activityId")) for i in items
         ]
 
-    tasks = [(ep, c) for ep in paged_eps for c in CURSOR_RANGE]
-    with ThreadPoolExecutor(max_workers=len(tasks)) as ex:
+    tasks   = [(ep, c) for ep in paged_eps for c in CURSOR_RANGE]
+    workers = min(len(tasks), limiter_for(BASE).max_inflight)   # เกินนี้ก็รอ slot ของ host อยู่ดี
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
         futures = [ex.submit(_fetch_one, ep, c) for ep, c in tasks]
         for fut in as_completed(futures):
             name, cursor, ids = fut.result()
@@ -196,6 +182,20 @@ def pagination_responses():
     return results
 
 
+@pytest.fixture(autouse=True)
+def _attach_timing(request, record_property):
+    """แนบ timing ของ response ที่ test ใช้ลง evidence (เฉพาะ fixture ที่ test ขอเอง — ไม่ fetch เพิ่ม)"""
+    callspec = getattr(request.node, "callspec", None)
+    ep_name  = callspec.params.get("ep_name") if callspec else None
+    if ep_name is None:
+        return
+    if "all_responses" in request.fixturenames:
+        record_property("timing", request.getfixturevalue("all_responses")[ep_name]["timing"])
+    elif "pagination_responses" in request.fixturenames:
+        request.getfixturevalue("pagination_responses")
+        record_property("timing", PAGE_TIMINGS.get(ep_name, {}))
+
+
 # ── Helper: get live items, skip if unavailable ───────────────────────────────
 def _require_items(all_responses, ep_name: str, node_name: str) -> list[dict]:
     """คืน live items หรือ pytest.skip ถ้า endpoint/node ไม่พร้อม"""
@@ -224,12 +224,14 @@ def test_e1_http_200(all_responses, ep_name):
 
 @pytest.mark.parametrize("ep_name", EP_NAMES)
 def test_e3_response_time(all_responses, ep_name):
-    """E3: response time ต้องไม่เกิน RESPONSE_TIME_LIMIT วินาที"""
+    """E3: response time ฝั่ง server (TTFB + download) ต้องไม่เกิน RESPONSE_TIME_LIMIT วินาที"""
     r = all_responses[ep_name]
     if r["status"] != 200:
         pytest.skip(f"HTTP {r['status']}")
+    t = r["timing"]
     assert r["elapsed"] <= RESPONSE_TIME_LIMIT, (
-        f"response time {r['elapsed']:.2f}s > {RESPONSE_TIME_LIMIT}s"
+        f"server time {r['elapsed']:.2f}s > {RESPONSE_TIME_LIMIT}s "
+        f"(ttfb {t['ttfb_s']:.2f}s, download {t['download_s']:.2f}s, {t['bytes']:,} bytes)"
     )
 
 
@@ -1,8 +1,20 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
-import requests
 from dataclasses import dataclass, field
 from typing import Callable, List, Dict, Any, Optional
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.http_client import get_session
+from qa_common.node_index import index_of
+
 # ══════════════════════════════════════════════════════════════════════════════
 # CONFIG (Global defaults)
 # ══════════════════════════════════════════════════════════════════════════════
@@ -10,12 +22,25 @@ BASE_URL     = "http://ai-universal-service-new.preprod-gcp-ai-bn.int-ai-platfor
 METADATA_URL = "http://ai-metadata-service.preprod-gcp-ai-bn.int-ai-platform.gcp.dmp.true.th"
 TIMEOUT      = 30
 
+# จำนวน scenario ที่ build พร้อมกันได้สูงสุด (= request ที่ in-flight พร้อมกันสูงสุด
+# เพราะแต่ละ scenario เดิน cursor ทีละ request)
+MAX_CONCURRENCY = int(os.environ.get("FOLLOWING_MAX_CONCURRENCY", "8"))
+
 # ══════════════════════════════════════════════════════════════════════════════
 # Logging helpers
 # ══════════════════════════════════════════════════════════════════════════════
 SEP = "═" * 65
 
-def log(msg):        print(msg)
+_log_local = threading.local()   # .lines != None → buffer log ของ scenario ที่กำลัง build
+
+
+def log(msg):
+    lines = getattr(_log_local, "lines", None)
+    if lines is not None:
+        lines.append(str(msg))
+    else:
+        print(msg)
+
 def section(t):      log(f"\n{SEP}\n  {t}\n{SEP}")
 def step(l, v=None): log(f"  ▶ {l}{(': ' + str(v)) if v is not None else ''}")
 def ok(l):           log(f"  ✅ {l}")
@@ -53,16 +78,10 @@ def t_block(passed: bool, tid: str, desc: str):
 # Generic helpers
 # ══════════════════════════════════════════════════════════════════════════════
 def find_key(obj, key_name):
-    """Recursive search — หา node ไม่ว่าจะซ้อนลึกแค่ไหน"""
+    """หา node ไม่ว่าจะซ้อนลึกแค่ไหน (ค้นเฉพาะใน dict ไม่ลงไปใน list) — body เดียวกัน walk ครั้งเดียว"""
     if not isinstance(obj, dict):
         return None
-    if key_name in obj:
-        return obj[key_name]
-    for v in obj.values():
-        found = find_key(v, key_name)
-        if found is not None:
-            return found
-    return None
+    return index_of(obj, lists=False).value(key_name)
 
 
 def extract_ids(node):
@@ -76,7 +95,7 @@ def extract_ids(node):
 
 
 def call_api(endpoint: str, params: Dict[str, Any]) -> Dict:
-    resp = requests.get(f"{BASE_URL}{endpoint}", params=params, timeout=TIMEOUT)
+    resp = get_session().get(f"{BASE_URL}{endpoint}", params=params, timeout=TIMEOUT)
     resp.raise_for_status()
     return resp.json()
 
@@ -92,7 +111,7 @@ def call_metadata_following(ssoids: List[str], limit: int = 200) -> List[str]:
             "language": "th",
         }
     }
-    resp = requests.post(
+    resp = get_session().post(
         f"{METADATA_URL}/metadata/sfv_following_chanel",
         json=payload,
         timeout=TIMEOUT,
@@ -145,6 +164,7 @@ class Scenario:
     config:    ScenarioConfig
     build_fn:  Callable[["Scenario"], List[Dict[str, Any]]]
     verify_fn: Callable[[Dict[str, Any]], None]
+    marks:     List[Any] = field(default_factory=list)   # pytest marks → ใช้กับ -m ได้
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -1273,46 +1293,148 @@ register(Scenario(
 
 
 # ══════════════════════════════════════════════════════════════════════════════
-# Build all test cases from all registered scenarios
+# Deferred build — เดิน cursor เฉพาะ scenario ที่ถูกเลือก (หลัง -k / -m) ตอน test แรกรัน
+#   • collection ไม่ยิง network เลย (item = 1 test case — id คำนวณจาก config ด้วย case_ids())
+#   • build พร้อมกันด้วย ThreadPoolExecutor (MAX_CONCURRENCY threads — requests เป็น blocking I/O
+#     จึงใช้ thread ตรง ๆ 1 chain ต่อ 1 worker)
+#   • cursor ภายใน scenario เดียวกันยังเดินตามลำดับ (seen state อยู่ฝั่ง server)
+#   • scenario ที่ใช้ user เดียวกัน (endpoint + ssoId) ถูกต่อเป็น chain เดียว
+#     เพราะ cursor ของคนละ scenario จะไปแก้ seen state ของกันและกัน
+#   • log ของแต่ละ scenario ถูก buffer แล้ว print ทีเดียวตอน build เสร็จ (ไม่ปนกัน)
+#   • ผล build cache ไว้ใน _BUILD_CACHE, เวลา build ต่อ scenario ใน _BUILD_TIMES
+#   • build_fn ที่ raise → เก็บ exception ไว้ใน _BUILD_CACHE แทน cases
+#     → fail เฉพาะ test ของ scenario นั้น (scenario อื่นยัง build / verify ต่อ)
 # ══════════════════════════════════════════════════════════════════════════════
-def _build_all() -> List[Dict[str, Any]]:
-    all_cases = []
-    for scenario in SCENARIO_REGISTRY:
-        all_cases.extend(scenario.build_fn(scenario))
-    return all_cases
+_BUILD_CACHE: Dict[str, Any]                  = {}   # scenario name → test cases | Exception
+_BUILD_TIMES: Dict[str, float]                = {}   # scenario name → build seconds
+
 
+def _get_scenario(name: str) -> Scenario:
+    return next(s for s in SCENARIO_REGISTRY if s.name == name)
 
-_ALL_TEST_CASES = _build_all()
+
+def case_ids(scenario: Scenario) -> List[str]:
+    """
+    test_id ทุกตัวที่ build_fn สร้างได้ — คำนวณจาก config ล้วน ๆ (collection ไม่ยิง network)
+    scenario แบบต่อ cursor: คู่ (cursor-1, cursor) ทุกคู่จนถึง max_cursors (walk หยุดก่อน → case ที่เหลือ skip)
+    scenario แบบรวม: case เดียว
+    """
+    if scenario.build_fn in (_seen_pool_build, _non_following_build):
+        cfg = scenario.config
+        return [f"{scenario.name}::src=cursor{c - 1}_chk=cursor{c}"
+                for c in range(cfg.start_cursor + 1, cfg.start_cursor + cfg.max_cursors)]
+    if scenario.build_fn is _all_cursor_dup_build:
+        return [f"{scenario.name}::all_cursors_dup_check"]
+    return [f"{scenario.name}::all_cursors"]
+
+
+def _walk_key(scenario: Scenario) -> tuple:
+    cfg = scenario.config
+    return (cfg.endpoint, str(cfg.base_params.get("ssoId")))
+
+
+def _run_build(scenario: Scenario) -> tuple:
+    """รัน build_fn ใน worker thread — คืน (cases หรือ exception, log_lines, elapsed_s)"""
+    _log_local.lines = []
+    t0 = time.perf_counter()
+    try:
+        result = scenario.build_fn(scenario)
+    except Exception as e:                               # fail เฉพาะ scenario นี้
+        result = e
+    finally:
+        lines, _log_local.lines = _log_local.lines, None
+    return result, lines, time.perf_counter() - t0
+
+
+_print_lock = threading.Lock()
+
+
+def _build_chain(chain: List[Scenario]):
+    """build scenario ของ user เดียวกันทีละตัวตามลำดับ (เรียกใน worker thread ของ pool)"""
+    for scenario in chain:
+        result, lines, elapsed = _run_build(scenario)
+        with _print_lock:
+            print("\n".join(lines))
+            if isinstance(result, Exception):
+                print(f"  ❌ [{scenario.name}] build error after {elapsed:.1f}s: "
+                      f"{type(result).__name__}: {result}")
+            else:
+                print(f"  ⏱️  [{scenario.name}] built {len(result)} cases in {elapsed:.1f}s")
+        _BUILD_CACHE[scenario.name] = result
+        _BUILD_TIMES[scenario.name] = elapsed
+
+
+def _build_all(scenarios: List[Scenario], max_concurrency: int):
+    chains: Dict[tuple, List[Scenario]] = {}
+    for scenario in scenarios:
+        chains.setdefault(_walk_key(scenario), []).append(scenario)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(chains)))) as pool:
+        for future in [pool.submit(_build_chain, c) for c in chains.values()]:
+            future.result()
+
+
+def build_scenarios(names, max_concurrency: int = MAX_CONCURRENCY) -> Dict[str, Any]:
+    """Build scenario ตามชื่อที่ยังไม่อยู่ใน cache แล้วคืน {name: cases | exception}"""
+    names = set(names)
+    todo  = [s for s in SCENARIO_REGISTRY if s.name in names and s.name not in _BUILD_CACHE]
+    if todo:
+        t0 = time.perf_counter()
+        _build_all(todo, max_concurrency)
+        wall = time.perf_counter() - t0
+
+        section(f"BUILD TIMES  ({len(todo)} scenarios, wall {wall:.1f}s, "
+                f"sum {sum(_BUILD_TIMES[s.name] for s in todo):.1f}s, "
+                f"max_concurrency={max_concurrency})")
+        for s in sorted(todo, key=lambda s: -_BUILD_TIMES[s.name]):
+            result = _BUILD_CACHE[s.name]
+            built  = "ERROR" if isinstance(result, Exception) else f"{len(result):>3} cases"
+            log(f"  {s.name:<34}{_BUILD_TIMES[s.name]:>7.1f}s   {built}")
+        log(SEP)
+    return {n: _BUILD_CACHE[n] for n in names if n in _BUILD_CACHE}
 
 
 # ══════════════════════════════════════════════════════════════════════════════
-# Pytest — parametrize + dispatch
+# Pytest — parametrize (ไม่ยิง network) + deferred build + dispatch
 # ══════════════════════════════════════════════════════════════════════════════
 def pytest_generate_tests(metafunc):
-    if "tc" in metafunc.fixturenames:
-        ids = [
-            c.get("test_id") or
-            f"{c['scenario']}::src=cursor{c['cursor_source']}_chk=cursor{c['cursor_check']}"
-            for c in _ALL_TEST_CASES
-        ]
-        metafunc.parametrize("tc", _ALL_TEST_CASES, ids=ids)
+    if "scenario_name" in metafunc.fixturenames:
+        params = [pytest.param(s.name, case_id, id=case_id, marks=s.marks)
+                  for s in SCENARIO_REGISTRY for case_id in case_ids(s)]
+        metafunc.parametrize("scenario_name,case_id", params)
+
+
+@pytest.fixture(scope="session")
+def scenario_cases(request) -> Dict[str, Any]:
+    """Build ทุก scenario ที่ถูกเลือกใน session นี้พร้อมกันครั้งเดียว (cached)"""
+    registered = {s.name for s in SCENARIO_REGISTRY}
+    selected   = {
+        item.callspec.params["scenario_name"]
+        for item in request.session.items
+        if hasattr(item, "callspec") and item.callspec.params.get("scenario_name") in registered
+    }
+    return build_scenarios(selected)
 
 
 # ── Summary collector ─────────────────────────────────────────────────────────
-_RESULTS: List[Dict[str, Any]] = []   # {"id": ..., "status": "PASS"|"FAIL", "reason": ...}
+_RESULTS: List[Dict[str, Any]] = []   # {"id": ..., "status": "PASS"|"FAIL"|"SKIP", "reason": ...}
+_STATUS = {"passed": "PASS", "failed": "FAIL", "skipped": "SKIP"}
 
 
 def pytest_runtest_logreport(report):
-    """เก็บผล pass/fail ของแต่ละ test case"""
-    if report.when != "call":
+    """เก็บผล pass/fail/skip ของแต่ละ test case (skip จาก mark เกิดใน setup phase)"""
+    if not (report.when == "call" or (report.when == "setup" and report.outcome != "passed")):
         return
-    status = "PASS" if report.passed else "FAIL"
+    status = _STATUS[report.outcome]
     reason = ""
-    if report.failed and report.longrepr:
-        # ดึงเฉพาะบรรทัดสุดท้ายของ assert message
-        lines  = str(report.longrepr).strip().splitlines()
-        reason = next((l.strip() for l in reversed(lines) if l.strip()), "")
-    _RESULTS.append({"id": report.nodeid.split("::")[-1], "status": status, "reason": reason})
+    if report.longrepr and not report.passed:
+        if report.skipped and isinstance(report.longrepr, tuple):
+            reason = str(report.longrepr[2])                 # (file, line, "Skipped: ...")
+        else:
+            # ดึงเฉพาะบรรทัดสุดท้ายของ assert message
+            lines  = str(report.longrepr).strip().splitlines()
+            reason = next((l.strip() for l in reversed(lines) if l.strip()), "")
+    _RESULTS.append({"id": report.nodeid.split("[", 1)[-1].rstrip("]"), "status": status, "reason": reason})
 
 
 def pytest_terminal_summary(terminalreporter, exitstatus, config):
@@ -1320,15 +1442,17 @@ def pytest_terminal_summary(terminalreporter, exitstatus, config):
     if not _RESULTS:
         return
 
-    passed = [r for r in _RESULTS if r["status"] == "PASS"]
-    failed = [r for r in _RESULTS if r["status"] == "FAIL"]
+    passed  = [r for r in _RESULTS if r["status"] == "PASS"]
+    failed  = [r for r in _RESULTS if r["status"] == "FAIL"]
+    skipped = [r for r in _RESULTS if r["status"] == "SKIP"]
 
     print(f"\n{SEP}")
-    print(f"  TEST SUMMARY  ({len(passed)} passed / {len(failed)} failed / {len(_RESULTS)} total)")
+    print(f"  TEST SUMMARY  ({len(passed)} passed / {len(failed)} failed / {len(skipped)} skipped"
+          f" / {len(_RESULTS)} total)")
     print(SEP)
 
     for r in _RESULTS:
-        icon  = "✅" if r["status"] == "PASS" else "❌"
+        icon  = {"PASS": "✅", "FAIL": "❌", "SKIP": "⏭️ "}[r["status"]]
         label = f"  {icon} {r['status']}  {r['id']}"
         print(label)
         if r["reason"]:
@@ -1339,12 +1463,23 @@ def pytest_terminal_summary(terminalreporter, exitstatus, config):
 
 class TestAllScenarios:
 
-    def test_verify(self, tc):
-        """Dispatch ไปยัง verify_fn ของแต่ละ scenario โดยอัตโนมัติ"""
-        scenario = next(s for s in SCENARIO_REGISTRY if s.name == tc["scenario"])
-        scenario.verify_fn(tc)
+    def test_verify(self, scenario_name, case_id, scenario_cases, record_property):
+        """Dispatch test case 1 ตัว (1 item ใน JUnit / Xray) ไปยัง verify_fn ของ scenario"""
+        scenario = _get_scenario(scenario_name)
+        built    = scenario_cases.get(scenario_name, [])
+        if isinstance(built, Exception):
+            pytest.fail(f"[{scenario_name}] build error: {type(built).__name__}: {built}", pytrace=False)
+        cases    = {tc.get("test_id"): tc for tc in built}
+        record_property("build_time_s", round(_BUILD_TIMES.get(scenario_name, 0.0), 3))
+        record_property("test_cases",   len(cases))
+
+        if not cases:
+            pytest.skip(f"[{scenario_name}] build ไม่ได้ test case เลย (request fail / node ว่าง)")
+        if case_id not in cases:
+            pytest.skip(f"[{scenario_name}] cursor walk หยุดก่อนถึง {case_id} ({len(cases)} cases ที่ build ได้)")
+
+        scenario.verify_fn(cases[case_id])
 
 
 if __name__ == "__main__":
-    import sys
     sys.exit(pytest.main([__file__, "-v", "-s"]))
@@ -12,10 +12,19 @@ test_pp2_vs_pp5_no_duplicate.py
 ════════════════════════════════════════════════════════════════════════════════
 """
 
+import os
+import sys
+
 import pytest
 import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.host_limiter import limited
+
 # ══════════════════════════════════════════════════════════════════════════════
 # CONFIG
 # ══════════════════════════════════════════════════════════════════════════════
@@ -43,7 +52,8 @@ def fail(l):         log(f"  ❌ {l}")
 
 def call_api(name: str, url: str, sso_id: str) -> dict:
     params = {"ssoId": sso_id}
-    resp   = requests.get(url, params=params, timeout=TIMEOUT)
+    with limited(url):   # in-flight / rps ต่อ host — ไม่ยิง 100 รอบรวดเดียวใส่ preprod
+        resp = requests.get(url, params=params, timeout=TIMEOUT)
     resp.raise_for_status()
     body = resp.json()
     return {
@@ -152,5 +162,4 @@ class TestPP2vsPP5NoDuplicate:
 
 
 if __name__ == "__main__":
-    import sys
     sys.exit(pytest.main([__file__, "-v", "-s"]))
\ No newline at end of file
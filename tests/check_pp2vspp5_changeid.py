@@ -12,12 +12,21 @@ test_pp2_vs_pp5_no_duplicate.py
 ════════════════════════════════════════════════════════════════════════════════
 """
 
+import os
+import sys
+
 import pytest
 import requests
 import time
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.host_limiter import limited
+
 # ══════════════════════════════════════════════════════════════════════════════
 # CONFIG
 # ══════════════════════════════════════════════════════════════════════════════
@@ -46,14 +55,15 @@ def fail(l):         log(f"  ❌ {l}")
 
 
 def call_api(name: str, url: str, sso_id: str) -> dict:
-    params     = {"ssoId": sso_id}
-    call_start = datetime.now()
-    ts_start   = time.perf_counter()
-
-    resp = requests.get(url, params=params, timeout=TIMEOUT)
-
-    ts_end   = time.perf_counter()
-    call_end = datetime.now()
+    params = {"ssoId": sso_id}
+
+    # in-flight / rps ต่อ host — เวลาเริ่มนับหลังได้ slot (ไม่รวมเวลารอคิว)
+    with limited(url):
+        call_start = datetime.now()
+        ts_start   = time.perf_counter()
+        resp = requests.get(url, params=params, timeout=TIMEOUT)
+        ts_end   = time.perf_counter()
+        call_end = datetime.now()
     elapsed  = round((ts_end - ts_start) * 1000, 2)  # ms
 
     resp.raise_for_status()
@@ -196,5 +206,4 @@ class TestPP2vsPP5NoDuplicate:
 
 
 if __name__ == "__main__":
-    import sys
     sys.exit(pytest.main([__file__, "-v", "-s"]))
\ No newline at end of file
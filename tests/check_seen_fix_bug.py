@@ -14,9 +14,18 @@ Flow (sliding window):
 ════════════════════════════════════════════════════════════════════════════════
 """
 
+import os
+import sys
+
 import pytest
 import requests
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.node_index import index_of
+
 # ══════════════════════════════════════════════════════════════════════════════
 # CONFIG
 # ══════════════════════════════════════════════════════════════════════════════
@@ -58,16 +67,10 @@ def fail(l):         log(f"  ❌ {l}")
 
 
 def find_key(obj, key_name):
-    """Recursive search — หา node ไม่ว่าจะซ้อนลึกแค่ไหน"""
+    """หา node ไม่ว่าจะซ้อนลึกแค่ไหน (ค้นเฉพาะใน dict ไม่ลงไปใน list) — body เดียวกัน walk ครั้งเดียว"""
     if not isinstance(obj, dict):
         return None
-    if key_name in obj:
-        return obj[key_name]
-    for v in obj.values():
-        found = find_key(v, key_name)
-        if found is not None:
-            return found
-    return None
+    return index_of(obj, lists=False).value(key_name)
 
 
 def extract_ids(node):
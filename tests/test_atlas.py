@@ -4,22 +4,36 @@ Atlas Serving Endpoint Comparison Script
 Compare response bodies between 2 endpoints for all placements.
 
 Usage:
-    pip install requests openpyxl pandas deepdiff
+    pip install requests openpyxl pandas
     python compare_endpoints.py
 
 Output:
     - comparison_results.xlsx  : Full result with diff details
-    - comparison_summary.txt   : Quick summary
+    - comparison_summary.txt   : Quick summary + throughput
+    - comparison_diffs.json    : Structured diff of every placement that is not byte-for-byte SAME
+
+Placements are fetched concurrently (WORKERS threads, per-host limits from
+qa_common.host_limiter). Each pair is first compared by a canonical hash;
+the id-keyed structural diff (qa_common.payload_diff) runs only when the hashes differ.
 """
 
+import os
+import hashlib
 import requests
 import pandas as pd
 import json
-import time
 import sys
-from deepdiff import DeepDiff
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from qa_common.host_limiter import limited
+from qa_common.payload_diff import diff_payloads, summarize
+
 # ─── CONFIG ─────────────────────────────────────────────────────────────────
 ENDPOINT_1 = "http://atlas-serving.preprod-gcp-ai-bn.int-ai-platform.gcp.dmp.true.th"
 ENDPOINT_2 = "http://atlas-serving-2.prod-gcp-ai-bn.ai-platform.gcp.dmp.true.th"
@@ -27,16 +41,26 @@ ENDPOINT_2 = "http://atlas-serving-2.prod-gcp-ai-bn.ai-platform.gcp.dmp.true.th"
 EXCEL_INPUT = "/Users/ekananat/Desktop/autoqa/src/req_atlas.xlsx" 
 EXCEL_OUTPUT = "comparison_results.xlsx"
 SUMMARY_OUTPUT = "comparison_summary.txt"
+DIFF_OUTPUT = "comparison_diffs.json"
 
 TIMEOUT = 10       # seconds per request
-DELAY   = 0.15     # seconds between requests (avoid rate limiting)
+WORKERS = int(os.environ.get("ATLAS_WORKERS", "16"))   # concurrent fetches (both endpoints)
+# rate limiting: per-host in-flight / rps limits in qa_common.host_limiter (QA_HOST_LIMITS)
+OLD_DELAY = 0.15   # sleep per request of the old serial loop — used only for the throughput estimate
+
+# top-level keys that differ per call and are not part of the comparison
+EXCLUDE_KEYS = ("schemaId", "request_id")
 # ─────────────────────────────────────────────────────────────────────────────
 
 
 def fetch(url: str) -> dict:
-    """Call URL, return dict with status, items_count, body (parsed JSON or None), error."""
+    """Call URL, return dict with status, items_count, body (parsed JSON or None), error, elapsed."""
+    t0 = time.perf_counter()
     try:
-        resp = requests.get(url, timeout=TIMEOUT)
+        with limited(url):
+            t0 = time.perf_counter()
+            resp = requests.get(url, timeout=TIMEOUT)
+            elapsed = time.perf_counter() - t0
         status = resp.status_code
         body = None
         items_count = 0
@@ -46,22 +70,68 @@ def fetch(url: str) -> dict:
             items_count = len(items) if isinstance(items, list) else 0
         except Exception:
             body = None
-        return {"status": status, "items_count": items_count, "body": body, "error": None}
+        return {"status": status, "items_count": items_count, "body": body, "error": None,
+                "elapsed": elapsed}
     except requests.exceptions.ConnectionError as e:
-        return {"status": "ERROR", "items_count": 0, "body": None, "error": f"ConnectionError: {e}"}
+        return {"status": "ERROR", "items_count": 0, "body": None, "error": f"ConnectionError: {e}",
+                "elapsed": time.perf_counter() - t0}
     except requests.exceptions.Timeout:
-        return {"status": "TIMEOUT", "items_count": 0, "body": None, "error": "Request timed out"}
+        return {"status": "TIMEOUT", "items_count": 0, "body": None, "error": "Request timed out",
+                "elapsed": time.perf_counter() - t0}
     except Exception as e:
-        return {"status": "ERROR", "items_count": 0, "body": None, "error": str(e)}
+        return {"status": "ERROR", "items_count": 0, "body": None, "error": str(e),
+                "elapsed": time.perf_counter() - t0}
+
+
+def _digest(obj) -> bytes:
+    """
+    Structural digest — equal digests mean equal bodies with list order ignored:
+      - dict  : keys sorted
+      - list  : order-insensitive (sum of element digests mod 2^256) + length
+      - float : rounded to 2 decimals; int / float / bool / str / None are distinct types
+    """
+    if isinstance(obj, dict):
+        h = hashlib.sha256(b"d")
+        for k in sorted(obj, key=str):
+            h.update(_digest(str(k)))
+            h.update(_digest(obj[k]))
+        return h.digest()
+    if isinstance(obj, list):
+        acc = 0
+        for x in obj:
+            acc += int.from_bytes(_digest(x), "big")
+        return hashlib.sha256(b"l%d:" % len(obj) + (acc % (1 << 256)).to_bytes(32, "big")).digest()
+    if isinstance(obj, bool):
+        raw = b"b1" if obj else b"b0"
+    elif isinstance(obj, float):
+        raw = b"f" + f"{obj:.2f}".encode()
+    elif isinstance(obj, int):
+        raw = b"i" + str(obj).encode()
+    elif isinstance(obj, str):
+        raw = b"s" + obj.encode("utf-8")
+    elif obj is None:
+        raw = b"n"
+    else:
+        raw = b"o" + repr(obj).encode("utf-8")
+    return hashlib.sha256(raw).digest()
+
+
+def canonical_hash(body: dict) -> str:
+    """Order-insensitive hash of a response body, ignoring EXCLUDE_KEYS at the top level."""
+    if isinstance(body, dict):
+        body = {k: v for k, v in body.items() if k not in EXCLUDE_KEYS}
+    return _digest(body).hex()
 
 
 def compare_bodies(body1, body2) -> dict:
     """
-    Deep-compare two JSON bodies.
+    Compare two JSON bodies (list order ignored for the verdict, as before).
     Returns:
         match     : True/False/None (None = both failed)
         diff_type : 'SAME' | 'BODY_DIFF' | 'BOTH_FAILED' | 'ONE_FAILED' | 'ITEMS_COUNT_DIFF'
         diff_detail: human-readable diff summary
+        checked_by: 'hash' (canonical hashes equal — diff skipped) | 'diff'
+        diff      : structured diff (qa_common.payload_diff) or None
     """
     if body1 is None and body2 is None:
         return {"match": None, "diff_type": "BOTH_FAILED", "diff_detail": "Both endpoints returned no parseable body"}
@@ -78,52 +148,30 @@ def compare_bodies(body1, body2) -> dict:
     items1 = items1 if isinstance(items1, list) else []
     items2 = items2 if isinstance(items2, list) else []
 
-    # Deep compare full body
-    try:
-        diff = DeepDiff(body1, body2, ignore_order=True, significant_digits=2,
-                exclude_paths=["root['schemaId']", "root['request_id']"])
-        if not diff:
-            return {"match": True, "diff_type": "SAME", "diff_detail": ""}
-
-        # Summarize diff
-        diff_parts = []
-        if "values_changed" in diff:
-            changed_details = []
-            for key, change in list(diff["values_changed"].items())[:3]:
-                old_val = change.get("old_value", "?")
-                new_val = change.get("new_value", "?")
-                changed_details.append(f"{key}({old_val!r} → {new_val!r})")
-            diff_parts.append(f"values_changed: {changed_details}")
-        if "iterable_item_added" in diff:
-            diff_parts.append(f"items_added in ep2: {len(diff['iterable_item_added'])}")
-        if "iterable_item_removed" in diff:
-            diff_parts.append(f"items_removed in ep2: {len(diff['iterable_item_removed'])}")
-        if "dictionary_item_added" in diff:
-            diff_parts.append(f"keys_added: {list(diff['dictionary_item_added'])[:3]}")
-        if "dictionary_item_removed" in diff:
-            diff_parts.append(f"keys_removed: {list(diff['dictionary_item_removed'])[:3]}")
-        if "type_changes" in diff:
-            diff_parts.append(f"type_changes: {list(diff['type_changes'].keys())[:3]}")
-
-        # Check if only item count differs
-        if len(items1) != len(items2):
-            diff_type = "ITEMS_COUNT_DIFF"
-        else:
-            diff_type = "BODY_DIFF"
+    # Cheap pre-check: equal canonical hashes → SAME without diffing
+    if canonical_hash(body1) == canonical_hash(body2):
+        return {"match": True, "diff_type": "SAME", "diff_detail": "", "checked_by": "hash", "diff": None}
 
-        return {
-            "match": False,
-            "diff_type": diff_type,
-            "diff_detail": " | ".join(diff_parts) if diff_parts else str(diff)[:200]
-        }
-    except Exception as e:
-        # Fallback: simple equality
-        match = (body1 == body2)
-        return {
-            "match": match,
-            "diff_type": "SAME" if match else "BODY_DIFF",
-            "diff_detail": "" if match else f"diff-error: {e}"
-        }
+    # Structural diff keyed by item id (only for pairs whose hashes differ)
+    diff = diff_payloads(body1, body2, exclude_keys=EXCLUDE_KEYS)
+    if diff["same_content"]:
+        # order-only differences (moved / shifted items) — SAME under the ignore-order verdict
+        return {"match": True, "diff_type": "SAME", "diff_detail": summarize(diff),
+                "checked_by": "diff", "diff": diff}
+
+    # Check if only item count differs
+    if len(items1) != len(items2):
+        diff_type = "ITEMS_COUNT_DIFF"
+    else:
+        diff_type = "BODY_DIFF"
+
+    return {
+        "match": False,
+        "diff_type": diff_type,
+        "diff_detail": summarize(diff),
+        "checked_by": "diff",
+        "diff": diff,
+    }
 
 
 def main():
@@ -144,31 +192,25 @@ def main():
     HOST1 = ENDPOINT_1.replace("http://", "")
     HOST2 = ENDPOINT_2.replace("http://", "")
 
-    results = []
     total = len(df)
+    rows  = []
+    for _, row in df.iterrows():
+        url1 = str(row["URL"]).strip()
+        rows.append((row["No"], str(row["Placement"]).strip(), url1, url1.replace(HOST1, HOST2)))
 
-    for i, row in df.iterrows():
-        no        = row["No"]
-        placement = str(row["Placement"]).strip()
-        url1      = str(row["URL"]).strip()
-        url2      = url1.replace(HOST1, HOST2)
+    def build_result(ri: int, r1: dict, r2: dict) -> dict:
+        no, placement, url1, url2 = rows[ri]
 
-        sys.stdout.write(f"\r[{no:3d}/{total}] {placement[:55]:<55}")
-        sys.stdout.flush()
-
-        # Fetch both endpoints
-        r1 = fetch(url1)
-        time.sleep(DELAY)
-        r2 = fetch(url2)
-        time.sleep(DELAY)
-
-        # Compare
+        # Compare (hash pre-check, structural diff only on mismatch)
         cmp = compare_bodies(r1["body"], r2["body"])
+        if cmp.get("diff") is not None:
+            diffs.append({"No": no, "Placement": placement, "Diff_Type": cmp["diff_type"],
+                          "URL1": url1, "URL2": url2, "diff": cmp["diff"]})
 
         # Status match (HTTP status code)
         status_match = (r1["status"] == r2["status"])
 
-        results.append({
+        return {
             "No":             no,
             "Placement":      placement,
             # Endpoint 1
@@ -184,9 +226,50 @@ def main():
             "Body_Match":     "✅" if cmp["match"] is True else ("⬛" if cmp["match"] is None else "❌"),
             "Diff_Type":      cmp["diff_type"],
             "Diff_Detail":    cmp["diff_detail"],
+            "Checked_By":     cmp.get("checked_by", ""),
             "URL1":           url1,
             "URL2":           url2,
-        })
+        }
+
+    # ── Fetch every (placement, endpoint) concurrently — host_limiter bounds each host.
+    #    A pair is compared as soon as both sides arrive, then its bodies are dropped.
+    results   = [None] * total
+    diffs     = []      # structured diffs → DIFF_OUTPUT
+    pending   = {}      # row index → response of the side that arrived first
+    fetch_sum = 0.0     # sum of per-request latency (= serial fetch time)
+    cmp_s     = 0.0
+    t_start   = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(WORKERS, 2 * total))) as pool:
+        futures = {pool.submit(fetch, url): (ri, ep)
+                   for ri, (_, _, url1, url2) in enumerate(rows)
+                   for ep, url in ((1, url1), (2, url2))}
+        for done, fut in enumerate(as_completed(futures), 1):
+            ri, ep = futures[fut]
+            resp   = fut.result()
+            fetch_sum += resp["elapsed"]
+            other = pending.pop(ri, None)
+            if other is None:
+                pending[ri] = resp
+            else:
+                r1, r2 = (resp, other) if ep == 1 else (other, resp)
+                t0 = time.perf_counter()
+                results[ri] = build_result(ri, r1, r2)
+                cmp_s += time.perf_counter() - t0
+                sys.stdout.write(f"\r[{done:4d}/{len(futures)}] {rows[ri][1][:55]:<55}")
+                sys.stdout.flush()
+    wall_s = time.perf_counter() - t_start
+
+    hash_hits  = sum(1 for r in results if r["Checked_By"] == "hash")
+    diff_runs  = sum(1 for r in results if r["Checked_By"] == "diff")
+    serial_s   = fetch_sum + 2 * total * OLD_DELAY
+    throughput = (
+        f"  Requests          : {2 * total} in {wall_s:.1f} s "
+        f"({2 * total / wall_s if wall_s else 0:.1f} req/s, {WORKERS} workers)\n"
+        f"  Serial estimate   : {serial_s:.1f} s (sum of latencies + {OLD_DELAY}s delay per request)\n"
+        f"  Speed-up          : x{serial_s / wall_s if wall_s else 0:.1f}\n"
+        f"  Hash pre-check    : {hash_hits} SAME without diffing, {diff_runs} structural diffs "
+        f"(compare {cmp_s:.2f} s)\n"
+    )
 
     print(f"\n\n✅ Done! Collected {len(results)} results.\n")
 
@@ -218,6 +301,8 @@ Total placements: {total}
 ── Status Code ──────────────────────
   Status mismatch   : {status_mismatch}
 
+── Throughput ───────────────────────
+{throughput}
 ── Placements with differences ──────
 """
     diff_rows = result_df[result_df["Diff_Type"] != "SAME"]
@@ -236,6 +321,12 @@ Total placements: {total}
         f.write(summary)
     print(f"📄 Summary saved: {SUMMARY_OUTPUT}")
 
+    # Save structured diffs
+    diffs.sort(key=lambda d: d["No"])
+    with open(DIFF_OUTPUT, "w", encoding="utf-8") as f:
+        json.dump(diffs, f, ensure_ascii=False, indent=2, default=str)
+    print(f"🧾 Structured diffs saved: {DIFF_OUTPUT} ({len(diffs)} placements)")
+
     # ── Export Excel ────────────────────────────────────────────────────────
     from openpyxl import Workbook
     from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
@@ -362,6 +453,11 @@ Total placements: {total}
     sum_row(10, "⚠️  ONE_FAILED",       one_fail,   YELLOW)
     sum_row(11, "⬛ BOTH_FAILED",      both_fail,  GREY)
     sum_row(13, "❌ Status Mismatch",  status_mismatch, RED)
+    sum_row(15, "Wall time (s)",       round(wall_s, 1))
+    sum_row(16, "Serial estimate (s)", round(serial_s, 1))
+    sum_row(17, "Requests / s",        round(2 * total / wall_s, 1) if wall_s else 0)
+    sum_row(18, "SAME by hash",        hash_hits)
+    sum_row(19, "Structural diffs",    diff_runs)
 
     wb.save(EXCEL_OUTPUT)
     print(f"📊 Excel saved: {EXCEL_OUTPUT}")